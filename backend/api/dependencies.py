@@ -0,0 +1,142 @@
+"""Shared request dependencies."""
+
+from functools import lru_cache
+from typing import Optional
+
+from cryptography.fernet import InvalidToken
+from fastapi import Depends, Header, HTTPException
+
+from backend.services.encryption import EnvelopeCipher, FernetCipher, RecordCipher
+from backend.services.jobs import JobQueue
+from backend.services.keys import KeyManager
+from backend.services.storage import DEFAULT_KEY_PATH, CycleStore, load_local_key
+
+# Single-user deployments never send a user id
+DEFAULT_USER_ID = "local"
+# Encrypted under a user's key as their key check
+KEY_CHECK = b"flux-key-check"
+
+cycle_store = CycleStore()
+key_manager = KeyManager()
+job_queue = JobQueue(cycle_store)
+
+
+async def get_user_id(x_user_id: Optional[str] = Header(default=None)) -> str:
+    """Identify the user a request acts for, from the X-User-ID header."""
+    return x_user_id or DEFAULT_USER_ID
+
+
+async def get_cycle_store() -> CycleStore:
+    """The shared cycle store; overridden in tests."""
+    return cycle_store
+
+
+async def get_key_manager() -> KeyManager:
+    """The shared key manager; overridden in tests."""
+    return key_manager
+
+
+async def get_job_queue() -> JobQueue:
+    """The shared background job queue; overridden in tests."""
+    return job_queue
+
+
+def bearer_token(authorization: Optional[str] = Header(default=None)) -> Optional[str]:
+    """Session token from an ``Authorization: Bearer <token>`` header."""
+    if authorization is None:
+        return None
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise HTTPException(status_code=401, detail="Expected a Bearer session token")
+    return token
+
+
+@lru_cache(maxsize=1)
+def _local_key() -> bytes:
+    return load_local_key(DEFAULT_KEY_PATH)
+
+
+async def get_cipher(
+    token: Optional[str] = Depends(bearer_token),
+    x_encryption_key: Optional[str] = Header(default=None),
+    user_id: str = Depends(get_user_id),
+    keys: KeyManager = Depends(get_key_manager),
+) -> RecordCipher:
+    """Cipher for the request's records, set up once per request.
+
+    In order of preference: the data key held for the session from ``POST
+    /session`` (envelope encryption), a Fernet key the client derived itself
+    in the X-Encryption-Key header, or, for single-user deployments, a key
+    file on the server.
+    """
+    if token is not None:
+        session = keys.session_key(token)
+        if session is None or session[0] != user_id:
+            raise HTTPException(status_code=401, detail="Session expired or invalid")
+        return EnvelopeCipher(session[1])
+    if x_encryption_key:
+        try:
+            return FernetCipher(x_encryption_key.encode())
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Malformed X-Encryption-Key")
+    return FernetCipher(_local_key())
+
+
+async def get_verified_cipher(
+    user_id: str = Depends(get_user_id),
+    cipher: RecordCipher = Depends(get_cipher),
+    store: CycleStore = Depends(get_cycle_store),
+) -> RecordCipher:
+    """``get_cipher``, checked against the user's key check.
+
+    For routes that return stored data without decrypting it, where a wrong
+    key would otherwise go unnoticed. The check is pinned by the user's
+    first write, so no later record, whoever wrote it, can vouch for a key.
+    A key that does not fit is a 403; a user who never wrote anything has
+    nothing to check against and nothing to leak but deletions.
+    """
+    await _check_key(user_id, cipher, store, pin=False)
+    return cipher
+
+
+async def get_write_cipher(
+    user_id: str = Depends(get_user_id),
+    cipher: RecordCipher = Depends(get_cipher),
+    store: CycleStore = Depends(get_cycle_store),
+) -> RecordCipher:
+    """``get_cipher``, checked against the user's key check before a write.
+
+    The user's first write stores their key check, so every later write must
+    come with the same key; one under another key would leave records the
+    user cannot decrypt. A key that does not fit is a 403.
+    """
+    await _check_key(user_id, cipher, store, pin=True)
+    return cipher
+
+
+async def _check_key(user_id: str, cipher: RecordCipher, store: CycleStore, pin: bool) -> None:
+    """Raise a 403 unless ``cipher`` holds the user's key.
+
+    Users without a key check yet are checked against their earliest record,
+    and get one once a key fits. With ``pin``, a user with no records at all
+    gets one for this key.
+
+    Raises:
+        HTTPException: 403 if the key does not fit
+    """
+    check = await store.get_key_check(user_id)
+    if check is None:
+        first = await store.get_first_payload(user_id)
+        if first is not None:
+            _decrypt_or_403(cipher, first)
+        elif not pin:
+            return
+        check = await store.set_key_check(user_id, cipher.encrypt(KEY_CHECK))
+    _decrypt_or_403(cipher, check)
+
+
+def _decrypt_or_403(cipher: RecordCipher, token: bytes) -> None:
+    try:
+        cipher.decrypt(token)
+    except (InvalidToken, ValueError):
+        raise HTTPException(status_code=403, detail="Data cannot be decrypted with this key")
@@ -1,42 +1,390 @@
 """API routes for period tracking."""
 
-from fastapi import APIRouter, UploadFile, File, Depends
-from typing import Optional
+import base64
+from collections.abc import Callable
+from datetime import date
+from fastapi import APIRouter, UploadFile, File, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from pathlib import Path
+from typing import Literal, Optional
 
-from backend.api.schemas import CycleData, PredictionResponse
-from backend.services.encryption import EncryptionService
-from backend.services.prediction import PredictionService
+from cryptography.fernet import InvalidToken
+
+from backend.api.dependencies import (
+    bearer_token,
+    get_cipher,
+    get_cycle_store,
+    get_job_queue,
+    get_key_manager,
+    get_user_id,
+    get_verified_cipher,
+    get_write_cipher,
+)
+from backend.api.encoding import (
+    FRAMES_MEDIA_TYPE,
+    encode_change,
+    encode_end,
+    encode_records,
+    wants_frames,
+)
+from backend.api.schemas import (
+    ChangePasswordRequest,
+    CycleData,
+    LoginRequest,
+    PredictionResponse,
+    SessionResponse,
+    SyncChange,
+    SyncResponse,
+)
+from backend.services.encryption import RecordCipher
+from backend.services.importer import FloImportPipeline, iter_file, spool_upload
+from backend.services.jobs import JobQueue, JobStatus
+from backend.services.keys import InvalidCredentials, KeyManager
+from backend.services.prediction import DEFAULT_MODEL_STORE_PATH, PredictionService
+from backend.services.retrain import retrain_user
+from backend.services.storage import CycleStore, StoredChange, StoredCycle
 
 router = APIRouter()
 
+SYNC_PAGE_SIZE = 500
+MAX_SYNC_PAGE_SIZE = 5000
+# Records written per chunk of a streamed response
+STREAM_BATCH_SIZE = 500
+
+prediction_service = PredictionService(model_path=DEFAULT_MODEL_STORE_PATH)
+
+
+@router.post("/session", response_model=SessionResponse)
+async def login(
+    body: LoginRequest,
+    user_id: str = Depends(get_user_id),
+    keys: KeyManager = Depends(get_key_manager),
+    store: CycleStore = Depends(get_cycle_store),
+):
+    """Derive the user's key once and hold it for a session."""
+    try:
+        session = await keys.login(user_id, body.password, store)
+    except InvalidCredentials:
+        raise HTTPException(status_code=401, detail="Invalid password")
+    return SessionResponse(token=session.token, expires_in=int(keys.ttl_seconds))
+
+
+@router.delete("/session")
+async def logout(
+    token: Optional[str] = Depends(bearer_token),
+    keys: KeyManager = Depends(get_key_manager),
+):
+    """End a session and wipe its key."""
+    if token is None or not keys.logout(token):
+        raise HTTPException(status_code=401, detail="Session expired or invalid")
+    return {"message": "Logged out"}
+
+
+@router.put("/session/password")
+async def change_password(
+    body: ChangePasswordRequest,
+    user_id: str = Depends(get_user_id),
+    keys: KeyManager = Depends(get_key_manager),
+    store: CycleStore = Depends(get_cycle_store),
+):
+    """Re-wrap the user's data key under a new password; records are untouched."""
+    try:
+        await keys.change_password(user_id, body.old_password, body.new_password, store)
+    except InvalidCredentials:
+        raise HTTPException(status_code=401, detail="Invalid password")
+    return {"message": "Password changed"}
+
+
+@router.get("/session/stats")
+async def session_stats(keys: KeyManager = Depends(get_key_manager)):
+    """Session count and key derivations since startup."""
+    return keys.stats()
+
+
+@router.post("/import/flo", status_code=202)
+async def import_flo_data(
+    file: UploadFile = File(...),
+    user_id: str = Depends(get_user_id),
+    cipher: RecordCipher = Depends(get_write_cipher),
+    store: CycleStore = Depends(get_cycle_store),
+    jobs: JobQueue = Depends(get_job_queue),
+):
+    """Import data from Flo app export as a background job.
+
+    The upload is copied to a private temporary file and the import is
+    queued; poll ``GET /jobs/{job_id}`` for progress and the final counts.
+    """
+    file_name = file.filename or "upload.json"
+    if Path(file_name).suffix != ".json":
+        raise HTTPException(status_code=400, detail="Flo exports must be .json files")
 
-@router.post("/import/flo")
-async def import_flo_data(file: UploadFile = File(...)):
-    """Import data from Flo app export."""
-    # TODO: Implement Flo data parsing
-    return {"message": "Import endpoint - to be implemented"}
+    path = await spool_upload(file)
+
+    async def run(report: Callable[[dict], None]) -> dict:
+        pipeline = FloImportPipeline(
+            user_id,
+            cipher,
+            store,
+            file_name=file_name,
+            total_bytes=path.stat().st_size,
+            on_progress=lambda progress: report(progress.model_dump()),
+        )
+        result = await pipeline.run(iter_file(path))
+        prediction_service.invalidate(user_id)
+        return result.model_dump()
+
+    try:
+        # The spooled copy is plaintext; it goes even if the job never runs
+        job_id = await jobs.submit(
+            "import", user_id, run, cleanup=lambda: path.unlink(missing_ok=True)
+        )
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+    return {"job_id": job_id}
+
+
+@router.post("/retrain", status_code=202)
+async def retrain_model(
+    model: Literal["auto", "prophet", "weighted_average", "bayesian"] = "auto",
+    user_id: str = Depends(get_user_id),
+    cipher: RecordCipher = Depends(get_write_cipher),
+    store: CycleStore = Depends(get_cycle_store),
+    jobs: JobQueue = Depends(get_job_queue),
+):
+    """Retrain the user's model on their stored cycles as a background job."""
+
+    async def run(report: Callable[[dict], None]) -> dict:
+        report({"stage": "fitting"})
+        result = await retrain_user(
+            user_id, cipher, store, model_type=model, model_store=prediction_service.model
+        )
+        prediction_service.invalidate(user_id)
+        return result
+
+    return {"job_id": await jobs.submit("retrain", user_id, run)}
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(
+    job_id: str,
+    user_id: str = Depends(get_user_id),
+    jobs: JobQueue = Depends(get_job_queue),
+):
+    """Status, progress and result of a background job."""
+    job = await jobs.get(job_id, user_id=user_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/jobs")
+async def job_queue_stats(jobs: JobQueue = Depends(get_job_queue)):
+    """Running and queued jobs per job type, with their concurrency limits."""
+    return jobs.stats()
 
 
 @router.post("/cycles")
-async def add_cycle(cycle: CycleData):
+async def add_cycle(
+    cycle: CycleData,
+    user_id: str = Depends(get_user_id),
+    cipher: RecordCipher = Depends(get_write_cipher),
+    store: CycleStore = Depends(get_cycle_store),
+):
     """Add a new cycle entry."""
-    # TODO: Encrypt and store cycle data
-    return {"message": "Cycle added"}
+    payload = cipher.encrypt(cycle.model_dump_json().encode())
+    cycle_id = await store.add_cycle(user_id, cycle.start_date, payload)
+    prediction_service.invalidate(user_id)
+    return {"message": "Cycle added", "id": cycle_id}
 
 
 @router.get("/cycles")
-async def get_cycles():
-    """Get all cycles for current user."""
-    # TODO: Decrypt and return cycle data
-    return {"cycles": []}
+async def get_cycles(
+    response: Response,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    accept: Optional[str] = Header(default=None),
+    user_id: str = Depends(get_user_id),
+    cipher: RecordCipher = Depends(get_cipher),
+    store: CycleStore = Depends(get_cycle_store),
+):
+    """Get all cycles for current user, optionally within a start date range.
+
+    With ``Accept: application/vnd.flux.frames`` the cycles are streamed as
+    record frames, encoded a batch at a time, ending in a frame with the
+    count.
+    """
+    stored = await store.get_cycles(user_id, since=since, until=until)
+    if not wants_frames(accept):
+        response.headers["Vary"] = "Accept"
+        return {"cycles": decrypt_cycles(stored, cipher)}
+
+    # Every row is decrypted before the headers go out: a wrong key or a
+    # corrupt row is a 403, never a 200 stream that breaks off partway
+    cycles = decrypt_cycles(stored, cipher)
+
+    def stream():
+        for start in range(0, len(cycles), STREAM_BATCH_SIZE):
+            yield encode_records(cycles[start:start + STREAM_BATCH_SIZE])
+        yield encode_end(count=len(cycles))
+
+    return StreamingResponse(stream(), media_type=FRAMES_MEDIA_TYPE, headers={"Vary": "Accept"})
+
+
+@router.get("/sync", response_model=SyncResponse, dependencies=[Depends(get_verified_cipher)])
+async def sync_changes(
+    response: Response,
+    cursor: int = Query(default=0, ge=0),
+    limit: int = Query(default=SYNC_PAGE_SIZE, ge=1, le=MAX_SYNC_PAGE_SIZE),
+    if_none_match: Optional[str] = Header(default=None),
+    accept: Optional[str] = Header(default=None),
+    user_id: str = Depends(get_user_id),
+    store: CycleStore = Depends(get_cycle_store),
+):
+    """Encrypted cycles and daily logs changed after ``cursor``, oldest first.
+
+    Start from cursor 0 and pass each response's ``cursor`` back until
+    ``has_more`` is false; keep the last one for the next sync. Payloads are
+    the stored ciphertext, so only one record is decrypted, to check the key
+    before anything is returned.
+
+    A page is fully determined by the cursor, the limit and the user's newest
+    change, which is what the ETag encodes. A client sending it back in
+    If-None-Match gets a 304 after a single index lookup.
+
+    With ``Accept: application/vnd.flux.frames`` the page is streamed as
+    change frames carrying the raw ciphertext, read from the store
+    ``SYNC_PAGE_SIZE`` changes at a time, and ends in a frame with the cursor
+    and ``has_more``.
+    """
+    frames = wants_frames(accept)
+    latest = await store.latest_change(user_id)
+    # Each representation gets its own tag
+    etag = f'"{cursor}-{limit}-{latest}-frames"' if frames else f'"{cursor}-{limit}-{latest}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Accept"}
+    if if_none_match is not None and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    if frames:
+        return StreamingResponse(
+            _stream_changes(store, user_id, cursor, limit, latest > cursor),
+            media_type=FRAMES_MEDIA_TYPE,
+            headers=headers,
+        )
+    response.headers.update(headers)
+
+    stored = []
+    if latest > cursor:
+        stored = await store.get_changes(user_id, after=cursor, limit=limit + 1)
+    page = stored[:limit]
+    changes = [
+        SyncChange(
+            seq=change.seq,
+            kind=change.kind,
+            id=change.record_id,
+            deleted=change.deleted,
+            date=change.date,
+            payload=None if change.deleted else base64.b64encode(change.payload).decode("ascii"),
+        )
+        for change in page
+        if _is_live(change)
+    ]
+    return SyncResponse(
+        changes=changes,
+        cursor=page[-1].seq if page else cursor,
+        has_more=len(stored) > limit,
+    )
 
 
 @router.get("/predict", response_model=PredictionResponse)
-async def predict_next_period():
-    """Predict next period based on historical data."""
-    # TODO: Run prediction model
-    return PredictionResponse(
-        predicted_start=None,
-        confidence=0.0,
-        cycle_length_avg=0,
+async def predict_next_period(
+    user_id: str = Depends(get_user_id),
+    cipher: RecordCipher = Depends(get_cipher),
+    store: CycleStore = Depends(get_cycle_store),
+):
+    """Predict next period based on historical data.
+
+    A user with a trained model is answered from the memory-mapped model
+    store, without decrypting their cycles. The key must first decrypt the
+    user's stored params, and cycles added or deleted since training retire
+    the model until the next retrain. Otherwise the baseline average of
+    their stored cycles is used, cached until the cycles change.
+    """
+    if prediction_service.model is not None and await model_is_current(user_id, cipher, store):
+        response = prediction_service.predict_from_model(user_id)
+        if response is not None:
+            return response
+    cycles = decrypt_cycles(await store.get_cycles(user_id), cipher)
+    return prediction_service.predict(cycles, user_id=user_id)
+
+
+@router.get("/predict/models")
+async def model_store_stats():
+    """Size and generation of the model store, if predictions use one."""
+    if prediction_service.model is None:
+        return {"enabled": False}
+    return {"enabled": True, **prediction_service.model.stats()}
+
+
+@router.get("/predict/cache")
+async def prediction_cache_stats():
+    """Hit/miss counters of the per-user prediction cache."""
+    return prediction_service.cache.stats()
+
+
+async def _stream_changes(
+    store: CycleStore, user_id: str, cursor: int, limit: int, has_more: bool
+):
+    """Change frames for up to ``limit`` changes after ``cursor``, then the end frame."""
+    remaining = limit
+    while has_more and remaining:
+        size = min(remaining, SYNC_PAGE_SIZE)
+        stored = await store.get_changes(user_id, after=cursor, limit=size + 1)
+        page = stored[:size]
+        has_more = len(stored) > size
+        if page:
+            cursor = page[-1].seq
+            remaining -= len(page)
+            yield b"".join(encode_change(change) for change in page if _is_live(change))
+    yield encode_end(cursor=cursor, has_more=has_more)
+
+
+def _is_live(change: StoredChange) -> bool:
+    # An insert whose row is gone again; its deletion follows later
+    return change.deleted or change.payload is not None
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Whether an If-None-Match header lists ``etag`` (weak comparison)."""
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        candidate.strip().removeprefix("W/") == etag for candidate in if_none_match.split(",")
     )
+
+
+async def model_is_current(user_id: str, cipher: RecordCipher, store: CycleStore) -> bool:
+    """Whether the user's trained model may answer; a key that does not fit is a 403.
+
+    The model store is not encrypted, so decrypting the user's stored params
+    is what proves the key before anything from it is returned.
+    """
+    state = await store.get_model_state(user_id)
+    if state is None:
+        return False
+    payload, stale = state
+    try:
+        cipher.decrypt(payload)
+    except (InvalidToken, ValueError):
+        raise HTTPException(status_code=403, detail="Model cannot be decrypted with this key")
+    return not stale
+
+
+def decrypt_cycles(stored: list[StoredCycle], cipher: RecordCipher) -> list[CycleData]:
+    """Decrypt stored cycles; a key that does not fit is a 403."""
+    try:
+        return [
+            CycleData.model_validate_json(data)
+            for data in cipher.decrypt_many([row.payload for row in stored])
+        ]
+    except (InvalidToken, ValueError):
+        raise HTTPException(status_code=403, detail="Cycle data cannot be decrypted with this key")
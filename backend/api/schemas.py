@@ -1,7 +1,7 @@
 """Backend API schemas."""
 
 from datetime import date
-from typing import Optional
+from typing import Literal, Optional
 
 from pydantic import BaseModel, Field
 
@@ -22,3 +22,45 @@ class PredictionResponse(BaseModel):
     confidence: float = Field(ge=0.0, le=1.0)
     cycle_length_avg: int
 
+
+
+class SyncChange(BaseModel):
+    """One changed record in a delta sync page.
+
+    ``payload`` is the stored ciphertext, base64-encoded; deletions have none.
+    """
+
+    seq: int
+    kind: Literal["cycle", "log"]
+    id: int
+    deleted: bool = False
+    date: Optional[date]
+    payload: Optional[str] = None
+
+
+class SyncResponse(BaseModel):
+    """A page of changes and the cursor to continue from."""
+
+    changes: list[SyncChange]
+    cursor: int
+    has_more: bool
+
+
+class LoginRequest(BaseModel):
+    """Login payload; the password never leaves the key derivation."""
+
+    password: str = Field(min_length=1)
+
+
+class ChangePasswordRequest(BaseModel):
+    """Password change payload."""
+
+    old_password: str = Field(min_length=1)
+    new_password: str = Field(min_length=1)
+
+
+class SessionResponse(BaseModel):
+    """A session whose key is held by the server until it expires."""
+
+    token: str
+    expires_in: int
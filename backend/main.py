@@ -1,14 +1,41 @@
 """FLux Backend API - Privacy-focused period tracking."""
 
-from fastapi import FastAPI
+import os
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import PlainTextResponse
 
 from backend.api import routes
+from backend.api.dependencies import cycle_store, job_queue, key_manager
+from backend.api.encoding import GZIP_LEVEL, GZIP_MINIMUM_SIZE
+from backend.services.metrics import CONTENT_TYPE, MetricsMiddleware, metrics, profiler
+from backend.services.retrain import shutdown_fit_executor
+
+# The sampling profiler endpoints exist only when this is set
+PROFILER_ENABLED = os.environ.get("FLUX_PROFILER") == "1"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await job_queue.recover()
+    yield
+    await job_queue.close()
+    profiler.stop()
+    shutdown_fit_executor()
+    # The store opens on first use; flush queued writes on shutdown
+    await cycle_store.close()
+    key_manager.close()
+
 
 app = FastAPI(
     title="FLux API",
     description="Privacy-focused period tracking API",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # Configure CORS - restrict in production
@@ -19,10 +46,61 @@ app.add_middleware(
     allow_methods=["GET", "POST", "PUT", "DELETE"],
     allow_headers=["*"],
 )
+# Compresses JSON and frame responses alike, streamed ones chunk by chunk
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE, compresslevel=GZIP_LEVEL)
+# Added last, so it is outermost and times everything below it
+app.add_middleware(MetricsMiddleware, registry=metrics)
 
 app.include_router(routes.router, prefix="/api/v1")
 
+metrics.add_collector("sessions", key_manager.stats)
+metrics.add_collector("jobs", job_queue.stats)
+metrics.add_collector("prediction_cache", routes.prediction_service.cache.stats)
+
 
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    """Request, stage and service metrics in the Prometheus text format."""
+    return PlainTextResponse(metrics.render(), media_type=CONTENT_TYPE)
+
+
+def require_profiler() -> None:
+    if not PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+
+profiler_router = APIRouter(
+    prefix="/debug/profiler",
+    dependencies=[Depends(require_profiler)],
+    include_in_schema=False,
+)
+
+
+@profiler_router.post("/start")
+async def start_profiler(interval: float = Query(default=0.005, gt=0.0005, le=1.0)):
+    """Start sampling thread stacks every ``interval`` seconds."""
+    profiler.start(interval)
+    return profiler.stats()
+
+
+@profiler_router.post("/stop")
+async def stop_profiler():
+    profiler.stop()
+    return profiler.stats()
+
+
+@profiler_router.get("")
+async def profiler_stacks(limit: Optional[int] = Query(default=None, gt=0), reset: bool = False):
+    """Sampled stacks in collapsed format (``frame;frame count``) for flame graphs."""
+    stacks = profiler.collapsed(limit)
+    if reset:
+        profiler.reset()
+    return PlainTextResponse(stacks)
+
+
+app.include_router(profiler_router)
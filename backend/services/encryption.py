@@ -4,14 +4,30 @@ Privacy approach:
 - All cycle data is encrypted at rest using user-derived keys
 - Keys are derived from user password, never stored on server
 - Server only sees encrypted blobs, cannot read user data
+
+Envelope encryption:
+- Each user's records are encrypted with a random data key (AES-256-GCM)
+- The data key is stored wrapped (encrypted) by the password-derived key
+- Changing the password only re-wraps the data key; records are untouched
 """
 
-from cryptography.fernet import Fernet
+from typing import Protocol
+
+from cryptography.exceptions import InvalidTag
+from cryptography.fernet import Fernet, InvalidToken
 from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 import base64
 import os
 
+from backend.services.metrics import stage
+
+# First byte of every envelope record; Fernet tokens start with b"g"
+ENVELOPE_VERSION = b"\x01"
+NONCE_SIZE = 12
+DATA_KEY_SIZE = 32
+
 
 class EncryptionService:
     """Handle encryption/decryption of sensitive cycle data."""
@@ -44,3 +60,119 @@ class EncryptionService:
         """Decrypt data using the provided key."""
         f = Fernet(key)
         return f.decrypt(encrypted_data)
+
+    @staticmethod
+    def encrypt_many(records: list[bytes], key: bytes) -> list[bytes]:
+        """Encrypt many records with one cipher context."""
+        f = Fernet(key)
+        return [f.encrypt(data) for data in records]
+
+    @staticmethod
+    def decrypt_many(encrypted_records: list[bytes], key: bytes) -> list[bytes]:
+        """Decrypt many records with one cipher context."""
+        f = Fernet(key)
+        return [f.decrypt(data) for data in encrypted_records]
+
+    @staticmethod
+    def generate_data_key() -> bytes:
+        """Generate a random per-user data key for envelope encryption."""
+        return AESGCM.generate_key(bit_length=DATA_KEY_SIZE * 8)
+
+    @staticmethod
+    def wrap_data_key(data_key: bytes, key: bytes) -> bytes:
+        """Encrypt a data key with a password-derived key."""
+        nonce = os.urandom(NONCE_SIZE)
+        return nonce + AESGCM(_raw_key(key)).encrypt(nonce, data_key, None)
+
+    @staticmethod
+    def unwrap_data_key(wrapped: bytes, key: bytes) -> bytes:
+        """Decrypt a wrapped data key.
+
+        Raises:
+            InvalidToken: If the key is wrong or the wrapped key was modified
+        """
+        try:
+            return AESGCM(_raw_key(key)).decrypt(
+                wrapped[:NONCE_SIZE], wrapped[NONCE_SIZE:], None
+            )
+        except InvalidTag:
+            raise InvalidToken from None
+
+
+class RecordCipher(Protocol):
+    """Encrypts and decrypts records with one set-up cipher."""
+
+    def encrypt(self, data: bytes) -> bytes: ...
+
+    def decrypt(self, encrypted_data: bytes) -> bytes: ...
+
+    def encrypt_many(self, records: list[bytes]) -> list[bytes]: ...
+
+    def decrypt_many(self, encrypted_records: list[bytes]) -> list[bytes]: ...
+
+
+class FernetCipher:
+    """Fernet records under a key the client derived itself."""
+
+    def __init__(self, key: bytes):
+        self._fernet = Fernet(key)
+
+    def encrypt(self, data: bytes) -> bytes:
+        return self.encrypt_many([data])[0]
+
+    def decrypt(self, encrypted_data: bytes) -> bytes:
+        return self.decrypt_many([encrypted_data])[0]
+
+    def encrypt_many(self, records: list[bytes]) -> list[bytes]:
+        with stage("encrypt", len(records)):
+            return [self._fernet.encrypt(data) for data in records]
+
+    def decrypt_many(self, encrypted_records: list[bytes]) -> list[bytes]:
+        with stage("decrypt", len(encrypted_records)):
+            return [self._fernet.decrypt(data) for data in encrypted_records]
+
+
+class EnvelopeCipher:
+    """AES-256-GCM records under an unwrapped per-user data key.
+
+    Record layout: version byte, 12-byte random nonce, ciphertext and tag.
+    Decryption failures raise ``InvalidToken``, as with Fernet.
+    """
+
+    def __init__(self, data_key: bytes):
+        self._aead = AESGCM(data_key)
+
+    def encrypt(self, data: bytes) -> bytes:
+        return self.encrypt_many([data])[0]
+
+    def decrypt(self, encrypted_data: bytes) -> bytes:
+        return self.decrypt_many([encrypted_data])[0]
+
+    def encrypt_many(self, records: list[bytes]) -> list[bytes]:
+        # One urandom call for every nonce in the batch
+        nonces = os.urandom(NONCE_SIZE * len(records))
+        encrypt = self._aead.encrypt
+        out = []
+        with stage("encrypt", len(records)):
+            for i, data in enumerate(records):
+                nonce = nonces[i * NONCE_SIZE:(i + 1) * NONCE_SIZE]
+                out.append(ENVELOPE_VERSION + nonce + encrypt(nonce, data, None))
+        return out
+
+    def decrypt_many(self, encrypted_records: list[bytes]) -> list[bytes]:
+        decrypt = self._aead.decrypt
+        out = []
+        try:
+            with stage("decrypt", len(encrypted_records)):
+                for record in encrypted_records:
+                    if record[:1] != ENVELOPE_VERSION:
+                        raise InvalidToken
+                    out.append(decrypt(record[1:1 + NONCE_SIZE], record[1 + NONCE_SIZE:], None))
+        except InvalidTag:
+            raise InvalidToken from None
+        return out
+
+
+def _raw_key(key: bytes) -> bytes:
+    """The 32 key bytes behind a urlsafe base64 Fernet-style key."""
+    return base64.urlsafe_b64decode(key)
@@ -0,0 +1,241 @@
+"""Streaming import of Flo exports.
+
+An upload flows through the pipeline in chunks and is never held whole:
+
+    upload chunks -> incremental JSON parser + FloParser mapping
+                  -> record batches -> bulk encryption -> batched inserts
+
+Parsing runs at most ``max_pending_batches`` batches ahead of the database.
+When inserts fall behind, the queue fills up and the pipeline stops reading
+the upload until it drains (backpressure).
+
+Flo GDPR cycles are stored while the upload is still being read. Daily logs
+are stored at the end, because point events for one day can appear anywhere
+in the file. Until then the parser keeps one folded entry per logged day.
+The per-request memory cap bounds that state and the batches in flight.
+
+An import is all or nothing. If it fails part way, the rows it already
+inserted are deleted again.
+"""
+
+import asyncio
+import codecs
+import os
+import tempfile
+import time
+from collections.abc import AsyncIterator, Callable
+from pathlib import Path
+from typing import Optional
+
+from pydantic import BaseModel
+
+from backend.services.encryption import RecordCipher
+from backend.services.metrics import timed
+from backend.services.storage import CycleStore
+from ml.models.schemas import Cycle, DailyLog
+from ml.preprocessing.flo_parser import FloParser, FloStreamParser
+from ml.preprocessing.json_stream import DEFAULT_CHUNK_SIZE
+
+DEFAULT_MEMORY_LIMIT = 64 * 1024 * 1024
+# Rough in-memory size of one raw export record or folded day
+RECORD_SIZE_ESTIMATE = 1024
+
+
+class ImportTooLarge(Exception):
+    """The import needs more memory than the per-request cap allows."""
+
+
+class ImportProgress(BaseModel):
+    """Where a running import is; sent to the progress callback."""
+
+    stage: str = "reading"  # "reading", "storing" or "done"
+    bytes_read: int = 0
+    total_bytes: Optional[int] = None
+    cycles: int = 0
+    logs: int = 0
+
+
+class ImportResult(BaseModel):
+    """Counts of what an import stored."""
+
+    cycles: int
+    logs: int
+    bytes_read: int
+    duration_s: float
+
+
+class FloImportPipeline:
+    """Parse, encrypt and store one Flo export upload for a user."""
+
+    def __init__(
+        self,
+        user_id: str,
+        cipher: RecordCipher,
+        store: CycleStore,
+        file_name: str = "upload.json",
+        total_bytes: Optional[int] = None,
+        batch_size: int = 500,
+        max_pending_batches: int = 4,
+        memory_limit: int = DEFAULT_MEMORY_LIMIT,
+        on_progress: Optional[Callable[[ImportProgress], None]] = None,
+    ):
+        """
+        Args:
+            user_id: Owner of the imported records
+            cipher: Encrypts the records, set up once for the whole import
+            store: Where records are inserted
+            file_name: Upload name; only ``.json`` exports are accepted
+            total_bytes: Upload size if known, for progress reporting
+            batch_size: Records per encryption and insert batch
+            max_pending_batches: Batches parsed ahead of the database
+            memory_limit: Approximate cap on parser state plus queued batches
+            on_progress: Called after every chunk read and batch stored
+        """
+        self.user_id = user_id
+        self.cipher = cipher
+        self.store = store
+        self.parser = FloParser(file_name)
+        self.batch_size = batch_size
+        self.max_pending_batches = max_pending_batches
+        self.memory_limit = memory_limit
+        self.on_progress = on_progress
+        self.progress = ImportProgress(total_bytes=total_bytes)
+
+        self._queue: asyncio.Queue[Optional[tuple[str, list]]] = asyncio.Queue(
+            maxsize=max_pending_batches
+        )
+        self._inserted: dict[str, list[int]] = {"cycles": [], "logs": []}
+        self._store_error: Optional[BaseException] = None
+        self._aborted = False
+
+    async def run(self, chunks: AsyncIterator[bytes]) -> ImportResult:
+        """Import the upload, returning the number of records stored.
+
+        Raises:
+            ImportTooLarge: If parser state would exceed the memory cap
+            ValueError: If the upload is not a valid Flo export
+        """
+        if self.parser.file_path.suffix != ".json":
+            raise ValueError(f"Unsupported file format: {self.parser.file_path.suffix}")
+
+        started = time.perf_counter()
+        storing = asyncio.create_task(self._store_batches())
+        try:
+            await self._parse(chunks)
+        except BaseException:
+            # Also on cancellation, e.g. the client went away
+            self._aborted = True
+            await asyncio.shield(self._finish(storing, rollback=True))
+            raise
+        await self._finish(storing, rollback=self._store_error is not None)
+        if self._store_error is not None:
+            raise self._store_error
+
+        self._report(stage="done")
+        return ImportResult(
+            cycles=self.progress.cycles,
+            logs=self.progress.logs,
+            bytes_read=self.progress.bytes_read,
+            duration_s=round(time.perf_counter() - started, 4),
+        )
+
+    async def _parse(self, chunks: AsyncIterator[bytes]) -> None:
+        stream = FloStreamParser(self.parser)
+        decoder = codecs.getincrementaldecoder("utf-8-sig")()
+
+        async for chunk in chunks:
+            self.progress.bytes_read += len(chunk)
+            # Parsing is CPU work; keep it off the event loop
+            cycles = await asyncio.to_thread(timed, "parse", stream.feed, decoder.decode(chunk))
+            self._check_memory(stream)
+            await self._enqueue(cycles)
+            self._report()
+
+        self._report(stage="storing")
+        # Raises UnicodeDecodeError (a ValueError) on a truncated character
+        stream.feed(decoder.decode(b"", final=True))
+        records = await asyncio.to_thread(timed, "parse", stream.close)
+        await self._enqueue(records)
+
+    def _check_memory(self, stream: FloStreamParser) -> None:
+        held = stream.held_records + self._queue.qsize() * self.batch_size
+        used = stream.buffered_chars + held * RECORD_SIZE_ESTIMATE
+        if used > self.memory_limit:
+            raise ImportTooLarge(
+                f"Import needs more than {self.memory_limit // (1024 * 1024)} MB; "
+                "split the export or raise the limit"
+            )
+
+    async def _enqueue(self, records: list[Cycle | DailyLog]) -> None:
+        cycles = [r for r in records if isinstance(r, Cycle)]
+        logs = [r for r in records if isinstance(r, DailyLog)]
+        for kind, items in (("cycles", cycles), ("logs", logs)):
+            for i in range(0, len(items), self.batch_size):
+                # Blocks while the queue is full: backpressure on the upload
+                await self._queue.put((kind, items[i:i + self.batch_size]))
+                if self._store_error is not None:
+                    raise self._store_error
+
+    async def _store_batches(self) -> None:
+        while (item := await self._queue.get()) is not None:
+            if self._aborted or self._store_error is not None:
+                continue  # Keep draining so the producer is never stuck on put
+            kind, records = item
+            try:
+                payloads = self.cipher.encrypt_many(
+                    [record.model_dump_json().encode() for record in records]
+                )
+                if kind == "cycles":
+                    rows = [(c.start_date, p) for c, p in zip(records, payloads)]
+                    ids = await self.store.add_cycles(self.user_id, rows)
+                else:
+                    rows = [(log.date, p) for log, p in zip(records, payloads)]
+                    ids = await self.store.add_logs(self.user_id, rows)
+            except Exception as e:
+                self._store_error = e
+                continue
+
+            self._inserted[kind].extend(ids)
+            if kind == "cycles":
+                self.progress.cycles += len(ids)
+            else:
+                self.progress.logs += len(ids)
+            self._report()
+
+    async def _finish(self, storing: asyncio.Task, rollback: bool) -> None:
+        """Wait for in-flight inserts, then delete everything if the import failed."""
+        await self._queue.put(None)
+        await storing
+        if rollback:
+            await self.store.delete_cycles(self._inserted["cycles"])
+            await self.store.delete_logs(self._inserted["logs"])
+
+    def _report(self, stage: Optional[str] = None) -> None:
+        if stage is not None:
+            self.progress.stage = stage
+        if self.on_progress is not None:
+            self.on_progress(self.progress.model_copy())
+
+
+async def spool_upload(file, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Path:
+    """Copy an ``UploadFile`` in chunks to a private temporary file.
+
+    The upload is closed when the request ends, so a background import reads
+    this copy instead. The caller deletes it.
+    """
+    fd, name = tempfile.mkstemp(prefix="flux-import-", suffix=".json")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while chunk := await file.read(chunk_size):
+                f.write(chunk)
+    except BaseException:
+        os.unlink(name)
+        raise
+    return Path(name)
+
+
+async def iter_file(path: Path, chunk_size: int = DEFAULT_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Read a file in chunks without blocking the event loop."""
+    with open(path, "rb") as f:
+        while chunk := await asyncio.to_thread(f.read, chunk_size):
+            yield chunk
@@ -0,0 +1,234 @@
+"""In-process background jobs for slow work such as imports and retraining.
+
+Each job type has its own queue and a fixed number of worker tasks. That
+number is the type's concurrency limit, so a burst of retrains can occupy at
+most its workers, never every slot, and imports keep moving. Job state lives
+in the ``jobs`` table, so ids stay valid across restarts.
+
+Jobs hold in-memory state such as the user's session cipher and are not
+resumed after a restart. Jobs left queued or running by a previous process
+are marked failed by ``recover``. A job's ``cleanup`` callback runs once it
+ends, however it ends: after it ran, when it was cancelled, or when ``close``
+drops it from the queue before it started. Imports use it to delete their
+spooled upload.
+"""
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timezone
+from typing import Optional
+
+from pydantic import BaseModel
+
+from backend.services.storage import CycleStore
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOB_LIMITS = {"import": 2, "retrain": 1}
+
+ProgressCallback = Callable[[dict], None]
+JobFunction = Callable[[ProgressCallback], Awaitable[dict]]
+Cleanup = Callable[[], None]
+
+
+class UnknownJobType(Exception):
+    """A job was submitted for a type without a configured limit."""
+
+
+class JobStatus(BaseModel):
+    """Externally visible state of a job."""
+
+    id: str
+    type: str
+    status: str  # "queued", "running", "succeeded" or "failed"
+    progress: Optional[dict] = None
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+class JobQueue:
+    """Runs submitted jobs with per-type concurrency limits.
+
+    Args:
+        store: Where job state is persisted
+        limits: Concurrent jobs per job type
+        progress_interval: Minimum seconds between progress writes to the
+            table; ``get`` always sees the latest progress of live jobs
+    """
+
+    def __init__(
+        self,
+        store: CycleStore,
+        limits: Optional[dict[str, int]] = None,
+        progress_interval: float = 1.0,
+    ):
+        self.store = store
+        self.limits = dict(limits if limits is not None else DEFAULT_JOB_LIMITS)
+        self.progress_interval = progress_interval
+
+        self._queues: dict[str, asyncio.Queue[tuple[str, JobFunction, Optional[Cleanup]]]] = {}
+        self._workers: list[asyncio.Task] = []
+        self._live_progress: dict[str, dict] = {}
+        self._running = {job_type: 0 for job_type in self.limits}
+
+    async def recover(self) -> None:
+        """Fail jobs that a previous process never finished."""
+        await self.store.fail_unfinished_jobs("Interrupted by a server restart")
+
+    async def submit(
+        self,
+        job_type: str,
+        user_id: str,
+        run: JobFunction,
+        cleanup: Optional[Cleanup] = None,
+    ) -> str:
+        """Queue a job and return its id.
+
+        ``run`` receives a progress callback taking a JSON-serializable dict
+        and returns the job's JSON-serializable result. ``cleanup`` is called
+        once the job is over, whether or not ``run`` ever started; if
+        ``submit`` raises, it is not, and the caller cleans up.
+
+        Raises:
+            UnknownJobType: If ``job_type`` has no concurrency limit
+        """
+        if job_type not in self.limits:
+            raise UnknownJobType(job_type)
+        self._start_workers()
+
+        job_id = uuid.uuid4().hex
+        await self.store.create_job(job_id, user_id, job_type, "queued")
+        await self._queues[job_type].put((job_id, run, cleanup))
+        return job_id
+
+    async def get(self, job_id: str, user_id: Optional[str] = None) -> Optional[JobStatus]:
+        """A job's status, or None if it does not exist or belongs to another user."""
+        row = await self.store.get_job(job_id)
+        if row is None or (user_id is not None and row["user_id"] != user_id):
+            return None
+
+        progress = self._live_progress.get(job_id)
+        if progress is None and row["progress"]:
+            progress = json.loads(row["progress"])
+        return JobStatus(
+            id=row["id"],
+            type=row["type"],
+            status=row["status"],
+            progress=progress,
+            result=json.loads(row["result"]) if row["result"] else None,
+            error=row["error"],
+            created_at=_timestamp(row["created_at"]),
+            started_at=_timestamp(row["started_at"]),
+            finished_at=_timestamp(row["finished_at"]),
+        )
+
+    def stats(self) -> dict:
+        return {
+            job_type: {
+                "limit": limit,
+                "running": self._running[job_type],
+                "queued": self._queues[job_type].qsize() if job_type in self._queues else 0,
+            }
+            for job_type, limit in self.limits.items()
+        }
+
+    async def close(self) -> None:
+        """Stop the workers; running jobs are cancelled, queued ones dropped."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
+        # Queued jobs never start; ``recover`` marks them failed next time
+        for queue in self._queues.values():
+            while not queue.empty():
+                job_id, _, cleanup = queue.get_nowait()
+                _run_cleanup(job_id, cleanup)
+        self._queues.clear()
+
+    def _start_workers(self) -> None:
+        if self._workers:
+            return
+        for job_type, limit in self.limits.items():
+            self._queues[job_type] = asyncio.Queue()
+            for _ in range(limit):
+                self._workers.append(asyncio.create_task(self._work(job_type)))
+
+    async def _work(self, job_type: str) -> None:
+        queue = self._queues[job_type]
+        while True:
+            job_id, run, cleanup = await queue.get()
+            self._running[job_type] += 1
+            try:
+                await self._run_job(job_id, run)
+            finally:
+                self._running[job_type] -= 1
+                queue.task_done()
+                _run_cleanup(job_id, cleanup)
+
+    async def _run_job(self, job_id: str, run: JobFunction) -> None:
+        await self.store.update_job(job_id, status="running", started_at=time.time())
+        last_write = 0.0
+        pending: list[asyncio.Task] = []
+
+        def report(progress: dict) -> None:
+            nonlocal last_write
+            self._live_progress[job_id] = progress
+            now = time.monotonic()
+            if now - last_write >= self.progress_interval:
+                last_write = now
+                pending.append(asyncio.create_task(
+                    self.store.update_job(job_id, progress=json.dumps(progress))
+                ))
+
+        try:
+            result = await run(report)
+        except asyncio.CancelledError:
+            await asyncio.shield(self._finish(job_id, pending, "failed", error="Cancelled"))
+            raise
+        except Exception as e:
+            logger.exception("Job %s failed", job_id)
+            await self._finish(job_id, pending, "failed", error=f"{type(e).__name__}: {e}")
+        else:
+            await self._finish(job_id, pending, "succeeded", result=result)
+
+    async def _finish(
+        self,
+        job_id: str,
+        pending: list[asyncio.Task],
+        status: str,
+        result: Optional[dict] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        # Let throttled progress writes land first so they cannot overwrite
+        # the final state
+        await asyncio.gather(*pending, return_exceptions=True)
+
+        fields: dict = {"status": status, "finished_at": time.time()}
+        progress = self._live_progress.pop(job_id, None)
+        if progress is not None:
+            fields["progress"] = json.dumps(progress)
+        if result is not None:
+            fields["result"] = json.dumps(result)
+        if error is not None:
+            fields["error"] = error
+        await self.store.update_job(job_id, **fields)
+
+
+def _run_cleanup(job_id: str, cleanup: Optional[Cleanup]) -> None:
+    if cleanup is None:
+        return
+    try:
+        cleanup()
+    except Exception:
+        logger.exception("Cleanup of job %s failed", job_id)
+
+
+def _timestamp(value: Optional[float]) -> Optional[datetime]:
+    return datetime.fromtimestamp(value, tz=timezone.utc) if value is not None else None
@@ -0,0 +1,284 @@
+"""Key management for password-derived encryption keys.
+
+``EncryptionService.derive_key`` runs PBKDF2 with 480,000 iterations, roughly
+100ms of CPU. Called from an async route it would stall every other request
+on the worker. ``KeyManager`` instead:
+- Derives keys on a bounded thread pool. OpenSSL releases the GIL during
+  PBKDF2, so derivations run in parallel with the event loop.
+- Derives once per login, unwraps the user's data key with it and keeps the
+  data key for the session, so only login pays the KDF cost. Sessions expire
+  after a period without use.
+- Holds session keys in a ``KeyVault``: one anonymous memory mapping that is
+  locked in RAM (never swapped) and excluded from core dumps where the OS
+  allows it. Slots are zeroed when a session ends.
+"""
+
+import asyncio
+import ctypes
+import ctypes.util
+import mmap
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from cryptography.fernet import InvalidToken
+
+from backend.services.encryption import EncryptionService
+from backend.services.metrics import timed
+from backend.services.storage import CycleStore
+
+# Room for a 44-byte base64 key plus a length byte
+KEY_SLOT_SIZE = 64
+
+
+class InvalidCredentials(Exception):
+    """The password does not match the one the user's data is encrypted with."""
+
+
+class KeyVault:
+    """Fixed-size slots for key material in locked, non-dumpable memory.
+
+    Locking is best effort: if ``RLIMIT_MEMLOCK`` is too small the vault
+    still works, unlocked, and ``locked`` is False.
+    """
+
+    def __init__(self, capacity: int, slot_size: int = KEY_SLOT_SIZE):
+        self.capacity = capacity
+        self.slot_size = slot_size
+        self._map = mmap.mmap(-1, max(capacity * slot_size, mmap.PAGESIZE))
+        self._free = list(range(capacity - 1, -1, -1))
+        self.locked = self._lock_memory()
+
+    def _lock_memory(self) -> bool:
+        if hasattr(mmap, "MADV_DONTDUMP"):
+            self._map.madvise(mmap.MADV_DONTDUMP)
+
+        libc_name = ctypes.util.find_library("c")
+        if libc_name is None:
+            return False
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(libc, "mlock"):
+            return False
+        buffer = ctypes.c_char.from_buffer(self._map)
+        try:
+            address = ctypes.addressof(buffer)
+            return libc.mlock(ctypes.c_void_p(address), ctypes.c_size_t(len(self._map))) == 0
+        finally:
+            del buffer  # The mapping cannot be closed while a ctypes view exists
+
+    def store(self, key: bytes) -> int:
+        """Copy a key into a free slot and return the slot number."""
+        if len(key) >= self.slot_size:
+            raise ValueError(f"Key longer than {self.slot_size - 1} bytes")
+        if not self._free:
+            raise MemoryError("Key vault is full")
+
+        slot = self._free.pop()
+        offset = slot * self.slot_size
+        self._map[offset] = len(key)
+        self._map[offset + 1:offset + 1 + len(key)] = key
+        return slot
+
+    def load(self, slot: int) -> bytes:
+        offset = slot * self.slot_size
+        length = self._map[offset]
+        return self._map[offset + 1:offset + 1 + length]
+
+    def release(self, slot: int) -> None:
+        """Zero a slot and make it available again."""
+        offset = slot * self.slot_size
+        self._map[offset:offset + self.slot_size] = bytes(self.slot_size)
+        self._free.append(slot)
+
+    def close(self) -> None:
+        self._map[:] = bytes(len(self._map))
+        self._map.close()
+
+
+class Session:
+    """A logged-in user and where their key is held."""
+
+    __slots__ = ("token", "user_id", "slot", "expires_at")
+
+    def __init__(self, token: str, user_id: str, slot: int, expires_at: float):
+        self.token = token
+        self.user_id = user_id
+        self.slot = slot
+        self.expires_at = expires_at
+
+
+class KeyManager:
+    """Derives keys off the event loop and keeps them per session."""
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        ttl_seconds: float = 900.0,
+        max_sessions: int = 10000,
+        clock: Callable[[], float] = time.monotonic,
+        derive: Callable[[str, bytes], bytes] = EncryptionService.derive_key,
+    ):
+        """
+        Args:
+            max_workers: Concurrent key derivations (default: CPUs, at most 4)
+            ttl_seconds: Idle time after which a session and its key are dropped
+            max_sessions: Sessions held at once; the least recently used
+                session is dropped beyond this
+            clock: Time source, replaceable in tests
+            derive: Password + salt -> Fernet key function
+        """
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._clock = clock
+        self._derive = derive
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="kdf"
+        )
+        # Waiting here rather than in the executor queue means a request that
+        # is cancelled while queued never starts a derivation
+        self._slots = asyncio.Semaphore(self.max_workers)
+        self._vault = KeyVault(max_sessions)
+        self._sessions: OrderedDict[str, Session] = OrderedDict()
+        self._lock = threading.Lock()
+        self._derivations = 0
+
+    async def derive_key(self, password: str, salt: bytes) -> bytes:
+        """Run the KDF on the pool without blocking the event loop."""
+        async with self._slots:
+            self._derivations += 1
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, timed, "kdf", self._derive, password, salt
+            )
+
+    async def login(self, user_id: str, password: str, store: CycleStore) -> Session:
+        """Derive the user's key once and open a session holding their data key.
+
+        The first login picks the user's salt and data key and stores the
+        data key wrapped by the password-derived key. Later logins with a
+        different password fail to unwrap it and are rejected.
+
+        Raises:
+            InvalidCredentials: If the password does not match the first login's
+        """
+        credentials = await store.get_credentials(user_id)
+        if credentials is None:
+            salt = EncryptionService.generate_salt()
+            key = await self.derive_key(password, salt)
+            wrapped = EncryptionService.wrap_data_key(EncryptionService.generate_data_key(), key)
+            credentials = await store.set_credentials(user_id, salt, wrapped)
+            if credentials[0] != salt:
+                # A concurrent first login won; unwrap with its salt
+                key = await self.derive_key(password, credentials[0])
+        else:
+            key = await self.derive_key(password, credentials[0])
+
+        data_key = self._unwrap(user_id, credentials[1], key)
+        return self._open_session(user_id, data_key)
+
+    async def change_password(
+        self, user_id: str, old_password: str, new_password: str, store: CycleStore
+    ) -> None:
+        """Re-wrap the user's data key under a new password.
+
+        Records stay encrypted under the same data key, so none are rewritten
+        and open sessions keep working.
+
+        Raises:
+            InvalidCredentials: If the old password is wrong, the user has no
+                credentials yet, or the password changed concurrently
+        """
+        credentials = await store.get_credentials(user_id)
+        if credentials is None:
+            raise InvalidCredentials(f"No credentials for user {user_id}")
+
+        old_key = await self.derive_key(old_password, credentials[0])
+        data_key = self._unwrap(user_id, credentials[1], old_key)
+
+        salt = EncryptionService.generate_salt()
+        new_key = await self.derive_key(new_password, salt)
+        wrapped = EncryptionService.wrap_data_key(data_key, new_key)
+        if not await store.replace_credentials(user_id, credentials, (salt, wrapped)):
+            raise InvalidCredentials(f"Password for user {user_id} changed concurrently")
+
+    @staticmethod
+    def _unwrap(user_id: str, wrapped: bytes, key: bytes) -> bytes:
+        try:
+            return EncryptionService.unwrap_data_key(wrapped, key)
+        except InvalidToken:
+            raise InvalidCredentials(f"Wrong password for user {user_id}") from None
+
+    def _open_session(self, user_id: str, key: bytes) -> Session:
+        token = secrets.token_urlsafe(32)
+        with self._lock:
+            self._purge_expired()
+            while len(self._sessions) >= self.max_sessions:
+                _, oldest = self._sessions.popitem(last=False)
+                self._vault.release(oldest.slot)
+
+            session = Session(
+                token=token,
+                user_id=user_id,
+                slot=self._vault.store(key),
+                expires_at=self._clock() + self.ttl_seconds,
+            )
+            self._sessions[token] = session
+        return session
+
+    def session_key(self, token: str) -> Optional[tuple[str, bytes]]:
+        """``(user_id, data_key)`` for a live session, extending its expiry."""
+        with self._lock:
+            session = self._sessions.get(token)
+            if session is None:
+                return None
+            now = self._clock()
+            if session.expires_at <= now:
+                self._drop(token)
+                return None
+
+            session.expires_at = now + self.ttl_seconds
+            self._sessions.move_to_end(token)
+            return session.user_id, self._vault.load(session.slot)
+
+    def logout(self, token: str) -> bool:
+        with self._lock:
+            return self._drop(token)
+
+    def _drop(self, token: str) -> bool:
+        session = self._sessions.pop(token, None)
+        if session is None:
+            return False
+        self._vault.release(session.slot)
+        return True
+
+    def _purge_expired(self) -> None:
+        # Every use moves a session to the end with a fresh expiry, so the
+        # sessions are ordered by expiry and expired ones are at the front
+        now = self._clock()
+        while self._sessions:
+            token, session = next(iter(self._sessions.items()))
+            if session.expires_at > now:
+                break
+            self._drop(token)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "derivations": self._derivations,
+                "max_workers": self.max_workers,
+                "memory_locked": self._vault.locked,
+            }
+
+    def close(self) -> None:
+        """Wipe every session key and stop the pool."""
+        with self._lock:
+            for token in list(self._sessions):
+                self._drop(token)
+            self._vault.close()
+        self._executor.shutdown(wait=True)
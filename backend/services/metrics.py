@@ -0,0 +1,323 @@
+"""Request and stage metrics in the Prometheus text format, and a sampling profiler.
+
+Everything is kept in process memory and rendered on ``GET /metrics``; no
+client library or push gateway is involved.
+
+- ``MetricsMiddleware`` records every HTTP request: a latency histogram per
+  method, route template and status class, and a gauge of requests in
+  flight. Route templates (``/api/v1/jobs/{job_id}``) keep the label set
+  small; requests that match no route share one ``unmatched`` label.
+- ``stage`` times a block of work, such as a KDF run, a bulk encryption or a
+  parse. It works in worker threads too, so stages run with
+  ``asyncio.to_thread`` or an executor are measured where the work happens.
+- Collectors are callables returning flat ``{name: number}`` dicts, read at
+  render time. They expose counters other services already keep (sessions,
+  job queues, the prediction cache) without duplicating them.
+- ``SamplingProfiler`` snapshots every thread's stack at a fixed interval
+  while switched on and counts identical stacks. The result is in the
+  collapsed format flame graph tools read. It costs nothing while off.
+
+Metric values never include user ids or any other request data.
+"""
+
+import math
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from collections.abc import Callable
+from contextlib import contextmanager
+from typing import Optional
+
+# Upper bounds in seconds; the +Inf bucket is implicit
+REQUEST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STAGE_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+                 0.5, 1.0, 2.5, 5.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Histogram:
+    """Cumulative-bucket histogram for one label set."""
+
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+
+class MetricsRegistry:
+    """Histograms, the in-flight gauge and collectors of one process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests: dict[tuple[str, str, str], Histogram] = {}
+        self._stages: dict[str, Histogram] = {}
+        self._stage_items: Counter[str] = Counter()
+        self._collectors: dict[str, Callable[[], dict]] = {}
+        self.in_flight = 0
+        self.started_at = time.time()
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float) -> None:
+        key = (method, route, f"{status // 100}xx")
+        with self._lock:
+            histogram = self._requests.get(key)
+            if histogram is None:
+                histogram = self._requests[key] = Histogram(REQUEST_BUCKETS)
+            histogram.observe(seconds)
+
+    def observe_stage(self, name: str, seconds: float, items: int = 0) -> None:
+        with self._lock:
+            histogram = self._stages.get(name)
+            if histogram is None:
+                histogram = self._stages[name] = Histogram(STAGE_BUCKETS)
+            histogram.observe(seconds)
+            self._stage_items[name] += items
+
+    @contextmanager
+    def stage(self, name: str, items: int = 0):
+        """Time the block as one run of stage ``name`` over ``items`` records."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_stage(name, time.perf_counter() - started, items)
+
+    def timed(self, name: str, fn: Callable, *args):
+        """Call ``fn(*args)`` as one run of stage ``name``; for executors and threads."""
+        with self.stage(name):
+            return fn(*args)
+
+    def add_collector(self, prefix: str, collect: Callable[[], dict]) -> None:
+        """Expose ``collect()``'s numeric values as gauges named ``<prefix>_<key>``."""
+        self._collectors[prefix] = collect
+
+    def snapshot(self) -> dict:
+        """Copies of the histograms, taken under the lock."""
+        with self._lock:
+            return {
+                "requests": {key: _copy(h) for key, h in self._requests.items()},
+                "stages": {key: _copy(h) for key, h in self._stages.items()},
+                "stage_items": dict(self._stage_items),
+                "in_flight": self.in_flight,
+            }
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        snap = self.snapshot()
+        lines = [
+            "# HELP flux_http_request_duration_seconds HTTP request latency by route.",
+            "# TYPE flux_http_request_duration_seconds histogram",
+        ]
+        for (method, route, status), data in sorted(snap["requests"].items()):
+            labels = f'method="{method}",route="{_escape(route)}",status="{status}"'
+            lines += _histogram_lines(
+                "flux_http_request_duration_seconds", labels, REQUEST_BUCKETS, *data
+            )
+
+        lines += [
+            "# HELP flux_http_requests_in_flight HTTP requests being served.",
+            "# TYPE flux_http_requests_in_flight gauge",
+            f"flux_http_requests_in_flight {snap['in_flight']}",
+            "# HELP flux_stage_duration_seconds Time spent in hot-path stages.",
+            "# TYPE flux_stage_duration_seconds histogram",
+        ]
+        for name, data in sorted(snap["stages"].items()):
+            lines += _histogram_lines(
+                "flux_stage_duration_seconds", f'stage="{_escape(name)}"', STAGE_BUCKETS, *data
+            )
+        lines += [
+            "# HELP flux_stage_items_total Records processed by hot-path stages.",
+            "# TYPE flux_stage_items_total counter",
+        ]
+        for name, items in sorted(snap["stage_items"].items()):
+            lines.append(f'flux_stage_items_total{{stage="{_escape(name)}"}} {items}')
+
+        for prefix, collect in sorted(self._collectors.items()):
+            for key, value in sorted(_flatten(collect()).items()):
+                name = f"flux_{prefix}_{key}"
+                lines += [f"# TYPE {name} gauge", f"{name} {_number(value)}"]
+
+        lines += [
+            "# TYPE flux_process_start_time_seconds gauge",
+            f"flux_process_start_time_seconds {self.started_at:.3f}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """ASGI middleware feeding request latency and in-flight counts to a registry."""
+
+    def __init__(self, app, registry: Optional["MetricsRegistry"] = None):
+        self.app = app
+        self.registry = registry or metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        registry = self.registry
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        registry.in_flight += 1
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            registry.in_flight -= 1
+            registry.observe_request(
+                scope["method"], _route_template(scope), status, time.perf_counter() - started
+            )
+
+
+class SamplingProfiler:
+    """Counts thread stacks sampled every ``interval`` seconds while running.
+
+    Args:
+        interval: Seconds between samples
+        max_depth: Innermost frames kept per stack
+    """
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval: Optional[float] = None) -> None:
+        """Start sampling; a running profiler keeps its samples."""
+        if self.running:
+            return
+        if interval is not None:
+            self.interval = interval
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stacks.clear()
+            self.samples = 0
+
+    def collapsed(self, limit: Optional[int] = None) -> str:
+        """``frame;frame;frame count`` lines, most frequent stack first."""
+        with self._lock:
+            top = self.stacks.most_common(limit)
+        return "".join(f"{stack} {count}\n" for stack, count in top)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "running": self.running,
+                "interval": self.interval,
+                "samples": self.samples,
+                "distinct_stacks": len(self.stacks),
+            }
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            sampled = [self._stack(frame) for ident, frame in frames.items() if ident != own]
+            with self._lock:
+                self.samples += 1
+                self.stacks.update(sampled)
+
+    def _stack(self, frame) -> str:
+        names = []
+        while frame is not None and len(names) < self.max_depth:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+
+def _route_template(scope: dict) -> str:
+    """Full path template of the route the request matched.
+
+    Routes of an included router keep their own path in ``scope["route"]``;
+    FastAPI records the prefixed template on the effective route context.
+    """
+    context = scope.get("fastapi", {}).get("effective_route_context")
+    path = getattr(context, "path", None) or getattr(scope.get("route"), "path", None)
+    return path or "unmatched"
+
+
+def _copy(histogram: Histogram) -> tuple[list[int], float]:
+    return list(histogram.counts), histogram.sum
+
+
+def _histogram_lines(
+    name: str, labels: str, bounds: tuple[float, ...], counts: list[int], total: float
+) -> list[str]:
+    lines = []
+    cumulative = 0
+    for bound, count in zip(bounds + (math.inf,), counts):
+        cumulative += count
+        le = "+Inf" if math.isinf(bound) else repr(bound)
+        lines.append(f'{name}_bucket{{{labels},le="{le}"}} {cumulative}')
+    lines.append(f"{name}_sum{{{labels}}} {total!r}")
+    lines.append(f"{name}_count{{{labels}}} {cumulative}")
+    return lines
+
+
+def _flatten(values: dict, prefix: str = "") -> dict:
+    """Numeric leaves of nested dicts, keyed ``outer_inner``."""
+    flat = {}
+    for key, value in values.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{name}_"))
+        elif isinstance(value, (bool, int, float)):
+            flat[_metric_name(name)] = value
+    return flat
+
+
+def _metric_name(name: str) -> str:
+    return "".join(c if c.isalnum() or c == "_" else "_" for c in name)
+
+
+def _number(value) -> str:
+    return str(int(value)) if isinstance(value, bool) else repr(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Process-wide registry and profiler, shared by the middleware and services
+metrics = MetricsRegistry()
+profiler = SamplingProfiler()
+stage = metrics.stage
+timed = metrics.timed
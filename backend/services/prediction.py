@@ -1,26 +1,234 @@
 """Prediction service - interfaces with ML model."""
 
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
 from datetime import date, timedelta
+from pathlib import Path
 from typing import Optional
 
 from backend.api.schemas import CycleData, PredictionResponse
+from backend.services.metrics import stage
+from ml.preprocessing.cycle_stats import IncrementalCycleStats
+from ml.training.model_store import ModelStore
+
+# Cycle lengths the baseline prediction trusts
+MIN_CYCLE_LENGTH = 21
+MAX_CYCLE_LENGTH = 35
+
+# Trained models are served from this store when it is set
+DEFAULT_MODEL_STORE_PATH = os.environ.get("FLUX_MODEL_STORE_PATH")
+
+
+def cycles_digest(cycles: list[CycleData]) -> str:
+    """Content hash of the fields a prediction depends on.
+
+    Order-independent, since predictions sort cycles by start date anyway.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    for start, end in sorted((c.start_date, c.end_date) for c in cycles):
+        h.update(f"{start.isoformat()}/{end.isoformat() if end else ''};".encode())
+    return h.hexdigest()
+
+
+class PredictionCache:
+    """Per-user prediction cache with LRU and TTL eviction.
+
+    Holds at most one entry per user, tagged with the digest (or storage
+    version) of the cycle set it was computed from. A lookup with a different
+    digest is a miss, so stale predictions are never served even without an
+    explicit invalidation.
+
+    Args:
+        max_entries: Maximum number of users kept; least recently used go first
+        ttl_seconds: Age after which an entry is recomputed
+        clock: Monotonic time source, injectable for tests
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10_000,
+        ttl_seconds: float = 3600.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[str, float, PredictionResponse]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, user_id: str, digest: str) -> Optional[PredictionResponse]:
+        """Return the cached prediction if it matches ``digest`` and is fresh."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            cached_digest, stored_at, response = entry
+            if cached_digest != digest or self._clock() - stored_at > self.ttl_seconds:
+                del self._entries[user_id]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return response
+
+    def put(self, user_id: str, digest: str, response: PredictionResponse) -> None:
+        with self._lock:
+            self._entries[user_id] = (digest, self._clock(), response)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, user_id: str) -> None:
+        """Drop a user's entry, e.g. after their cycles changed."""
+        with self._lock:
+            if self._entries.pop(user_id, None) is not None:
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Counters for sizing the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
 
 
 class PredictionService:
     """Service for period predictions using time series model."""
 
-    def __init__(self, model_path: Optional[str] = None):
-        self.model = None
+    def __init__(
+        self,
+        model_path: Optional[str] = None,
+        cache: Optional[PredictionCache] = None,
+    ):
+        self.model: Optional[ModelStore] = None
+        self.cache = cache if cache is not None else PredictionCache()
         if model_path:
             self.load_model(model_path)
 
-    def load_model(self, model_path: str):
-        """Load trained prediction model."""
-        # TODO: Load actual model
-        pass
+    def load_model(self, model_path: str | Path):
+        """Serve trained models from the model store at ``model_path``.
+
+        The store is memory-mapped; it need not exist until a model is
+        trained. Later swaps of the file, e.g. by a retrain in another worker,
+        are picked up automatically.
+        """
+        self.model = ModelStore(model_path)
+
+    def predict_from_model(self, user_id: str) -> Optional[PredictionResponse]:
+        """The user's trained model's prediction, or None without one.
+
+        The model store is not encrypted and not tied to the user's cycles;
+        callers check the key and that the model is current first.
+        """
+        if self.model is None:
+            return None
+        with stage("predict_model"):
+            record = self.model.record(user_id)
+        if record is None:
+            return None
+        return PredictionResponse(
+            predicted_start=date.fromordinal(int(record["next_period"])),
+            confidence=round(float(record["confidence"]), 2),
+            cycle_length_avg=int(record["expected_cycle_length"]),
+        )
+
+    def predict(
+        self,
+        cycles: list[CycleData],
+        user_id: Optional[str] = None,
+        version: Optional[str] = None,
+    ) -> PredictionResponse:
+        """Predict next period based on cycle history.
+
+        With a ``user_id`` the result is cached until that user's cycles
+        change. ``version`` identifies the cycle set when the caller already
+        tracks one (e.g. a storage revision); otherwise it is hashed from
+        ``cycles``.
+        """
+        if user_id is None:
+            with stage("predict"):
+                return self._predict(cycles)
+
+        digest = version if version is not None else cycles_digest(cycles)
+        cached = self.cache.get(user_id, digest)
+        if cached is not None:
+            return cached
+
+        with stage("predict"):
+            response = self._predict(cycles)
+        self.cache.put(user_id, digest, response)
+        return response
+
+    def invalidate(self, user_id: str) -> None:
+        """Forget cached predictions for a user whose cycles changed."""
+        self.cache.invalidate(user_id)
+
+    @staticmethod
+    def new_stats() -> IncrementalCycleStats:
+        """Running statistics with the length filter ``predict_from_stats`` expects."""
+        return IncrementalCycleStats(min_length=MIN_CYCLE_LENGTH, max_length=MAX_CYCLE_LENGTH)
+
+    def predict_from_stats(self, stats: IncrementalCycleStats) -> PredictionResponse:
+        """Same prediction as ``predict``, from running statistics in O(1).
+
+        ``stats`` should come from ``new_stats`` and be updated as cycles are
+        added, so appending a period never rescans the history.
+        """
+        if stats.last_start_date is None:
+            return PredictionResponse(
+                predicted_start=None,
+                confidence=0.0,
+                cycle_length_avg=0,
+            )
+
+        if stats.count == 0:
+            return PredictionResponse(
+                predicted_start=None,
+                confidence=0.0,
+                cycle_length_avg=28,
+            )
+
+        avg_length = round(stats.mean)
+        predicted_start = stats.last_start_date + timedelta(days=avg_length)
+
+        # Variance around the rounded average, from the running moments
+        if stats.count >= 3:
+            variance = stats.m2 / stats.count + (stats.mean - avg_length) ** 2
+            confidence = max(0.0, min(1.0, 1.0 - (variance / 50)))
+        else:
+            confidence = 0.3
+
+        return PredictionResponse(
+            predicted_start=predicted_start,
+            confidence=round(confidence, 2),
+            cycle_length_avg=avg_length,
+        )
 
-    def predict(self, cycles: list[CycleData]) -> PredictionResponse:
-        """Predict next period based on cycle history."""
+    def _predict(self, cycles: list[CycleData]) -> PredictionResponse:
         if not cycles:
             return PredictionResponse(
                 predicted_start=None,
@@ -34,7 +242,7 @@ class PredictionService:
 
         for i in range(1, len(sorted_cycles)):
             length = (sorted_cycles[i].start_date - sorted_cycles[i-1].start_date).days
-            if 21 <= length <= 35:  # Filter outliers
+            if MIN_CYCLE_LENGTH <= length <= MAX_CYCLE_LENGTH:  # Filter outliers
                 cycle_lengths.append(length)
 
         if not cycle_lengths:
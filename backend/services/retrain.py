@@ -0,0 +1,93 @@
+"""Retraining a user's cycle model from their stored cycles.
+
+Fitting (Prophet in particular) is CPU-bound, so it runs in a process pool
+rather than on the event loop or a thread. The fitted params are stored
+encrypted with the user's cipher, like their cycles. If the API serves
+models from a model store, they are also published there for predictions.
+"""
+
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Optional
+
+from backend.services.encryption import RecordCipher
+from backend.services.metrics import stage
+from backend.services.storage import CycleStore
+from ml.models.schemas import Cycle, ModelParams
+from ml.training.model_store import ModelStore
+from ml.training.train import create_predictor, validate_cycles
+
+_fit_executor: Optional[ProcessPoolExecutor] = None
+
+
+def fit_executor(max_workers: int = 1) -> ProcessPoolExecutor:
+    """Shared process pool for model fits, created on first use."""
+    global _fit_executor
+    if _fit_executor is None:
+        _fit_executor = ProcessPoolExecutor(max_workers=max_workers)
+    return _fit_executor
+
+
+def shutdown_fit_executor() -> None:
+    global _fit_executor
+    if _fit_executor is not None:
+        _fit_executor.shutdown(cancel_futures=True)
+        _fit_executor = None
+
+
+def fit_model_params(cycles: list[Cycle], model_type: str = "auto") -> str:
+    """Fit a predictor and return its params as JSON; runs in a worker process."""
+    predictor = create_predictor(model_type)
+    predictor.fit(cycles)
+    return predictor.export_params().model_dump_json()
+
+
+async def retrain_user(
+    user_id: str,
+    cipher: RecordCipher,
+    store: CycleStore,
+    model_type: str = "auto",
+    executor: Optional[Executor] = None,
+    model_store: Optional[ModelStore] = None,
+) -> dict:
+    """Fit a model on the user's stored cycles and store its params.
+
+    Args:
+        user_id: Whose model to train
+        cipher: Decrypts the user's cycles and encrypts the params
+        store: Where cycles are read from and params written to
+        model_type: "prophet", "weighted_average", "bayesian", or "auto"
+        executor: Where to run the fit (default: the shared process pool)
+        model_store: Store to publish the model to for serving, if any
+
+    Returns:
+        A summary of the trained model, without any cycle data
+
+    Raises:
+        TrainingError: If there are too few usable cycles
+    """
+    # Read first: every cycle change up to here is in ``stored``
+    trained_seq = await store.latest_change(user_id)
+    stored = await store.get_cycles(user_id)
+    cycles = [
+        Cycle.model_validate_json(data)
+        for data in cipher.decrypt_many([row.payload for row in stored])
+    ]
+    validate_cycles(cycles)
+
+    with stage("fit"):
+        params_json = await asyncio.get_running_loop().run_in_executor(
+            executor or fit_executor(), fit_model_params, cycles, model_type
+        )
+    await store.put_model_params(user_id, cipher.encrypt(params_json.encode()), trained_seq)
+
+    params = ModelParams.model_validate_json(params_json)
+    result = {
+        "model_type": params.model_type,
+        "cycles_trained": params.cycles_trained,
+        "trained_at": params.trained_at.isoformat(),
+    }
+    if model_store is not None:
+        # Copy-on-write of the whole store file; keep it off the event loop
+        result["model_version"] = await asyncio.to_thread(model_store.put, user_id, params)
+    return result
@@ -0,0 +1,657 @@
+"""Async SQLite storage for encrypted cycle data.
+
+Each cycle and daily log is stored as an encrypted blob. Only the user id and
+the date are kept in plaintext, as indexed columns, so lookups by user and
+date range never need to decrypt anything.
+
+Triggers append every insert and delete of a cycle or log to a ``changes``
+table. Its ``seq`` only grows, so clients keeping their own copy can ask for
+what changed after the last ``seq`` they saw instead of reloading everything.
+
+SQLite calls are blocking, so they run on a small dedicated thread pool:
+- Reads take a connection from a pool of ``pool_size`` connections. In WAL
+  mode, readers run in parallel with each other and with the writer.
+- Writes go through one writer connection. Concurrent requests are queued and
+  committed together in one transaction (group commit), so a burst of N
+  inserts costs one fsync instead of N.
+"""
+
+import asyncio
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from pathlib import Path
+from typing import Optional
+
+from cryptography.fernet import Fernet
+from pydantic import BaseModel
+
+DEFAULT_DB_PATH = os.environ.get("FLUX_DB_PATH", "data/flux.db")
+DEFAULT_KEY_PATH = os.environ.get("FLUX_KEY_PATH", "data/flux.key")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cycles (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    start_date TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_cycles_user_start ON cycles (user_id, start_date);
+CREATE TABLE IF NOT EXISTS daily_logs (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_daily_logs_user_date ON daily_logs (user_id, date);
+CREATE TABLE IF NOT EXISTS model_params (
+    user_id TEXT PRIMARY KEY,
+    payload BLOB NOT NULL,
+    trained_at REAL NOT NULL,
+    -- The user's latest change seq when training read their cycles
+    trained_seq INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    type TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress TEXT,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status);
+CREATE TABLE IF NOT EXISTS credentials (
+    user_id TEXT PRIMARY KEY,
+    salt BLOB NOT NULL,
+    wrapped_key BLOB NOT NULL
+);
+-- A known value encrypted under the key of the user's first write; a request's
+-- key is checked against it before anything of the user's is written or sent
+CREATE TABLE IF NOT EXISTS key_checks (
+    user_id TEXT PRIMARY KEY,
+    token BLOB NOT NULL
+);
+
+-- Change log for delta sync: one row per inserted or deleted cycle or log,
+-- numbered by seq, which never goes back even when rows are deleted
+CREATE TABLE IF NOT EXISTS changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    record_id INTEGER NOT NULL,
+    deleted INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_changes_user_seq ON changes (user_id, seq);
+
+-- Rows stored before the change log existed count as the first changes
+INSERT INTO changes (user_id, kind, record_id)
+SELECT user_id, kind, id FROM (
+    SELECT user_id, 'cycle' AS kind, id, start_date AS day FROM cycles
+    UNION ALL
+    SELECT user_id, 'log' AS kind, id, date AS day FROM daily_logs
+)
+WHERE NOT EXISTS (SELECT 1 FROM changes)
+ORDER BY day, id;
+
+CREATE TRIGGER IF NOT EXISTS cycles_insert_change AFTER INSERT ON cycles BEGIN
+    INSERT INTO changes (user_id, kind, record_id) VALUES (NEW.user_id, 'cycle', NEW.id);
+END;
+CREATE TRIGGER IF NOT EXISTS cycles_delete_change AFTER DELETE ON cycles BEGIN
+    INSERT INTO changes (user_id, kind, record_id, deleted)
+    VALUES (OLD.user_id, 'cycle', OLD.id, 1);
+END;
+CREATE TRIGGER IF NOT EXISTS daily_logs_insert_change AFTER INSERT ON daily_logs BEGIN
+    INSERT INTO changes (user_id, kind, record_id) VALUES (NEW.user_id, 'log', NEW.id);
+END;
+CREATE TRIGGER IF NOT EXISTS daily_logs_delete_change AFTER DELETE ON daily_logs BEGIN
+    INSERT INTO changes (user_id, kind, record_id, deleted)
+    VALUES (OLD.user_id, 'log', OLD.id, 1);
+END;
+"""
+
+INSERT_CYCLE = (
+    "INSERT INTO cycles (user_id, start_date, payload, created_at) VALUES (?, ?, ?, ?)"
+)
+INSERT_LOG = "INSERT INTO daily_logs (user_id, date, payload, created_at) VALUES (?, ?, ?, ?)"
+PUT_MODEL_PARAMS = (
+    "INSERT OR REPLACE INTO model_params (user_id, payload, trained_at, trained_seq) "
+    "VALUES (?, ?, ?, ?)"
+)
+# Params plus whether a cycle was added or deleted after training; walks the
+# (user_id, seq) index from trained_seq only
+SELECT_MODEL_STATE = """
+SELECT m.payload, EXISTS (
+    SELECT 1 FROM changes c
+    WHERE c.user_id = m.user_id AND c.seq > m.trained_seq AND c.kind = 'cycle'
+)
+FROM model_params m
+WHERE m.user_id = ?
+"""
+INSERT_JOB = (
+    "INSERT INTO jobs (id, user_id, type, status, created_at) VALUES (?, ?, ?, ?, ?)"
+)
+JOB_COLUMNS = (
+    "id", "user_id", "type", "status", "progress", "result", "error",
+    "created_at", "started_at", "finished_at",
+)
+# Changes after a seq, joined with the rows they point at. A row deleted by a
+# later change, or whose id was reused by another user, joins as NULL.
+SELECT_CHANGES = """
+SELECT c.seq, c.kind, c.record_id, c.deleted,
+       COALESCE(cy.start_date, dl.date), COALESCE(cy.payload, dl.payload)
+FROM changes c
+LEFT JOIN cycles cy
+    ON c.kind = 'cycle' AND NOT c.deleted AND cy.id = c.record_id AND cy.user_id = c.user_id
+LEFT JOIN daily_logs dl
+    ON c.kind = 'log' AND NOT c.deleted AND dl.id = c.record_id AND dl.user_id = c.user_id
+WHERE c.user_id = ? AND c.seq > ?
+ORDER BY c.seq
+LIMIT ?
+"""
+
+DELETE_CYCLE = "DELETE FROM cycles WHERE id = ?"
+DELETE_LOG = "DELETE FROM daily_logs WHERE id = ?"
+INSERT_CREDENTIALS = (
+    "INSERT OR IGNORE INTO credentials (user_id, salt, wrapped_key) VALUES (?, ?, ?)"
+)
+INSERT_KEY_CHECK = "INSERT OR IGNORE INTO key_checks (user_id, token) VALUES (?, ?)"
+# The user's earliest surviving cycle or log, in change order
+SELECT_FIRST_PAYLOAD = """
+SELECT COALESCE(cy.payload, dl.payload)
+FROM changes c
+LEFT JOIN cycles cy
+    ON c.kind = 'cycle' AND cy.id = c.record_id AND cy.user_id = c.user_id
+LEFT JOIN daily_logs dl
+    ON c.kind = 'log' AND dl.id = c.record_id AND dl.user_id = c.user_id
+WHERE c.user_id = ? AND NOT c.deleted AND COALESCE(cy.payload, dl.payload) IS NOT NULL
+ORDER BY c.seq
+LIMIT 1
+"""
+UPDATE_CREDENTIALS = (
+    "UPDATE credentials SET salt = ?, wrapped_key = ? "
+    "WHERE user_id = ? AND salt = ? AND wrapped_key = ?"
+)
+
+
+class StoredCycle(BaseModel):
+    """One encrypted cycle row."""
+
+    id: int
+    user_id: str
+    start_date: date
+    payload: bytes
+
+
+class StoredLog(BaseModel):
+    """One encrypted daily log row."""
+
+    id: int
+    user_id: str
+    date: date
+    payload: bytes
+
+
+class StoredChange(BaseModel):
+    """One entry of a user's change log.
+
+    ``date`` and ``payload`` are None for deletions, and for insertions whose
+    row a later change deleted again.
+    """
+
+    seq: int
+    kind: str  # "cycle" or "log"
+    record_id: int
+    deleted: bool
+    date: Optional[date]
+    payload: Optional[bytes] = None
+
+
+class _WriteRequest:
+    __slots__ = ("sql", "rows", "future")
+
+    def __init__(self, sql: str, rows: list[tuple], future: asyncio.Future):
+        self.sql = sql
+        self.rows = rows
+        self.future = future
+
+
+class CycleStore:
+    """Pooled async access to the encrypted cycle table.
+
+    The store opens lazily on first use, so it can be created at import time
+    and shared by every request.
+    """
+
+    def __init__(
+        self,
+        path: str | Path = DEFAULT_DB_PATH,
+        pool_size: int = 4,
+        max_batch: int = 500,
+    ):
+        """
+        Args:
+            path: SQLite database file, created if missing
+            pool_size: Number of read connections
+            max_batch: Most queued inserts committed in one transaction
+        """
+        self.path = Path(path)
+        self.pool_size = pool_size
+        self.max_batch = max_batch
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._readers: Optional[asyncio.Queue[sqlite3.Connection]] = None
+        self._writer: Optional[sqlite3.Connection] = None
+        self._writes: Optional[asyncio.Queue[_WriteRequest]] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        self._open_lock = asyncio.Lock()
+        self._opened = False
+
+    async def open(self) -> None:
+        """Create the schema and connections. Safe to call more than once."""
+        async with self._open_lock:
+            if self._opened:
+                return
+
+            # One thread per reader plus the writer, so a slow commit never
+            # holds up reads
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.pool_size + 1, thread_name_prefix="cycle-store"
+            )
+            loop = asyncio.get_running_loop()
+
+            self._writer = await loop.run_in_executor(self._executor, self._connect, True)
+            self._readers = asyncio.Queue()
+            for _ in range(self.pool_size):
+                conn = await loop.run_in_executor(self._executor, self._connect, False)
+                self._readers.put_nowait(conn)
+
+            self._writes = asyncio.Queue()
+            self._writer_task = asyncio.create_task(self._write_loop())
+            self._opened = True
+
+    async def close(self) -> None:
+        """Flush pending writes and close every connection."""
+        async with self._open_lock:
+            if not self._opened:
+                return
+            assert self._writes is not None and self._readers is not None
+
+            await self._writes.join()
+            if self._writer_task is not None:
+                self._writer_task.cancel()
+                try:
+                    await self._writer_task
+                except asyncio.CancelledError:
+                    pass
+
+            connections = [self._writer]
+            while not self._readers.empty():
+                connections.append(self._readers.get_nowait())
+            for conn in connections:
+                if conn is not None:
+                    conn.close()
+
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+            self._opened = False
+
+    def _connect(self, create: bool) -> sqlite3.Connection:
+        if create:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # In WAL mode NORMAL is still safe against corruption; only the last
+        # commits before a power loss can be lost
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        if create:
+            conn.executescript(SCHEMA)
+            _migrate(conn)
+        return conn
+
+    async def add_cycle(self, user_id: str, start_date: date, payload: bytes) -> int:
+        """Store one encrypted cycle and return its id."""
+        return (await self.add_cycles(user_id, [(start_date, payload)]))[0]
+
+    async def add_cycles(self, user_id: str, cycles: list[tuple[date, bytes]]) -> list[int]:
+        """Store many encrypted cycles for a user in one transaction.
+
+        Args:
+            user_id: Owner of the cycles
+            cycles: ``(start_date, encrypted payload)`` pairs
+
+        Returns:
+            The new row ids, in input order
+        """
+        if not cycles:
+            return []
+        now = time.time()
+        rows = [(user_id, start.isoformat(), payload, now) for start, payload in cycles]
+        return await self._write(INSERT_CYCLE, rows)
+
+    async def get_cycles(
+        self,
+        user_id: str,
+        since: Optional[date] = None,
+        until: Optional[date] = None,
+    ) -> list[StoredCycle]:
+        """Encrypted cycles for a user ordered by start date, via the index.
+
+        Args:
+            user_id: Owner of the cycles
+            since: Only cycles starting on or after this date
+            until: Only cycles starting on or before this date
+        """
+        query = "SELECT id, user_id, start_date, payload FROM cycles WHERE user_id = ?"
+        params: list = [user_id]
+        if since is not None:
+            query += " AND start_date >= ?"
+            params.append(since.isoformat())
+        if until is not None:
+            query += " AND start_date <= ?"
+            params.append(until.isoformat())
+        query += " ORDER BY start_date, id"
+
+        rows = await self._read(query, params)
+        return [
+            StoredCycle(id=row[0], user_id=row[1], start_date=row[2], payload=row[3])
+            for row in rows
+        ]
+
+    async def count_cycles(self, user_id: str) -> int:
+        rows = await self._read("SELECT COUNT(*) FROM cycles WHERE user_id = ?", [user_id])
+        return rows[0][0]
+
+    async def add_logs(self, user_id: str, logs: list[tuple[date, bytes]]) -> list[int]:
+        """Store many encrypted daily logs for a user in one transaction.
+
+        Args:
+            user_id: Owner of the logs
+            logs: ``(date, encrypted payload)`` pairs
+
+        Returns:
+            The new row ids, in input order
+        """
+        if not logs:
+            return []
+        now = time.time()
+        rows = [(user_id, day.isoformat(), payload, now) for day, payload in logs]
+        return await self._write(INSERT_LOG, rows)
+
+    async def get_logs(
+        self,
+        user_id: str,
+        since: Optional[date] = None,
+        until: Optional[date] = None,
+    ) -> list[StoredLog]:
+        """Encrypted daily logs for a user ordered by date, via the index."""
+        query = "SELECT id, user_id, date, payload FROM daily_logs WHERE user_id = ?"
+        params: list = [user_id]
+        if since is not None:
+            query += " AND date >= ?"
+            params.append(since.isoformat())
+        if until is not None:
+            query += " AND date <= ?"
+            params.append(until.isoformat())
+        query += " ORDER BY date, id"
+
+        rows = await self._read(query, params)
+        return [
+            StoredLog(id=row[0], user_id=row[1], date=row[2], payload=row[3]) for row in rows
+        ]
+
+    async def count_logs(self, user_id: str) -> int:
+        rows = await self._read("SELECT COUNT(*) FROM daily_logs WHERE user_id = ?", [user_id])
+        return rows[0][0]
+
+    async def delete_cycles(self, ids: list[int]) -> None:
+        if ids:
+            await self._write(DELETE_CYCLE, [(i,) for i in ids])
+
+    async def delete_logs(self, ids: list[int]) -> None:
+        if ids:
+            await self._write(DELETE_LOG, [(i,) for i in ids])
+
+    async def get_changes(
+        self,
+        user_id: str,
+        after: int = 0,
+        limit: int = 500,
+    ) -> list[StoredChange]:
+        """A user's changes with ``seq`` above ``after``, oldest first (keyset pagination).
+
+        Walks the ``(user_id, seq)`` index, so a page costs the same however
+        long the history before ``after`` is.
+        """
+        rows = await self._read(SELECT_CHANGES, [user_id, after, limit])
+        return [
+            StoredChange(
+                seq=row[0],
+                kind=row[1],
+                record_id=row[2],
+                deleted=bool(row[3]),
+                date=row[4],
+                payload=row[5],
+            )
+            for row in rows
+        ]
+
+    async def latest_change(self, user_id: str) -> int:
+        """``seq`` of the user's newest change, or 0 if there is none."""
+        rows = await self._read("SELECT MAX(seq) FROM changes WHERE user_id = ?", [user_id])
+        return rows[0][0] or 0
+
+    async def put_model_params(self, user_id: str, payload: bytes, trained_seq: int = 0) -> None:
+        """Store a user's encrypted model params, replacing older ones.
+
+        Args:
+            user_id: Owner of the params
+            payload: Encrypted params
+            trained_seq: ``latest_change`` as of reading the cycles trained on
+        """
+        await self._write(PUT_MODEL_PARAMS, [(user_id, payload, time.time(), trained_seq)])
+
+    async def get_model_params(self, user_id: str) -> Optional[bytes]:
+        rows = await self._read("SELECT payload FROM model_params WHERE user_id = ?", [user_id])
+        return rows[0][0] if rows else None
+
+    async def get_first_payload(self, user_id: str) -> Optional[bytes]:
+        """The user's earliest stored cycle or log, or None.
+
+        Stands in for a key check for users whose data predates key checks.
+        Later rows may have been written under any key; the first is theirs.
+        """
+        rows = await self._read(SELECT_FIRST_PAYLOAD, [user_id])
+        return rows[0][0] if rows else None
+
+    async def get_key_check(self, user_id: str) -> Optional[bytes]:
+        rows = await self._read("SELECT token FROM key_checks WHERE user_id = ?", [user_id])
+        return rows[0][0] if rows else None
+
+    async def set_key_check(self, user_id: str, token: bytes) -> bytes:
+        """Store the user's key check unless they already have one.
+
+        Returns:
+            The stored key check, which is the existing one if two first
+            writes raced
+        """
+        await self._write(INSERT_KEY_CHECK, [(user_id, token)])
+        stored = await self.get_key_check(user_id)
+        assert stored is not None
+        return stored
+
+    async def get_model_state(self, user_id: str) -> Optional[tuple[bytes, bool]]:
+        """A user's encrypted model params and whether their cycles changed since.
+
+        Returns:
+            Tuple of (payload, stale), or None without params
+        """
+        rows = await self._read(SELECT_MODEL_STATE, [user_id])
+        return (rows[0][0], bool(rows[0][1])) if rows else None
+
+    async def create_job(self, job_id: str, user_id: str, job_type: str, status: str) -> None:
+        await self._write(INSERT_JOB, [(job_id, user_id, job_type, status, time.time())])
+
+    async def update_job(self, job_id: str, **fields) -> None:
+        """Set job columns, e.g. ``status``, ``progress`` or ``finished_at``."""
+        unknown = fields.keys() - set(JOB_COLUMNS[3:])
+        if unknown:
+            raise ValueError(f"Unknown job columns: {sorted(unknown)}")
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        await self._write(
+            f"UPDATE jobs SET {assignments} WHERE id = ?", [(*fields.values(), job_id)]
+        )
+
+    async def get_job(self, job_id: str) -> Optional[dict]:
+        rows = await self._read(
+            f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE id = ?", [job_id]
+        )
+        return dict(zip(JOB_COLUMNS, rows[0])) if rows else None
+
+    async def fail_unfinished_jobs(self, error: str) -> None:
+        """Mark jobs left queued or running by a previous process as failed."""
+        await self._write(
+            "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? "
+            "WHERE status IN ('queued', 'running')",
+            [(error, time.time())],
+        )
+
+    async def get_credentials(self, user_id: str) -> Optional[tuple[bytes, bytes]]:
+        """The user's KDF salt and wrapped data key, if they have logged in before."""
+        rows = await self._read(
+            "SELECT salt, wrapped_key FROM credentials WHERE user_id = ?", [user_id]
+        )
+        return (rows[0][0], rows[0][1]) if rows else None
+
+    async def set_credentials(
+        self, user_id: str, salt: bytes, wrapped_key: bytes
+    ) -> tuple[bytes, bytes]:
+        """Store credentials unless the user already has some.
+
+        Returns:
+            The stored credentials, which are the existing ones if two first
+            logins raced
+        """
+        await self._write(INSERT_CREDENTIALS, [(user_id, salt, wrapped_key)])
+        stored = await self.get_credentials(user_id)
+        assert stored is not None
+        return stored
+
+    async def replace_credentials(
+        self, user_id: str, old: tuple[bytes, bytes], new: tuple[bytes, bytes]
+    ) -> bool:
+        """Swap ``(salt, wrapped_key)`` if the stored ones are still ``old``.
+
+        Returns:
+            False if the credentials changed concurrently and nothing was written
+        """
+        await self._write(UPDATE_CREDENTIALS, [(*new, user_id, *old)])
+        return await self.get_credentials(user_id) == new
+
+    async def _write(self, sql: str, rows: list[tuple]) -> list[int]:
+        await self.open()
+        assert self._writes is not None
+
+        future = asyncio.get_running_loop().create_future()
+        await self._writes.put(_WriteRequest(sql, rows, future))
+        return await future
+
+    async def _read(self, query: str, params: list) -> list[tuple]:
+        await self.open()
+        assert self._readers is not None
+
+        conn = await self._readers.get()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, lambda: conn.execute(query, params).fetchall()
+            )
+        finally:
+            self._readers.put_nowait(conn)
+
+    async def _write_loop(self) -> None:
+        """Commit queued writes in batches until cancelled."""
+        assert self._writes is not None
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = [await self._writes.get()]
+            # Take whatever else queued up while the last commit ran
+            n_rows = len(batch[0].rows)
+            while n_rows < self.max_batch and not self._writes.empty():
+                request = self._writes.get_nowait()
+                batch.append(request)
+                n_rows += len(request.rows)
+
+            try:
+                ids = await loop.run_in_executor(self._executor, self._insert_batch, batch)
+            except Exception as e:
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+            else:
+                for request, request_ids in zip(batch, ids):
+                    if not request.future.done():
+                        request.future.set_result(request_ids)
+            finally:
+                for _ in batch:
+                    self._writes.task_done()
+
+    def _insert_batch(self, batch: list[_WriteRequest]) -> list[list[int]]:
+        conn = self._writer
+        assert conn is not None
+
+        ids = []
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for request in batch:
+                request_ids = []
+                for row in request.rows:
+                    request_ids.append(conn.execute(request.sql, row).lastrowid)
+                ids.append(request_ids)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return ids
+
+
+def _migrate(conn: sqlite3.Connection) -> None:
+    """Add columns that ``CREATE TABLE IF NOT EXISTS`` skips on older databases."""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(model_params)")}
+    if "trained_seq" not in columns:
+        # Older params count as stale until the user retrains
+        conn.execute(
+            "ALTER TABLE model_params ADD COLUMN trained_seq INTEGER NOT NULL DEFAULT 0"
+        )
+
+
+def load_local_key(path: str | Path) -> bytes:
+    """Fernet key for single-user deployments, created on first use.
+
+    Used only when a request does not bring its own key. The file is readable
+    by the server user only.
+    """
+    path = Path(path)
+    try:
+        return path.read_bytes().strip()
+    except FileNotFoundError:
+        pass
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    key = Fernet.generate_key()
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        # Another worker created it first
+        return path.read_bytes().strip()
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+    return key
@@ -0,0 +1,5 @@
+"""Performance benchmarks for FLux.
+
+Run a benchmark as a module from the repository root, e.g.:
+    python -m benchmarks.bench_date_parsing
+"""
@@ -0,0 +1,135 @@
+"""Benchmark parsing FLux app exports: per-row models versus batched validation.
+
+Writes a synthetic app export with ``ml.training.synthetic`` (10 years by
+default) and reports time and ``tracemalloc`` peak for:
+- ``previous``: ``json.load``, recursive key normalization calling the
+  character loop for every key, then one model constructor call per row
+- ``parse_app_export``: the streaming reader with memoised keys and
+  ``TypeAdapter`` validation in batches
+- the two halves on their own, on already-decoded log entries:
+  normalization (character loop versus ``normalize_keys``) and validation
+  (``DailyLog(**entry)`` versus one ``TypeAdapter(list[DailyLog])`` call)
+
+Usage:
+    python -m benchmarks.bench_app_export
+    python -m benchmarks.bench_app_export --years 30 --density 3 --json
+"""
+
+import argparse
+import json
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+from pydantic import TypeAdapter
+
+from ml.models.schemas import AppExport, Cycle, DailyLog
+from ml.preprocessing.flo_parser import normalize_keys, parse_app_export
+from ml.training.synthetic import SyntheticUser, write_app_export
+
+
+def to_snake_case(key: str) -> str:
+    result = []
+    for i, char in enumerate(key):
+        if char.isupper() and i > 0:
+            result.append("_")
+        result.append(char.lower())
+    return "".join(result)
+
+
+def normalize_entry(entry: dict) -> dict:
+    normalized: dict = {}
+    for key, value in entry.items():
+        snake_key = to_snake_case(key)
+        if isinstance(value, dict):
+            normalized[snake_key] = normalize_entry(value)
+        elif isinstance(value, list):
+            normalized[snake_key] = [
+                normalize_entry(item) if isinstance(item, dict) else item for item in value
+            ]
+        else:
+            normalized[snake_key] = value
+    return normalized
+
+
+def previous_parse(path: Path) -> AppExport:
+    """``parse_app_export`` before batched validation."""
+    with open(path, "r", encoding="utf-8") as f:
+        normalized = normalize_entry(json.load(f))
+    return AppExport(
+        exported_at=datetime.fromisoformat(normalized["exported_at"].replace("Z", "+00:00")),
+        cycles=[Cycle(**c) for c in normalized.get("cycles", [])],
+        logs=[DailyLog(**l) for l in normalized.get("logs", [])],
+    )
+
+
+def measure(fn, repeat: int) -> dict:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+        del result
+
+    tracemalloc.start()
+    result = fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del result
+    return {"seconds": best, "peak_bytes": peak}
+
+
+def run(years: float, density: float, repeat: int) -> dict:
+    user = SyntheticUser(seed=0, index=0, years=years, density=density)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "app.json"
+        with open(path, "w", encoding="utf-8") as out:
+            n_logs = write_app_export(user, out)
+        entries = json.loads(path.read_text(encoding="utf-8"))["logs"]
+        normalized = [normalize_keys(entry) for entry in entries]
+        adapter = TypeAdapter(list[DailyLog])
+
+        methods = {
+            "previous": lambda: previous_parse(path),
+            "parse_app_export": lambda: parse_app_export(path),
+            "normalize_char_loop": lambda: [normalize_entry(entry) for entry in entries],
+            "normalize_memoised": lambda: [normalize_keys(entry) for entry in entries],
+            "validate_per_row": lambda: [DailyLog(**entry) for entry in normalized],
+            "validate_type_adapter": lambda: adapter.validate_python(normalized),
+        }
+        return {
+            "years": years,
+            "density": density,
+            "logs": n_logs,
+            "bytes": path.stat().st_size,
+            "methods": {name: measure(fn, repeat) for name, fn in methods.items()},
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark app export parsing")
+    parser.add_argument("--years", type=float, default=10, help="Years of history")
+    parser.add_argument("--density", type=float, default=1.0, help="Event rate multiplier")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per method")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    report = run(args.years, args.density, args.repeat)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(
+        f"{report['years']:g} years: {report['logs']:,} logs, "
+        f"{report['bytes'] / 1e6:.1f} MB app export"
+    )
+    print(f"  {'method':<22} {'ms':>9} {'peak MB':>9}")
+    for name, m in report["methods"].items():
+        print(f"  {name:<22} {m['seconds'] * 1000:>9.1f} {m['peak_bytes'] / 1e6:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Benchmark cohort-level feature engineering.
+
+Times ``compute_cycle_features_batch`` on synthetic ragged histories for a
+large cohort, against calling ``compute_cycle_features`` once per user (timed
+on a sample and extrapolated, since the loop takes minutes at 100k users).
+
+Usage:
+    python -m benchmarks.bench_batch_features
+    python -m benchmarks.bench_batch_features --users 10000 --json
+"""
+
+import argparse
+import json
+import time
+from datetime import date
+
+import numpy as np
+
+from ml.models.schemas import Cycle
+from ml.preprocessing.feature_engineering import (
+    compute_cycle_features,
+    compute_cycle_features_batch,
+)
+
+
+def synthetic_cohort(n_users: int, mean_cycles: int = 40, seed: int = 0):
+    """Ragged start ordinals for ``n_users`` with 28±4 day cycles."""
+    rng = np.random.default_rng(seed)
+    counts = rng.integers(1, 2 * mean_cycles, size=n_users)
+    offsets = np.zeros(n_users + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+
+    gaps = rng.normal(28, 4, size=offsets[-1]).round().astype(np.int64)
+    # Each user's first entry holds their absolute first start date
+    gaps[offsets[:-1]] = date(2012, 1, 1).toordinal() + rng.integers(0, 3650, size=n_users)
+    running = np.cumsum(gaps)
+    before_user = running[offsets[:-1]] - gaps[offsets[:-1]]
+    starts = running - np.repeat(before_user, counts)
+    return offsets, starts
+
+
+def run(n_users: int, loop_sample: int) -> dict:
+    offsets, starts = synthetic_cohort(n_users)
+
+    started = time.perf_counter()
+    features = compute_cycle_features_batch(offsets, starts)
+    batch_s = time.perf_counter() - started
+
+    sample = min(loop_sample, n_users)
+    histories = [
+        [Cycle(start_date=date.fromordinal(int(o))) for o in starts[offsets[i]:offsets[i + 1]]]
+        for i in range(sample)
+    ]
+    started = time.perf_counter()
+    for i, history in enumerate(histories):
+        expected = compute_cycle_features(history)
+        if "error" in expected:
+            continue
+        if not np.isclose(features["mean_length"][i], expected["mean_length"]):
+            raise AssertionError(f"Batch features differ for user {i}")
+    loop_s = time.perf_counter() - started
+
+    return {
+        "users": n_users,
+        "cycles": int(offsets[-1]),
+        "batch_s": round(batch_s, 3),
+        "loop_s_estimated": round(loop_s / sample * n_users, 3),
+        "speedup": round(loop_s / sample * n_users / batch_s, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batch cycle features")
+    parser.add_argument("--users", type=int, default=100_000, help="Cohort size")
+    parser.add_argument("--loop-sample", type=int, default=2_000,
+                        help="Users timed with the per-user function")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    report = run(args.users, args.loop_sample)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{report['users']:,} users, {report['cycles']:,} cycles")
+    print(f"  batch:            {report['batch_s']:.2f}s")
+    print(f"  per-user (est.):  {report['loop_s_estimated']:.2f}s")
+    print(f"  speedup:          {report['speedup']:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Benchmark bulk record encryption.
+
+Encrypts and decrypts a user's worth of daily log records three ways:
+- ``EncryptionService.encrypt``/``decrypt`` per record (a new Fernet each call)
+- ``EncryptionService.encrypt_many``/``decrypt_many`` (one Fernet for the batch)
+- ``EnvelopeCipher`` (AES-256-GCM under the user's unwrapped data key)
+
+Usage:
+    python -m benchmarks.bench_bulk_encryption
+    python -m benchmarks.bench_bulk_encryption --records 50000 --json
+"""
+
+import argparse
+import json
+import time
+from datetime import date, timedelta
+
+from cryptography.fernet import Fernet
+
+from backend.services.encryption import EncryptionService, EnvelopeCipher
+
+
+def synthetic_log_records(n_records: int) -> list[bytes]:
+    """Daily log entries as the import pipeline serializes them."""
+    start = date(2015, 1, 1)
+    return [
+        json.dumps({
+            "date": (start + timedelta(days=i)).isoformat(),
+            "flow": ["light", "medium", "heavy", None][i % 4],
+            "symptoms": ["cramps", "headache"][: i % 3],
+            "mood": "calm",
+            "notes": None,
+        }).encode()
+        for i in range(n_records)
+    ]
+
+
+def _time(fn) -> tuple[float, list]:
+    started = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - started, result
+
+
+def run(n_records: int) -> dict:
+    records = synthetic_log_records(n_records)
+    key = Fernet.generate_key()
+    report: dict = {"records": n_records, "methods": {}}
+
+    enc_s, encrypted = _time(lambda: [EncryptionService.encrypt(r, key) for r in records])
+    dec_s, decrypted = _time(lambda: [EncryptionService.decrypt(r, key) for r in encrypted])
+    assert decrypted == records
+    report["methods"]["per_record_fernet"] = {"encrypt_s": enc_s, "decrypt_s": dec_s}
+
+    enc_s, encrypted = _time(lambda: EncryptionService.encrypt_many(records, key))
+    dec_s, decrypted = _time(lambda: EncryptionService.decrypt_many(encrypted, key))
+    assert decrypted == records
+    report["methods"]["bulk_fernet"] = {"encrypt_s": enc_s, "decrypt_s": dec_s}
+
+    # Envelope: unwrapping the data key is part of the per-batch cost
+    wrapped = EncryptionService.wrap_data_key(EncryptionService.generate_data_key(), key)
+
+    def envelope_cipher() -> EnvelopeCipher:
+        return EnvelopeCipher(EncryptionService.unwrap_data_key(wrapped, key))
+
+    def envelope_encrypt():
+        return envelope_cipher().encrypt_many(records)
+
+    def envelope_decrypt():
+        return envelope_cipher().decrypt_many(encrypted)
+
+    enc_s, encrypted = _time(envelope_encrypt)
+    dec_s, decrypted = _time(envelope_decrypt)
+    assert decrypted == records
+    report["methods"]["bulk_envelope"] = {"encrypt_s": enc_s, "decrypt_s": dec_s}
+
+    baseline = report["methods"]["per_record_fernet"]
+    for row in report["methods"].values():
+        row["encrypt_speedup"] = round(baseline["encrypt_s"] / row["encrypt_s"], 1)
+        row["decrypt_speedup"] = round(baseline["decrypt_s"] / row["decrypt_s"], 1)
+        row["encrypt_s"] = round(row["encrypt_s"], 4)
+        row["decrypt_s"] = round(row["decrypt_s"], 4)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark bulk record encryption")
+    parser.add_argument("--records", type=int, default=10000, help="Records per user")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    report = run(args.records)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"Encrypting {report['records']:,} log records")
+    print(f"{'method':<18} {'encrypt':>9} {'speedup':>8} {'decrypt':>9} {'speedup':>8}")
+    for method, row in report["methods"].items():
+        print(
+            f"{method:<18} {row['encrypt_s']:>8.3f}s {row['encrypt_speedup']:>7.1f}x "
+            f"{row['decrypt_s']:>8.3f}s {row['decrypt_speedup']:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
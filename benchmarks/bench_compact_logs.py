@@ -0,0 +1,142 @@
+"""Benchmark the compact columnar containers against lists of models.
+
+Builds a synthetic daily log and cycle history covering ``--years`` years
+(one log per day, symptoms on about a third of the days) and reports:
+- memory: ``tracemalloc`` peak while holding ``list[DailyLog]`` versus
+  ``DailyLogColumns`` (cycles are reported the same way)
+- conversion time in both directions
+- ``compute_log_features`` and ``compute_cycle_features`` time on each form
+
+Usage:
+    python -m benchmarks.bench_compact_logs
+    python -m benchmarks.bench_compact_logs --years 30 --json
+"""
+
+import argparse
+import gc
+import json
+import random
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from ml.models.schemas import Cycle, DailyLog
+from ml.preprocessing.compact import (
+    MULTI_VALUED_FIELDS,
+    SINGLE_VALUED_FIELDS,
+    CycleColumns,
+    DailyLogColumns,
+    base_vocabulary,
+)
+from ml.preprocessing.feature_engineering import compute_cycle_features, compute_log_features
+
+
+def synthetic_history(years: int, seed: int = 0) -> tuple[list[DailyLog], list[Cycle]]:
+    rng = random.Random(seed)
+    vocab = {field: base_vocabulary(m) for field, m in SINGLE_VALUED_FIELDS.items()}
+    symptoms = base_vocabulary(MULTI_VALUED_FIELDS["symptoms"])
+    disturbers = base_vocabulary(MULTI_VALUED_FIELDS["disturbers"])
+
+    start = date(2024, 1, 1) - timedelta(days=365 * years)
+    cycles, logs = [], []
+    day = start
+    while day < date(2024, 1, 1):
+        length, period = rng.randint(25, 33), rng.randint(3, 6)
+        cycles.append(Cycle(start_date=day, length=length, period_length=period))
+        for offset in range(length):
+            in_period = offset < period
+            logs.append(DailyLog(
+                date=day + timedelta(days=offset),
+                flow=rng.choice(vocab["flow"]) if in_period else None,
+                symptoms=sorted(rng.sample(symptoms, 2)) if rng.random() < 0.33 else [],
+                mood=rng.choice(vocab["mood"]) if rng.random() < 0.5 else None,
+                fluid=rng.choice(vocab["fluid"]) if rng.random() < 0.2 else None,
+                disturbers=[rng.choice(disturbers)] if rng.random() < 0.1 else [],
+                temperature=round(rng.gauss(36.5, 0.2), 2) if rng.random() < 0.6 else None,
+                is_period=in_period,
+            ))
+        day += timedelta(days=length)
+    return logs, cycles
+
+
+def held_bytes(build) -> int:
+    """Bytes still allocated after ``build()`` returns, while its result is alive."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del result
+    return held
+
+
+def timed(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def run(years: int) -> dict:
+    logs, cycles = synthetic_history(years)
+    log_columns = DailyLogColumns.from_logs(logs)
+    cycle_columns = CycleColumns.from_cycles(cycles)
+
+    return {
+        "years": years,
+        "logs": len(logs),
+        "cycles": len(cycles),
+        "bytes": {
+            "logs_models": held_bytes(lambda: synthetic_history(years)[0]),
+            "logs_columns": held_bytes(lambda: DailyLogColumns.from_logs(logs)),
+            "logs_column_arrays": log_columns.nbytes,
+            "cycles_models": held_bytes(lambda: synthetic_history(years)[1]),
+            "cycles_columns": held_bytes(lambda: CycleColumns.from_cycles(cycles)),
+        },
+        "seconds": {
+            "logs_to_columns": timed(lambda: DailyLogColumns.from_logs(logs)),
+            "columns_to_logs": timed(log_columns.to_logs),
+            "log_features_models": timed(lambda: compute_log_features(logs, cycles)),
+            "log_features_columns": timed(
+                lambda: compute_log_features(log_columns, cycle_columns)
+            ),
+            "cycle_features_models": timed(lambda: compute_cycle_features(cycles)),
+            "cycle_features_columns": timed(lambda: compute_cycle_features(cycle_columns)),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark compact columnar histories")
+    parser.add_argument("--years", type=int, default=10, help="Years of daily logs")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    report = run(args.years)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    sizes, seconds = report["bytes"], report["seconds"]
+    print(f"{report['years']} years: {report['logs']:,} daily logs, {report['cycles']:,} cycles")
+    print(
+        f"  logs:   {sizes['logs_models'] / 1e6:>7.2f} MB as models, "
+        f"{sizes['logs_columns'] / 1e6:>7.3f} MB as columns "
+        f"({sizes['logs_models'] / sizes['logs_columns']:.0f}x smaller)"
+    )
+    print(
+        f"  cycles: {sizes['cycles_models'] / 1e3:>7.1f} KB as models, "
+        f"{sizes['cycles_columns'] / 1e3:>7.1f} KB as columns"
+    )
+    print()
+    print(f"{'step':<24} {'ms':>9}")
+    for step, value in seconds.items():
+        print(f"{step:<24} {value * 1000:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Benchmark date parsing on a synthetic Flo export.
+
+Compares the original try-every-format ``_parse_date`` with ``DateParser``
+on the ``date`` field of synthetic ``point_events_manual_v2`` events.
+
+Usage:
+    python -m benchmarks.bench_date_parsing
+    python -m benchmarks.bench_date_parsing --events 200000 --json
+"""
+
+import argparse
+import json
+import random
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable, Optional
+
+from ml.preprocessing.date_parsing import DATE_FORMATS, DateParser
+
+
+def legacy_parse_date(date_val: Optional[str | int]) -> Optional[date]:
+    """The original FloParser._parse_date, kept as the baseline."""
+    if date_val is None:
+        return None
+
+    if isinstance(date_val, int):
+        if date_val > 1e12:
+            return datetime.fromtimestamp(date_val / 1000).date()
+        else:
+            return datetime.fromtimestamp(date_val).date()
+
+    date_str = str(date_val)
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(date_str, fmt).date()
+        except ValueError:
+            continue
+
+    return None
+
+
+def synthetic_event_dates(n_events: int, years: int = 10, seed: int = 0) -> dict[str, list]:
+    """Build event date columns the way different exports write them.
+
+    Several events share a day, as in real exports where symptoms, mood and
+    fluid are logged together.
+    """
+    rng = random.Random(seed)
+    start = date(2015, 1, 1)
+    n_days = 365 * years
+
+    def day() -> date:
+        return start + timedelta(days=rng.randrange(n_days))
+
+    return {
+        "flo_gdpr": [f"{day().isoformat()} 00:00:00.0" for _ in range(n_events)],
+        "iso_date": [day().isoformat() for _ in range(n_events)],
+        "iso_datetime": [
+            f"{day().isoformat()}T{rng.randrange(24):02d}:{rng.randrange(60):02d}:00Z"
+            for _ in range(n_events)
+        ],
+        "day_first": [day().strftime("%d.%m.%Y") for _ in range(n_events)],
+    }
+
+
+def time_parser(parse: Callable, values: list) -> tuple[float, list]:
+    started = time.perf_counter()
+    results = [parse(v) for v in values]
+    return time.perf_counter() - started, results
+
+
+def run(n_events: int) -> dict:
+    report: dict = {"events": n_events, "columns": {}}
+
+    for column, values in synthetic_event_dates(n_events).items():
+        legacy_s, expected = time_parser(legacy_parse_date, values)
+
+        parser = DateParser()
+        fast_s, results = time_parser(lambda v: parser.parse(v, "point_event"), values)
+        if results != expected:
+            raise AssertionError(f"DateParser disagrees with legacy parser on {column}")
+
+        report["columns"][column] = {
+            "legacy_s": round(legacy_s, 3),
+            "date_parser_s": round(fast_s, 3),
+            "speedup": round(legacy_s / fast_s, 1),
+        }
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark export date parsing")
+    parser.add_argument("--events", type=int, default=1_000_000, help="Events per column")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    report = run(args.events)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"Date parsing, {report['events']:,} events per column")
+    print(f"{'column':<14} {'legacy':>10} {'DateParser':>12} {'speedup':>9}")
+    for column, row in report["columns"].items():
+        print(
+            f"{column:<14} {row['legacy_s']:>9.2f}s {row['date_parser_s']:>11.2f}s "
+            f"{row['speedup']:>8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
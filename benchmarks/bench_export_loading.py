@@ -0,0 +1,120 @@
+"""Benchmark loading exports of unknown format: detect-then-parse versus load_any_export.
+
+Writes one large synthetic Flo GDPR export and one FLux app export with
+``ml.training.synthetic`` and, for each file, reports time and
+``tracemalloc`` peak for:
+- ``double_load``: the previous path, which ran ``json.load`` to detect the
+  format and then let the parser load the file again
+- ``load_any_export``: one ``json.load``, with the decoded document handed
+  to the matching parser
+- ``load_any_export_stream``: one incremental pass through
+  ``ExportStreamParser``
+- ``sniff``: format detection alone, with ``sniff_export_format`` scanning
+  the keys versus ``json.load``
+
+Usage:
+    python -m benchmarks.bench_export_loading
+    python -m benchmarks.bench_export_loading --years 40 --density 4 --json
+"""
+
+import argparse
+import json
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from ml.preprocessing.flo_parser import (
+    load_any_export,
+    parse_app_export,
+    parse_flo_export,
+    sniff_export_format,
+)
+from ml.training.synthetic import WRITERS, SyntheticUser
+
+
+def double_load(path: Path) -> tuple:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if "exported_at" in data or "exportedAt" in data:
+        app_export = parse_app_export(path)
+        return app_export.cycles, app_export.logs, "app"
+    return (*parse_flo_export(path), "flo")
+
+
+def json_detect(path: Path) -> str:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return "app" if "exported_at" in data or "exportedAt" in data else "flo"
+
+
+def sniff(path: Path) -> str:
+    with open(path, "r", encoding="utf-8") as f:
+        return sniff_export_format(f)
+
+
+METHODS = {
+    "double_load": double_load,
+    "load_any_export": load_any_export,
+    "load_any_export_stream": lambda path: load_any_export(path, stream=True),
+    "sniff_json_load": json_detect,
+    "sniff_streaming": sniff,
+}
+
+
+def measure(fn, path: Path, repeat: int) -> dict:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(path)
+        best = min(best, time.perf_counter() - started)
+        del result
+
+    tracemalloc.start()
+    result = fn(path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del result
+    return {"seconds": best, "peak_bytes": peak}
+
+
+def run(years: float, density: float, repeat: int) -> dict:
+    user = SyntheticUser(seed=0, index=0, years=years, density=density)
+    report = {"years": years, "density": density, "files": {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt, write in WRITERS.items():
+            path = Path(tmp) / f"{fmt}.json"
+            with open(path, "w", encoding="utf-8") as out:
+                write(user, out)
+            report["files"][fmt] = {
+                "bytes": path.stat().st_size,
+                "methods": {name: measure(fn, path, repeat) for name, fn in METHODS.items()},
+            }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark single-pass export loading")
+    parser.add_argument("--years", type=float, default=20, help="Years of history per file")
+    parser.add_argument("--density", type=float, default=2.0, help="Event rate multiplier")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per method")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    report = run(args.years, args.density, args.repeat)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{report['years']:g} years, density {report['density']:g}")
+    for fmt, result in report["files"].items():
+        print()
+        print(f"{fmt} export: {result['bytes'] / 1e6:.1f} MB")
+        print(f"  {'method':<24} {'ms':>9} {'peak MB':>9}")
+        for name, m in result["methods"].items():
+            print(f"  {name:<24} {m['seconds'] * 1000:>9.1f} {m['peak_bytes'] / 1e6:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
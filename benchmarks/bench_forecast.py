@@ -0,0 +1,176 @@
+"""Benchmark the Bayesian forecasting engine against per-user predictors.
+
+Builds a synthetic cohort whose cycle lengths drift slowly, with noise that
+differs between users and occasional missed periods (a doubled gap). Each
+user's last start date is held out. Every model is fitted on the earlier
+cycles and scored on the held-out date:
+- ``mae_days``: mean absolute error of the predicted next period date
+- ``within_2d``: share of predictions within two days of the actual date
+- ``mean_confidence``: average reported confidence. For the Bayesian model
+  this is P(within 2 days), so it should be close to ``within_2d``.
+
+``BayesianCyclePredictor.fit_batch`` fits the whole cohort in one call.
+``CyclePredictor`` (weighted average, and Prophet when installed) is fitted
+per user on a sample, and its cohort time is extrapolated from that. Accuracy
+is compared on that same sample.
+
+Usage:
+    python -m benchmarks.bench_forecast
+    python -m benchmarks.bench_forecast --users 100000 --prophet-sample 50 --json
+"""
+
+import argparse
+import json
+import time
+from datetime import date
+
+import numpy as np
+
+from ml.models.schemas import Cycle
+from ml.training.forecast import BayesianCyclePredictor
+
+
+def synthetic_cohort(n_users: int, seed: int = 0):
+    """Ragged start ordinals for ``n_users`` plus each user's held-out next start."""
+    rng = np.random.default_rng(seed)
+    counts = rng.integers(6, 60, size=n_users) + 1  # +1: the held-out start
+    offsets = np.zeros(n_users + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    user = np.repeat(np.arange(n_users), counts)
+
+    # Per-user level that drifts as a random walk, plus per-user noise
+    level = rng.normal(28, 2, size=n_users)[user]
+    drift = rng.normal(0, 0.3, size=offsets[-1])
+    drift[offsets[:-1]] = 0
+    walk = np.cumsum(drift)
+    walk -= np.repeat(walk[offsets[:-1]], counts)
+    noise = rng.normal(0, 1, size=offsets[-1]) * rng.uniform(1, 4, size=n_users)[user]
+    gaps = np.clip(np.rint(level + walk + noise), 21, 45).astype(np.int64)
+    missed = rng.random(offsets[-1]) < 0.03
+    gaps[missed] *= 2
+
+    # Each user's first entry holds their absolute first start date
+    gaps[offsets[:-1]] = date(2012, 1, 1).toordinal() + rng.integers(0, 3650, size=n_users)
+    running = np.cumsum(gaps)
+    before_user = running[offsets[:-1]] - gaps[offsets[:-1]]
+    starts = running - np.repeat(before_user, counts)
+
+    # Hold out each user's last start
+    held_out = starts[offsets[1:] - 1]
+    keep = np.ones(len(starts), dtype=bool)
+    keep[offsets[1:] - 1] = False
+    return offsets - np.arange(n_users + 1), starts[keep], held_out
+
+
+def score(predicted: np.ndarray, actual: np.ndarray, confidence: np.ndarray) -> dict:
+    errors = np.abs(predicted - actual)
+    return {
+        "users": len(errors),
+        "mae_days": round(float(errors.mean()), 3),
+        "within_2d": round(float((errors <= 2).mean()), 4),
+        "mean_confidence": round(float(confidence.mean()), 4),
+    }
+
+
+def fit_per_user(model_type: str, histories: list[list[Cycle]]):
+    """Fit ``CyclePredictor`` per user; returns (seconds, user index, ordinal, confidence)."""
+    from ml.models.cycle_predictor import CyclePredictor
+
+    rows = []
+    started = time.perf_counter()
+    for i, history in enumerate(histories):
+        try:
+            prediction = CyclePredictor(model_type=model_type).fit(history).predict()
+        except ValueError:
+            continue
+        rows.append((i, prediction.next_period_date.toordinal(), prediction.confidence))
+    elapsed = time.perf_counter() - started
+    index, ordinals, confidence = (np.array(col) for col in zip(*rows))
+    return elapsed, index, ordinals, confidence
+
+
+def run(n_users: int, sample: int, prophet_sample: int) -> dict:
+    offsets, starts, held_out = synthetic_cohort(n_users)
+    model = BayesianCyclePredictor()
+
+    started = time.perf_counter()
+    forecast = model.fit_batch(offsets, starts)
+    batch_s = time.perf_counter() - started
+    ok = forecast["n_cycles"] > 0
+
+    report: dict = {
+        "users": n_users,
+        "cycles": int(len(starts)),
+        "bayesian_batch": {
+            "fit_s": round(batch_s, 4),
+            "us_per_user": round(batch_s / n_users * 1e6, 2),
+            **score(forecast["next_period_ordinal"][ok], held_out[ok], forecast["confidence"][ok]),
+        },
+        "sample": {},
+    }
+
+    sample = min(sample, n_users)
+    histories = [
+        [Cycle(start_date=date.fromordinal(int(o))) for o in starts[offsets[i]:offsets[i + 1]]]
+        for i in range(sample)
+    ]
+    methods = {"weighted_average": sample}
+    try:
+        import prophet  # noqa: F401
+        methods["prophet"] = min(prophet_sample, sample)
+    except ImportError:
+        report["sample"]["prophet"] = {"skipped": "prophet is not installed"}
+
+    for method, n in methods.items():
+        elapsed, index, ordinals, confidence = fit_per_user(method, histories[:n])
+        report["sample"][method] = {
+            "fit_s": round(elapsed, 4),
+            "us_per_user": round(elapsed / n * 1e6, 2),
+            "cohort_s_extrapolated": round(elapsed / n * n_users, 2),
+            **score(ordinals, held_out[index], confidence),
+        }
+        # The Bayesian model on exactly the users this method could fit
+        report["sample"][f"bayesian_vs_{method}"] = score(
+            forecast["next_period_ordinal"][index],
+            held_out[index],
+            forecast["confidence"][index],
+        )
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Bayesian forecasting engine")
+    parser.add_argument("--users", type=int, default=20000, help="Users in the cohort")
+    parser.add_argument("--sample", type=int, default=1000, help="Users fitted one by one")
+    parser.add_argument("--prophet-sample", type=int, default=20, help="Users fitted with Prophet")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    report = run(args.users, args.sample, args.prophet_sample)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    batch = report["bayesian_batch"]
+    print(f"Forecasting {report['users']:,} users ({report['cycles']:,} cycles)")
+    print(
+        f"bayesian fit_batch: {batch['fit_s']:.3f}s ({batch['us_per_user']:.1f} us/user), "
+        f"MAE {batch['mae_days']:.2f}d, within 2d {batch['within_2d']:.1%}, "
+        f"mean confidence {batch['mean_confidence']:.1%}"
+    )
+    print()
+    print(f"{'method':<28} {'users':>6} {'us/user':>10} {'MAE':>7} {'<=2d':>7} {'conf':>7}")
+    for method, row in report["sample"].items():
+        if "skipped" in row:
+            print(f"{method:<28} skipped: {row['skipped']}")
+            continue
+        per_user = f"{row['us_per_user']:.1f}" if "us_per_user" in row else "-"
+        print(
+            f"{method:<28} {row['users']:>6} {per_user:>10} {row['mae_days']:>6.2f}d "
+            f"{row['within_2d']:>6.1%} {row['mean_confidence']:>6.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Benchmark cold-start import time of the ML package, CLI and API.
+
+Each target runs in a fresh interpreter under ``python -X importtime``. The
+per-module timings on stderr are summed over top-level imports, minus an
+empty interpreter's own startup imports. The benchmark also records which
+heavy modules the target loaded.
+
+Each target lists heavy modules it must not load. A target that loads one
+has regressed to eager imports; ``--check`` exits non-zero so CI can catch
+it. Timings are only reported, never enforced, because they depend on the
+machine.
+
+Usage:
+    python -m benchmarks.bench_import_time
+    python -m benchmarks.bench_import_time --repeat 10 --json
+    python -m benchmarks.bench_import_time --check
+"""
+
+import argparse
+import ast
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+HEAVY_MODULES = ("numpy", "pandas", "prophet", "fastapi", "ml.models.cycle_predictor")
+
+# Target name -> (interpreter arguments, heavy modules it must not load)
+TARGETS: dict[str, tuple[list[str], tuple[str, ...]]] = {
+    "import ml": (["-c", "import ml"], HEAVY_MODULES),
+    "python -m ml": (["-m", "ml"], HEAVY_MODULES),
+    "import ml.preprocessing.flo_parser": (
+        ["-c", "import ml.preprocessing.flo_parser"],
+        ("pandas", "prophet", "ml.models.cycle_predictor"),
+    ),
+    "import ml.training.train": (
+        ["-c", "import ml.training.train"],
+        ("pandas", "prophet", "ml.models.cycle_predictor"),
+    ),
+    "import backend.main": (
+        ["-c", "import backend.main"],
+        ("pandas", "prophet", "ml.models.cycle_predictor"),
+    ),
+}
+
+# Prints which heavy modules are loaded once the target has run
+_PROBE = (
+    "import atexit, sys\n"
+    "atexit.register(lambda: sys.stdout.write('\\n' + repr(sorted("
+    "m for m in {heavy!r} if m in sys.modules))))\n"
+)
+
+
+def parse_importtime(stderr: str) -> tuple[float, int]:
+    """Total top-level import time in ms and the number of modules imported."""
+    total_us = 0
+    modules = 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules += 1
+        if not name[1:].startswith(" "):  # Nested imports are indented
+            total_us += int(cumulative)
+    return total_us / 1000, modules
+
+
+def measure(args: list[str], forbidden: tuple[str, ...]) -> dict:
+    """Run one target in a fresh interpreter."""
+    probe = _PROBE.format(heavy=HEAVY_MODULES)
+    if args[0] == "-c":
+        args = ["-c", probe + args[1]]
+    else:
+        # Run the module with runpy after installing the probe; "-m" would
+        # not let us run code first
+        args = ["-c", probe + f"import runpy; runpy.run_module({args[1]!r}, run_name='__main__')"]
+
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+
+    import_ms, modules = parse_importtime(proc.stderr)
+    loaded = ast.literal_eval(proc.stdout.strip().splitlines()[-1])
+    return {
+        "import_ms": import_ms,
+        "wall_ms": wall_ms,
+        "modules": modules,
+        "heavy_loaded": loaded,
+        "violations": [m for m in loaded if m in forbidden],
+    }
+
+
+def run(repeat: int) -> dict:
+    baseline = [measure(["-c", "pass"], ()) for _ in range(repeat)]
+    base_ms = statistics.median(r["import_ms"] for r in baseline)
+    base_modules = baseline[0]["modules"]
+
+    report: dict = {"repeat": repeat, "python": sys.version.split()[0], "targets": {}}
+    for name, (args, forbidden) in TARGETS.items():
+        runs = [measure(args, forbidden) for _ in range(repeat)]
+        import_ms = statistics.median(r["import_ms"] for r in runs) - base_ms
+        report["targets"][name] = {
+            "import_ms": round(max(import_ms, 0), 1),
+            "wall_ms": round(statistics.median(r["wall_ms"] for r in runs), 1),
+            "modules": runs[0]["modules"] - base_modules,
+            "heavy_loaded": runs[0]["heavy_loaded"],
+            "violations": runs[0]["violations"],
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cold-start import time")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per target (median)")
+    parser.add_argument(
+        "--check", action="store_true", help="Exit 1 if a target loads a module it must not"
+    )
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    report = run(args.repeat)
+    failed = {name: t["violations"] for name, t in report["targets"].items() if t["violations"]}
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"Cold-start imports, median of {report['repeat']} runs")
+        print(f"{'target':<36} {'imports':>9} {'wall':>9} {'modules':>8}  heavy modules loaded")
+        for name, row in report["targets"].items():
+            heavy = ", ".join(row["heavy_loaded"]) or "-"
+            print(
+                f"{name:<36} {row['import_ms']:>7.1f}ms {row['wall_ms']:>7.1f}ms "
+                f"{row['modules']:>8}  {heavy}"
+            )
+        for name, modules in failed.items():
+            print(f"REGRESSION: {name} loads {', '.join(modules)}")
+
+    if args.check and failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
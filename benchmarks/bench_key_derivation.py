@@ -0,0 +1,126 @@
+"""Benchmark key derivation under concurrency.
+
+Runs a burst of concurrent logins alongside a stream of cheap requests (a
+coroutine that should answer within a millisecond) and reports:
+- How long the event loop stalled, and the cheap requests' p99 latency, when
+  the KDF runs inline in the async handler versus on the ``KeyManager`` pool
+- Login throughput for different pool sizes
+- Per-request cost of reusing a session key versus deriving every time
+
+Usage:
+    python -m benchmarks.bench_key_derivation
+    python -m benchmarks.bench_key_derivation --logins 32 --json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+
+import numpy as np
+
+from backend.services.encryption import EncryptionService
+from backend.services.keys import KeyManager
+
+
+async def _probe(stop: asyncio.Event, interval: float = 0.005) -> list[float]:
+    """Latency of a trivial request issued every ``interval`` seconds."""
+    latencies = []
+    while not stop.is_set():
+        scheduled = time.perf_counter()
+        await asyncio.sleep(0)
+        latencies.append(time.perf_counter() - scheduled)
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def _login_burst(n_logins: int, derive) -> dict:
+    stop = asyncio.Event()
+    probe = asyncio.create_task(_probe(stop))
+    await asyncio.sleep(0.02)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(derive(f"password{i}", os.urandom(16)) for i in range(n_logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    latencies = np.array(await probe) * 1000
+
+    return {
+        "logins_per_s": round(n_logins / elapsed, 1),
+        "probe_p99_ms": round(float(np.percentile(latencies, 99)), 2),
+        "probe_max_ms": round(float(latencies.max()), 2),
+    }
+
+
+async def run(n_logins: int, worker_counts: list[int], n_requests: int) -> dict:
+    report: dict = {"logins": n_logins, "cpus": os.cpu_count(), "login_burst": {}}
+
+    async def inline(password: str, salt: bytes) -> bytes:
+        return EncryptionService.derive_key(password, salt)
+
+    report["login_burst"]["inline"] = await _login_burst(n_logins, inline)
+
+    for workers in worker_counts:
+        manager = KeyManager(max_workers=workers)
+        report["login_burst"][f"pool_{workers}"] = await _login_burst(
+            n_logins, manager.derive_key
+        )
+        manager.close()
+
+    # Per-request key cost: one derivation per request versus one per session
+    salt = os.urandom(16)
+    manager = KeyManager(max_workers=1)
+    started = time.perf_counter()
+    for _ in range(min(n_requests, 20)):
+        await manager.derive_key("password", salt)
+    derive_ms = (time.perf_counter() - started) / min(n_requests, 20) * 1000
+
+    key = await manager.derive_key("password", salt)
+    token = manager._open_session("user", key).token
+    started = time.perf_counter()
+    for _ in range(n_requests):
+        manager.session_key(token)
+    session_ms = (time.perf_counter() - started) / n_requests * 1000
+    manager.close()
+
+    report["per_request_key_ms"] = {
+        "derive": round(derive_ms, 3),
+        "session": round(session_ms, 5),
+        "speedup": round(derive_ms / session_ms),
+    }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark key derivation concurrency")
+    parser.add_argument("--logins", type=int, default=16, help="Concurrent logins per burst")
+    parser.add_argument(
+        "--workers", type=int, nargs="+", default=[1, 2, 4], help="Pool sizes to compare"
+    )
+    parser.add_argument("--requests", type=int, default=10000, help="Session key lookups")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args.logins, args.workers, args.requests))
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{report['logins']} concurrent logins, {report['cpus']} CPUs")
+    print(f"{'':<10} {'logins/s':>9} {'probe p99':>11} {'probe max':>11}")
+    for name, row in report["login_burst"].items():
+        print(
+            f"{name:<10} {row['logins_per_s']:>9.1f} {row['probe_p99_ms']:>9.1f}ms "
+            f"{row['probe_max_ms']:>9.1f}ms"
+        )
+    cost = report["per_request_key_ms"]
+    print(
+        f"\nKey per request: derive {cost['derive']:.1f}ms, session lookup "
+        f"{cost['session'] * 1000:.1f}us ({cost['speedup']:,}x)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Benchmark merging overlapping exports: full rebuild versus incremental add.
+
+Simulates one user with ``ml.training.synthetic``: a Flo export covering the
+whole history and app exports taken every ``--every`` days since
+``--app-years`` ago, each repeating everything before it. Reports:
+- ``rebuild``: ``MergedHistory.from_sources`` over all exports, what
+  retraining did each time a new export arrived
+- ``add_latest``: ``MergedHistory.add`` of only the latest export into a
+  history holding the rest, where nearly every record is a duplicate
+- ``add_new_only``: ``add`` of just the records the latest export adds
+
+Usage:
+    python -m benchmarks.bench_merge
+    python -m benchmarks.bench_merge --years 20 --app-years 5 --json
+"""
+
+import argparse
+import copy
+import json
+import time
+from datetime import date, timedelta
+
+from ml.models.schemas import Cycle, DailyLog
+from ml.preprocessing.merge import MergedHistory
+from ml.training.synthetic import SyntheticUser
+
+
+def user_history(years: float) -> tuple[list[Cycle], list[DailyLog]]:
+    user = SyntheticUser(seed=0, index=0, years=years)
+    cycles = [Cycle(**c) for c in user.cycles()]
+    logs = [
+        DailyLog(**{k: v for k, v in day.items() if k in DailyLog.model_fields})
+        for day in user.days()
+    ]
+    return cycles, logs
+
+
+def snapshots(cycles, logs, app_years: float, every: int) -> list[tuple[list, list]]:
+    """App exports taken every ``every`` days, each holding everything up to its date."""
+    end = logs[-1].date
+    taken = end - timedelta(days=int(app_years * 365.25))
+    exports = []
+    while taken <= end:
+        exports.append((
+            [c for c in cycles if c.start_date <= taken],
+            [l for l in logs if l.date <= taken],
+        ))
+        taken += timedelta(days=every)
+    return exports
+
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def timed_add(history: MergedHistory, cycles, logs, repeat: int) -> float:
+    """Best time of ``add`` into fresh copies of ``history``, copied beforehand."""
+    best = float("inf")
+    for target in [copy.deepcopy(history) for _ in range(repeat)]:
+        started = time.perf_counter()
+        target.add(cycles, logs)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def run(years: float, app_years: float, every: int, repeat: int) -> dict:
+    cycles, logs = user_history(years)
+    flo_end = date.fromordinal(logs[-1].date.toordinal() - int(app_years * 365.25))
+    flo = ([c for c in cycles if c.start_date <= flo_end], [l for l in logs if l.date <= flo_end])
+    apps = snapshots(cycles, logs, app_years, every)
+    sources = [flo] + apps
+
+    history, _ = MergedHistory.from_sources(sources[:-1])
+    known = {l.date for l in history.logs()}
+    latest_cycles, latest_logs = sources[-1]
+    new_logs = [l for l in latest_logs if l.date not in known]
+
+    return {
+        "years": years,
+        "exports": len(sources),
+        "records": sum(len(c) + len(l) for c, l in sources),
+        "latest_new_logs": len(new_logs),
+        "seconds": {
+            "rebuild": timed(lambda: MergedHistory.from_sources(sources), repeat),
+            "add_latest": timed_add(history, latest_cycles, latest_logs, repeat),
+            "add_new_only": timed_add(history, (), new_logs, repeat),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark merging overlapping exports")
+    parser.add_argument("--years", type=float, default=10, help="Years of history")
+    parser.add_argument("--app-years", type=float, default=2, help="Years of app exports")
+    parser.add_argument("--every", type=int, default=30, help="Days between app exports")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per step")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    report = run(args.years, args.app_years, args.every, args.repeat)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(
+        f"{report['years']:g} years: {report['exports']} exports, "
+        f"{report['records']:,} records in total, "
+        f"{report['latest_new_logs']} new logs in the latest"
+    )
+    print(f"  {'step':<14} {'ms':>9}")
+    for step, value in report["seconds"].items():
+        print(f"  {step:<14} {value * 1000:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Benchmark serving model params from the model store against JSON files.
+
+For a cohort of users, compares one lookup per request three ways:
+- opening and parsing the user's ``model_params.json`` (what
+  ``CyclePredictor.save`` writes)
+- ``ModelStore.record``: hash, probe, checksummed copy of the raw record
+- ``ModelStore.get``: the same, decoded into ``ModelParams``
+
+It also reports the on-disk size of both layouts and the cost of building
+the store and of one user's in-place update.
+
+Usage:
+    python -m benchmarks.bench_model_store
+    python -m benchmarks.bench_model_store --users 100000 --json
+"""
+
+import argparse
+import json
+import random
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from ml.models.schemas import ModelParams, Prediction
+from ml.training.model_store import ModelStore
+
+
+def synthetic_params(n_users: int, seed: int = 0) -> list[tuple[str, ModelParams]]:
+    rng = random.Random(seed)
+    items = []
+    for i in range(n_users):
+        length = rng.randint(24, 34)
+        next_period = date(2024, 1, 1) + timedelta(days=rng.randrange(365))
+        items.append((f"user-{i}", ModelParams(
+            trained_at=datetime(2024, 1, 1),
+            cycles_trained=rng.randint(3, 120),
+            model_type="bayesian",
+            prediction=Prediction(
+                next_period_date=next_period,
+                confidence=round(rng.random(), 4),
+                expected_cycle_length=length,
+                fertile_window_start=next_period - timedelta(days=19),
+                fertile_window_end=next_period - timedelta(days=14),
+                period_length=5,
+            ),
+            avg_cycle_length=length + rng.random(),
+            std_cycle_length=rng.random() * 4,
+            avg_period_length=5.0,
+            recent_cycle_lengths=[rng.randint(24, 34) for _ in range(6)],
+            trend=rng.random() - 0.5,
+        )))
+    return items
+
+
+def run(n_users: int, lookups: int) -> dict:
+    items = synthetic_params(n_users)
+    rng = random.Random(1)
+    queries = [f"user-{rng.randrange(n_users)}" for _ in range(lookups)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        json_dir = root / "models"
+        json_dir.mkdir()
+        for user_id, params in items:
+            (json_dir / f"{user_id}_model_params.json").write_text(
+                params.model_dump_json(indent=2)
+            )
+
+        started = time.perf_counter()
+        store = ModelStore(root / "models.bin")
+        store.put_many(items)
+        build_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        store.put("user-0", items[0][1])
+        update_s = time.perf_counter() - started
+
+        def per_lookup(fn) -> float:
+            started = time.perf_counter()
+            for user_id in queries:
+                fn(user_id)
+            return (time.perf_counter() - started) / lookups * 1e6
+
+        json_us = per_lookup(lambda user_id: ModelParams.model_validate_json(
+            (json_dir / f"{user_id}_model_params.json").read_bytes()
+        ))
+        record_us = per_lookup(store.record)
+        get_us = per_lookup(store.get)
+
+        json_bytes = sum(p.stat().st_size for p in json_dir.iterdir())
+        store_bytes = (root / "models.bin").stat().st_size
+
+    return {
+        "users": n_users,
+        "lookups": lookups,
+        "lookup_us": {
+            "json_file": round(json_us, 2),
+            "store_record": round(record_us, 2),
+            "store_get": round(get_us, 2),
+        },
+        "bytes": {"json_files": json_bytes, "store": store_bytes},
+        "store_build_s": round(build_s, 3),
+        "store_single_update_s": round(update_s, 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the model store")
+    parser.add_argument("--users", type=int, default=20000, help="Users in the store")
+    parser.add_argument("--lookups", type=int, default=20000, help="Random lookups per method")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    report = run(args.users, args.lookups)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"Model params for {report['users']:,} users, {report['lookups']:,} random lookups")
+    baseline = report["lookup_us"]["json_file"]
+    for method, us in report["lookup_us"].items():
+        print(f"  {method:<14} {us:>8.2f} us/lookup {baseline / us:>7.1f}x")
+    print(
+        f"  on disk: {report['bytes']['json_files'] / 1e6:.1f} MB as JSON files, "
+        f"{report['bytes']['store'] / 1e6:.1f} MB as one store"
+    )
+    print(
+        f"  build {report['store_build_s']:.2f}s, "
+        f"single-user update {report['store_single_update_s'] * 1000:.1f}ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Benchmark point event to daily log conversion at increasing export sizes.
+
+Compares the per-event ``PointEventAccumulator`` with the columnar
+``fold_point_events`` path and reports time per million events, which should
+stay flat as the export grows.
+
+Usage:
+    python -m benchmarks.bench_point_events
+    python -m benchmarks.bench_point_events --sizes 100000 1000000 --json
+"""
+
+import argparse
+import json
+import random
+import time
+from datetime import date, timedelta
+
+from ml.preprocessing.flo_parser import POINT_EVENT_FIELDS, FloParser, PointEventAccumulator
+
+
+def synthetic_point_events(n_events: int, years: int = 10, seed: int = 0) -> list[dict]:
+    """Build Flo GDPR-style point events spread over ``years`` of history."""
+    rng = random.Random(seed)
+    start = date(2015, 1, 1)
+    n_days = 365 * years
+    categories = [
+        (category, list(mapping)) for category, (_, mapping, _) in POINT_EVENT_FIELDS.items()
+    ]
+
+    events = []
+    for _ in range(n_events):
+        category, subcategories = rng.choice(categories)
+        day = start + timedelta(days=rng.randrange(n_days))
+        events.append({
+            "date": f"{day.isoformat()} 00:00:00.0",
+            "category": category,
+            "subcategory": rng.choice(subcategories),
+        })
+    return events
+
+
+def run(sizes: list[int]) -> dict:
+    rows = []
+    for n_events in sizes:
+        events = synthetic_point_events(n_events)
+
+        parser = FloParser("synthetic.json")
+        started = time.perf_counter()
+        accumulator = PointEventAccumulator(parser._parse_event_date)
+        for event in events:
+            accumulator.add(event)
+        expected = accumulator.entries()
+        loop_s = time.perf_counter() - started
+
+        parser = FloParser("synthetic.json")
+        started = time.perf_counter()
+        entries = parser._convert_point_events_to_logs(events)
+        columnar_s = time.perf_counter() - started
+
+        if entries != expected:
+            raise AssertionError(f"Columnar conversion differs at {n_events} events")
+
+        rows.append({
+            "events": n_events,
+            "days": len(entries),
+            "loop_s": round(loop_s, 3),
+            "columnar_s": round(columnar_s, 3),
+            "columnar_s_per_million": round(columnar_s / n_events * 1e6, 3),
+        })
+    return {"runs": rows}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark point event conversion")
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[250_000, 500_000, 1_000_000, 2_000_000],
+        help="Event counts to benchmark",
+    )
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    report = run(args.sizes)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{'events':>10} {'days':>6} {'loop':>9} {'columnar':>9} {'s / 1M':>8}")
+    for row in report["runs"]:
+        print(
+            f"{row['events']:>10,} {row['days']:>6} {row['loop_s']:>8.2f}s "
+            f"{row['columnar_s']:>8.2f}s {row['columnar_s_per_million']:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
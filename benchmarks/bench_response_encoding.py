@@ -0,0 +1,170 @@
+"""Benchmark bulk response encodings: JSON versus binary frames, with and without gzip.
+
+Builds a sync page of encrypted daily logs (``EnvelopeCipher`` records, or
+Fernet tokens with ``--fernet``) and a cycle listing, then reports payload
+bytes and serialization time for:
+- ``json``: the JSON path as FastAPI runs it: ``SyncResponse`` with base64
+  payloads, validated and dumped against the response model, or the
+  ``{"cycles": [...]}`` listing through ``jsonable_encoder``
+- ``frames``: ``encode_change``/``encode_records`` frames with the raw
+  ciphertext
+- each of them gzipped at levels 1, 6 and 9 (``GZIP_LEVEL`` is what the
+  API uses), timing the compression on its own
+
+Usage:
+    python -m benchmarks.bench_response_encoding
+    python -m benchmarks.bench_response_encoding --records 20000 --fernet --json
+"""
+
+import argparse
+import base64
+import gzip
+import json
+import os
+import time
+from datetime import date, timedelta
+
+from cryptography.fernet import Fernet
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from backend.api.encoding import GZIP_LEVEL, encode_change, encode_end, encode_records
+from backend.api.schemas import CycleData, SyncChange, SyncResponse
+from backend.services.encryption import EnvelopeCipher, FernetCipher
+from backend.services.storage import StoredChange
+from benchmarks.bench_bulk_encryption import synthetic_log_records
+
+SYNC_RESPONSE = TypeAdapter(SyncResponse)
+
+
+def synthetic_changes(n_records: int, fernet: bool) -> list[StoredChange]:
+    cipher = FernetCipher(Fernet.generate_key()) if fernet else EnvelopeCipher(os.urandom(32))
+    payloads = cipher.encrypt_many(synthetic_log_records(n_records))
+    start = date(2015, 1, 1)
+    return [
+        StoredChange(
+            seq=i + 1,
+            kind="log",
+            record_id=i + 1,
+            deleted=False,
+            date=start + timedelta(days=i),
+            payload=payload,
+        )
+        for i, payload in enumerate(payloads)
+    ]
+
+
+def synthetic_cycles(n_cycles: int) -> list[CycleData]:
+    start = date(2000, 1, 1)
+    return [
+        CycleData(
+            start_date=start + timedelta(days=28 * i),
+            end_date=start + timedelta(days=28 * i + 4),
+            flow_intensity=["light", "medium", "heavy"][i % 3],
+            symptoms=["cramps", "headache", "fatigue"][: i % 4],
+        )
+        for i in range(n_cycles)
+    ]
+
+
+def sync_json(changes: list[StoredChange]) -> bytes:
+    """The ``GET /sync`` JSON body, built and serialized as the route does."""
+    response = SyncResponse(
+        changes=[
+            SyncChange(
+                seq=c.seq,
+                kind=c.kind,
+                id=c.record_id,
+                deleted=c.deleted,
+                date=c.date,
+                payload=base64.b64encode(c.payload).decode("ascii"),
+            )
+            for c in changes
+        ],
+        cursor=changes[-1].seq,
+        has_more=False,
+    )
+    return SYNC_RESPONSE.dump_json(SYNC_RESPONSE.validate_python(response))
+
+
+def sync_frames(changes: list[StoredChange]) -> bytes:
+    return b"".join(encode_change(c) for c in changes) + encode_end(
+        cursor=changes[-1].seq, has_more=False
+    )
+
+
+def cycles_json(cycles: list[CycleData]) -> bytes:
+    return json.dumps(jsonable_encoder({"cycles": cycles}), separators=(",", ":")).encode()
+
+
+def cycles_frames(cycles: list[CycleData]) -> bytes:
+    return encode_records(cycles) + encode_end(count=len(cycles))
+
+
+def timed(fn, repeat: int) -> tuple[float, bytes]:
+    best, result = float("inf"), b""
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def measure(encode, records, repeat: int) -> dict:
+    seconds, body = timed(lambda: encode(records), repeat)
+    result = {"bytes": len(body), "seconds": seconds, "gzip": {}}
+    for level in sorted({1, 6, 9, GZIP_LEVEL}):
+        gzip_seconds, compressed = timed(lambda: gzip.compress(body, level), repeat)
+        result["gzip"][level] = {"bytes": len(compressed), "seconds": gzip_seconds}
+    return result
+
+
+def run(n_records: int, n_cycles: int, fernet: bool, repeat: int) -> dict:
+    changes = synthetic_changes(n_records, fernet)
+    cycles = synthetic_cycles(n_cycles)
+    return {
+        "records": n_records,
+        "cycles": n_cycles,
+        "cipher": "fernet" if fernet else "envelope",
+        "endpoints": {
+            "sync": {
+                "json": measure(sync_json, changes, repeat),
+                "frames": measure(sync_frames, changes, repeat),
+            },
+            "cycles": {
+                "json": measure(cycles_json, cycles, repeat),
+                "frames": measure(cycles_frames, cycles, repeat),
+            },
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark bulk response encodings")
+    parser.add_argument("--records", type=int, default=5000, help="Changes in the sync page")
+    parser.add_argument("--cycles", type=int, default=500, help="Cycles in the listing")
+    parser.add_argument("--fernet", action="store_true", help="Fernet instead of envelope records")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per encoding")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    report = run(args.records, args.cycles, args.fernet, args.repeat)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{report['records']:,} {report['cipher']} sync records, {report['cycles']:,} cycles")
+    for endpoint, encodings in report["endpoints"].items():
+        print()
+        print(endpoint)
+        print(f"  {'encoding':<16} {'KB':>9} {'ms':>9}")
+        for name, m in encodings.items():
+            print(f"  {name:<16} {m['bytes'] / 1e3:>9.1f} {m['seconds'] * 1000:>9.2f}")
+            for level, z in m["gzip"].items():
+                label = f"{name}+gzip{level}"
+                print(f"  {label:<16} {z['bytes'] / 1e3:>9.1f} {z['seconds'] * 1000:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
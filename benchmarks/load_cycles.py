@@ -0,0 +1,162 @@
+"""Load test for the /cycles endpoints.
+
+Sends a mix of ``POST /cycles`` and ``GET /cycles`` at a fixed arrival rate
+across many users. Requests are started on schedule whether or not earlier
+ones have finished (open loop). Latency is measured from each request's
+scheduled start, so queueing delay shows up in the percentiles instead of
+being hidden by a slower send rate.
+
+By default the app runs in-process against a temporary database. Pass
+``--url`` to test a running server instead.
+
+Usage:
+    python -m benchmarks.load_cycles
+    python -m benchmarks.load_cycles --rps 300 --duration 20 --json
+    python -m benchmarks.load_cycles --url http://localhost:8000
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from cryptography.fernet import Fernet
+from httpx import ASGITransport, AsyncClient
+
+from backend.api.dependencies import get_cipher, get_cycle_store
+from backend.services.encryption import FernetCipher
+from backend.services.storage import CycleStore
+
+
+@asynccontextmanager
+async def make_client(url: Optional[str], db_dir: Path, pool_size: int):
+    if url:
+        async with AsyncClient(base_url=url, timeout=30) as client:
+            yield client
+        return
+
+    from backend.main import app
+
+    store = CycleStore(db_dir / "load.db", pool_size=pool_size)
+    key = Fernet.generate_key()
+    app.dependency_overrides[get_cycle_store] = lambda: store
+    app.dependency_overrides[get_cipher] = lambda: FernetCipher(key)
+    try:
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://load", timeout=30
+        ) as client:
+            yield client
+    finally:
+        app.dependency_overrides.clear()
+        await store.close()
+
+
+async def run(
+    rps: int,
+    duration: float,
+    users: int,
+    write_ratio: float,
+    url: Optional[str] = None,
+    pool_size: int = 4,
+    seed: int = 0,
+) -> dict:
+    rng = random.Random(seed)
+    n_requests = int(rps * duration)
+    next_start = {user: date(2015, 1, 1) for user in range(users)}
+    latencies: dict[str, list[float]] = {"POST": [], "GET": []}
+    errors = 0
+
+    async def one(client: AsyncClient, scheduled: float, method: str, user: int, body: dict):
+        nonlocal errors
+        headers = {"X-User-ID": f"load-user-{user}"}
+        if method == "POST":
+            response = await client.post("/api/v1/cycles", json=body, headers=headers)
+        else:
+            response = await client.get("/api/v1/cycles", headers=headers)
+        latencies[method].append(time.perf_counter() - scheduled)
+        if response.status_code != 200:
+            errors += 1
+
+    with tempfile.TemporaryDirectory() as tmp:
+        async with make_client(url, Path(tmp), pool_size) as client:
+            tasks = []
+            started = time.perf_counter()
+            for i in range(n_requests):
+                scheduled = started + i / rps
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+                user = rng.randrange(users)
+                if rng.random() < write_ratio:
+                    start = next_start[user]
+                    next_start[user] = start + timedelta(days=rng.randint(24, 34))
+                    body = {"start_date": start.isoformat(), "symptoms": ["cramps"]}
+                    tasks.append(asyncio.create_task(one(client, scheduled, "POST", user, body)))
+                else:
+                    tasks.append(asyncio.create_task(one(client, scheduled, "GET", user, {})))
+
+            await asyncio.gather(*tasks)
+            elapsed = time.perf_counter() - started
+
+    report: dict = {
+        "target_rps": rps,
+        "achieved_rps": round(n_requests / elapsed, 1),
+        "requests": n_requests,
+        "errors": errors,
+        "latency_ms": {},
+    }
+    for method, values in [("all", latencies["POST"] + latencies["GET"]), *latencies.items()]:
+        if not values:
+            continue
+        ms = np.array(values) * 1000
+        report["latency_ms"][method] = {
+            "count": len(values),
+            "p50": round(float(np.percentile(ms, 50)), 2),
+            "p95": round(float(np.percentile(ms, 95)), 2),
+            "p99": round(float(np.percentile(ms, 99)), 2),
+            "max": round(float(ms.max()), 2),
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the /cycles endpoints")
+    parser.add_argument("--rps", type=int, default=300, help="Requests per second")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run")
+    parser.add_argument("--users", type=int, default=200, help="Distinct users")
+    parser.add_argument("--write-ratio", type=float, default=0.3, help="Share of POSTs")
+    parser.add_argument("--pool-size", type=int, default=4, help="Read connections (in-process)")
+    parser.add_argument("--url", type=str, default=None, help="Target a running server")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    report = asyncio.run(
+        run(args.rps, args.duration, args.users, args.write_ratio, args.url, args.pool_size)
+    )
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(
+        f"/cycles load: {report['requests']:,} requests, target {report['target_rps']} rps, "
+        f"achieved {report['achieved_rps']} rps, {report['errors']} errors"
+    )
+    print(f"{'':<6} {'count':>7} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}")
+    for method, row in report["latency_ms"].items():
+        print(
+            f"{method:<6} {row['count']:>7} {row['p50']:>7.1f}ms {row['p95']:>7.1f}ms "
+            f"{row['p99']:>7.1f}ms {row['max']:>7.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -169,7 +169,7 @@ export interface Prediction {
 export interface ModelParams {
   trainedAt: string; // ISO datetime
   cyclesTrained: number;
-  modelType: 'prophet' | 'weighted_average';
+  modelType: 'prophet' | 'weighted_average' | 'bayesian';
   prediction: Prediction;
   avgCycleLength: number;
   stdCycleLength: number;
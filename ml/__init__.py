@@ -1,8 +1,28 @@
-"""FLux ML Pipeline - Cycle prediction using time series analysis."""
+"""FLux ML Pipeline - Cycle prediction using time series analysis.
 
-from ml.models.cycle_predictor import CyclePredictor
-from ml.models.schemas import Cycle, DailyLog, ModelParams, Prediction
-from ml.preprocessing.flo_parser import parse_flo_export, parse_app_export
+The public names below are imported on first attribute access, so
+``import ml`` (and ``python -m ml`` without a command) does not pay for
+NumPy, pandas or Prophet until something actually needs them.
+"""
+
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from ml.models.cycle_predictor import CyclePredictor
+    from ml.models.schemas import Cycle, DailyLog, ModelParams, Prediction
+    from ml.preprocessing.flo_parser import parse_app_export, parse_flo_export
+
+# Public name -> module that defines it
+_LAZY_ATTRS = {
+    "CyclePredictor": "ml.models.cycle_predictor",
+    "Cycle": "ml.models.schemas",
+    "DailyLog": "ml.models.schemas",
+    "ModelParams": "ml.models.schemas",
+    "Prediction": "ml.models.schemas",
+    "parse_flo_export": "ml.preprocessing.flo_parser",
+    "parse_app_export": "ml.preprocessing.flo_parser",
+}
 
 __all__ = [
     "CyclePredictor",
@@ -15,3 +35,16 @@ __all__ = [
 ]
 
 __version__ = "0.1.0"
+
+
+def __getattr__(name: str):
+    module = _LAZY_ATTRS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value  # Later lookups skip __getattr__
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -2,6 +2,9 @@
 
 Usage:
     python -m ml train --input data.json --output model_params.json
+    python -m ml train-batch --input-dir exports/ --output-dir models/ --workers 8
+    python -m ml bench --input data.json --output bench.json
+    python -m ml generate --out-dir data/synthetic --users 1000 --years 10
 """
 
 import sys
@@ -13,13 +16,22 @@ def main():
         print()
         print("Usage:")
         print("  python -m ml train --input <file> --output <file>")
+        print("  python -m ml train-batch --input-dir <dir> --output-dir <dir> [--workers N]")
+        print("  python -m ml bench [--input <file>] [--model <type>] [--output <file>]")
+        print("  python -m ml generate --out-dir <dir> [--users N] [--years N] [--format flo|app|both]")
         print()
         print("Commands:")
-        print("  train    Train the cycle prediction model")
+        print("  train        Train the cycle prediction model")
+        print("  train-batch  Train one model per export in a directory, in parallel")
+        print("  bench        Backtest predictors: accuracy, calibration, latency, memory")
+        print("  generate     Write synthetic Flo and app exports for load and scale tests")
         print()
         print("Examples:")
         print("  python -m ml train --input flo_export.json --output model_params.json")
         print("  python -m ml train -i exported_data.json -o model_params.json --model weighted_average")
+        print("  python -m ml train-batch --input-dir exports/ --output-dir models/ --workers 8")
+        print("  python -m ml bench --input flo_export.json --output bench.json")
+        print("  python -m ml generate --out-dir data/synthetic --users 1000 --years 10")
         sys.exit(0)
 
     command = sys.argv[1]
@@ -29,9 +41,21 @@ def main():
         sys.argv = [sys.argv[0]] + sys.argv[2:]
         from ml.training.train import main as train_main
         train_main()
+    elif command == "train-batch":
+        sys.argv = [sys.argv[0]] + sys.argv[2:]
+        from ml.training.batch import main as batch_main
+        batch_main()
+    elif command == "bench":
+        sys.argv = [sys.argv[0]] + sys.argv[2:]
+        from ml.training.backtest import main as bench_main
+        bench_main()
+    elif command == "generate":
+        sys.argv = [sys.argv[0]] + sys.argv[2:]
+        from ml.training.synthetic import main as generate_main
+        generate_main()
     else:
         print(f"Unknown command: {command}")
-        print("Available commands: train")
+        print("Available commands: train, train-batch, bench, generate")
         sys.exit(1)
 
 
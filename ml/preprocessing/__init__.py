@@ -1,19 +1,80 @@
-"""Preprocessing utilities for FLux ML pipeline."""
+"""Preprocessing utilities for FLux ML pipeline.
 
-from .flo_parser import FloParser, parse_flo_export, parse_app_export
-from .feature_engineering import (
-    compute_cycle_features,
-    compute_log_features,
-    prepare_prophet_data,
-    predict_fertile_window,
-)
+Names are resolved lazily, like in the top-level ``ml`` package, so importing
+one submodule does not import all of them.
+"""
+
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .compact import CycleColumns, DailyLogColumns
+    from .feature_engineering import (
+        compute_cycle_features,
+        compute_cycle_features_batch,
+        compute_log_features,
+        cycles_to_ragged,
+        predict_fertile_window,
+        prepare_prophet_data,
+    )
+    from .flo_parser import (
+        FloParser,
+        iter_flo_export,
+        load_any_export,
+        parse_app_export,
+        parse_flo_export,
+    )
+    from .merge import MergedHistory
+    from .phases import aggregate_by_phase, likely_symptoms
+
+# Public name -> submodule that defines it
+_LAZY_ATTRS = {
+    "FloParser": "flo_parser",
+    "parse_flo_export": "flo_parser",
+    "iter_flo_export": "flo_parser",
+    "parse_app_export": "flo_parser",
+    "load_any_export": "flo_parser",
+    "CycleColumns": "compact",
+    "DailyLogColumns": "compact",
+    "compute_cycle_features": "feature_engineering",
+    "compute_cycle_features_batch": "feature_engineering",
+    "cycles_to_ragged": "feature_engineering",
+    "compute_log_features": "feature_engineering",
+    "prepare_prophet_data": "feature_engineering",
+    "predict_fertile_window": "feature_engineering",
+    "aggregate_by_phase": "phases",
+    "likely_symptoms": "phases",
+    "MergedHistory": "merge",
+}
 
 __all__ = [
     "FloParser",
     "parse_flo_export",
+    "iter_flo_export",
     "parse_app_export",
+    "load_any_export",
+    "CycleColumns",
+    "DailyLogColumns",
     "compute_cycle_features",
+    "compute_cycle_features_batch",
+    "cycles_to_ragged",
     "compute_log_features",
     "prepare_prophet_data",
     "predict_fertile_window",
+    "aggregate_by_phase",
+    "likely_symptoms",
+    "MergedHistory",
 ]
+
+
+def __getattr__(name: str):
+    module = _LAZY_ATTRS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f"{__name__}.{module}"), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
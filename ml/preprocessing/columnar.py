@@ -0,0 +1,151 @@
+"""Columnar conversion of Flo point events into daily log entries.
+
+``fold_point_events`` loads the ``date``/``category``/``subcategory`` of every
+event into arrays once, then resolves dates, category lookups, per-day
+de-duplication and last-value-wins fields with NumPy/pandas operations.
+Python-level work is limited to extracting the columns and emitting one dict
+per day, so cost grows linearly with the number of events.
+"""
+
+from collections.abc import Callable, Sequence
+from datetime import date
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# Flo category -> (daily log field, subcategory map, multi-valued)
+PointEventFields = dict[str, tuple[str, dict[str, str], bool]]
+
+
+def fold_point_events(
+    events: Sequence[dict],
+    parse_date: Callable[[Optional[str | int]], Optional[date]],
+    fields: PointEventFields,
+) -> list[dict]:
+    """Group point events by day and map them to daily log fields.
+
+    Matches ``PointEventAccumulator``: days appear in order of their first
+    event, multi-valued fields keep first-seen order without duplicates and
+    single-valued fields take the last event of the day.
+    """
+    n_events = len(events)
+    if n_events == 0:
+        return []
+
+    raw_dates = [event.get("date") for event in events]
+    categories = [event.get("category", "") for event in events]
+    subcategories = [event.get("subcategory", "") for event in events]
+
+    # Parse each distinct date value once; -1 marks missing or unparseable
+    date_codes, date_values = _factorize(raw_dates)
+    value_ordinals = np.array(
+        [_to_ordinal(value, parse_date) for value in date_values], dtype=np.int64
+    )
+    ordinals = value_ordinals[date_codes]
+    has_date = ordinals >= 0
+
+    # Days in order of first appearance, as the per-event loop creates them
+    day = np.full(n_events, -1, dtype=np.int64)
+    day_codes, day_ordinals = pd.factorize(ordinals[has_date], sort=False)
+    day[has_date] = day_codes
+
+    # Resolve each distinct (category, subcategory) pair through the maps
+    field_names = list(dict.fromkeys(name for name, _, _ in fields.values()))
+    vocabularies: dict[str, list[str]] = {name: [] for name in field_names}
+    cat_codes, cat_values = _factorize(categories)
+    sub_codes, sub_values = _factorize(subcategories)
+    pair_codes, pairs = pd.factorize(cat_codes.astype(np.int64) * len(sub_values) + sub_codes)
+
+    pair_field = np.full(len(pairs), -1, dtype=np.int64)
+    pair_value = np.full(len(pairs), -1, dtype=np.int64)
+    for i, pair in enumerate(pairs):
+        category = cat_values[pair // len(sub_values)]
+        subcategory = sub_values[pair % len(sub_values)]
+        target = fields.get(category) if isinstance(category, str) else None
+        if target is None or not isinstance(subcategory, str) or subcategory not in target[1]:
+            continue
+        name, mapping, _ = target
+        vocabulary = vocabularies[name]
+        value = mapping[subcategory]
+        if value not in vocabulary:
+            vocabulary.append(value)
+        pair_field[i] = field_names.index(name)
+        pair_value[i] = vocabulary.index(value)
+
+    event_field = pair_field[pair_codes]
+    event_value = pair_value[pair_codes]
+
+    multi_valued = {name: multi for name, _, multi in fields.values()}
+    entries: list[dict] = [
+        {
+            "date": date.fromordinal(int(ordinal)).isoformat(),
+            **{name: [] for name in field_names if multi_valued[name]},
+        }
+        for ordinal in day_ordinals
+    ]
+
+    for field_index, name in enumerate(field_names):
+        rows = np.flatnonzero((event_field == field_index) & has_date)
+        if len(rows) == 0:
+            continue
+        vocabulary = vocabularies[name]
+        if multi_valued[name]:
+            _fold_multi(entries, name, vocabulary, day[rows], event_value[rows])
+        else:
+            _fold_last(entries, name, vocabulary, day[rows], event_value[rows])
+
+    return entries
+
+
+def _fold_multi(
+    entries: list[dict],
+    name: str,
+    vocabulary: list[str],
+    days: np.ndarray,
+    values: np.ndarray,
+) -> None:
+    """Attach distinct values per day, in order of first occurrence."""
+    keys = days * len(vocabulary) + values
+    unique_keys, first_seen = np.unique(keys, return_index=True)
+    # Back to event order, then group by day keeping that order within a day
+    unique_keys = unique_keys[np.argsort(first_seen, kind="stable")]
+    unique_keys = unique_keys[np.argsort(unique_keys // len(vocabulary), kind="stable")]
+
+    key_days = unique_keys // len(vocabulary)
+    key_values = unique_keys % len(vocabulary)
+    boundaries = np.flatnonzero(np.diff(key_days)) + 1
+    for group_days, group_values in zip(
+        np.split(key_days, boundaries), np.split(key_values, boundaries)
+    ):
+        entries[int(group_days[0])][name] = [vocabulary[v] for v in group_values]
+
+
+def _fold_last(
+    entries: list[dict],
+    name: str,
+    vocabulary: list[str],
+    days: np.ndarray,
+    values: np.ndarray,
+) -> None:
+    """Set each day's value from its last event."""
+    # First occurrence in reversed order is the last event of each day
+    unique_days, from_end = np.unique(days[::-1], return_index=True)
+    last_values = values[len(values) - 1 - from_end]
+    for day_index, value in zip(unique_days, last_values):
+        entries[int(day_index)][name] = vocabulary[int(value)]
+
+
+def _factorize(values: list) -> tuple[np.ndarray, np.ndarray]:
+    """Integer-code a column of Python objects, keeping None as its own value."""
+    return pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=False)
+
+
+def _to_ordinal(
+    value: Optional[str | int],
+    parse_date: Callable[[Optional[str | int]], Optional[date]],
+) -> int:
+    if not value:
+        return -1
+    parsed = parse_date(value)
+    return parsed.toordinal() if parsed is not None else -1
@@ -0,0 +1,320 @@
+"""Compact columnar containers for cycle and daily log histories.
+
+A ``DailyLog`` is a Pydantic object holding lists and strings, so a
+multi-year history costs hundreds of bytes per day. ``DailyLogColumns`` and
+``CycleColumns`` keep the same data as parallel NumPy arrays instead:
+
+- Dates are int32 ordinals (``date.toordinal()``).
+- Single-valued categories (flow, mood, fluid, sex drive) are int16 codes
+  into a per-field vocabulary, with -1 for None. Each vocabulary starts with
+  the values of the matching ``FLO_*_MAP`` and grows by any other value seen.
+- Multi-valued categories (symptoms, disturbers) are uint64 bitsets over
+  their vocabulary, so "logs with cramps" is one vectorized ``&``.
+- Rare or free-form data is kept sparse, keyed by row: notes, lists whose
+  order or duplicates a bitset cannot express, and any non-default field the
+  columns do not cover.
+
+``to_logs``/``to_cycles`` rebuild models equal to the originals, so the
+conversion is lossless. The feature and training functions accept either
+form.
+"""
+
+from collections.abc import Sequence
+from datetime import date
+from typing import Optional
+
+import numpy as np
+
+from ml.models.schemas import Cycle, DailyLog
+from ml.preprocessing.flo_parser import (
+    FLO_DISTURBER_MAP,
+    FLO_FLOW_MAP,
+    FLO_FLUID_MAP,
+    FLO_MOOD_MAP,
+    FLO_SEX_DRIVE_MAP,
+    FLO_SYMPTOM_MAP,
+)
+
+# Field -> Flo map whose values seed the field's vocabulary
+SINGLE_VALUED_FIELDS = {
+    "flow": FLO_FLOW_MAP,
+    "mood": FLO_MOOD_MAP,
+    "fluid": FLO_FLUID_MAP,
+    "sex_drive": FLO_SEX_DRIVE_MAP,
+}
+MULTI_VALUED_FIELDS = {
+    "symptoms": FLO_SYMPTOM_MAP,
+    "disturbers": FLO_DISTURBER_MAP,
+}
+MAX_BITSET_VALUES = 64
+
+LOG_COLUMNS = {"date", "temperature", "notes", "is_period"}
+LOG_COLUMNS |= SINGLE_VALUED_FIELDS.keys() | MULTI_VALUED_FIELDS.keys()
+CYCLE_COLUMNS = {"start_date", "end_date", "length", "period_length"}
+
+
+def base_vocabulary(flo_map: dict) -> list[str]:
+    """A field's initial vocabulary: the Flo map's values, in map order."""
+    return list(dict.fromkeys(flo_map.values()))
+
+
+class DailyLogColumns:
+    """Daily logs as parallel arrays; build with ``from_logs``."""
+
+    def __init__(
+        self,
+        dates: np.ndarray,
+        codes: dict[str, np.ndarray],
+        bits: dict[str, np.ndarray],
+        vocabularies: dict[str, tuple[str, ...]],
+        temperature: np.ndarray,
+        is_period: np.ndarray,
+        notes: Optional[dict[int, str]] = None,
+        exact_lists: Optional[dict[str, dict[int, list[str]]]] = None,
+        extras: Optional[dict[int, dict]] = None,
+    ):
+        self.dates = dates
+        self.codes = codes
+        self.bits = bits
+        self.vocabularies = vocabularies
+        self.temperature = temperature
+        self.is_period = is_period
+        self.notes = notes or {}
+        self.exact_lists = exact_lists or {field: {} for field in bits}
+        self.extras = extras or {}
+
+    @classmethod
+    def from_logs(cls, logs: Sequence[DailyLog]) -> "DailyLogColumns":
+        """Encode logs, keeping their order.
+
+        Raises:
+            ValueError: If a multi-valued field has more than 64 distinct values
+        """
+        n = len(logs)
+        dates = np.fromiter((log.date.toordinal() for log in logs), dtype=np.int32, count=n)
+        temperature = np.fromiter(
+            (np.nan if log.temperature is None else log.temperature for log in logs),
+            dtype=np.float64,
+            count=n,
+        )
+        is_period = np.fromiter(
+            (-1 if log.is_period is None else int(log.is_period) for log in logs),
+            dtype=np.int8,
+            count=n,
+        )
+
+        vocabularies: dict[str, tuple[str, ...]] = {}
+        codes: dict[str, np.ndarray] = {}
+        for field, flo_map in SINGLE_VALUED_FIELDS.items():
+            index = {value: i for i, value in enumerate(base_vocabulary(flo_map))}
+            codes[field] = np.fromiter(
+                (_code(index, getattr(log, field)) for log in logs), dtype=np.int16, count=n
+            )
+            vocabularies[field] = tuple(index)
+
+        bits: dict[str, np.ndarray] = {}
+        exact_lists: dict[str, dict[int, list[str]]] = {}
+        for field, flo_map in MULTI_VALUED_FIELDS.items():
+            index = {value: i for i, value in enumerate(base_vocabulary(flo_map))}
+            column = np.zeros(n, dtype=np.uint64)
+            exact: dict[int, list[str]] = {}
+            for row, log in enumerate(logs):
+                values = getattr(log, field)
+                if not values:
+                    continue
+                row_codes = [_code(index, value) for value in values]
+                if max(row_codes) >= MAX_BITSET_VALUES:
+                    raise ValueError(
+                        f"{field} has more than {MAX_BITSET_VALUES} distinct values, "
+                        "which do not fit in a bitset"
+                    )
+                mask = 0
+                for code in row_codes:
+                    mask |= 1 << code
+                column[row] = mask
+                # A bitset lists each value once, in vocabulary order
+                if len(values) > 1 and row_codes != sorted(set(row_codes)):
+                    exact[row] = list(values)
+            bits[field] = column
+            exact_lists[field] = exact
+            vocabularies[field] = tuple(index)
+
+        notes = {row: log.notes for row, log in enumerate(logs) if log.notes is not None}
+        extras = _extras(logs, LOG_COLUMNS)
+        return cls(
+            dates, codes, bits, vocabularies, temperature, is_period, notes, exact_lists, extras
+        )
+
+    def to_logs(self) -> list[DailyLog]:
+        """Decode back into ``DailyLog`` models equal to the encoded ones."""
+        decoded = {
+            field: [None if c < 0 else self.vocabularies[field][c] for c in column.tolist()]
+            for field, column in self.codes.items()
+        }
+        for field, column in self.bits.items():
+            vocabulary = self.vocabularies[field]
+            exact = self.exact_lists[field]
+            decoded[field] = [
+                exact[row] if row in exact else _bits_to_values(mask, vocabulary)
+                for row, mask in enumerate(column.tolist())
+            ]
+        temperatures = [None if np.isnan(t) else t for t in self.temperature.tolist()]
+        periods = [None if p < 0 else bool(p) for p in self.is_period.tolist()]
+
+        logs = []
+        for row, ordinal in enumerate(self.dates.tolist()):
+            fields = {field: values[row] for field, values in decoded.items()}
+            logs.append(DailyLog(
+                date=date.fromordinal(ordinal),
+                temperature=temperatures[row],
+                notes=self.notes.get(row),
+                is_period=periods[row],
+                **fields,
+                **self.extras.get(row, {}),
+            ))
+        return logs
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the arrays; the sparse dicts are not counted."""
+        arrays = [self.dates, self.temperature, self.is_period]
+        arrays += list(self.codes.values()) + list(self.bits.values())
+        return sum(a.nbytes for a in arrays)
+
+    def has(self, field: str, value: str) -> np.ndarray:
+        """Boolean mask of the rows whose ``field`` is or contains ``value``."""
+        vocabulary = self.vocabularies[field]
+        if value not in vocabulary:
+            return np.zeros(len(self), dtype=bool)
+        code = vocabulary.index(value)
+        if field in self.bits:
+            return (self.bits[field] & np.uint64(1 << code)) != 0
+        return self.codes[field] == code
+
+    def code_matrix(self, field: str) -> np.ndarray:
+        """Rows x vocabulary boolean matrix of a multi-valued field."""
+        shifts = np.arange(len(self.vocabularies[field]), dtype=np.uint64)
+        return ((self.bits[field][:, None] >> shifts) & np.uint64(1)).astype(bool)
+
+    def value_counts(self, field: str) -> dict[str, int]:
+        """How often each value occurs, counting every list entry.
+
+        Matches counting over ``to_logs()``, including duplicate list
+        entries; values that never occur are left out.
+        """
+        vocabulary = self.vocabularies[field]
+        if field in self.codes:
+            counts = np.bincount(self.codes[field][self.codes[field] >= 0],
+                                 minlength=len(vocabulary))
+        else:
+            exact = self.exact_lists[field]
+            in_bitset = np.ones(len(self), dtype=bool)
+            in_bitset[list(exact)] = False
+            counts = self.code_matrix(field)[in_bitset].sum(axis=0)
+            for values in exact.values():
+                for value in values:
+                    counts[vocabulary.index(value)] += 1
+        return {value: int(count) for value, count in zip(vocabulary, counts) if count}
+
+
+class CycleColumns:
+    """Cycles as parallel arrays; build with ``from_cycles``.
+
+    ``end`` is 0 and ``length``/``period_length`` -1 where a value is None.
+    """
+
+    def __init__(
+        self,
+        start: np.ndarray,
+        end: np.ndarray,
+        length: np.ndarray,
+        period_length: np.ndarray,
+        extras: Optional[dict[int, dict]] = None,
+    ):
+        self.start = start
+        self.end = end
+        self.length = length
+        self.period_length = period_length
+        self.extras = extras or {}
+
+    @classmethod
+    def from_cycles(cls, cycles: Sequence[Cycle]) -> "CycleColumns":
+        """Encode cycles, keeping their order."""
+        n = len(cycles)
+        return cls(
+            start=np.fromiter((c.start_date.toordinal() for c in cycles), np.int32, count=n),
+            end=np.fromiter(
+                (c.end_date.toordinal() if c.end_date else 0 for c in cycles), np.int32, count=n
+            ),
+            length=np.fromiter(
+                (-1 if c.length is None else c.length for c in cycles), np.int16, count=n
+            ),
+            period_length=np.fromiter(
+                (-1 if c.period_length is None else c.period_length for c in cycles),
+                np.int16,
+                count=n,
+            ),
+            extras=_extras(cycles, CYCLE_COLUMNS),
+        )
+
+    def to_cycles(self) -> list[Cycle]:
+        """Decode back into ``Cycle`` models equal to the encoded ones."""
+        return [
+            Cycle(
+                start_date=date.fromordinal(start),
+                end_date=date.fromordinal(end) if end else None,
+                length=None if length < 0 else length,
+                period_length=None if period < 0 else period,
+                **self.extras.get(row, {}),
+            )
+            for row, (start, end, length, period) in enumerate(zip(
+                self.start.tolist(),
+                self.end.tolist(),
+                self.length.tolist(),
+                self.period_length.tolist(),
+            ))
+        ]
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    @property
+    def nbytes(self) -> int:
+        return self.start.nbytes + self.end.nbytes + self.length.nbytes + self.period_length.nbytes
+
+
+def _code(index: dict[str, int], value: Optional[str]) -> int:
+    """Code of ``value``, adding it to ``index`` if new; -1 for None."""
+    if value is None:
+        return -1
+    code = index.get(value)
+    if code is None:
+        code = index[value] = len(index)
+    return code
+
+
+def _bits_to_values(mask: int, vocabulary: tuple[str, ...]) -> list[str]:
+    values = []
+    while mask:
+        low = mask & -mask
+        values.append(vocabulary[low.bit_length() - 1])
+        mask ^= low
+    return values
+
+
+def _extras(models: Sequence, columns: set[str]) -> dict[int, dict]:
+    """Non-default values of model fields outside ``columns``, by row."""
+    if not models:
+        return {}
+    other = set(type(models[0]).model_fields) - columns
+    if not other:
+        return {}
+    extras = {}
+    for row, model in enumerate(models):
+        values = model.model_dump(include=other, exclude_defaults=True)
+        if values:
+            extras[row] = {name: getattr(model, name) for name in values}
+    return extras
@@ -0,0 +1,230 @@
+"""Incremental cycle statistics.
+
+``compute_cycle_features`` rebuilds every statistic from the full history.
+``IncrementalCycleStats`` keeps running moments (Welford) and fixed-size ring
+buffers of recent lengths instead, so appending one period is O(1) no matter
+how many years of history a user has. The state is small and is saved next to
+``model_params.json`` by the training pipeline.
+"""
+
+import json
+import math
+from collections import deque
+from datetime import date
+from pathlib import Path
+from typing import Optional
+
+from ml.models.schemas import Cycle
+
+STATS_VERSION = 1
+
+# Physiologically plausible cycle lengths, as in compute_cycle_features
+MIN_CYCLE_LENGTH = 21
+MAX_CYCLE_LENGTH = 45
+
+# Longest rolling window in the features (rolling_mean_6)
+RECENT_WINDOW = 6
+
+
+class IncrementalCycleStats:
+    """Running cycle-length statistics updated one cycle at a time.
+
+    Cycles must arrive in start date order. A cycle's length becomes known
+    when the next one starts (unless it was given explicitly), so the most
+    recent cycle is held as pending until then, just like the last cycle in
+    ``compute_cycle_features``. Two cycles starting on the same day leave a
+    zero-length gap, which is skipped as implausible there too.
+    """
+
+    def __init__(
+        self,
+        min_length: int = MIN_CYCLE_LENGTH,
+        max_length: int = MAX_CYCLE_LENGTH,
+    ):
+        self.min_length = min_length
+        self.max_length = max_length
+
+        self.n_seen = 0  # All cycles, including pending and implausible ones
+        # Welford running moments over valid lengths
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.total = 0
+        self.min: Optional[int] = None
+        self.max: Optional[int] = None
+        self.recent: deque[int] = deque(maxlen=RECENT_WINDOW)
+
+        self.period_sum = 0
+        self.period_count = 0
+
+        self.last_start_date: Optional[date] = None
+        self.last_length: Optional[int] = None
+
+    @classmethod
+    def from_cycles(cls, cycles: list[Cycle], **kwargs) -> "IncrementalCycleStats":
+        """Build statistics from a full history, e.g. the first time a model is trained."""
+        stats = cls(**kwargs)
+        for cycle in sorted(cycles, key=lambda c: c.start_date):
+            stats.update(cycle)
+        return stats
+
+    def update(self, cycle: Cycle) -> None:
+        """Add the next cycle in O(1).
+
+        Raises:
+            ValueError: If the cycle starts before the last one seen. Rebuild
+                with ``from_cycles`` to insert into the past.
+        """
+        self.add(
+            cycle.start_date,
+            length=getattr(cycle, "length", None),
+            period_length=getattr(cycle, "period_length", None),
+        )
+
+    def add(
+        self,
+        start_date: date,
+        length: Optional[int] = None,
+        period_length: Optional[int] = None,
+    ) -> None:
+        """Add the next cycle by its fields; see ``update``."""
+        if self.last_start_date is not None:
+            if start_date < self.last_start_date:
+                raise ValueError(
+                    f"Cycle starting {start_date} is not after the last cycle "
+                    f"({self.last_start_date}); rebuild the statistics instead"
+                )
+            completed = self.last_length
+            if completed is None:
+                completed = (start_date - self.last_start_date).days
+            self._add_length(completed)
+
+        self.n_seen += 1
+        self.last_start_date = start_date
+        self.last_length = length
+        if period_length:
+            self.period_sum += period_length
+            self.period_count += 1
+
+    def _add_length(self, length: int) -> None:
+        if not self.min_length <= length <= self.max_length:
+            return
+
+        self.count += 1
+        delta = length - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (length - self.mean)
+        self.total += length
+        self.min = length if self.min is None else min(self.min, length)
+        self.max = length if self.max is None else max(self.max, length)
+        self.recent.append(length)
+
+    @property
+    def std(self) -> float:
+        """Population standard deviation of valid lengths (as ``np.std``)."""
+        return math.sqrt(self.m2 / self.count) if self.count else 0.0
+
+    def features(self) -> dict:
+        """Features in the shape of ``compute_cycle_features``.
+
+        The full ``cycle_lengths`` list is not kept; ``recent_cycle_lengths``
+        holds the last ``RECENT_WINDOW`` valid lengths instead.
+        """
+        if self.n_seen < 2:
+            return {"error": "Need at least 2 cycles for features"}
+        if self.count < 2:
+            return {
+                "error": f"Not enough valid cycles ({self.min_length}-{self.max_length} days)"
+            }
+
+        recent = list(self.recent)
+        features = {
+            "recent_cycle_lengths": recent,
+            "mean_length": self.mean,
+            "std_length": self.std,
+            "min_length": self.min,
+            "max_length": self.max,
+            "last_length": recent[-1],
+            "n_cycles": self.count,
+        }
+
+        if self.count >= 3:
+            features["rolling_mean_3"] = sum(recent[-3:]) / 3
+
+        if self.count >= 6:
+            features["rolling_mean_6"] = sum(recent[-6:]) / 6
+
+        # Trend: mean of the last 3 against the mean of everything before them
+        if self.count >= 4:
+            last_3 = sum(recent[-3:])
+            features["trend"] = last_3 / 3 - (self.total - last_3) / (self.count - 3)
+
+        cv = self.std / self.mean
+        features["regularity_score"] = max(0.0, 1 - cv)
+
+        if self.period_count:
+            features["avg_period_length"] = self.period_sum / self.period_count
+
+        assert self.last_start_date is not None
+        features["last_month"] = self.last_start_date.month
+        features["last_start_date"] = self.last_start_date.isoformat()
+
+        return features
+
+    def to_dict(self) -> dict:
+        return {
+            "version": STATS_VERSION,
+            "min_length": self.min_length,
+            "max_length": self.max_length,
+            "n_seen": self.n_seen,
+            "count": self.count,
+            "mean": self.mean,
+            "m2": self.m2,
+            "total": self.total,
+            "min": self.min,
+            "max": self.max,
+            "recent": list(self.recent),
+            "period_sum": self.period_sum,
+            "period_count": self.period_count,
+            "last_start_date": self.last_start_date.isoformat() if self.last_start_date else None,
+            "last_length": self.last_length,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "IncrementalCycleStats":
+        if data.get("version") != STATS_VERSION:
+            raise ValueError(f"Unsupported cycle stats version: {data.get('version')}")
+
+        stats = cls(min_length=data["min_length"], max_length=data["max_length"])
+        stats.n_seen = data["n_seen"]
+        stats.count = data["count"]
+        stats.mean = data["mean"]
+        stats.m2 = data["m2"]
+        stats.total = data["total"]
+        stats.min = data["min"]
+        stats.max = data["max"]
+        stats.recent.extend(data["recent"])
+        stats.period_sum = data["period_sum"]
+        stats.period_count = data["period_count"]
+        last_start = data["last_start_date"]
+        stats.last_start_date = date.fromisoformat(last_start) if last_start else None
+        stats.last_length = data["last_length"]
+        return stats
+
+    def save(self, path: str | Path) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "IncrementalCycleStats":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+
+def stats_path_for(params_path: str | Path) -> Path:
+    """Where the statistics for a model params file live.
+
+    ``model_params.json`` -> ``model_params.stats.json``
+    """
+    params_path = Path(params_path)
+    return params_path.with_name(f"{params_path.stem}.stats.json")
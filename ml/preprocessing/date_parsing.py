@@ -0,0 +1,150 @@
+"""Date parsing for export timestamps.
+
+Exports store dates in a handful of string formats (Flo GDPR uses
+"2018-10-22 00:00:00.0") or as Unix timestamps. Parsing runs once per point
+event, so ``DateParser`` avoids the try-every-format loop where it can:
+
+- ISO-shaped strings are decoded by slicing, without ``strptime``
+- every string result is memoised, since many events share a timestamp
+- for other shapes, the format that last matched a field is tried first
+"""
+
+from datetime import date, datetime
+from typing import Optional
+
+# Supported string formats, in priority order
+DATE_FORMATS = [
+    "%Y-%m-%d %H:%M:%S.%f",  # Flo GDPR format: "2018-10-22 00:00:00.0"
+    "%Y-%m-%d %H:%M:%S",     # Without microseconds
+    "%Y-%m-%d",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%dT%H:%M:%SZ",
+    "%Y-%m-%dT%H:%M:%S.%fZ",
+    "%Y-%m-%dT%H:%M:%S.%f",
+    "%d/%m/%Y",
+    "%m/%d/%Y",
+    "%Y/%m/%d",
+    "%d-%m-%Y",
+    "%d.%m.%Y",
+]
+
+# "01/02/2024" matches both slash formats; the earlier one must win, so
+# "%m/%d/%Y" is never tried ahead of the list order
+_AMBIGUOUS_FORMATS = {"%m/%d/%Y"}
+
+DEFAULT_CACHE_SIZE = 1 << 16
+
+_MISSING = object()
+
+
+def _is_digits(s: str) -> bool:
+    return s.isascii() and s.isdigit()
+
+
+def parse_iso_fast(date_str: str) -> Optional[date]:
+    """Decode the ISO shapes in ``DATE_FORMATS`` without ``strptime``.
+
+    Only accepts strings ``strptime`` would accept with the same result;
+    returns None for anything else so the caller can fall back.
+    """
+    n = len(date_str)
+    if n < 10 or date_str[4] != "-" or date_str[7] != "-":
+        return None
+    year, month, day = date_str[:4], date_str[5:7], date_str[8:10]
+    if not (_is_digits(year) and _is_digits(month) and _is_digits(day)):
+        return None
+
+    if n > 10:
+        # "<sep>HH:MM:SS" optionally followed by ".ffffff" and/or "Z"
+        sep = date_str[10]
+        if n < 19 or sep not in " T" or date_str[13] != ":" or date_str[16] != ":":
+            return None
+        hour, minute, second = date_str[11:13], date_str[14:16], date_str[17:19]
+        if not (_is_digits(hour) and _is_digits(minute) and _is_digits(second)):
+            return None
+        if int(hour) > 23 or int(minute) > 59 or int(second) > 59:
+            return None
+
+        rest = date_str[19:]
+        if sep == "T" and rest.endswith("Z"):
+            rest = rest[:-1]
+        if rest:
+            fraction = rest[1:]
+            if rest[0] != "." or not 1 <= len(fraction) <= 6 or not _is_digits(fraction):
+                return None
+
+    try:
+        return date(int(year), int(month), int(day))
+    except ValueError:
+        return None
+
+
+class DateParser:
+    """Parse export date values with caching and per-field format detection.
+
+    Args:
+        cache_size: Maximum number of memoised strings before the cache is reset
+    """
+
+    def __init__(self, cache_size: int = DEFAULT_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._cache: dict[str, Optional[date]] = {}
+        self._field_formats: dict[str, str] = {}
+
+    def parse(self, date_val: Optional[str | int], field: str = "") -> Optional[date]:
+        """Parse date string or timestamp to date object.
+
+        Args:
+            date_val: Date string, or Unix timestamp in seconds or milliseconds
+            field: Name of the field the value came from, used to remember
+                which format that field is written in
+        """
+        if date_val is None:
+            return None
+
+        # Handle Unix timestamp (milliseconds)
+        if isinstance(date_val, int):
+            if date_val > 1e12:  # Milliseconds
+                return datetime.fromtimestamp(date_val / 1000).date()
+            else:  # Seconds
+                return datetime.fromtimestamp(date_val).date()
+
+        date_str = str(date_val)
+        cached = self._cache.get(date_str, _MISSING)
+        if cached is not _MISSING:
+            return cached  # type: ignore[return-value]
+
+        parsed = parse_iso_fast(date_str)
+        if parsed is None:
+            parsed = self._parse_with_formats(date_str, field)
+
+        if len(self._cache) >= self.cache_size:
+            self._cache.clear()
+        self._cache[date_str] = parsed
+        return parsed
+
+    def _parse_with_formats(self, date_str: str, field: str) -> Optional[date]:
+        known = self._field_formats.get(field)
+        if known is not None:
+            try:
+                return datetime.strptime(date_str, known).date()
+            except ValueError:
+                pass
+
+        for fmt in DATE_FORMATS:
+            if fmt == known:
+                continue
+            try:
+                parsed = datetime.strptime(date_str, fmt).date()
+            except ValueError:
+                continue
+            if fmt not in _AMBIGUOUS_FORMATS:
+                self._field_formats[field] = fmt
+            return parsed
+
+        return None
+
+    def clear(self) -> None:
+        """Forget memoised values and detected formats."""
+        self._cache.clear()
+        self._field_formats.clear()
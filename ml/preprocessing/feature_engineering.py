@@ -5,9 +5,15 @@ from datetime import date, timedelta
 from typing import Optional
 
 from ml.models.schemas import Cycle, DailyLog
+from ml.preprocessing.compact import CycleColumns, DailyLogColumns
+from ml.preprocessing.phases import (
+    FERTILE_DAYS_BEFORE_OVULATION,
+    OVULATION_DAYS_BEFORE_PERIOD,
+    aggregate_by_phase,
+)
 
 
-def compute_cycle_features(cycles: list[Cycle]) -> dict:
+def compute_cycle_features(cycles: list[Cycle] | CycleColumns) -> dict:
     """Compute features from cycle history for prediction.
 
     Returns features useful for time series prediction:
@@ -18,19 +24,15 @@ def compute_cycle_features(cycles: list[Cycle]) -> dict:
     if len(cycles) < 2:
         return {"error": "Need at least 2 cycles for features"}
 
-    sorted_cycles = sorted(cycles, key=lambda c: c.start_date)
+    starts, explicit, periods = _cycle_arrays(cycles)
+    order = np.argsort(starts, kind="stable")
+    starts, explicit, periods = starts[order], explicit[order], periods[order]
 
     # Get cycle lengths (compute if not provided)
-    lengths = []
-    for i, cycle in enumerate(sorted_cycles[:-1]):
-        if cycle.length is not None:
-            lengths.append(cycle.length)
-        else:
-            length = (sorted_cycles[i + 1].start_date - cycle.start_date).days
-            lengths.append(length)
+    lengths = np.where(explicit[:-1] >= 0, explicit[:-1], np.diff(starts))
 
     # Filter out physiologically implausible values
-    valid_lengths = [l for l in lengths if 21 <= l <= 45]
+    valid_lengths = [l for l in lengths.tolist() if 21 <= l <= 45]
 
     if len(valid_lengths) < 2:
         return {"error": "Not enough valid cycles (21-45 days)"}
@@ -66,46 +68,264 @@ def compute_cycle_features(cycles: list[Cycle]) -> dict:
     features["regularity_score"] = float(max(0, 1 - cv))
 
     # Period lengths if available
-    period_lengths = [c.period_length for c in sorted_cycles if c.period_length]
-    if period_lengths:
+    period_lengths = periods[periods > 0]
+    if len(period_lengths):
         features["avg_period_length"] = float(np.mean(period_lengths))
 
     # Month of last period (seasonality)
-    features["last_month"] = sorted_cycles[-1].start_date.month
-    features["last_start_date"] = sorted_cycles[-1].start_date.isoformat()
+    last_start = date.fromordinal(int(starts[-1]))
+    features["last_month"] = last_start.month
+    features["last_start_date"] = last_start.isoformat()
 
     return features
 
 
-def compute_log_features(logs: list[DailyLog], cycles: list[Cycle]) -> dict:
-    """Compute features from daily logs.
-
-    Analyzes patterns in symptoms and mood relative to cycle phase.
+def _cycle_arrays(
+    cycles: list[Cycle] | CycleColumns,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Start ordinals, explicit lengths (-1 if unknown) and period lengths (0 if unknown)."""
+    if isinstance(cycles, CycleColumns):
+        return (
+            cycles.start.astype(np.int64),
+            cycles.length.astype(np.int64),
+            np.maximum(cycles.period_length, 0).astype(np.int64),
+        )
+    n = len(cycles)
+    return (
+        np.fromiter((c.start_date.toordinal() for c in cycles), np.int64, count=n),
+        np.fromiter((-1 if c.length is None else c.length for c in cycles), np.int64, count=n),
+        np.fromiter((c.period_length or 0 for c in cycles), np.int64, count=n),
+    )
+
+
+def cycles_to_ragged(
+    histories: list[list[Cycle] | CycleColumns],
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Flatten many users' cycle histories into ragged arrays.
+
+    Returns:
+        Tuple of (offsets, start_ordinals, lengths, period_lengths). User ``i``
+        owns entries ``offsets[i]:offsets[i + 1]``. Missing lengths are -1 and
+        missing period lengths 0.
     """
-    if not logs or not cycles:
-        return {}
+    counts = np.array([len(h) for h in histories], dtype=np.int64)
+    offsets = np.zeros(len(histories) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+
+    if not histories:
+        empty = np.zeros(0, dtype=np.int64)
+        return offsets, empty, empty, empty
+    start_ordinals, lengths, period_lengths = (
+        np.concatenate(columns) for columns in zip(*map(_cycle_arrays, histories))
+    )
+    return offsets, start_ordinals, lengths, period_lengths
+
+
+def compute_cycle_features_batch(
+    offsets: np.ndarray,
+    start_ordinals: np.ndarray,
+    lengths: Optional[np.ndarray] = None,
+    period_lengths: Optional[np.ndarray] = None,
+) -> dict[str, np.ndarray]:
+    """Compute ``compute_cycle_features`` for many users at once.
+
+    Histories are passed as ragged arrays (see ``cycles_to_ragged``): user
+    ``i`` owns entries ``offsets[i]:offsets[i + 1]`` of ``start_ordinals``
+    (``date.toordinal()``), ``lengths`` (explicit cycle length, -1 if unknown)
+    and ``period_lengths`` (0 if unknown). Every statistic is computed with
+    segment operations over all users together.
+
+    Returns:
+        Columnar features, one entry per user. Floats are NaN and integers 0
+        where a feature is not defined for a user; ``error`` holds the
+        message ``compute_cycle_features`` would return, or None. Valid
+        lengths are ragged too: user ``i`` owns
+        ``cycle_lengths[cycle_length_offsets[i]:cycle_length_offsets[i + 1]]``.
+    """
+    offsets = np.asarray(offsets, dtype=np.int64)
+    start_ordinals = np.asarray(start_ordinals, dtype=np.int64)
+    n_users = len(offsets) - 1
+    n_total = len(start_ordinals)
+    counts = np.diff(offsets)
+    user = np.repeat(np.arange(n_users), counts)
+
+    if lengths is None:
+        lengths = np.full(n_total, -1, dtype=np.int64)
+    if period_lengths is None:
+        period_lengths = np.zeros(n_total, dtype=np.int64)
+
+    # Sort each user's cycles by start date (stable, like sorted())
+    order = np.lexsort((start_ordinals, user))
+    starts = start_ordinals[order]
+    explicit = np.asarray(lengths, dtype=np.int64)[order]
+    periods = np.asarray(period_lengths, dtype=np.int64)[order]
+
+    # Cycle length: explicit, else days until the same user's next start
+    is_last = np.zeros(n_total, dtype=bool)
+    is_last[offsets[1:][counts > 0] - 1] = True
+    gaps = np.zeros(n_total, dtype=np.int64)
+    gaps[:-1] = np.diff(starts)
+    cycle_lengths = np.where(explicit >= 0, explicit, gaps)
+
+    # Filter out physiologically implausible values
+    valid = ~is_last & (cycle_lengths >= 21) & (cycle_lengths <= 45)
+    valid_lengths = cycle_lengths[valid]
+    valid_user = user[valid]
+    n_valid = np.bincount(valid_user, minlength=n_users)
+    valid_offsets = np.zeros(n_users + 1, dtype=np.int64)
+    np.cumsum(n_valid, out=valid_offsets[1:])
+
+    has_valid = n_valid > 0
+    safe_n = np.maximum(n_valid, 1)
+    total = np.bincount(valid_user, weights=valid_lengths, minlength=n_users)
+    mean = np.where(has_valid, total / safe_n, np.nan)
+    squares = np.bincount(
+        valid_user, weights=(valid_lengths - mean[valid_user]) ** 2, minlength=n_users
+    )
+    std = np.where(has_valid, np.sqrt(squares / safe_n), np.nan)
+
+    starts_nonempty = valid_offsets[:-1][has_valid]
+    min_length = np.zeros(n_users, dtype=np.int64)
+    max_length = np.zeros(n_users, dtype=np.int64)
+    last_length = np.zeros(n_users, dtype=np.int64)
+    if len(starts_nonempty):
+        min_length[has_valid] = np.minimum.reduceat(valid_lengths, starts_nonempty)
+        max_length[has_valid] = np.maximum.reduceat(valid_lengths, starts_nonempty)
+        last_length[has_valid] = valid_lengths[valid_offsets[1:][has_valid] - 1]
+
+    # Sums of each user's last k valid lengths from one cumulative sum
+    cumulative = np.zeros(len(valid_lengths) + 1, dtype=np.float64)
+    np.cumsum(valid_lengths, out=cumulative[1:])
+    ends = valid_offsets[1:]
+
+    def mean_of_last(k: int) -> np.ndarray:
+        enough = n_valid >= k
+        out = np.full(n_users, np.nan)
+        out[enough] = (cumulative[ends[enough]] - cumulative[ends[enough] - k]) / k
+        return out
+
+    rolling_mean_3 = mean_of_last(3)
+    rolling_mean_6 = mean_of_last(6)
+
+    # Trend: mean of the last 3 against the mean of everything before them
+    trend = np.full(n_users, np.nan)
+    has_trend = n_valid >= 4
+    last_3 = rolling_mean_3[has_trend] * 3
+    trend[has_trend] = last_3 / 3 - (total[has_trend] - last_3) / (n_valid[has_trend] - 3)
+
+    regularity_score = np.maximum(0.0, 1 - std / mean)
+
+    # Period lengths count for every cycle, including the last
+    has_period = periods > 0
+    n_periods = np.bincount(user[has_period], minlength=n_users)
+    period_total = np.bincount(user[has_period], weights=periods[has_period], minlength=n_users)
+    avg_period_length = np.where(n_periods > 0, period_total / np.maximum(n_periods, 1), np.nan)
+
+    # Month of last period (seasonality)
+    last_start_ordinal = np.zeros(n_users, dtype=np.int64)
+    last_start_ordinal[counts > 0] = starts[offsets[1:][counts > 0] - 1]
+    epoch = date(1970, 1, 1).toordinal()
+    months = (last_start_ordinal - epoch).astype("datetime64[D]").astype("datetime64[M]")
+    last_month = np.where(counts > 0, months.astype(np.int64) % 12 + 1, 0)
+
+    error = np.full(n_users, None, dtype=object)
+    error[n_valid < 2] = "Not enough valid cycles (21-45 days)"
+    error[counts < 2] = "Need at least 2 cycles for features"
+    ok = (counts >= 2) & (n_valid >= 2)
+
+    def defined(values: np.ndarray) -> np.ndarray:
+        if values.dtype.kind == "f":
+            return np.where(ok, values, np.nan)
+        return np.where(ok, values, 0)
+
+    return {
+        "error": error,
+        "n_cycles": np.where(ok, n_valid, 0),
+        "mean_length": defined(mean),
+        "std_length": defined(std),
+        "min_length": defined(min_length),
+        "max_length": defined(max_length),
+        "last_length": defined(last_length),
+        "rolling_mean_3": defined(rolling_mean_3),
+        "rolling_mean_6": defined(rolling_mean_6),
+        "trend": defined(trend),
+        "regularity_score": defined(regularity_score),
+        "avg_period_length": defined(avg_period_length),
+        "last_month": defined(last_month),
+        "last_start_ordinal": defined(last_start_ordinal),
+        "cycle_length_offsets": valid_offsets,
+        "cycle_lengths": valid_lengths,
+    }
 
-    features = {}
 
-    # Count symptom frequencies
-    symptom_counts: dict[str, int] = {}
-    mood_counts: dict[str, int] = {}
+def compute_log_features(
+    logs: list[DailyLog] | DailyLogColumns,
+    cycles: list[Cycle] | CycleColumns,
+) -> dict:
+    """Compute features from daily logs.
 
-    for log in logs:
-        for symptom in log.symptoms:
-            symptom_counts[symptom] = symptom_counts.get(symptom, 0) + 1
-        if log.mood:
-            mood_counts[log.mood] = mood_counts.get(log.mood, 0) + 1
+    Analyzes patterns in symptoms and mood relative to cycle phase: besides
+    overall frequencies, the result holds the count matrices of
+    ``phases.aggregate_by_phase`` (symptom x cycle day, symptom and mood x
+    phase).
+    """
+    if not len(logs) or not len(cycles):
+        return {}
 
-    features["symptom_frequencies"] = symptom_counts
-    features["mood_frequencies"] = mood_counts
+    if isinstance(logs, DailyLogColumns):
+        features = {
+            "symptom_frequencies": logs.value_counts("symptoms"),
+            "mood_frequencies": logs.value_counts("mood"),
+        }
+        symptom_rows, symptom_codes = np.nonzero(logs.code_matrix("symptoms"))
+        log_ordinals = logs.dates
+        symptom_vocabulary = logs.vocabularies["symptoms"]
+        mood_codes, mood_vocabulary = logs.codes["mood"], logs.vocabularies["mood"]
+        temps = logs.temperature[~np.isnan(logs.temperature) & (logs.temperature != 0)]
+    else:
+        features = {}
+
+        # Count symptom frequencies
+        symptom_counts: dict[str, int] = {}
+        mood_counts: dict[str, int] = {}
+        symptom_index: dict[str, int] = {}
+        mood_index: dict[str, int] = {}
+        rows, codes, moods = [], [], []
+
+        for row, log in enumerate(logs):
+            for symptom in log.symptoms:
+                symptom_counts[symptom] = symptom_counts.get(symptom, 0) + 1
+            for symptom in dict.fromkeys(log.symptoms):
+                rows.append(row)
+                codes.append(symptom_index.setdefault(symptom, len(symptom_index)))
+            if log.mood:
+                mood_counts[log.mood] = mood_counts.get(log.mood, 0) + 1
+                moods.append(mood_index.setdefault(log.mood, len(mood_index)))
+            else:
+                moods.append(-1)
+
+        features["symptom_frequencies"] = symptom_counts
+        features["mood_frequencies"] = mood_counts
+        log_ordinals = np.fromiter((log.date.toordinal() for log in logs), np.int64, len(logs))
+        symptom_rows, symptom_codes = np.array(rows, np.int64), np.array(codes, np.int64)
+        symptom_vocabulary = tuple(symptom_index)
+        mood_codes, mood_vocabulary = np.array(moods, np.int64), tuple(mood_index)
+        temps = [log.temperature for log in logs if log.temperature]
 
     # Temperature analysis if available
-    temps = [log.temperature for log in logs if log.temperature]
     if len(temps) >= 10:
         features["avg_temperature"] = float(np.mean(temps))
         features["temp_std"] = float(np.std(temps))
 
+    features.update(aggregate_by_phase(
+        log_ordinals,
+        symptom_rows,
+        symptom_codes,
+        symptom_vocabulary,
+        mood_codes,
+        mood_vocabulary,
+        *_cycle_arrays(cycles),
+    ))
     return features
 
 
@@ -143,12 +363,11 @@ def predict_fertile_window(
     Fertile window is approximately 5 days before ovulation + ovulation day.
     """
     # Estimate ovulation day (14 days before next period is common)
-    days_before_next = 14
     next_period = last_period_start + timedelta(days=predicted_cycle_length)
-    estimated_ovulation = next_period - timedelta(days=days_before_next)
+    estimated_ovulation = next_period - timedelta(days=OVULATION_DAYS_BEFORE_PERIOD)
 
     # Fertile window: 5 days before ovulation through ovulation day
-    fertile_start = estimated_ovulation - timedelta(days=5)
+    fertile_start = estimated_ovulation - timedelta(days=FERTILE_DAYS_BEFORE_OVULATION)
     fertile_end = estimated_ovulation
 
     return fertile_start, fertile_end
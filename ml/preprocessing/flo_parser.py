@@ -1,14 +1,21 @@
 """Parser for Flo app data exports and FLux app exports.
 
 Handles Flo GDPR export format and converts categories to FLux internal format.
+``load_any_export`` reads either kind of export without being told which it is.
 """
 
 import json
+from collections.abc import Callable, Iterable, Iterator
 from datetime import date, datetime
+from functools import cache, lru_cache
 from pathlib import Path
-from typing import Optional
+from typing import Optional, TextIO
+
+from pydantic import TypeAdapter
 
 from ml.models.schemas import Cycle, DailyLog, AppExport
+from ml.preprocessing.date_parsing import DateParser
+from ml.preprocessing.json_stream import DEFAULT_CHUNK_SIZE, JsonStreamReader, iter_json_events
 
 # Mapping from Flo subcategories to our internal values
 FLO_SYMPTOM_MAP = {
@@ -67,6 +74,104 @@ FLO_FLOW_MAP = {
     3: "heavy",
 }
 
+# How each point event category lands in a daily log:
+# category -> (field, subcategory map, multi-valued)
+POINT_EVENT_FIELDS = {
+    "Symptom": ("symptoms", FLO_SYMPTOM_MAP, True),
+    "Mood": ("mood", FLO_MOOD_MAP, False),
+    "Fluid": ("fluid", FLO_FLUID_MAP, False),
+    "Disturber": ("disturbers", FLO_DISTURBER_MAP, True),
+    "Sex": ("sex_drive", FLO_SEX_DRIVE_MAP, False),
+}
+
+# Every array FloParser knows how to read, in lookup priority order.
+# The streaming mode tracks exactly these paths and skips the rest.
+FLO_GDPR_CYCLES = ("operationalData", "cycles")
+FLO_GDPR_POINT_EVENTS = ("operationalData", "point_events_manual_v2")
+
+CYCLE_PATHS = [
+    FLO_GDPR_CYCLES,
+    ("periods",),
+    ("menstrual_cycles",),
+    ("cycle_data",),
+    ("cycles",),
+    ("data", "periods"),
+    ("data", "cycles"),
+]
+
+LOG_PATHS = [
+    FLO_GDPR_POINT_EVENTS,
+    ("daily_logs",),
+    ("logs",),
+    ("symptoms",),
+    ("data", "daily_logs"),
+    ("data", "logs"),
+]
+
+# Top-level keys only FLux app exports have
+APP_EXPORT_MARKERS = ("exported_at", "exportedAt")
+APP_EXPORT_PATHS = [("cycles",), ("logs",)] + [(marker,) for marker in APP_EXPORT_MARKERS]
+
+# App export records validated per TypeAdapter call
+APP_RECORD_BATCH_SIZE = 4096
+
+
+class PointEventAccumulator:
+    """Fold Flo point events into daily log entries, one event at a time.
+
+    Holds one small dict per logged day rather than the events themselves,
+    so memory grows with the number of days, not the number of events.
+    """
+
+    def __init__(self, parse_date: Callable[[Optional[str | int]], Optional[date]]):
+        self._parse_date = parse_date
+        self._days: dict[str, dict] = {}
+
+    def add(self, event: dict) -> None:
+        """Merge a single point event into its day."""
+        date_str = event.get("date")
+        if not date_str:
+            return
+
+        # Parse the date to get just the date part
+        parsed_date = self._parse_date(date_str)
+        if parsed_date is None:
+            return
+
+        date_key = parsed_date.isoformat()
+        day = self._days.get(date_key)
+        if day is None:
+            # Symptoms and disturbers are dicts used as insertion-ordered sets
+            day = self._days[date_key] = {
+                "date": date_key,
+                "symptoms": {},
+                "disturbers": {},
+            }
+
+        category = event.get("category", "")
+        subcategory = event.get("subcategory", "")
+
+        # Map Flo categories to our schema
+        target = POINT_EVENT_FIELDS.get(category) if isinstance(category, str) else None
+        if target is None or not isinstance(subcategory, str) or subcategory not in target[1]:
+            return
+
+        field, mapping, multi_valued = target
+        if multi_valued:
+            day[field][mapping[subcategory]] = None
+        else:
+            day[field] = mapping[subcategory]
+
+    def __len__(self) -> int:
+        return len(self._days)
+
+    def entries(self) -> list[dict]:
+        """Return the accumulated days in daily log format."""
+        return [
+            {**day, "symptoms": list(day["symptoms"]), "disturbers": list(day["disturbers"])}
+            for day in self._days.values()
+        ]
+
 
 class FloParser:
     """Parse Flo app export data into cycle records.
@@ -78,6 +183,7 @@ class FloParser:
     def __init__(self, file_path: str | Path):
         self.file_path = Path(file_path)
         self.raw_data: Optional[dict] = None
+        self._dates = DateParser()
 
     def load(self) -> dict:
         """Load the Flo export file."""
@@ -88,61 +194,101 @@ class FloParser:
             raise ValueError(f"Unsupported file format: {self.file_path.suffix}")
         return self.raw_data
 
-    def parse(self) -> tuple[list[Cycle], list[DailyLog]]:
+    def parse(self, stream: bool = False) -> tuple[list[Cycle], list[DailyLog]]:
         """Extract cycles and daily logs from Flo export.
 
+        Args:
+            stream: Read the file incrementally via ``iter_parse`` instead of
+                loading it whole. Produces the same result with bounded memory.
+
         Returns:
             Tuple of (cycles, daily_logs)
         """
+        if stream:
+            cycles: list[Cycle] = []
+            logs: list[DailyLog] = []
+            for record in self.iter_parse():
+                if isinstance(record, Cycle):
+                    cycles.append(record)
+                else:
+                    logs.append(record)
+            return cycles, logs
+
         if self.raw_data is None:
             self.load()
 
         assert self.raw_data is not None
 
-        cycles = self._parse_cycles()
-        logs = self._parse_logs()
+        cycles = self._parse_cycles(self.raw_data)
+        logs = self._parse_logs(self.raw_data)
 
         return cycles, logs
 
-    def _parse_cycles(self) -> list[Cycle]:
+    def iter_parse(self, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Cycle | DailyLog]:
+        """Stream cycles and daily logs from the export file.
+
+        Reads the file in chunks and never holds the full document. Point
+        events are folded into per-day entries as they are read, so memory is
+        bounded by the number of cycles and logged days. Flo GDPR cycles are
+        yielded as soon as their array ends; logs follow once the whole file
+        has been read, since events for a day may appear anywhere in it.
+
+        Yields all cycles (sorted) before all daily logs (sorted), matching
+        ``parse()``.
+        """
+        if self.file_path.suffix != ".json":
+            raise ValueError(f"Unsupported file format: {self.file_path.suffix}")
+
+        stream = FloStreamParser(self)
+        with open(self.file_path, "r", encoding="utf-8") as f:
+            while chunk := f.read(chunk_size):
+                yield from stream.feed(chunk)
+        yield from stream.close()
+
+    def _parse_cycles(self, raw_data: dict) -> list[Cycle]:
         """Extract cycle data from Flo export."""
-        assert self.raw_data is not None
         cycles: list[Cycle] = []
 
         # Try different possible Flo export structures
         period_data = None
 
         # Structure 1: Flo GDPR export format - operationalData.cycles
-        if "operationalData" in self.raw_data:
-            op_data = self.raw_data["operationalData"]
+        if "operationalData" in raw_data:
+            op_data = raw_data["operationalData"]
             if isinstance(op_data, dict) and "cycles" in op_data:
                 period_data = op_data["cycles"]
 
         # Structure 2: "periods" array
-        if period_data is None and "periods" in self.raw_data:
-            period_data = self.raw_data["periods"]
+        if period_data is None and "periods" in raw_data:
+            period_data = raw_data["periods"]
 
         # Structure 3: "menstrual_cycles" array
-        if period_data is None and "menstrual_cycles" in self.raw_data:
-            period_data = self.raw_data["menstrual_cycles"]
+        if period_data is None and "menstrual_cycles" in raw_data:
+            period_data = raw_data["menstrual_cycles"]
 
         # Structure 4: "cycle_data" or "cycles" at top level
-        if period_data is None and "cycle_data" in self.raw_data:
-            period_data = self.raw_data["cycle_data"]
-        if period_data is None and "cycles" in self.raw_data:
-            period_data = self.raw_data["cycles"]
+        if period_data is None and "cycle_data" in raw_data:
+            period_data = raw_data["cycle_data"]
+        if period_data is None and "cycles" in raw_data:
+            period_data = raw_data["cycles"]
 
         # Structure 5: Nested under "data"
-        if period_data is None and "data" in self.raw_data:
-            data = self.raw_data["data"]
+        if period_data is None and "data" in raw_data:
+            data = raw_data["data"]
             if isinstance(data, dict):
                 period_data = data.get("periods") or data.get("cycles")
 
         if period_data is None:
             print("Warning: Could not find period data in export.")
-            print(f"Available keys: {list(self.raw_data.keys())}")
+            print(f"Available keys: {list(raw_data.keys())}")
             return cycles
 
+        return self._build_cycles(period_data)
+
+    def _build_cycles(self, period_data: list) -> list[Cycle]:
+        """Convert raw period entries into sorted cycles with lengths filled in."""
+        cycles: list[Cycle] = []
+
         for period in period_data:
             # Try various field names for start date
             start = self._parse_date(
@@ -150,7 +296,8 @@ class FloParser:
                 or period.get("start_date")
                 or period.get("startDate")
                 or period.get("start")
-                or period.get("date")
+                or period.get("date"),
+                "period_start",
             )
             if start is None:
                 continue
@@ -160,7 +307,8 @@ class FloParser:
                 period.get("period_end_date")  # Flo GDPR format
                 or period.get("end_date")
                 or period.get("endDate")
-                or period.get("end")
+                or period.get("end"),
+                "period_end",
             )
 
             # Get cycle/period lengths if available
@@ -194,30 +342,42 @@ class FloParser:
 
         return cycles
 
-    def _parse_logs(self) -> list[DailyLog]:
-        """Extract daily logs from Flo export."""
-        assert self.raw_data is not None
+    def _parse_logs(
+        self,
+        raw_data: dict,
+        point_event_logs: Optional[list[dict]] = None,
+    ) -> list[DailyLog]:
+        """Extract daily logs from Flo export.
+
+        ``point_event_logs`` lets the streaming mode pass point events that
+        were already folded into daily entries while reading.
+        """
         logs: list[DailyLog] = []
 
         # Try to find daily log data
         log_data = None
 
         # Check operationalData for point_events (Flo stores daily logs there)
-        if "operationalData" in self.raw_data:
-            op_data = self.raw_data["operationalData"]
+        if "operationalData" in raw_data:
+            op_data = raw_data["operationalData"]
             if isinstance(op_data, dict):
                 # point_events_manual_v2 contains daily tracking data
                 if "point_events_manual_v2" in op_data:
-                    log_data = self._convert_point_events_to_logs(op_data["point_events_manual_v2"])
-
-        if log_data is None and "daily_logs" in self.raw_data:
-            log_data = self.raw_data["daily_logs"]
-        if log_data is None and "logs" in self.raw_data:
-            log_data = self.raw_data["logs"]
-        if log_data is None and "symptoms" in self.raw_data:
-            log_data = self._convert_symptoms_to_logs(self.raw_data["symptoms"])
-        if log_data is None and "data" in self.raw_data:
-            data = self.raw_data["data"]
+                    if point_event_logs is not None:
+                        log_data = point_event_logs
+                    else:
+                        log_data = self._convert_point_events_to_logs(
+                            op_data["point_events_manual_v2"]
+                        )
+
+        if log_data is None and "daily_logs" in raw_data:
+            log_data = raw_data["daily_logs"]
+        if log_data is None and "logs" in raw_data:
+            log_data = raw_data["logs"]
+        if log_data is None and "symptoms" in raw_data:
+            log_data = self._convert_symptoms_to_logs(raw_data["symptoms"])
+        if log_data is None and "data" in raw_data:
+            data = raw_data["data"]
             if isinstance(data, dict):
                 log_data = data.get("daily_logs") or data.get("logs")
 
@@ -226,7 +386,8 @@ class FloParser:
 
         for entry in log_data:
             log_date = self._parse_date(
-                entry.get("date") or entry.get("log_date")
+                entry.get("date") or entry.get("log_date"),
+                "log",
             )
             if log_date is None:
                 continue
@@ -251,53 +412,16 @@ class FloParser:
         """Convert Flo point_events_manual_v2 to daily log format.
 
         Flo stores events with 'category' and 'subcategory' fields.
-        We map these to our internal schema.
+        We map these to our internal schema. The whole list is converted
+        column-wise; see ``fold_point_events``.
         """
-        logs_by_date: dict[str, dict] = {}
-
-        for event in events:
-            date_str = event.get("date")
-            if not date_str:
-                continue
-
-            # Parse the date to get just the date part
-            parsed_date = self._parse_date(date_str)
-            if parsed_date is None:
-                continue
-
-            date_key = parsed_date.isoformat()
-
-            if date_key not in logs_by_date:
-                logs_by_date[date_key] = {
-                    "date": date_key,
-                    "symptoms": [],
-                    "disturbers": [],
-                }
-
-            category = event.get("category", "")
-            subcategory = event.get("subcategory", "")
-
-            # Map Flo categories to our schema
-            if category == "Symptom" and subcategory in FLO_SYMPTOM_MAP:
-                symptom = FLO_SYMPTOM_MAP[subcategory]
-                if symptom not in logs_by_date[date_key]["symptoms"]:
-                    logs_by_date[date_key]["symptoms"].append(symptom)
+        # Deferred: columnar needs pandas, which most imports of this module
+        # (e.g. the API's streaming importer on boot) never use
+        from ml.preprocessing.columnar import fold_point_events
 
-            elif category == "Mood" and subcategory in FLO_MOOD_MAP:
-                logs_by_date[date_key]["mood"] = FLO_MOOD_MAP[subcategory]
-
-            elif category == "Fluid" and subcategory in FLO_FLUID_MAP:
-                logs_by_date[date_key]["fluid"] = FLO_FLUID_MAP[subcategory]
-
-            elif category == "Disturber" and subcategory in FLO_DISTURBER_MAP:
-                disturber = FLO_DISTURBER_MAP[subcategory]
-                if disturber not in logs_by_date[date_key]["disturbers"]:
-                    logs_by_date[date_key]["disturbers"].append(disturber)
-
-            elif category == "Sex" and subcategory in FLO_SEX_DRIVE_MAP:
-                logs_by_date[date_key]["sex_drive"] = FLO_SEX_DRIVE_MAP[subcategory]
-
-        return list(logs_by_date.values())
+        if not isinstance(events, list):
+            events = list(events)
+        return fold_point_events(events, self._parse_event_date, POINT_EVENT_FIELDS)
 
     def _convert_symptoms_to_logs(self, symptoms_data: list) -> list[dict]:
         """Convert symptom entries to daily log format."""
@@ -317,86 +441,338 @@ class FloParser:
 
         return list(logs_by_date.values())
 
-    def _parse_date(self, date_val: Optional[str | int]) -> Optional[date]:
-        """Parse date string or timestamp to date object."""
-        if date_val is None:
-            return None
-
-        # Handle Unix timestamp (milliseconds)
-        if isinstance(date_val, int):
-            if date_val > 1e12:  # Milliseconds
-                return datetime.fromtimestamp(date_val / 1000).date()
-            else:  # Seconds
-                return datetime.fromtimestamp(date_val).date()
-
-        # Handle string formats
-        date_str = str(date_val)
-
-        formats = [
-            "%Y-%m-%d %H:%M:%S.%f",  # Flo GDPR format: "2018-10-22 00:00:00.0"
-            "%Y-%m-%d %H:%M:%S",     # Without microseconds
-            "%Y-%m-%d",
-            "%Y-%m-%dT%H:%M:%S",
-            "%Y-%m-%dT%H:%M:%SZ",
-            "%Y-%m-%dT%H:%M:%S.%fZ",
-            "%Y-%m-%dT%H:%M:%S.%f",
-            "%d/%m/%Y",
-            "%m/%d/%Y",
-            "%Y/%m/%d",
-            "%d-%m-%Y",
-            "%d.%m.%Y",
-        ]
+    def _parse_date(self, date_val: Optional[str | int], field: str = "") -> Optional[date]:
+        """Parse date string or timestamp to date object.
 
-        for fmt in formats:
-            try:
-                return datetime.strptime(date_str, fmt).date()
-            except ValueError:
-                continue
+        ``field`` names the source field so its format is detected once and
+        reused; see ``DateParser``.
+        """
+        return self._dates.parse(date_val, field)
+
+    def _parse_event_date(self, date_val: Optional[str | int]) -> Optional[date]:
+        return self._dates.parse(date_val, "point_event")
+
+
+class FloStreamParser:
+    """Push-style ``FloParser.iter_parse``: feed text chunks, get records back.
+
+    For sources that arrive in pieces, such as an upload read chunk by chunk.
+    Flo GDPR cycles are returned from ``feed`` as soon as their array ends;
+    everything else is returned by ``close``.
+    """
+
+    paths = CYCLE_PATHS + LOG_PATHS
 
-        return None
+    def __init__(self, parser: FloParser):
+        self._parser = parser
+        self._reader = JsonStreamReader(self.paths)
+        # Skeleton of the export holding only what the lookups below read
+        self._skeleton: dict = {}
+        self._point_events: Optional[PointEventAccumulator] = None
+        self._cycles_done = False
+        self._held_items = 0
 
+    @property
+    def buffered_chars(self) -> int:
+        """Text read but not yet parsed, e.g. the unfinished tail of a chunk."""
+        return self._reader.buffered_chars
+
+    @property
+    def held_records(self) -> int:
+        """Raw items and folded days held until ``close``."""
+        days = len(self._point_events) if self._point_events is not None else 0
+        return self._held_items + days
+
+    def feed(self, chunk: str) -> list[Cycle]:
+        return self._handle(self._reader.feed(chunk))
+
+    def close(self) -> list[Cycle | DailyLog]:
+        """Finish the document and return the remaining records.
+
+        Raises:
+            ValueError: If the document is incomplete or malformed
+        """
+        records: list[Cycle | DailyLog] = list(self._handle(self._reader.close()))
+        records.extend(self._held_back_records())
+        return records
+
+    def _held_back_records(self) -> list[Cycle | DailyLog]:
+        """Records only known once the document has ended."""
+        records: list[Cycle | DailyLog] = []
+        skeleton = self._skeleton
+        if not self._cycles_done:
+            records.extend(self._parser._parse_cycles(skeleton))
+
+        point_events = self._point_events
+        point_event_logs = point_events.entries() if point_events is not None else None
+        records.extend(self._parser._parse_logs(skeleton, point_event_logs=point_event_logs))
+        return records
+
+    def _handle(self, events: list) -> list[Cycle]:
+        cycles: list[Cycle] = []
+        skeleton = self._skeleton
+        for event, path, value in events:
+            if event == "item":
+                if path == FLO_GDPR_POINT_EVENTS:
+                    assert self._point_events is not None
+                    self._point_events.add(value)
+                else:
+                    _skeleton_get(skeleton, path).append(value)
+                    self._held_items += 1
+            elif event == "start_array":
+                if path == FLO_GDPR_POINT_EVENTS:
+                    self._point_events = PointEventAccumulator(self._parser._parse_event_date)
+                _skeleton_set(skeleton, path, [])
+            elif event == "key" and not path:
+                # Untracked top-level keys only show up in the missing-data warning
+                skeleton.setdefault(value, None)
+            elif event == "start_map" and path:
+                _skeleton_set(skeleton, path, {})
+            elif event == "value":
+                _skeleton_set(skeleton, path, value)
+            elif event == "end_array" and path == FLO_GDPR_CYCLES:
+                # Highest priority source: nothing later in the file can override it
+                cycles.extend(self._parser._build_cycles(_skeleton_get(skeleton, path)))
+                self._cycles_done = True
+        return cycles
 
-def parse_flo_export(file_path: str | Path) -> tuple[list[Cycle], list[DailyLog]]:
-    """Convenience function to parse Flo export file."""
+
+class ExportStreamParser(FloStreamParser):
+    """``FloStreamParser`` that also takes FLux app exports.
+
+    App exports keep their records in top-level ``cycles`` and ``logs``
+    arrays, which the Flo paths already track, so only the
+    ``APP_EXPORT_MARKERS`` are added. Whether the document is an app export
+    is only certain once all its top-level keys have been read, so ``feed``
+    holds everything back and ``finish`` builds the records for the
+    detected format.
+    """
+
+    paths = FloStreamParser.paths + [(marker,) for marker in APP_EXPORT_MARKERS]
+
+    def __init__(self, parser: FloParser):
+        super().__init__(parser)
+        self._gdpr_cycles: list[Cycle] = []
+
+    def feed(self, chunk: str) -> list[Cycle]:
+        self._gdpr_cycles.extend(super().feed(chunk))
+        return []
+
+    def finish(self, input_format: str = "auto") -> tuple[list[Cycle], list[DailyLog], str]:
+        """Finish the document and parse it as ``input_format``.
+
+        Returns:
+            Tuple of (cycles, daily_logs, resolved input format)
+
+        Raises:
+            ValueError: If the document is incomplete or malformed
+        """
+        self._gdpr_cycles.extend(self._handle(self._reader.close()))
+        if input_format == "auto":
+            input_format = export_format(self._skeleton)
+
+        if input_format == "app":
+            app_export = _build_app_export(self._skeleton)
+            return app_export.cycles, app_export.logs, input_format
+
+        cycles: list[Cycle] = self._gdpr_cycles
+        logs: list[DailyLog] = []
+        for record in self._held_back_records():
+            if isinstance(record, Cycle):
+                cycles.append(record)
+            else:
+                logs.append(record)
+        return cycles, logs, input_format
+
+
+def _skeleton_get(skeleton: dict, path: tuple[str, ...]):
+    node = skeleton
+    for key in path:
+        node = node[key]
+    return node
+
+
+def _skeleton_set(skeleton: dict, path: tuple[str, ...], value) -> None:
+    _skeleton_get(skeleton, path[:-1])[path[-1]] = value
+
+
+def parse_flo_export(
+    file_path: str | Path,
+    stream: bool = False,
+) -> tuple[list[Cycle], list[DailyLog]]:
+    """Convenience function to parse Flo export file.
+
+    Pass ``stream=True`` for very large exports to parse with bounded memory.
+    """
     parser = FloParser(file_path)
-    return parser.parse()
+    return parser.parse(stream=stream)
+
+
+def iter_flo_export(file_path: str | Path) -> Iterator[Cycle | DailyLog]:
+    """Stream cycles, then daily logs, from a Flo export file."""
+    return FloParser(file_path).iter_parse()
 
 
-def parse_app_export(file_path: str | Path) -> AppExport:
-    """Parse FLux app export for retraining."""
+def parse_app_export(file_path: str | Path, chunk_size: int = DEFAULT_CHUNK_SIZE) -> AppExport:
+    """Parse FLux app export for retraining.
+
+    The file is read incrementally. Entries of the ``logs`` array are decoded
+    one at a time and validated in batches as they arrive, so only one
+    batch of raw dicts is alive at once; everything but the cycles, the logs
+    and the ``exportedAt`` marker is skipped without being decoded.
+    """
+    header: dict = {"cycles": []}
+
+    def log_entries() -> Iterator[dict]:
+        with open(file_path, "r", encoding="utf-8") as f:
+            for event, path, value in iter_json_events(f, APP_EXPORT_PATHS, chunk_size):
+                if event == "item" and path == ("logs",):
+                    yield value
+                elif event == "item":
+                    header["cycles"].append(value)
+                elif event == "value":
+                    header[path[0]] = value
+
+    logs = validate_records(DailyLog, log_entries())
+    return _build_app_export(header, logs)
+
+
+def export_format(data: dict) -> str:
+    """``"app"`` if a decoded export is a FLux app export, else ``"flo"``."""
+    return "app" if any(marker in data for marker in APP_EXPORT_MARKERS) else "flo"
+
+
+def sniff_export_format(fp: TextIO, chunk_size: int = DEFAULT_CHUNK_SIZE) -> str:
+    """Detect the format of an export without decoding it.
+
+    Reads ``fp`` only until an app export marker turns up among the top-level
+    keys; everything else is skipped by ``JsonStreamReader`` without being
+    built. A Flo export has no marker, so it is scanned to the end.
+    """
+    reader = JsonStreamReader([(marker,) for marker in APP_EXPORT_MARKERS])
+    while chunk := fp.read(chunk_size):
+        for event, path, value in reader.feed(chunk):
+            if event == "key" and not path and value in APP_EXPORT_MARKERS:
+                return "app"
+    reader.close()
+    return "flo"
+
+
+def load_any_export(
+    file_path: str | Path,
+    input_format: str = "auto",
+    stream: bool = False,
+) -> tuple[list[Cycle], list[DailyLog], str]:
+    """Parse a Flo or FLux app export, reading and decoding the file once.
+
+    The format is detected from the decoded document's top-level keys, which
+    is then handed to the matching parser. With ``stream=True`` the file goes
+    through ``ExportStreamParser`` instead: one incremental pass that holds
+    the tracked arrays and skips everything else.
+
+    Args:
+        file_path: Path to the export
+        input_format: "flo", "app", or "auto" (detect automatically)
+        stream: Read the file incrementally instead of decoding it whole
+
+    Returns:
+        Tuple of (cycles, daily_logs, resolved input format)
+
+    Raises:
+        ValueError: If the format is unknown or the file cannot be parsed as it
+    """
+    file_path = Path(file_path)
+    if input_format not in ("auto", "flo", "app"):
+        raise ValueError(f"Unknown input format: {input_format}")
+
+    if stream:
+        parser = ExportStreamParser(FloParser(file_path))
+        with open(file_path, "r", encoding="utf-8") as f:
+            while chunk := f.read(DEFAULT_CHUNK_SIZE):
+                parser.feed(chunk)
+        return parser.finish(input_format)
+
     with open(file_path, "r", encoding="utf-8") as f:
         data = json.load(f)
+    if input_format == "auto":
+        input_format = export_format(data)
 
-    def to_snake_case(key: str) -> str:
-        result = []
-        for i, char in enumerate(key):
-            if char.isupper() and i > 0:
-                result.append("_")
-            result.append(char.lower())
-        return "".join(result)
-
-    def normalize_entry(entry: dict) -> dict:
-        normalized: dict = {}
-        for key, value in entry.items():
-            snake_key = to_snake_case(key)
-            if isinstance(value, dict):
-                normalized[snake_key] = normalize_entry(value)
-            elif isinstance(value, list):
-                normalized[snake_key] = [
-                    normalize_entry(item) if isinstance(item, dict) else item
-                    for item in value
-                ]
-            else:
-                normalized[snake_key] = value
-        return normalized
+    if input_format == "app":
+        app_export = _build_app_export(data)
+        return app_export.cycles, app_export.logs, input_format
+
+    flo_parser = FloParser(file_path)
+    flo_parser.raw_data = data
+    cycles, logs = flo_parser.parse()
+    return cycles, logs, input_format
+
+
+def _build_app_export(data: dict, logs: Optional[list[DailyLog]] = None) -> AppExport:
+    """Validate a decoded app export.
 
-    normalized = normalize_entry(data)
-    exported_at = normalized.get("exported_at")
+    ``logs`` lets ``parse_app_export`` pass logs it validated while reading;
+    otherwise they are validated from ``data["logs"]``.
+    """
+    exported_at = data.get("exportedAt", data.get("exported_at"))
     if not isinstance(exported_at, str):
         raise ValueError("Invalid app export: missing 'exported_at'/'exportedAt'")
 
     return AppExport(
         exported_at=datetime.fromisoformat(exported_at.replace("Z", "+00:00")),
-        cycles=[Cycle(**c) for c in normalized.get("cycles", [])],
-        logs=[DailyLog(**l) for l in normalized.get("logs", [])],
+        cycles=validate_records(Cycle, data.get("cycles") or []),
+        logs=validate_records(DailyLog, data.get("logs") or []) if logs is None else logs,
+    )
+
+
+@lru_cache(maxsize=1024)
+def to_snake_case(key: str) -> str:
+    """``"sexDrive"`` -> ``"sex_drive"``; memoised, since exports repeat a few dozen keys."""
+    return "".join(
+        f"_{char.lower()}" if char.isupper() and i > 0 else char.lower()
+        for i, char in enumerate(key)
     )
+
+
+def normalize_keys(value):
+    """Copy of a decoded JSON value with every object key in snake case."""
+    if isinstance(value, dict):
+        return {
+            to_snake_case(key): normalize_keys(item) if isinstance(item, (dict, list)) else item
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [normalize_keys(item) if isinstance(item, (dict, list)) else item for item in value]
+    return value
+
+
+@cache
+def _list_adapter(model: type) -> TypeAdapter:
+    return TypeAdapter(list[model])
+
+
+def validate_records(
+    model: type,
+    entries: Iterable[dict],
+    batch_size: int = APP_RECORD_BATCH_SIZE,
+) -> list:
+    """Normalize the keys of decoded app export records and validate them.
+
+    Records are validated ``batch_size`` at a time with one ``TypeAdapter``
+    call per batch rather than one model constructor call per record, and
+    a batch's raw dicts are released as soon as it has been validated.
+
+    Raises:
+        pydantic.ValidationError: If a record does not fit ``model``; the
+            error's location is the index within the batch
+    """
+    adapter = _list_adapter(model)
+    records: list = []
+    batch: list[dict] = []
+    for entry in entries:
+        batch.append(normalize_keys(entry))
+        if len(batch) >= batch_size:
+            records.extend(adapter.validate_python(batch))
+            batch = []
+    if batch:
+        records.extend(adapter.validate_python(batch))
+    return records
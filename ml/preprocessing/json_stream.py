@@ -0,0 +1,273 @@
+"""Incremental JSON reader for large export files.
+
+Flo GDPR exports can reach hundreds of MB, almost all of it inside a few
+arrays. ``JsonStreamReader`` is fed the document chunk by chunk and only
+materialises the paths it is asked for: items of a tracked array are decoded
+one at a time, everything outside the tracked paths is skipped without being
+built. Memory stays bounded by the largest single item, not the file.
+"""
+
+import json
+import re
+from collections.abc import Iterable, Iterator
+from typing import Any, Optional, TextIO
+
+JsonPath = tuple[str, ...]
+Event = tuple[str, JsonPath, Any]
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_STRUCTURAL = re.compile(r'["\[\]{}]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+_SCALAR = re.compile(r"[^,\]}\s]*")
+
+# Returned by ``_decode`` when the value continues past the buffer; a decoded
+# JSON ``null`` is None
+_INCOMPLETE = object()
+
+
+class JsonStreamReader:
+    """Push parser emitting events for selected paths of a JSON document.
+
+    ``paths`` are tuples of object keys from the document root, e.g.
+    ``("operationalData", "cycles")``. For every tracked path the reader emits:
+
+    - ``("start_array", path, None)``, one ``("item", path, value)`` per
+      element and ``("end_array", path, None)`` if the value is an array
+    - ``("value", path, value)`` for any other value
+
+    Objects on the way to a tracked path emit ``("start_map", path, None)``,
+    a ``("key", path, key)`` per member and ``("end_map", path, None)``.
+    """
+
+    def __init__(self, paths: Iterable[JsonPath]):
+        self.targets = {tuple(p) for p in paths}
+        self.prefixes = {p[:i] for p in self.targets for i in range(len(p))}
+
+        self._decoder = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        # Frames are [kind, path, state, key] for "obj" and tracked "arr" containers
+        self._stack: list[list] = []
+        self._root_done = False
+        # (depth, in_string) while skipping an untracked value, else None
+        self._skip: Optional[tuple[int, bool]] = None
+
+    def feed(self, chunk: str) -> list[Event]:
+        """Consume the next chunk of text and return the events it completed."""
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        return self._run(final=False)
+
+    @property
+    def buffered_chars(self) -> int:
+        """Characters fed but not yet consumed."""
+        return len(self._buf) - self._pos
+
+    def close(self) -> list[Event]:
+        """Signal end of input, returning any remaining events."""
+        events = self._run(final=True)
+        self._pos = _WHITESPACE.match(self._buf, self._pos).end()
+        if not self._root_done or self._skip is not None or self._stack:
+            raise ValueError("Unexpected end of JSON input")
+        if self._pos != len(self._buf):
+            raise self._error("Extra data")
+        return events
+
+    def _run(self, final: bool) -> list[Event]:
+        events: list[Event] = []
+        while not self._root_done:
+            if self._skip is not None:
+                if not self._skip_value(final):
+                    break
+                continue
+            if not self._stack:
+                if not self._begin_value((), events, final):
+                    break
+                continue
+            if not self._step_frame(self._stack[-1], events, final):
+                break
+        return events
+
+    def _step_frame(self, frame: list, events: list[Event], final: bool) -> bool:
+        kind, path, state, key = frame
+        if state == "value":
+            return self._begin_value(path + (key,), events, final)
+
+        ch = self._next_char()
+        if ch is None:
+            return False
+
+        if kind == "obj":
+            if state in ("key_or_end", "comma_or_end") and ch == "}":
+                self._pos += 1
+                self._stack.pop()
+                events.append(("end_map", path, None))
+                self._value_done()
+            elif state == "comma_or_end" and ch == ",":
+                self._pos += 1
+                frame[2] = "key"
+            elif state in ("key_or_end", "key") and ch == '"':
+                decoded = self._decode(final, scalar=False)
+                if decoded is _INCOMPLETE:
+                    return False
+                frame[3] = decoded
+                events.append(("key", path, decoded))
+                frame[2] = "colon"
+            elif state == "colon" and ch == ":":
+                self._pos += 1
+                frame[2] = "value"
+            else:
+                raise self._error("Unexpected character in object")
+            return True
+
+        # Tracked array: decode its items one by one
+        if state in ("item_or_end", "comma_or_end") and ch == "]":
+            self._pos += 1
+            self._stack.pop()
+            events.append(("end_array", path, None))
+            self._value_done()
+        elif state == "comma_or_end" and ch == ",":
+            self._pos += 1
+            frame[2] = "item"
+        elif state in ("item_or_end", "item"):
+            decoded = self._decode(final, scalar=ch not in '{["')
+            if decoded is _INCOMPLETE:
+                return False
+            events.append(("item", path, decoded))
+            frame[2] = "comma_or_end"
+        else:
+            raise self._error("Unexpected character in array")
+        return True
+
+    def _begin_value(self, path: JsonPath, events: list[Event], final: bool) -> bool:
+        ch = self._next_char()
+        if ch is None:
+            return False
+
+        if path in self.targets and ch == "[":
+            self._pos += 1
+            self._stack.append(["arr", path, "item_or_end", None])
+            events.append(("start_array", path, None))
+        elif path in self.targets:
+            decoded = self._decode(final, scalar=ch not in '{["')
+            if decoded is _INCOMPLETE:
+                return False
+            events.append(("value", path, decoded))
+            self._value_done()
+        elif path in self.prefixes and ch == "{":
+            self._pos += 1
+            self._stack.append(["obj", path, "key_or_end", None])
+            events.append(("start_map", path, None))
+        elif ch in "{[":
+            self._pos += 1
+            self._skip = (1, False)
+        elif ch == '"':
+            self._pos += 1
+            self._skip = (0, True)
+        else:
+            end = _SCALAR.match(self._buf, self._pos).end()
+            if end == len(self._buf) and not final:
+                return False
+            if end == self._pos:
+                raise self._error("Expecting value")
+            self._pos = end
+            self._value_done()
+        return True
+
+    def _skip_value(self, final: bool) -> bool:
+        """Advance past an untracked value without decoding it."""
+        assert self._skip is not None
+        depth, in_string = self._skip
+        buf = self._buf
+        pos = self._pos
+
+        while True:
+            if in_string:
+                match = _STRING_SPECIAL.search(buf, pos)
+                if match is None:
+                    pos = len(buf)
+                    break
+                if match.group() == "\\":
+                    if match.end() >= len(buf):
+                        # Escape sequence split across chunks
+                        pos = match.start()
+                        break
+                    pos = match.end() + 1
+                    continue
+                pos = match.end()
+                in_string = False
+                if depth == 0:
+                    self._pos = pos
+                    self._skip = None
+                    self._value_done()
+                    return True
+            else:
+                match = _STRUCTURAL.search(buf, pos)
+                if match is None:
+                    pos = len(buf)
+                    break
+                pos = match.end()
+                char = match.group()
+                if char == '"':
+                    in_string = True
+                elif char in "{[":
+                    depth += 1
+                else:
+                    depth -= 1
+                    if depth == 0:
+                        self._pos = pos
+                        self._skip = None
+                        self._value_done()
+                        return True
+
+        if final:
+            raise ValueError("Unexpected end of JSON input")
+        self._pos = pos
+        self._skip = (depth, in_string)
+        return False
+
+    def _decode(self, final: bool, scalar: bool) -> Any:
+        """Decode one complete value at the cursor, or return ``_INCOMPLETE``."""
+        try:
+            value, end = self._decoder.raw_decode(self._buf, self._pos)
+        except json.JSONDecodeError:
+            if final:
+                raise
+            return _INCOMPLETE
+        # A number at the end of the buffer may continue in the next chunk
+        if scalar and end == len(self._buf) and not final:
+            return _INCOMPLETE
+        self._pos = end
+        return value
+
+    def _value_done(self) -> None:
+        if self._stack:
+            self._stack[-1][2] = "comma_or_end"
+        else:
+            self._root_done = True
+
+    def _next_char(self) -> Optional[str]:
+        self._pos = _WHITESPACE.match(self._buf, self._pos).end()
+        if self._pos >= len(self._buf):
+            return None
+        return self._buf[self._pos]
+
+    def _error(self, msg: str) -> json.JSONDecodeError:
+        return json.JSONDecodeError(msg, self._buf, self._pos)
+
+
+def iter_json_events(
+    fp: TextIO,
+    paths: Iterable[JsonPath],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[Event]:
+    """Stream events for ``paths`` from an open text file."""
+    reader = JsonStreamReader(paths)
+    while True:
+        chunk = fp.read(chunk_size)
+        if not chunk:
+            break
+        yield from reader.feed(chunk)
+    yield from reader.close()
@@ -0,0 +1,274 @@
+"""Merge cycles and daily logs from overlapping exports into one history.
+
+A user's first import is usually a Flo export, followed by periodic FLux app
+exports that repeat most of what came before. ``MergedHistory`` keeps one
+record per date:
+
+- Logs are indexed by date ordinal in a dict, next to a sorted list of the
+  ordinals for range queries; cycles likewise by start ordinal.
+- ``add`` folds in the records of one more source. Finding a record's place
+  is a dict lookup and a ``bisect``, O(log n). Dates past the end of the
+  history, the usual case for a newer export, are appended in O(1); a date
+  inside it is an ``insort`` that shifts the later ordinals, O(n) in the
+  worst case. Records the history already holds leave it unchanged, so a
+  repeated import only pays for what is new.
+- ``MergedHistory.from_sources`` merges several sources at once with a k-way
+  sort-merge (``heapq.merge``) on date, so every insert is an append.
+
+Conflicts are resolved by source priority. By default each source outranks
+the ones added before it, since a later export carries the user's later
+edits:
+
+- Two logs on the same date are combined field by field. The higher-priority
+  log's value wins where it has one; list fields such as ``symptoms`` are
+  unioned.
+- Two cycles starting within ``CYCLE_MATCH_DAYS`` of each other are the same
+  period recorded twice. The higher-priority start date wins and its unset
+  fields are filled in from the other.
+- A cycle's ``length`` is the gap to the next start. Where the next cycle
+  comes from another source, it is recomputed from the merged starts;
+  within one source it is kept as given.
+"""
+
+import heapq
+from bisect import bisect_left, bisect_right, insort
+from collections.abc import Iterable
+from datetime import date
+from typing import Optional, TypeVar
+
+from pydantic import BaseModel
+
+from ml.models.schemas import Cycle, DailyLog
+
+# Starts this close together are one period recorded by two sources
+CYCLE_MATCH_DAYS = 2
+
+Record = TypeVar("Record", bound=BaseModel)
+
+
+class MergeStats(BaseModel):
+    """What merging one or more sources changed."""
+
+    cycles_added: int = 0
+    cycles_updated: int = 0
+    cycles_unchanged: int = 0
+    logs_added: int = 0
+    logs_updated: int = 0
+    logs_unchanged: int = 0
+
+
+class MergedHistory:
+    """Cycles and daily logs from several sources, one record per date.
+
+    Args:
+        cycle_match_days: Starts at most this many days apart are one cycle
+    """
+
+    def __init__(self, cycle_match_days: int = CYCLE_MATCH_DAYS):
+        self.cycle_match_days = cycle_match_days
+        self._sources = 0
+        # Sorted ordinals, and ordinal -> (record, priority[, source])
+        self._log_days: list[int] = []
+        self._logs: dict[int, tuple[DailyLog, int]] = {}
+        self._cycle_starts: list[int] = []
+        self._cycles: dict[int, tuple[Cycle, int, int]] = {}
+
+    @classmethod
+    def from_sources(
+        cls,
+        sources: Iterable[tuple[Iterable[Cycle], Iterable[DailyLog]]],
+        cycle_match_days: int = CYCLE_MATCH_DAYS,
+    ) -> tuple["MergedHistory", MergeStats]:
+        """Merge ``(cycles, logs)`` sources, later ones taking priority.
+
+        Returns:
+            Tuple of (history, stats)
+        """
+        history = cls(cycle_match_days)
+        sources = list(sources)
+        cycle_streams, log_streams = [], []
+        for source, (cycles, logs) in enumerate(sources):
+            cycle_streams.append(
+                [(c.start_date.toordinal(), source, c) for c in _by_date(cycles, "start_date")]
+            )
+            log_streams.append([(l.date.toordinal(), source, l) for l in _by_date(logs, "date")])
+
+        stats = MergeStats()
+        # Equal dates come out in source order, so the higher priority is merged last
+        for _, source, cycle in heapq.merge(*cycle_streams, key=_date_and_source):
+            history._put_cycle(cycle, source, source, stats)
+        for _, source, log in heapq.merge(*log_streams, key=_date_and_source):
+            history._put_log(log, source, stats)
+        history._sources = len(sources)
+        return history, stats
+
+    def add(
+        self,
+        cycles: Iterable[Cycle] = (),
+        logs: Iterable[DailyLog] = (),
+        priority: Optional[int] = None,
+    ) -> MergeStats:
+        """Merge one more source into the history.
+
+        Args:
+            cycles: The source's cycles, in any order
+            logs: The source's daily logs, in any order
+            priority: Conflict priority; defaults to outranking every source
+                added so far. Ties go to the incoming record.
+        """
+        source = self._sources
+        self._sources += 1
+        if priority is None:
+            priority = source
+
+        stats = MergeStats()
+        for cycle in _by_date(cycles, "start_date"):
+            self._put_cycle(cycle, priority, source, stats)
+        for log in _by_date(logs, "date"):
+            self._put_log(log, priority, stats)
+        return stats
+
+    @property
+    def n_cycles(self) -> int:
+        return len(self._cycle_starts)
+
+    @property
+    def n_logs(self) -> int:
+        return len(self._log_days)
+
+    def cycles(self) -> list[Cycle]:
+        """All cycles, sorted by start date."""
+        return [self._cycles[start][0] for start in self._cycle_starts]
+
+    def logs(self) -> list[DailyLog]:
+        """All daily logs, sorted by date."""
+        return [self._logs[day][0] for day in self._log_days]
+
+    def log_on(self, day: date) -> Optional[DailyLog]:
+        entry = self._logs.get(day.toordinal())
+        return entry[0] if entry is not None else None
+
+    def logs_between(self, start: date, end: date) -> list[DailyLog]:
+        """Logs dated ``start`` to ``end``, both included."""
+        days = self._log_days
+        lo = bisect_left(days, start.toordinal())
+        hi = bisect_right(days, end.toordinal())
+        return [self._logs[day][0] for day in days[lo:hi]]
+
+    def cycle_on(self, day: date) -> Optional[Cycle]:
+        """The cycle ``day`` falls in: the last one starting on or before it."""
+        index = bisect_right(self._cycle_starts, day.toordinal()) - 1
+        return self._cycles[self._cycle_starts[index]][0] if index >= 0 else None
+
+    def _put_log(self, log: DailyLog, priority: int, stats: MergeStats) -> None:
+        day = log.date.toordinal()
+        current = self._logs.get(day)
+        if current is None:
+            self._logs[day] = (log, priority)
+            _insert(self._log_days, day)
+            stats.logs_added += 1
+            return
+
+        existing, existing_priority = current
+        if priority >= existing_priority:
+            merged = _combine(log, existing)
+        else:
+            merged = _combine(existing, log)
+        if merged == existing:
+            merged = existing
+            stats.logs_unchanged += 1
+        else:
+            stats.logs_updated += 1
+        self._logs[day] = (merged, max(priority, existing_priority))
+
+    def _put_cycle(self, cycle: Cycle, priority: int, source: int, stats: MergeStats) -> None:
+        start = cycle.start_date.toordinal()
+        match = self._matching_start(start)
+        if match is None:
+            self._cycles[start] = (cycle, priority, source)
+            self._relink(_insert(self._cycle_starts, start))
+            stats.cycles_added += 1
+            return
+
+        existing, existing_priority, existing_source = self._cycles[match]
+        if priority >= existing_priority:
+            merged, owner = _combine(cycle, existing), (priority, source)
+        else:
+            merged, owner = _combine(existing, cycle), (existing_priority, existing_source)
+        if merged == existing:
+            self._cycles[match] = (existing, *owner)
+            stats.cycles_unchanged += 1
+            return
+
+        stats.cycles_updated += 1
+        starts = self._cycle_starts
+        merged_start = merged.start_date.toordinal()
+        if merged_start != match and merged_start in self._cycles:
+            # Moving would collide with the neighbouring cycle
+            merged = merged.model_copy(update={"start_date": existing.start_date})
+            merged_start = match
+        if merged_start != match:
+            del self._cycles[match]
+            del starts[bisect_left(starts, match)]
+            index = _insert(starts, merged_start)
+        else:
+            index = bisect_left(starts, match)
+        self._cycles[merged_start] = (merged, *owner)
+        self._relink(index)
+
+    def _matching_start(self, start: int) -> Optional[int]:
+        """Start ordinal of the stored cycle ``start`` duplicates, if any."""
+        if start in self._cycles:
+            return start
+        starts = self._cycle_starts
+        index = bisect_left(starts, start)
+        near = [
+            s for s in starts[max(index - 1, 0):index + 1]
+            if abs(s - start) <= self.cycle_match_days
+        ]
+        return min(near, key=lambda s: abs(s - start)) if near else None
+
+    def _relink(self, index: int) -> None:
+        """Recompute lengths across source boundaries around cycle ``index``."""
+        starts = self._cycle_starts
+        for i in (index - 1, index):
+            if i < 0 or i + 1 >= len(starts):
+                continue
+            cycle, priority, source = self._cycles[starts[i]]
+            if source == self._cycles[starts[i + 1]][2]:
+                continue
+            gap = starts[i + 1] - starts[i]
+            if cycle.length != gap:
+                self._cycles[starts[i]] = (cycle.model_copy(update={"length": gap}), priority, source)
+
+
+def _combine(winner: Record, other: Record) -> Record:
+    """``winner`` with its unset fields taken from ``other`` and list fields unioned."""
+    update = {}
+    for name in type(winner).model_fields:
+        mine, theirs = getattr(winner, name), getattr(other, name)
+        if isinstance(mine, list):
+            union = list(dict.fromkeys([*mine, *(theirs or ())]))
+            if len(union) != len(mine):
+                update[name] = union
+        elif mine is None and theirs is not None:
+            update[name] = theirs
+    return winner.model_copy(update=update) if update else winner
+
+
+def _insert(keys: list[int], key: int) -> int:
+    """Insert ``key`` into sorted ``keys``: O(1) when it is the largest, else O(n)."""
+    if not keys or key > keys[-1]:
+        keys.append(key)
+        return len(keys) - 1
+    insort(keys, key)
+    return bisect_left(keys, key)
+
+
+def _by_date(records: Iterable[Record], field: str) -> list[Record]:
+    # Parsers return sorted records, which sort in linear time
+    return sorted(records, key=lambda record: getattr(record, field))
+
+
+def _date_and_source(item: tuple) -> tuple[int, int]:
+    return item[0], item[1]
@@ -0,0 +1,195 @@
+"""Aggregate daily logs by cycle day and cycle phase.
+
+Each log is placed in its cycle with one ``np.searchsorted`` over the sorted
+cycle start ordinals, so the cost is O(logs * log(cycles)) with no Python loop
+over cycles. Its cycle day and phase then come from array arithmetic, and
+the count matrices are built with a single ``np.bincount`` each:
+
+- ``symptom_by_cycle_day``: cycle day x symptom, for days 1 to
+  ``MAX_CYCLE_DAY``
+- ``symptom_by_phase`` and ``mood_by_phase``: phase x value
+
+A symptom counts once per day even if it was logged twice. Rates come from
+dividing by ``logs_by_cycle_day`` or ``logs_by_phase``, the number of logged
+days in each row, so days without a log do not count as days without a
+symptom.
+
+Phases follow ``predict_fertile_window``: ovulation falls
+``OVULATION_DAYS_BEFORE_PERIOD`` days before the next start, and the
+ovulatory phase is the fertile window that ends on it. The menstrual phase
+is the cycle's period length, or ``DEFAULT_PERIOD_LENGTH`` when unknown.
+"""
+
+from typing import Optional
+
+import numpy as np
+
+PHASES = ("menstrual", "follicular", "ovulatory", "luteal")
+MENSTRUAL, FOLLICULAR, OVULATORY, LUTEAL = range(len(PHASES))
+
+MAX_CYCLE_DAY = 45
+DEFAULT_CYCLE_LENGTH = 28
+DEFAULT_PERIOD_LENGTH = 5
+
+# Fertile window relative to the next period start
+OVULATION_DAYS_BEFORE_PERIOD = 14
+FERTILE_DAYS_BEFORE_OVULATION = 5
+
+
+def assign_cycle_days(
+    log_ordinals: np.ndarray,
+    start_ordinals: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Place each log in its cycle.
+
+    Args:
+        log_ordinals: Log dates as ``date.toordinal()``, in any order
+        start_ordinals: Cycle start ordinals, sorted ascending
+
+    Returns:
+        Tuple of (cycle index, zero-based cycle day) per log. Logs dated
+        before the first start get cycle index -1.
+    """
+    cycle = np.searchsorted(start_ordinals, log_ordinals, side="right") - 1
+    day = log_ordinals - start_ordinals[np.maximum(cycle, 0)]
+    return cycle, day
+
+
+def cycle_phases(
+    cycle: np.ndarray,
+    day: np.ndarray,
+    cycle_lengths: np.ndarray,
+    period_lengths: np.ndarray,
+) -> np.ndarray:
+    """Phase index (into ``PHASES``) of each assigned log.
+
+    ``cycle``/``day`` come from ``assign_cycle_days`` with unassigned logs
+    removed; ``cycle_lengths`` and ``period_lengths`` hold one entry per cycle.
+    """
+    ovulation = cycle_lengths[cycle] - OVULATION_DAYS_BEFORE_PERIOD
+    fertile_start = ovulation - FERTILE_DAYS_BEFORE_OVULATION
+    phase = np.full(len(day), LUTEAL, dtype=np.int64)
+    phase[day <= ovulation] = OVULATORY
+    phase[day < fertile_start] = FOLLICULAR
+    phase[day < period_lengths[cycle]] = MENSTRUAL
+    return phase
+
+
+def aggregate_by_phase(
+    log_ordinals: np.ndarray,
+    symptom_rows: np.ndarray,
+    symptom_codes: np.ndarray,
+    symptom_vocabulary: tuple[str, ...],
+    mood_codes: np.ndarray,
+    mood_vocabulary: tuple[str, ...],
+    start_ordinals: np.ndarray,
+    explicit_lengths: Optional[np.ndarray] = None,
+    period_lengths: Optional[np.ndarray] = None,
+) -> dict:
+    """Count symptoms by cycle day and phase, and moods by phase.
+
+    Args:
+        log_ordinals: One date ordinal per log
+        symptom_rows: Log row of each (log, symptom) pair, without duplicates
+        symptom_codes: Symptom code of each pair, into ``symptom_vocabulary``
+        symptom_vocabulary: Symptom names by code
+        mood_codes: One mood code per log, -1 for none
+        mood_vocabulary: Mood names by code
+        start_ordinals: Cycle start ordinals, in any order
+        explicit_lengths: Cycle lengths where known, -1 elsewhere
+        period_lengths: Period lengths where known, 0 elsewhere
+
+    Returns:
+        Count matrices and the vocabularies labelling their axes. Logs that
+        precede the first cycle are left out and counted in ``unassigned``.
+
+    Raises:
+        ValueError: If there are no cycles
+    """
+    log_ordinals = np.asarray(log_ordinals, dtype=np.int64)
+    start_ordinals = np.asarray(start_ordinals, dtype=np.int64)
+    n_cycles = len(start_ordinals)
+    if n_cycles == 0:
+        raise ValueError("Need at least one cycle to place logs in")
+    if explicit_lengths is None:
+        explicit_lengths = np.full(n_cycles, -1, dtype=np.int64)
+    if period_lengths is None:
+        period_lengths = np.zeros(n_cycles, dtype=np.int64)
+
+    order = np.argsort(start_ordinals, kind="stable")
+    starts = start_ordinals[order]
+    explicit = np.asarray(explicit_lengths, dtype=np.int64)[order]
+    periods = np.asarray(period_lengths, dtype=np.int64)[order]
+
+    # Length: explicit, else the gap to the next start; the last cycle is still
+    # open, so it gets the typical length of the others
+    lengths = np.empty(n_cycles, dtype=np.int64)
+    lengths[:-1] = np.diff(starts)
+    known = lengths[:-1][(lengths[:-1] >= 21) & (lengths[:-1] <= 45)]
+    lengths[-1] = int(np.median(known)) if len(known) else DEFAULT_CYCLE_LENGTH
+    lengths = np.where(explicit > 0, explicit, lengths)
+    periods = np.where(periods > 0, periods, DEFAULT_PERIOD_LENGTH)
+
+    cycle, day = assign_cycle_days(log_ordinals, starts)
+    assigned = cycle >= 0
+    phase = np.full(len(log_ordinals), -1, dtype=np.int64)
+    phase[assigned] = cycle_phases(cycle[assigned], day[assigned], lengths, periods)
+    in_day_range = assigned & (day < MAX_CYCLE_DAY)
+
+    n_phases, n_symptoms, n_moods = len(PHASES), len(symptom_vocabulary), len(mood_vocabulary)
+
+    def counts(rows: np.ndarray, columns: np.ndarray, shape: tuple[int, int]) -> np.ndarray:
+        flat = np.bincount(rows * shape[1] + columns, minlength=shape[0] * shape[1])
+        return flat.reshape(shape)
+
+    symptom_rows = np.asarray(symptom_rows, dtype=np.int64)
+    symptom_codes = np.asarray(symptom_codes, dtype=np.int64)
+    on_day = in_day_range[symptom_rows]
+    with_phase = assigned[symptom_rows]
+    mood_codes = np.asarray(mood_codes, dtype=np.int64)
+    has_mood = assigned & (mood_codes >= 0)
+
+    return {
+        "phases": PHASES,
+        "symptom_vocabulary": tuple(symptom_vocabulary),
+        "mood_vocabulary": tuple(mood_vocabulary),
+        "symptom_by_cycle_day": counts(
+            day[symptom_rows[on_day]], symptom_codes[on_day], (MAX_CYCLE_DAY, n_symptoms)
+        ),
+        "logs_by_cycle_day": np.bincount(day[in_day_range], minlength=MAX_CYCLE_DAY),
+        "symptom_by_phase": counts(
+            phase[symptom_rows[with_phase]], symptom_codes[with_phase], (n_phases, n_symptoms)
+        ),
+        "mood_by_phase": counts(phase[has_mood], mood_codes[has_mood], (n_phases, n_moods)),
+        "logs_by_phase": np.bincount(phase[assigned], minlength=n_phases),
+        "unassigned": int((~assigned).sum()),
+    }
+
+
+def symptom_rates(profile: dict, by: str = "phase") -> np.ndarray:
+    """Share of logged days with each symptom, per phase or per cycle day.
+
+    Rows without any logged day are 0.
+    """
+    symptoms = profile[f"symptom_by_{by}"]
+    logged = profile[f"logs_by_{by}"][:, None]
+    return np.divide(symptoms, logged, out=np.zeros(symptoms.shape), where=logged > 0)
+
+
+def likely_symptoms(
+    profile: dict,
+    phase: str,
+    min_rate: float = 0.5,
+    min_days: int = 3,
+) -> list[str]:
+    """Symptoms logged on at least ``min_rate`` of the phase's logged days.
+
+    Returns them most frequent first; empty when fewer than ``min_days``
+    days of the phase were logged.
+    """
+    index = PHASES.index(phase)
+    if profile["logs_by_phase"][index] < min_days:
+        return []
+    rates = symptom_rates(profile)[index]
+    ranked = np.argsort(-rates, kind="stable")
+    return [profile["symptom_vocabulary"][i] for i in ranked if rates[i] >= min_rate]
@@ -0,0 +1,367 @@
+"""Rolling-origin backtests of the cycle predictors.
+
+Usage:
+    python -m ml bench
+    python -m ml bench --input data/test/sample_flo_export.json --users 500 --workers 8
+    python -m ml bench --model weighted_average --model bayesian --output bench.json
+
+Every history is replayed forward: for each origin ``k`` from ``min_train``
+on, a fresh predictor is fitted on the first ``k`` cycles and its predicted
+next period date is compared with the actual start of cycle ``k + 1``. The
+report, per source and model type, holds:
+
+- ``mae_days`` and the share of predictions within 1, 2 and 3 days
+- calibration of ``confidence`` against hits within ``tolerance_days``:
+  per-bin mean confidence versus hit rate, the expected calibration error
+  (``ece``) and the Brier score
+- fit and predict latency percentiles, per origin
+- peak traced memory of one fit on the longest history
+
+Histories come from export files (any format ``load_training_data``
+reads) and from a cohort of ``synthetic.SyntheticUser``s, whose cycle
+lengths drift and vary around a per-user level with occasional missed
+periods. Work is split into chunks of histories and fanned
+out over worker processes, as ``train-batch`` does with files. Latencies are
+measured inside the workers, so with more workers than idle cores they
+include time slicing; use ``--workers 1`` when latency is what is tracked.
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from ml.models.schemas import Cycle
+from ml.training.synthetic import SyntheticUser
+from ml.training.train import create_predictor, load_training_data
+
+DEFAULT_MODELS = ["weighted_average", "bayesian", "prophet"]
+CALIBRATION_BINS = 10
+
+
+def synthetic_histories(n_users: int, seed: int = 0) -> list[list[Cycle]]:
+    """Cycle histories of ``SyntheticUser``s covering 8 to 40 cycles each."""
+    rng = np.random.default_rng(seed)
+    years = rng.integers(8, 40, n_users) * 28 / 365.25
+    return [
+        [Cycle(**cycle) for cycle in SyntheticUser(seed, index, years=float(y)).cycles()]
+        for index, y in enumerate(years)
+    ]
+
+
+def backtest_history(
+    cycles: list[Cycle],
+    model_type: str,
+    min_train: int = 3,
+    max_origins: Optional[int] = None,
+) -> list[tuple[int, float, float, float]]:
+    """Fit and predict at every origin of one history.
+
+    Returns:
+        One (signed error in days, confidence, fit seconds, predict seconds)
+        per origin the model could fit. ``max_origins`` keeps only the last
+        origins.
+    """
+    cycles = sorted(cycles, key=lambda c: c.start_date)
+    origins = range(min_train, len(cycles))
+    if max_origins is not None:
+        origins = origins[-max_origins:]
+
+    rows = []
+    for k in origins:
+        predictor = create_predictor(model_type)
+        started = time.perf_counter()
+        try:
+            predictor.fit(cycles[:k])
+        except ValueError:
+            continue  # Not enough valid cycles yet
+        fitted = time.perf_counter()
+        prediction = predictor.predict()
+        predicted = time.perf_counter()
+        error = (prediction.next_period_date - cycles[k].start_date).days
+        rows.append((error, prediction.confidence, fitted - started, predicted - fitted))
+    return rows
+
+
+def peak_fit_memory(cycles: list[Cycle], model_type: str) -> int:
+    """Peak bytes traced by ``tracemalloc`` while fitting ``cycles``."""
+    predictor = create_predictor(model_type)
+    tracemalloc.start()
+    try:
+        predictor.fit(cycles)
+        predictor.predict()
+        return tracemalloc.get_traced_memory()[1]
+    except ValueError:
+        return 0
+    finally:
+        tracemalloc.stop()
+
+
+def _run_chunk(
+    model_type: str,
+    histories: list[list[Cycle]],
+    min_train: int,
+    max_origins: Optional[int],
+) -> np.ndarray:
+    rows = [
+        row
+        for history in histories
+        for row in backtest_history(history, model_type, min_train, max_origins)
+    ]
+    return np.array(rows, dtype=np.float64).reshape(-1, 4)
+
+
+def summarize(rows: np.ndarray, tolerance_days: int = 2) -> dict:
+    """Accuracy, calibration and latency of backtest rows."""
+    if not len(rows):
+        return {"predictions": 0}
+    errors = np.abs(rows[:, 0])
+    confidence = np.clip(rows[:, 1], 0.0, 1.0)
+    hits = (errors <= tolerance_days).astype(np.float64)
+
+    bins = np.minimum((confidence * CALIBRATION_BINS).astype(int), CALIBRATION_BINS - 1)
+    counts = np.bincount(bins, minlength=CALIBRATION_BINS)
+    mean_confidence = np.bincount(bins, weights=confidence, minlength=CALIBRATION_BINS)
+    hit_rate = np.bincount(bins, weights=hits, minlength=CALIBRATION_BINS)
+    filled = counts > 0
+    mean_confidence[filled] /= counts[filled]
+    hit_rate[filled] /= counts[filled]
+
+    def ms(values: np.ndarray) -> dict:
+        p50, p95, p99 = np.percentile(values * 1000, [50, 95, 99])
+        return {"p50": round(p50, 4), "p95": round(p95, 4), "p99": round(p99, 4)}
+
+    return {
+        "predictions": len(rows),
+        "mae_days": round(float(errors.mean()), 3),
+        "bias_days": round(float(rows[:, 0].mean()), 3),
+        "within_1d": round(float((errors <= 1).mean()), 4),
+        "within_2d": round(float((errors <= 2).mean()), 4),
+        "within_3d": round(float((errors <= 3).mean()), 4),
+        "calibration": {
+            "tolerance_days": tolerance_days,
+            "mean_confidence": round(float(confidence.mean()), 4),
+            "hit_rate": round(float(hits.mean()), 4),
+            "ece": round(float(np.sum(counts * np.abs(mean_confidence - hit_rate)) / len(rows)), 4),
+            "brier": round(float(np.mean((confidence - hits) ** 2)), 4),
+            "bins": [
+                {
+                    "confidence": [i / CALIBRATION_BINS, (i + 1) / CALIBRATION_BINS],
+                    "count": int(counts[i]),
+                    "mean_confidence": round(float(mean_confidence[i]), 4),
+                    "hit_rate": round(float(hit_rate[i]), 4),
+                }
+                for i in np.flatnonzero(filled)
+            ],
+        },
+        "fit_ms": ms(rows[:, 2]),
+        "predict_ms": ms(rows[:, 3]),
+    }
+
+
+def available_models(model_types: list[str]) -> tuple[list[str], dict[str, str]]:
+    """Split model types into runnable ones and skipped ones with a reason."""
+    runnable, skipped = [], {}
+    for model_type in model_types:
+        if model_type == "prophet" and importlib.util.find_spec("prophet") is None:
+            skipped[model_type] = "prophet is not installed"
+        else:
+            runnable.append(model_type)
+    return runnable, skipped
+
+
+def run_backtest(
+    sources: dict[str, list[list[Cycle]]],
+    model_types: list[str],
+    workers: Optional[int] = None,
+    min_train: int = 3,
+    max_origins: Optional[int] = None,
+    tolerance_days: int = 2,
+) -> dict:
+    """Backtest every model type on every source.
+
+    Args:
+        sources: Source name -> cycle histories
+        model_types: Model types for ``create_predictor``
+        workers: Worker processes (default: CPU count); ``1`` runs in this
+            process
+        min_train: Cycles in the first training window
+        max_origins: Origins per history, counted from the end
+        tolerance_days: Error that still counts as a hit for calibration
+
+    Returns:
+        JSON-serializable report
+    """
+    workers = workers or os.cpu_count() or 1
+    runnable, skipped = available_models(model_types)
+
+    jobs = []
+    for name, histories in sources.items():
+        # A few chunks per worker balances long and short histories
+        n_chunks = max(1, min(len(histories), workers * 4))
+        for model_type in runnable:
+            for i in range(n_chunks):
+                jobs.append((name, model_type, histories[i::n_chunks]))
+
+    started = time.perf_counter()
+    args = [(model_type, chunk, min_train, max_origins) for _, model_type, chunk in jobs]
+    if workers == 1:
+        results = [_run_chunk(*a) for a in args]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_run_chunk, *zip(*args)))
+    elapsed = time.perf_counter() - started
+
+    report: dict = {
+        "config": {
+            "models": model_types,
+            "workers": workers,
+            "min_train": min_train,
+            "max_origins": max_origins,
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "elapsed_s": round(elapsed, 3),
+        "skipped": skipped,
+        "sources": {},
+    }
+    for name, histories in sources.items():
+        longest = max(histories, key=len, default=[])
+        source: dict = {"histories": len(histories), "cycles": sum(map(len, histories))}
+        for model_type in runnable:
+            rows = [r for (n, m, _), r in zip(jobs, results) if n == name and m == model_type]
+            summary = summarize(np.concatenate(rows), tolerance_days)
+            summary["peak_fit_memory_bytes"] = peak_fit_memory(longest, model_type)
+            source[model_type] = summary
+        report["sources"][name] = source
+    return report
+
+
+def print_report(report: dict) -> None:
+    print(f"Backtest in {report['elapsed_s']:.2f}s on {report['config']['workers']} workers")
+    for model_type, reason in report["skipped"].items():
+        print(f"  {model_type}: skipped ({reason})")
+    header = (
+        f"{'model':<18} {'preds':>7} {'MAE':>7} {'<=2d':>7} {'conf':>7} {'hits':>7} "
+        f"{'ECE':>6} {'fit p50':>9} {'fit p95':>9} {'peak KB':>8}"
+    )
+    for name, source in report["sources"].items():
+        print()
+        print(f"{name}: {source['histories']} histories, {source['cycles']} cycles")
+        print(header)
+        for model_type, s in source.items():
+            if not isinstance(s, dict):
+                continue
+            if not s["predictions"]:
+                print(f"{model_type:<18} {0:>7}")
+                continue
+            cal = s["calibration"]
+            print(
+                f"{model_type:<18} {s['predictions']:>7} {s['mae_days']:>6.2f}d "
+                f"{s['within_2d']:>6.1%} {cal['mean_confidence']:>6.1%} {cal['hit_rate']:>6.1%} "
+                f"{cal['ece']:>6.3f} {s['fit_ms']['p50']:>7.3f}ms {s['fit_ms']['p95']:>7.3f}ms "
+                f"{s['peak_fit_memory_bytes'] / 1024:>8.1f}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Backtest FLux cycle predictors with rolling origins",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Synthetic cohort, every available model
+  python -m ml bench
+
+  # Add a real export and keep the JSON report for comparison
+  python -m ml bench --input data/test/sample_flo_export.json --output bench.json
+        """,
+    )
+    parser.add_argument(
+        "--input", "-i",
+        action="append",
+        default=[],
+        help="Export file to backtest on (repeatable; Flo or FLux app format)",
+    )
+    parser.add_argument(
+        "--users",
+        type=int,
+        default=200,
+        help="Synthetic histories to generate; 0 to skip (default: 200)",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Synthetic cohort seed")
+    parser.add_argument(
+        "--model", "-m",
+        action="append",
+        default=None,
+        help=f"Model type to backtest (repeatable; default: {', '.join(DEFAULT_MODELS)})",
+    )
+    parser.add_argument(
+        "--workers", "-w",
+        type=int,
+        default=None,
+        help="Number of worker processes (default: number of CPUs)",
+    )
+    parser.add_argument("--min-train", type=int, default=3, help="Cycles in the first window")
+    parser.add_argument(
+        "--max-origins",
+        type=int,
+        default=None,
+        help="Only backtest the last N origins of each history",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=int,
+        default=2,
+        help="Days of error that still count as a hit for calibration (default: 2)",
+    )
+    parser.add_argument("--output", "-o", type=str, default=None, help="Write the JSON report here")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    sources: dict[str, list[list[Cycle]]] = {}
+    for path in args.input:
+        cycles, _, _ = load_training_data(Path(path))
+        sources[path] = [cycles]
+    if args.users:
+        sources[f"synthetic(users={args.users}, seed={args.seed})"] = synthetic_histories(
+            args.users, args.seed
+        )
+    if not sources:
+        parser.error("nothing to backtest: pass --input or --users")
+
+    report = run_backtest(
+        sources,
+        args.model or DEFAULT_MODELS,
+        workers=args.workers,
+        min_train=args.min_train,
+        max_origins=args.max_origins,
+        tolerance_days=args.tolerance,
+    )
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+    if args.json:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        print_report(report)
+        if args.output:
+            print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
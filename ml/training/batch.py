@@ -0,0 +1,272 @@
+"""Batch training over many exports with a process pool.
+
+Usage:
+    python -m ml train-batch --input-dir exports/ --output-dir models/ --workers 8
+
+Each input file is parsed and fitted in a worker process. Failures are
+reported per file instead of stopping the run, and a summary of every result
+is written to ``batch_summary.json`` in the output directory. With
+``--store``, all fitted params are also written to one model store (see
+``ml.training.model_store``), keyed by input file name, in a single swap.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Optional
+
+from pydantic import BaseModel
+
+from ml.models.schemas import ModelParams
+from ml.preprocessing.cycle_stats import IncrementalCycleStats, stats_path_for
+from ml.training.model_store import ModelStore
+from ml.training.train import MODEL_TYPES, create_predictor, load_training_data, validate_cycles
+
+SUMMARY_FILE = "batch_summary.json"
+
+
+class BatchResult(BaseModel):
+    """Outcome of training one input file."""
+
+    input_path: str
+    output_path: Optional[str] = None
+    status: str  # "ok" or "error"
+    error: Optional[str] = None
+    input_format: Optional[str] = None
+    model_type: Optional[str] = None
+    cycles: int = 0
+    logs: int = 0
+    next_period_date: Optional[str] = None
+    confidence: Optional[float] = None
+    duration_s: float = 0.0
+
+
+def output_path_for(input_path: Path, output_dir: Path) -> Path:
+    """Model params path for an input file, e.g. ``user42_model_params.json``."""
+    return output_dir / f"{input_path.stem}_model_params.json"
+
+
+def train_one(
+    input_path: str,
+    output_path: str,
+    input_format: str = "auto",
+    model_type: str = "auto",
+) -> BatchResult:
+    """Train and save a model for one file, returning errors as a result."""
+    started = time.perf_counter()
+    result = BatchResult(input_path=input_path, status="error")
+
+    try:
+        cycles, logs, result.input_format = load_training_data(Path(input_path), input_format)
+        result.cycles = len(cycles)
+        result.logs = len(logs)
+        validate_cycles(cycles)
+
+        predictor = create_predictor(model_type)
+        predictor.fit(cycles)
+        prediction = predictor.predict()
+        stats = IncrementalCycleStats.from_cycles(cycles)
+        predictor.save(Path(output_path))
+        stats.save(stats_path_for(output_path))
+    except Exception as e:
+        # One bad export must not stop the batch
+        result.error = f"{type(e).__name__}: {e}"
+    else:
+        result.status = "ok"
+        result.output_path = output_path
+        result.model_type = predictor.model_type
+        result.next_period_date = prediction.next_period_date.isoformat()
+        result.confidence = prediction.confidence
+
+    result.duration_s = round(time.perf_counter() - started, 4)
+    return result
+
+
+def train_batch(
+    input_dir: str | Path,
+    output_dir: str | Path,
+    workers: Optional[int] = None,
+    input_format: str = "auto",
+    model_type: str = "auto",
+    pattern: str = "*.json",
+    verbose: bool = True,
+    store_path: Optional[str | Path] = None,
+) -> list[BatchResult]:
+    """Train one model per input file, fanned out over worker processes.
+
+    Args:
+        input_dir: Directory containing Flo exports and/or FLux app exports
+        output_dir: Directory to write ``<name>_model_params.json`` files to
+        workers: Number of worker processes (default: CPU count). ``1`` trains
+            in the current process.
+        input_format: "flo", "app", or "auto" (detect per file)
+        model_type: "prophet", "weighted_average", "bayesian", or "auto"
+        pattern: Glob pattern selecting input files
+        verbose: Print one line per finished file
+        store_path: Model store to put every fitted model into, with the
+            input file's stem as user id
+
+    Returns:
+        One result per input file, in input file order
+    """
+    input_root = Path(input_dir)
+    output_root = Path(output_dir)
+    output_root.mkdir(parents=True, exist_ok=True)
+
+    inputs = sorted(p for p in input_root.glob(pattern) if p.is_file())
+    jobs = [
+        (str(p), str(output_path_for(p, output_root)), input_format, model_type)
+        for p in inputs
+    ]
+    workers = workers or os.cpu_count() or 1
+
+    results: dict[str, BatchResult] = {}
+
+    def report(result: BatchResult) -> None:
+        results[result.input_path] = result
+        if verbose:
+            detail = result.next_period_date if result.status == "ok" else result.error
+            print(f"[{len(results)}/{len(jobs)}] {result.status:<5} {result.input_path}: {detail}")
+
+    if workers == 1:
+        for job in jobs:
+            report(train_one(*job))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(train_one, *job) for job in jobs]
+            for future in as_completed(futures):
+                report(future.result())
+
+    ordered = [results[job[0]] for job in jobs]
+
+    summary = {
+        "total": len(ordered),
+        "succeeded": sum(r.status == "ok" for r in ordered),
+        "failed": sum(r.status == "error" for r in ordered),
+        "results": [r.model_dump() for r in ordered],
+    }
+    with open(output_root / SUMMARY_FILE, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+
+    if store_path is not None:
+        ModelStore(store_path).put_many(
+            (
+                Path(r.input_path).stem,
+                ModelParams.model_validate_json(Path(r.output_path).read_text()),
+            )
+            for r in ordered
+            if r.status == "ok"
+        )
+
+    return ordered
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Train FLux cycle prediction models for a directory of exports",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Nightly retrain of every export in a directory
+  python -m ml train-batch --input-dir exports/ --output-dir models/ --workers 8
+
+  # Only app exports, weighted average model
+  python -m ml train-batch --input-dir exports/ --output-dir models/ \\
+      --format app --model weighted_average
+
+  # Also publish every model to the store the API serves from
+  python -m ml train-batch --input-dir exports/ --output-dir models/ \\
+      --store data/models.bin
+        """,
+    )
+
+    parser.add_argument(
+        "--input-dir",
+        type=str,
+        required=True,
+        help="Directory of input JSON files (Flo exports or FLux app exports)",
+    )
+
+    parser.add_argument(
+        "--output-dir",
+        type=str,
+        required=True,
+        help="Directory to write model parameters and batch_summary.json to",
+    )
+
+    parser.add_argument(
+        "--workers", "-w",
+        type=int,
+        default=None,
+        help="Number of worker processes (default: number of CPUs)",
+    )
+
+    parser.add_argument(
+        "--pattern",
+        type=str,
+        default="*.json",
+        help="Glob pattern for input files (default: *.json)",
+    )
+
+    parser.add_argument(
+        "--format", "-f",
+        type=str,
+        choices=["flo", "app", "auto"],
+        default="auto",
+        help="Input format for all files, or 'auto' to detect per file (default: auto)",
+    )
+
+    parser.add_argument(
+        "--model", "-m",
+        type=str,
+        choices=MODEL_TYPES,
+        default="auto",
+        help="Model type: 'prophet', 'weighted_average', 'bayesian', or 'auto' (default: auto)",
+    )
+
+    parser.add_argument(
+        "--store",
+        type=str,
+        default=None,
+        help="Also write all models to this model store, keyed by input file name",
+    )
+
+    parser.add_argument(
+        "--strict",
+        action="store_true",
+        help="Exit with status 1 if any file fails",
+    )
+
+    parser.add_argument(
+        "--quiet", "-q",
+        action="store_true",
+        help="Suppress per-file progress messages",
+    )
+
+    args = parser.parse_args()
+
+    results = train_batch(
+        input_dir=args.input_dir,
+        output_dir=args.output_dir,
+        workers=args.workers,
+        input_format=args.format,
+        model_type=args.model,
+        pattern=args.pattern,
+        verbose=not args.quiet,
+        store_path=args.store,
+    )
+
+    failed = sum(r.status == "error" for r in results)
+    print(f"\nTrained {len(results) - failed}/{len(results)} models ({failed} failed)")
+    print(f"Summary written to {Path(args.output_dir) / SUMMARY_FILE}")
+
+    if args.strict and failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
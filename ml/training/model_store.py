@@ -0,0 +1,426 @@
+"""Many users' model params in one compact, memory-mapped binary file.
+
+``CyclePredictor.save`` writes one ``model_params.json`` per user. Serving
+from those would mean a file open and a JSON parse per request. The store
+instead keeps every user's params as a fixed-size NumPy record in a single
+file:
+
+- The records form an open-addressing hash table keyed by a 64-bit BLAKE2b
+  hash of the user id. A lookup costs one hash plus (at load factor <= 0.5)
+  one or two probes into the mapping, with no parsing. User ids themselves
+  are not stored.
+- Every record carries a ``version`` that goes up each time that user is
+  retrained. The header carries a ``generation`` that goes up with every
+  write.
+- All writes hold an exclusive lock, so writers in different processes do
+  not lose each other's updates.
+- ``put``, one user's retrain, rewrites that user's record and the header in
+  place: one record write and an ``fsync``, whatever the number of users.
+  Every record ends in a CRC32 of the rest. Readers see in-place writes
+  through their mapping straight away; one that copies a record mid-write
+  finds the checksum off, reads it again and, if it never settles, treats
+  the user as having no stored model.
+- ``put_many``, and a ``put`` that needs a bigger table, are copy-on-write.
+  The new table is written to a temporary file next to the store and
+  swapped in with ``os.replace``. Readers keep their old mapping until they
+  notice the swap.
+- Readers check for a swap by another process with one ``stat`` at most
+  every ``refresh_interval`` seconds, never per lookup.
+
+Floats are stored as float32 and only the last ``RECENT_LENGTHS`` cycle
+lengths are kept, so ``get`` returns a close, not bit-exact, copy of what
+was ``put``.
+
+The store is a plaintext cache of health data. Each record holds a user's
+predicted next period, fertile window, confidence and last cycle lengths,
+unencrypted, under an unsalted hash of the user id: anyone who can read the
+file and knows or guesses a user id can read that user's record. The file is
+private to its owner (0600); keep it on the serving host, out of backups and
+logs, and check the user's key before serving from it.
+"""
+
+import fcntl
+import hashlib
+import math
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from datetime import date, datetime
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from ml.models.schemas import ModelParams, Prediction
+
+MAGIC = b"FLXM"
+# 2 added record checksums; version 1 stores are read and upgraded on write
+FORMAT_VERSION = 2
+READABLE_FORMATS = (1, FORMAT_VERSION)
+# magic, format version, record size, capacity, count, generation, written at
+HEADER = struct.Struct("<4sHHIIQd")
+HEADER_SIZE = 64
+RECENT_LENGTHS = 6
+MIN_CAPACITY = 64
+# Reads of a record whose checksum is off before it is treated as absent
+READ_ATTEMPTS = 3
+
+# Model type codes; 0 is any type not listed
+MODEL_TYPES = ("other", "weighted_average", "prophet", "bayesian")
+
+RECORD_DTYPE = np.dtype([
+    ("key", "<u8"),  # 0 marks an empty slot
+    ("version", "<u4"),
+    ("model_type", "u1"),
+    ("recent_count", "u1"),
+    ("expected_cycle_length", "<u2"),
+    ("trained_at", "<f8"),  # Unix time
+    ("cycles_trained", "<u4"),
+    ("next_period", "<i4"),  # Date ordinals; 0 when absent
+    ("fertile_start", "<i4"),
+    ("fertile_end", "<i4"),
+    ("confidence", "<f4"),
+    ("avg_cycle_length", "<f4"),
+    ("std_cycle_length", "<f4"),
+    ("avg_period_length", "<f4"),  # NaN when absent
+    ("trend", "<f4"),
+    ("period_length", "<u2"),
+    ("recent_cycle_lengths", "u1", (RECENT_LENGTHS,)),
+    ("checksum", "<u4"),  # CRC32 of the bytes before it
+])
+CHECKSUMMED_BYTES = RECORD_DTYPE.fields["checksum"][1]
+EMPTY_KEY = bytes(8)
+
+
+class InvalidModelStore(ValueError):
+    """The file is not a model store this code can read."""
+
+
+def user_key(user_id: str) -> int:
+    """64-bit table key for a user id; never 0, which marks empty slots."""
+    digest = hashlib.blake2b(user_id.encode(), digest_size=8, person=b"flux-models").digest()
+    return int.from_bytes(digest, "little") or 1
+
+
+class ModelStore:
+    """Reader and writer of a model store file.
+
+    Args:
+        path: Store file; it need not exist until the first write
+        refresh_interval: Seconds between checks for a swap by another
+            process
+        clock: Monotonic time source, injectable for tests
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        refresh_interval: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.path = Path(path)
+        self.refresh_interval = refresh_interval
+        self._clock = clock
+        self._write_lock = threading.Lock()
+
+        # (file identity, header fields, records, mapping); replaced as a whole
+        self._snapshot: tuple = (None, {}, np.zeros(0, dtype=RECORD_DTYPE), None)
+        self._checked_at = -math.inf
+        self._refresh(force=True)
+
+    @property
+    def generation(self) -> int:
+        return self._current()[1].get("generation", 0)
+
+    def __len__(self) -> int:
+        return self._current()[1].get("count", 0)
+
+    def __contains__(self, user_id: str) -> bool:
+        return self.record(user_id) is not None
+
+    def record(self, user_id: str) -> Optional[np.void]:
+        """A copy of the raw record for a user, or None; the cheapest lookup."""
+        _, header, records, mapping = self._current()
+        index = _find(records, user_key(user_id))
+        if index is None:
+            return None
+        start = HEADER_SIZE + index * RECORD_DTYPE.itemsize
+        checked = header["format"] >= 2
+        for _ in range(READ_ATTEMPTS):
+            # Copied so a concurrent in-place write cannot change it under the caller
+            raw = mapping[start:start + RECORD_DTYPE.itemsize]
+            if raw[:8] == EMPTY_KEY:
+                return None
+            stored = int.from_bytes(raw[CHECKSUMMED_BYTES:], "little")
+            if not checked or zlib.crc32(raw[:CHECKSUMMED_BYTES]) == stored:
+                return np.frombuffer(raw, dtype=RECORD_DTYPE)[0]
+        return None
+
+    def version(self, user_id: str) -> int:
+        """How often the user's model was stored; 0 if never."""
+        record = self.record(user_id)
+        return 0 if record is None else int(record["version"])
+
+    def get(self, user_id: str) -> Optional[ModelParams]:
+        """The user's params, or None if the store has none."""
+        record = self.record(user_id)
+        return None if record is None else record_to_params(record)
+
+    def put(self, user_id: str, params: ModelParams) -> int:
+        """Store one user's params and return their new version.
+
+        The record is rewritten in place when the table has room for it;
+        otherwise the table is grown and swapped in as by ``put_many``.
+        """
+        key = user_key(user_id)
+        with self._locked():
+            _, header, records, _ = self._snapshot
+            count = header.get("count", 0)
+            index = _find(records, key)
+            is_new = index is None or records[index]["key"] == 0
+            if (
+                header.get("format") != FORMAT_VERSION
+                or is_new and (count + 1) * 2 > len(records)
+            ):
+                self._put_copy([(user_id, params)])
+            else:
+                version = 1 if is_new else int(records[index]["version"]) + 1
+                record = params_to_record(params, key, version)
+                self._write_record(
+                    index, record, len(records), count + is_new, header["generation"] + 1
+                )
+                self._refresh(force=True)
+            return int(self._snapshot[2][_find(self._snapshot[2], key)]["version"])
+
+    def put_many(self, items: Iterable[tuple[str, ModelParams]]) -> None:
+        """Store many users' params in one copy-on-write swap."""
+        items = list(items)
+        if not items:
+            return
+        with self._locked():
+            self._put_copy(items)
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Hold the write lock, with the snapshot refreshed from disk."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        lock_path = self.path.with_name(self.path.name + ".lock")
+        with self._write_lock, open(lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            # Start from what is on disk now, including other writers' updates
+            self._refresh(force=True)
+            yield
+
+    def _put_copy(self, items: list[tuple[str, ModelParams]]) -> None:
+        _, header, current, _ = self._snapshot
+        count = header.get("count", 0)
+
+        records = np.array(current, copy=True)
+        if header.get("format", FORMAT_VERSION) != FORMAT_VERSION:
+            occupied = records["key"] != 0
+            records["checksum"][occupied] = [_checksum(r) for r in records[occupied]]
+        if (count + len(items)) * 2 > len(records):
+            records = _rehash(records, count + len(items))
+
+        for user_id, params in items:
+            key = user_key(user_id)
+            index = _find(records, key)
+            if records[index]["key"] == 0:
+                count += 1
+            version = int(records[index]["version"]) + 1 if records[index]["key"] else 1
+            records[index] = params_to_record(params, key, version)
+
+        self._write(records, count, header.get("generation", 0) + 1)
+        self._refresh(force=True)
+
+    def stats(self) -> dict:
+        _, header, records, _ = self._current()
+        return {
+            "path": str(self.path),
+            "users": header.get("count", 0),
+            "capacity": len(records),
+            "generation": header.get("generation", 0),
+            "bytes": HEADER_SIZE + records.nbytes,
+        }
+
+    def _current(self) -> tuple:
+        if self._clock() - self._checked_at >= self.refresh_interval:
+            self._refresh()
+        return self._snapshot
+
+    def _refresh(self, force: bool = False) -> None:
+        """Map the file again if it was swapped since the last check."""
+        self._checked_at = self._clock()
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        identity = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if not force and identity == self._snapshot[0]:
+            return
+
+        with open(self.path, "rb") as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(mapping) < HEADER_SIZE:
+            raise InvalidModelStore(f"{self.path} is too short for a model store")
+        magic, fmt, record_size, capacity, count, generation, written_at = HEADER.unpack_from(
+            mapping
+        )
+        if magic != MAGIC:
+            raise InvalidModelStore(f"{self.path} is not a model store")
+        if fmt not in READABLE_FORMATS or record_size != RECORD_DTYPE.itemsize:
+            raise InvalidModelStore(
+                f"{self.path} has format version {fmt}; expected {FORMAT_VERSION}"
+            )
+        if len(mapping) != HEADER_SIZE + capacity * record_size:
+            raise InvalidModelStore(f"{self.path} is truncated")
+
+        records = np.frombuffer(mapping, dtype=RECORD_DTYPE, count=capacity, offset=HEADER_SIZE)
+        header = {
+            "format": fmt, "count": count, "generation": generation, "written_at": written_at,
+        }
+        self._snapshot = (identity, header, records, mapping)
+
+    def _write(self, records: np.ndarray, count: int, generation: int) -> None:
+        fd, tmp_name = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.path.name}-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(_header(len(records), count, generation))
+                f.write(records.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_name, self.path)
+        except BaseException:
+            os.unlink(tmp_name)
+            raise
+
+    def _write_record(
+        self, index: int, record: np.ndarray, capacity: int, count: int, generation: int
+    ) -> None:
+        """Overwrite one slot and the header of the current file."""
+        fd = os.open(self.path, os.O_WRONLY)
+        try:
+            os.pwrite(fd, record.tobytes(), HEADER_SIZE + index * RECORD_DTYPE.itemsize)
+            os.pwrite(fd, _header(capacity, count, generation), 0)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def _header(capacity: int, count: int, generation: int) -> bytes:
+    header = HEADER.pack(
+        MAGIC, FORMAT_VERSION, RECORD_DTYPE.itemsize, capacity, count, generation, time.time()
+    )
+    return header.ljust(HEADER_SIZE, b"\0")
+
+
+def _checksum(record: np.ndarray | np.void) -> int:
+    return zlib.crc32(record.tobytes()[:CHECKSUMMED_BYTES])
+
+
+def params_to_record(params: ModelParams, key: int, version: int) -> np.ndarray:
+    """Pack ``params`` into a one-element record array."""
+    prediction = params.prediction
+    recent = [min(max(length, 0), 255) for length in params.recent_cycle_lengths[-RECENT_LENGTHS:]]
+    record = np.zeros(1, dtype=RECORD_DTYPE)
+    record[0] = (
+        key,
+        version,
+        MODEL_TYPES.index(params.model_type) if params.model_type in MODEL_TYPES else 0,
+        len(recent),
+        prediction.expected_cycle_length,
+        params.trained_at.timestamp(),
+        params.cycles_trained,
+        prediction.next_period_date.toordinal(),
+        _ordinal(prediction.fertile_window_start),
+        _ordinal(prediction.fertile_window_end),
+        prediction.confidence,
+        params.avg_cycle_length,
+        params.std_cycle_length,
+        math.nan if params.avg_period_length is None else params.avg_period_length,
+        math.nan if params.trend is None else params.trend,
+        prediction.period_length or 0,
+        recent + [0] * (RECENT_LENGTHS - len(recent)),
+        0,
+    )
+    record["checksum"] = _checksum(record)
+    return record
+
+
+def record_to_params(record: np.void) -> ModelParams:
+    """Unpack a record into ``ModelParams``."""
+    # One conversion to Python values; indexing the record per field is slower
+    r = dict(zip(RECORD_DTYPE.names, record.item()))
+    return ModelParams(
+        trained_at=datetime.fromtimestamp(r["trained_at"]),
+        cycles_trained=r["cycles_trained"],
+        model_type=MODEL_TYPES[r["model_type"]],
+        prediction=_prediction(r),
+        avg_cycle_length=_float(r["avg_cycle_length"]),
+        std_cycle_length=_float(r["std_cycle_length"]),
+        avg_period_length=_optional_float(r["avg_period_length"]),
+        recent_cycle_lengths=r["recent_cycle_lengths"][: r["recent_count"]].tolist(),
+        trend=_optional_float(r["trend"]),
+    )
+
+
+def record_to_prediction(record: np.void) -> Prediction:
+    return _prediction(dict(zip(RECORD_DTYPE.names, record.item())))
+
+
+def _prediction(r: dict) -> Prediction:
+    return Prediction(
+        next_period_date=date.fromordinal(r["next_period"]),
+        confidence=_float(r["confidence"]),
+        expected_cycle_length=r["expected_cycle_length"],
+        fertile_window_start=_date(r["fertile_start"]),
+        fertile_window_end=_date(r["fertile_end"]),
+        period_length=r["period_length"] or None,
+    )
+
+
+def _find(records: np.ndarray, key: int) -> Optional[int]:
+    """Slot holding ``key``, or the empty slot where it would go (linear probing)."""
+    capacity = len(records)
+    if capacity == 0:
+        return None
+    keys = records["key"]
+    index = key & (capacity - 1)
+    key = np.uint64(key)
+    while keys[index] != key and keys[index] != 0:
+        index = (index + 1) & (capacity - 1)
+    return index
+
+
+def _rehash(records: np.ndarray, needed: int) -> np.ndarray:
+    """A table with room for ``needed`` records at load factor <= 0.5."""
+    capacity = MIN_CAPACITY
+    while capacity < needed * 2:
+        capacity *= 2
+    table = np.zeros(capacity, dtype=RECORD_DTYPE)
+    for record in records[records["key"] != 0]:
+        table[_find(table, int(record["key"]))] = record
+    return table
+
+
+def _ordinal(value: Optional[date]) -> int:
+    return value.toordinal() if value is not None else 0
+
+
+def _date(ordinal: int) -> Optional[date]:
+    return date.fromordinal(ordinal) if ordinal else None
+
+
+def _float(value: float) -> float:
+    # float32 carries ~7 significant digits: 0.85 instead of 0.8500000238418579
+    return float(f"{value:.7g}")
+
+
+def _optional_float(value: float) -> Optional[float]:
+    return None if math.isnan(value) else _float(value)
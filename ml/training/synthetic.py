@@ -0,0 +1,403 @@
+"""Deterministic synthetic Flo and FLux app exports for load and scale tests.
+
+Usage:
+    python -m ml generate --out-dir data/synthetic --users 1000 --years 10
+    python -m ml generate --out-dir big/ --users 1 --years 40 --density 4 --format flo
+
+Each user is simulated from their own seed, derived from ``(seed, user
+index)``, so a user's data does not depend on how many others are generated
+or in which order. The simulation follows the same rules as the rest of the
+pipeline:
+
+- Cycle lengths drift slowly around a per-user level, with per-user noise
+  and occasional missed periods (a doubled gap).
+- Days are assigned phases with ``phases.cycle_phases``, and symptoms,
+  moods and cervical fluid are drawn with phase-specific rates, so
+  ``compute_log_features`` finds real structure. Basal temperature rises
+  after ovulation.
+- Values come from the ``FLO_*_MAP`` vocabularies: Flo subcategories in GDPR
+  exports, our values in app exports.
+
+``SyntheticUser`` is the one source of synthetic data: the backtest's
+cohorts (``backtest.synthetic_histories``) are its cycles too.
+
+Output is written while it is generated, one cycle at a time, so memory
+stays flat however many years or events a file holds. Flo exports have the
+GDPR shape (``operationalData.point_events_manual_v2`` and
+``operationalData.cycles``); app exports have the camelCase shape the
+frontend's ``exportData`` writes.
+"""
+
+import argparse
+import json
+import sys
+from collections.abc import Iterator
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import IO
+
+import numpy as np
+
+from ml.preprocessing.flo_parser import (
+    FLO_DISTURBER_MAP,
+    FLO_FLOW_MAP,
+    FLO_FLUID_MAP,
+    FLO_MOOD_MAP,
+    FLO_SEX_DRIVE_MAP,
+    FLO_SYMPTOM_MAP,
+)
+from ml.preprocessing.phases import FOLLICULAR, LUTEAL, MENSTRUAL, OVULATORY, cycle_phases
+
+FORMATS = ("flo", "app")
+END_DATE = date(2024, 12, 31)
+
+# Chance per logged day of each symptom, by phase
+SYMPTOM_RATES = {
+    "cramps": (0.6, 0.05, 0.1, 0.1),
+    "backache": (0.35, 0.05, 0.05, 0.15),
+    "fatigue": (0.4, 0.1, 0.1, 0.3),
+    "headache": (0.2, 0.05, 0.1, 0.2),
+    "bloating": (0.25, 0.05, 0.15, 0.4),
+    "tender_breasts": (0.05, 0.02, 0.1, 0.35),
+    "acne": (0.1, 0.05, 0.05, 0.3),
+    "cravings": (0.15, 0.05, 0.05, 0.35),
+    "insomnia": (0.05, 0.05, 0.05, 0.15),
+    "diarrhea": (0.15, 0.02, 0.02, 0.05),
+    "feel_good": (0.05, 0.4, 0.4, 0.1),
+}
+# Relative mood weights, by phase
+MOOD_WEIGHTS = {
+    "happy": (1, 4, 4, 1),
+    "energetic": (0.5, 3, 4, 0.5),
+    "neutral": (3, 3, 2, 3),
+    "sad": (2, 0.5, 0.5, 2),
+    "angry": (1, 0.3, 0.3, 2),
+    "anxious": (1, 0.5, 0.5, 2),
+    "mood_swings": (1, 0.2, 0.2, 3),
+    "depressed": (1, 0.2, 0.2, 1),
+    "apathetic": (1, 0.3, 0.3, 1),
+    "confused": (0.3, 0.3, 0.3, 0.5),
+    "self_critical": (0.3, 0.2, 0.2, 0.8),
+    "feeling_guilty": (0.3, 0.2, 0.2, 0.5),
+}
+FLUID_BY_PHASE = ("bloody", "sticky", "eggwhite", "creamy")
+MOOD_RATE = 0.5
+FLUID_RATE = 0.3
+DISTURBER_RATE = 0.08
+SEX_DRIVE_RATE = 0.1
+TEMPERATURE_RATE = 0.7
+NOTE_RATE = 0.02
+
+
+def _flo_names(flo_map: dict) -> dict:
+    """Our value -> first Flo subcategory that maps to it."""
+    names: dict = {}
+    for flo_name, value in flo_map.items():
+        names.setdefault(value, flo_name)
+    return names
+
+
+FLO_NAMES = {
+    "symptoms": _flo_names(FLO_SYMPTOM_MAP),
+    "mood": _flo_names(FLO_MOOD_MAP),
+    "fluid": _flo_names(FLO_FLUID_MAP),
+    "disturbers": _flo_names(FLO_DISTURBER_MAP),
+    "sex_drive": _flo_names(FLO_SEX_DRIVE_MAP),
+}
+POINT_EVENT_CATEGORIES = {
+    "symptoms": "Symptom",
+    "mood": "Mood",
+    "fluid": "Fluid",
+    "disturbers": "Disturber",
+    "sex_drive": "Sex",
+}
+
+
+class SyntheticUser:
+    """One simulated user.
+
+    Args:
+        seed: Base seed of the data set
+        index: User index; with ``seed`` it fixes all of the user's data
+        years: Years of history ending at ``end_date``
+        log_rate: Share of days with a log entry
+        density: Multiplier on every per-day event rate
+        end_date: Last day of the history
+    """
+
+    def __init__(
+        self,
+        seed: int,
+        index: int,
+        years: float = 5,
+        log_rate: float = 0.6,
+        density: float = 1.0,
+        end_date: date = END_DATE,
+    ):
+        self.index = index
+        self.log_rate = log_rate
+        self.density = density
+        cycle_seed, self._day_seed = np.random.SeedSequence([seed, index]).spawn(2)
+        rng = np.random.default_rng(cycle_seed)
+
+        # Cycle starts: per-user level, slow drift, per-user noise, missed periods
+        first = end_date - timedelta(days=int(years * 365.25))
+        n = max(2, int(years * 365.25 / 26) + 2)
+        gaps = (
+            rng.normal(28, 2)
+            + np.cumsum(rng.normal(0, 0.3, n))
+            + rng.normal(0, rng.uniform(1, 3), n)
+        )
+        gaps = np.clip(np.rint(gaps), 21, 45).astype(np.int64)
+        gaps[rng.random(n) < 0.02] *= 2
+        starts = first.toordinal() + np.concatenate(([0], np.cumsum(gaps)[:-1]))
+        self.start_ordinals = starts[starts <= end_date.toordinal()]
+        self.end_ordinal = end_date.toordinal()
+        base_period = rng.integers(3, 8)
+        self.period_lengths = np.clip(
+            base_period + rng.integers(-1, 2, len(self.start_ordinals)), 2, 8
+        )
+        self.baseline_temperature = round(float(rng.normal(36.4, 0.1)), 2)
+
+    def cycles(self) -> list[dict]:
+        """Cycles as ``Cycle`` fields; the last one is still open."""
+        cycles = []
+        starts = self.start_ordinals.tolist()
+        for i, (start, period) in enumerate(zip(starts, self.period_lengths.tolist())):
+            cycle = {
+                "start_date": date.fromordinal(start),
+                "end_date": date.fromordinal(start + period - 1),
+                "period_length": period,
+            }
+            if i + 1 < len(starts):
+                cycle["length"] = starts[i + 1] - start
+            cycles.append(cycle)
+        return cycles
+
+    def days(self) -> Iterator[dict]:
+        """Logged days in date order, as ``DailyLog`` fields."""
+        rng = np.random.default_rng(self._day_seed)
+        symptoms = list(SYMPTOM_RATES)
+        symptom_rates = np.array(list(SYMPTOM_RATES.values())).T * self.density
+        moods = list(MOOD_WEIGHTS)
+        mood_weights = np.array(list(MOOD_WEIGHTS.values()), dtype=np.float64).T
+        mood_weights /= mood_weights.sum(axis=1, keepdims=True)
+        flows = list(FLO_FLOW_MAP.values())
+        disturbers = list(FLO_NAMES["disturbers"])
+
+        starts = np.append(self.start_ordinals, self.end_ordinal + 1)
+        lengths = np.diff(starts)
+        for i, start in enumerate(self.start_ordinals.tolist()):
+            # The last cycle is cut off at the end date; phase it as a typical one
+            length = int(lengths[i])
+            cycle = np.zeros(length, dtype=np.int64)
+            day = np.arange(length)
+            full_length = length if i + 1 < len(self.start_ordinals) else max(length, 28)
+            phase = cycle_phases(
+                cycle, day, np.array([full_length]), self.period_lengths[i:i + 1]
+            ).tolist()
+
+            logged = rng.random(length) < self.log_rate
+            draws = rng.random((length, len(symptoms)))
+            # flow, mood, fluid, disturber, sex drive, temperature, notes
+            extra = rng.random((length, 7))
+            temperature_noise = rng.normal(0, 0.1, length)
+            for d in np.flatnonzero(logged).tolist():
+                p = phase[d]
+                entry: dict = {"date": date.fromordinal(start + d)}
+                if p == MENSTRUAL:
+                    entry["flow"] = flows[min(3, max(0, 3 - d + int(extra[d, 0] * 2)))]
+                    entry["is_period"] = True
+                entry["symptoms"] = [
+                    symptoms[k]
+                    for k in np.flatnonzero(draws[d] < symptom_rates[p]).tolist()
+                ]
+                if extra[d, 1] < MOOD_RATE * self.density:
+                    entry["mood"] = moods[int(rng.choice(len(moods), p=mood_weights[p]))]
+                if extra[d, 2] < FLUID_RATE * self.density and p != MENSTRUAL:
+                    entry["fluid"] = FLUID_BY_PHASE[p]
+                entry["disturbers"] = []
+                if extra[d, 3] < DISTURBER_RATE * self.density:
+                    entry["disturbers"].append(disturbers[int(rng.integers(len(disturbers)))])
+                if extra[d, 4] < SEX_DRIVE_RATE * self.density:
+                    entry["sex_drive"] = "high" if p in (FOLLICULAR, OVULATORY) else "none"
+                if extra[d, 5] < TEMPERATURE_RATE:
+                    # Progesterone lifts basal temperature after ovulation
+                    shift = 0.3 if p == LUTEAL else 0.0
+                    entry["temperature"] = round(
+                        self.baseline_temperature + shift + float(temperature_noise[d]), 2
+                    )
+                if extra[d, 6] < NOTE_RATE:
+                    entry["notes"] = f"note {self.index}-{start + d}"
+                yield entry
+
+
+def _flo_datetime(day: date) -> str:
+    return f"{day.isoformat()} 00:00:00.0"
+
+
+def write_flo_export(user: SyntheticUser, out: IO[str]) -> int:
+    """Write a Flo GDPR-shaped export; returns the number of point events."""
+    out.write('{"userProfile": {"name": "synthetic-%d"}, "operationalData": {' % user.index)
+    out.write('"point_events_manual_v2": [')
+    n_events = 0
+    for entry in user.days():
+        timestamp = _flo_datetime(entry["date"])
+        for field, category in POINT_EVENT_CATEGORIES.items():
+            values = entry.get(field) or []
+            if isinstance(values, str):
+                values = [values]
+            for value in values:
+                if n_events:
+                    out.write(",")
+                out.write(json.dumps({
+                    "date": timestamp,
+                    "category": category,
+                    "subcategory": FLO_NAMES[field][value],
+                }))
+                n_events += 1
+    out.write('], "cycles": [')
+    for i, cycle in enumerate(user.cycles()):
+        record = {
+            "period_start_date": _flo_datetime(cycle["start_date"]),
+            "period_end_date": _flo_datetime(cycle["end_date"]),
+        }
+        out.write(("," if i else "") + json.dumps(record))
+    out.write("]}}\n")
+    return n_events
+
+
+def write_app_export(user: SyntheticUser, out: IO[str]) -> int:
+    """Write a FLux app export (camelCase); returns the number of logs."""
+    exported_at = datetime.fromordinal(user.end_ordinal + 1).isoformat() + "Z"
+    out.write('{"exportedAt": %s, "cycles": [' % json.dumps(exported_at))
+    for i, cycle in enumerate(user.cycles()):
+        record = {
+            "startDate": cycle["start_date"].isoformat(),
+            "endDate": cycle["end_date"].isoformat(),
+            "periodLength": cycle["period_length"],
+        }
+        if "length" in cycle:
+            record["length"] = cycle["length"]
+        out.write(("," if i else "") + json.dumps(record))
+    out.write('], "logs": [')
+    n_logs = 0
+    for entry in user.days():
+        record = {"date": entry["date"].isoformat()}
+        for field, key in (
+            ("flow", "flow"),
+            ("symptoms", "symptoms"),
+            ("mood", "mood"),
+            ("fluid", "fluid"),
+            ("sex_drive", "sexDrive"),
+            ("disturbers", "disturbers"),
+            ("temperature", "temperature"),
+            ("notes", "notes"),
+            ("is_period", "isPeriod"),
+        ):
+            if field in entry:
+                record[key] = entry[field]
+        out.write(("," if n_logs else "") + json.dumps(record))
+        n_logs += 1
+    out.write('], "modelParams": null}\n')
+    return n_logs
+
+
+WRITERS = {"flo": write_flo_export, "app": write_app_export}
+
+
+def generate(
+    out_dir: str | Path,
+    users: int,
+    years: float = 5,
+    formats: tuple[str, ...] = FORMATS,
+    seed: int = 0,
+    log_rate: float = 0.6,
+    density: float = 1.0,
+    first_user: int = 0,
+) -> list[dict]:
+    """Write ``<format>/user-<index>.json`` for every user and format.
+
+    ``first_user`` lets several processes write disjoint parts of one data
+    set. Returns one summary per written file.
+    """
+    out_root = Path(out_dir)
+    for fmt in formats:
+        (out_root / fmt).mkdir(parents=True, exist_ok=True)
+
+    written = []
+    for index in range(first_user, first_user + users):
+        user = SyntheticUser(seed, index, years, log_rate, density)
+        for fmt in formats:
+            path = out_root / fmt / f"user-{index:06d}.json"
+            with open(path, "w", encoding="utf-8") as f:
+                records = WRITERS[fmt](user, f)
+            written.append({
+                "path": str(path),
+                "format": fmt,
+                "cycles": len(user.start_ordinals),
+                "records": records,
+                "bytes": path.stat().st_size,
+            })
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate synthetic Flo and FLux app exports",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # 1000 users with 10 years each, both formats
+  python -m ml generate --out-dir data/synthetic --users 1000 --years 10
+
+  # One very large Flo export for parser scaling
+  python -m ml generate --out-dir big/ --users 1 --years 40 --density 4 --format flo
+        """,
+    )
+    parser.add_argument("--out-dir", "-o", type=str, required=True, help="Output directory")
+    parser.add_argument("--users", "-n", type=int, default=10, help="Users to generate")
+    parser.add_argument("--first-user", type=int, default=0, help="Index of the first user")
+    parser.add_argument("--years", type=float, default=5, help="Years of history per user")
+    parser.add_argument(
+        "--format", "-f",
+        choices=[*FORMATS, "both"],
+        default="both",
+        help="Export format to write (default: both)",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Data set seed")
+    parser.add_argument(
+        "--log-rate",
+        type=float,
+        default=0.6,
+        help="Share of days with a log entry (default: 0.6)",
+    )
+    parser.add_argument(
+        "--density",
+        type=float,
+        default=1.0,
+        help="Multiplier on per-day symptom, mood and other event rates (default: 1)",
+    )
+    parser.add_argument("--quiet", "-q", action="store_true", help="Only print the summary")
+    args = parser.parse_args()
+
+    formats = FORMATS if args.format == "both" else (args.format,)
+    written = generate(
+        args.out_dir,
+        args.users,
+        years=args.years,
+        formats=formats,
+        seed=args.seed,
+        log_rate=args.log_rate,
+        density=args.density,
+        first_user=args.first_user,
+    )
+    if not args.quiet:
+        for item in written:
+            print(f"{item['path']}: {item['cycles']} cycles, {item['records']} records")
+    total = sum(item["bytes"] for item in written)
+    print(f"Wrote {len(written)} files ({total / 1e6:.1f} MB) to {args.out_dir}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
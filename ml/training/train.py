@@ -9,31 +9,117 @@ Usage:
 
     # Use weighted average instead of Prophet
     python -m ml.train --input data.json --output model_params.json --model weighted_average
+
+    # Use the fast Bayesian model (NumPy only)
+    python -m ml.train --input data.json --output model_params.json --model bayesian
+
+    # Merge a Flo export with later app exports; later files win conflicts
+    python -m ml.train --input flo_export.json app_2024_06.json app_2024_12.json
 """
 
 import argparse
-import json
 import sys
 from pathlib import Path
 
-from ml.models.cycle_predictor import CyclePredictor
-from ml.preprocessing.flo_parser import parse_flo_export, parse_app_export
+from ml.models.schemas import Cycle, DailyLog
+from ml.preprocessing.flo_parser import load_any_export, sniff_export_format
 from ml.preprocessing.feature_engineering import compute_cycle_features
+from ml.preprocessing.compact import CycleColumns
+from ml.preprocessing.cycle_stats import IncrementalCycleStats, stats_path_for
+from ml.preprocessing.merge import MergedHistory, MergeStats
+
+MODEL_TYPES = ["prophet", "weighted_average", "bayesian", "auto"]
+
+
+class TrainingError(Exception):
+    """Raised when an input file cannot be used to train a model."""
 
 
 def detect_format(file_path: Path) -> str:
-    """Auto-detect whether input is Flo export or FLux app export."""
+    """Auto-detect whether input is Flo export or FLux app export.
+
+    Scans the top-level keys without decoding the file; see
+    ``sniff_export_format``.
+    """
     with open(file_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+        return sniff_export_format(f)
+
+
+def load_training_data(
+    input_file: Path,
+    input_format: str = "auto",
+) -> tuple[list[Cycle], list[DailyLog], str]:
+    """Parse an input file into cycles and daily logs.
+
+    The file is read once, whatever its format; see ``load_any_export``.
+
+    Returns:
+        Tuple of (cycles, daily_logs, resolved input format)
+    """
+    if not input_file.exists():
+        raise TrainingError(f"Input file not found: {input_file}")
+
+    return load_any_export(input_file, input_format)
+
+
+def merge_training_data(
+    input_files: list[Path],
+    input_format: str = "auto",
+) -> tuple[MergedHistory, MergeStats, list[str]]:
+    """Parse several input files and merge them into one history.
+
+    Files are given oldest first; later files win conflicts. See
+    ``MergedHistory`` for the rules.
+
+    Returns:
+        Tuple of (merged history, merge stats, resolved format per file)
+    """
+    sources, formats = [], []
+    for input_file in input_files:
+        cycles, logs, resolved = load_training_data(input_file, input_format)
+        sources.append((cycles, logs))
+        formats.append(resolved)
+    history, stats = MergedHistory.from_sources(sources)
+    return history, stats, formats
+
+
+def validate_cycles(cycles: list[Cycle] | CycleColumns) -> dict:
+    """Check there is enough cycle history to train on.
+
+    Returns:
+        Cycle features from ``compute_cycle_features``
+    """
+    if len(cycles) < 3:
+        raise TrainingError(
+            "Need at least 3 cycles for meaningful predictions. "
+            "Please add more cycle data and try again."
+        )
 
-    # FLux app exports have "exported_at" field
-    if "exported_at" in data or "exportedAt" in data:
-        return "app"
-    return "flo"
+    features = compute_cycle_features(cycles)
+    if "error" in features:
+        raise TrainingError(features["error"])
+    return features
+
+
+def create_predictor(model_type: str = "auto"):
+    """Predictor for a model type.
+
+    ``"bayesian"`` is ``BayesianCyclePredictor``; other types go to
+    ``CyclePredictor``, which is imported only then because it may import
+    Prophet.
+    """
+    if model_type == "bayesian":
+        from ml.training.forecast import BayesianCyclePredictor
+
+        return BayesianCyclePredictor()
+
+    from ml.models.cycle_predictor import CyclePredictor
+
+    return CyclePredictor(model_type=model_type)
 
 
 def train(
-    input_path: str,
+    input_path: str | list[str],
     output_path: str,
     input_format: str = "auto",
     model_type: str = "auto",
@@ -42,51 +128,44 @@ def train(
     """Train cycle prediction model.
 
     Args:
-        input_path: Path to input JSON file (Flo export or app export)
+        input_path: Path to input JSON file (Flo export or app export), or
+            several paths, oldest first, to merge
         output_path: Path to save model_params.json
         input_format: "flo", "app", or "auto" (detect automatically)
-        model_type: "prophet", "weighted_average", or "auto"
+        model_type: "prophet", "weighted_average", "bayesian", or "auto"
         verbose: Print progress messages
     """
-    input_file = Path(input_path)
+    input_paths = [input_path] if isinstance(input_path, str) else input_path
+    input_files = [Path(path) for path in input_paths]
     output_file = Path(output_path)
 
-    if not input_file.exists():
-        print(f"Error: Input file not found: {input_file}")
-        sys.exit(1)
-
-    # Detect format if auto
-    if input_format == "auto":
-        input_format = detect_format(input_file)
+    try:
         if verbose:
-            print(f"Detected input format: {input_format}")
-
-    # Parse input data
-    if verbose:
-        print(f"Loading data from {input_file}")
-
-    if input_format == "app":
-        app_export = parse_app_export(input_file)
-        cycles = app_export.cycles
-        logs = app_export.logs
-    else:
-        cycles, logs = parse_flo_export(input_file)
-
-    if verbose:
-        print(f"Found {len(cycles)} cycles")
-        if logs:
-            print(f"Found {len(logs)} daily log entries")
-
-    # Validate data
-    if len(cycles) < 3:
-        print("Error: Need at least 3 cycles for meaningful predictions")
-        print("Please add more cycle data and try again.")
-        sys.exit(1)
+            print(f"Loading data from {', '.join(map(str, input_files))}")
+
+        if len(input_files) == 1:
+            cycles, logs, detected_format = load_training_data(input_files[0], input_format)
+        else:
+            history, stats, formats = merge_training_data(input_files, input_format)
+            cycles, logs, detected_format = history.cycles(), history.logs(), ", ".join(formats)
+            if verbose:
+                print(
+                    f"Merged {len(input_files)} files: "
+                    f"{stats.cycles_updated + stats.cycles_unchanged} overlapping cycles, "
+                    f"{stats.logs_updated + stats.logs_unchanged} overlapping daily logs"
+                )
 
-    # Compute features for display
-    features = compute_cycle_features(cycles)
-    if "error" in features:
-        print(f"Error: {features['error']}")
+        if verbose:
+            if input_format == "auto":
+                print(f"Detected input format: {detected_format}")
+            print(f"Found {len(cycles)} cycles")
+            if logs:
+                print(f"Found {len(logs)} daily log entries")
+
+        # Validate data and compute features for display
+        features = validate_cycles(cycles)
+    except TrainingError as e:
+        print(f"Error: {e}")
         sys.exit(1)
 
     if verbose:
@@ -101,7 +180,7 @@ def train(
     if verbose:
         print(f"\nTraining model (type: {model_type})...")
 
-    predictor = CyclePredictor(model_type=model_type)
+    predictor = create_predictor(model_type)
     predictor.fit(cycles)
 
     # Get prediction
@@ -114,11 +193,16 @@ def train(
         if prediction.fertile_window_start:
             print(f"  Fertile window: {prediction.fertile_window_start} to {prediction.fertile_window_end}")
 
+    # Running statistics let later updates append a cycle without the history.
+    # Built before anything is written, so a failure leaves no partial output.
+    stats = IncrementalCycleStats.from_cycles(cycles)
+
     # Save model parameters
     if verbose:
         print(f"\nSaving model to {output_file}")
 
     predictor.save(output_file)
+    stats.save(stats_path_for(output_file))
 
     if verbose:
         print("\nDone! Import model_params.json into the FLux app.")
@@ -138,14 +222,22 @@ Examples:
 
   # Force weighted average model (if Prophet not installed)
   python -m ml.train --input data.json --output model_params.json --model weighted_average
+
+  # Fast Bayesian model without Prophet
+  python -m ml.train --input data.json --output model_params.json --model bayesian
+
+  # Merge a Flo export with later app exports (later files win conflicts)
+  python -m ml.train --input flo_export.json app_2024_06.json --output model_params.json
         """,
     )
 
     parser.add_argument(
         "--input", "-i",
         type=str,
+        nargs="+",
         required=True,
-        help="Path to input JSON file (Flo export or FLux app export)",
+        help="Path to input JSON file (Flo export or FLux app export); "
+        "several files are merged, oldest first",
     )
 
     parser.add_argument(
@@ -166,9 +258,9 @@ Examples:
     parser.add_argument(
         "--model", "-m",
         type=str,
-        choices=["prophet", "weighted_average", "auto"],
+        choices=MODEL_TYPES,
         default="auto",
-        help="Model type: 'prophet', 'weighted_average', or 'auto' (default: auto)",
+        help="Model type: 'prophet', 'weighted_average', 'bayesian', or 'auto' (default: auto)",
     )
 
     parser.add_argument(
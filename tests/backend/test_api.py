@@ -1,16 +1,41 @@
 """Tests for the API endpoints."""
 
+import base64
+import json
+from datetime import date
+
 import pytest
+from cryptography.fernet import Fernet
 from httpx import AsyncClient, ASGITransport
 
+from backend.api import routes
+from backend.api.dependencies import DEFAULT_USER_ID, get_cipher, get_cycle_store
+from backend.api.encoding import (
+    FRAME_CHANGE,
+    FRAME_END,
+    FRAME_RECORD,
+    FRAMES_MEDIA_TYPE,
+    decode_change,
+    iter_frames,
+)
 from backend.main import app
+from backend.services.encryption import FernetCipher
+from backend.services.storage import CycleStore
 
 
 @pytest.fixture
-async def client():
+async def client(tmp_path):
+    store = CycleStore(tmp_path / "flux.db", pool_size=2)
+    key = Fernet.generate_key()
+    app.dependency_overrides[get_cycle_store] = lambda: store
+    app.dependency_overrides[get_cipher] = lambda: FernetCipher(key)
+
     async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
         yield ac
 
+    app.dependency_overrides.clear()
+    await store.close()
+
 
 @pytest.mark.asyncio
 async def test_health_check(client):
@@ -26,6 +51,75 @@ async def test_get_cycles_empty(client):
     assert response.json() == {"cycles": []}
 
 
+@pytest.mark.asyncio
+async def test_add_and_get_cycles(client):
+    for start in ["2024-02-01", "2024-01-04", "2024-02-29"]:
+        response = await client.post("/api/v1/cycles", json={"start_date": start})
+        assert response.status_code == 200
+
+    response = await client.get("/api/v1/cycles")
+    assert [c["start_date"] for c in response.json()["cycles"]] == [
+        "2024-01-04", "2024-02-01", "2024-02-29"
+    ]
+
+    response = await client.get("/api/v1/cycles", params={"since": "2024-02-01"})
+    assert len(response.json()["cycles"]) == 2
+
+    other_user = await client.get("/api/v1/cycles", headers={"X-User-ID": "someone-else"})
+    assert other_user.json() == {"cycles": []}
+
+
+@pytest.mark.asyncio
+async def test_get_cycles_wrong_key(client):
+    await client.post("/api/v1/cycles", json={"start_date": "2024-01-04"})
+
+    app.dependency_overrides[get_cipher] = lambda: FernetCipher(Fernet.generate_key())
+    response = await client.get("/api/v1/cycles")
+    assert response.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_writes_require_the_users_key(client):
+    store = app.dependency_overrides[get_cycle_store]()
+    await client.post("/api/v1/cycles", json={"start_date": "2024-01-04"})
+
+    app.dependency_overrides[get_cipher] = lambda: FernetCipher(Fernet.generate_key())
+    files = {"file": ("export.json", b'{"operationalData": {}}', "application/json")}
+    for response in [
+        await client.post("/api/v1/cycles", json={"start_date": "2024-02-01"}),
+        await client.post("/api/v1/import/flo", files=files),
+        await client.post("/api/v1/retrain"),
+    ]:
+        assert response.status_code == 403
+    assert await store.count_cycles(DEFAULT_USER_ID) == 1
+
+    # Another user's first write sets their own key
+    response = await client.post(
+        "/api/v1/cycles", json={"start_date": "2024-02-01"}, headers={"X-User-ID": "bob"}
+    )
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_users_without_key_check_are_checked_against_their_first_record(client):
+    store = app.dependency_overrides[get_cycle_store]()
+    cipher = app.dependency_overrides[get_cipher]()
+    other = FernetCipher(Fernet.generate_key())
+    # Stored before key checks existed, the second row under a foreign key
+    await store.add_cycle(DEFAULT_USER_ID, date(2024, 2, 1), cipher.encrypt(b"{}"))
+    await store.add_cycle(DEFAULT_USER_ID, date(1900, 1, 1), other.encrypt(b"{}"))
+
+    app.dependency_overrides[get_cipher] = lambda: other
+    response = await client.post("/api/v1/cycles", json={"start_date": "2024-03-01"})
+    assert response.status_code == 403
+    assert await store.get_key_check(DEFAULT_USER_ID) is None
+
+    app.dependency_overrides[get_cipher] = lambda: cipher
+    response = await client.post("/api/v1/cycles", json={"start_date": "2024-03-01"})
+    assert response.status_code == 200
+    assert cipher.decrypt(await store.get_key_check(DEFAULT_USER_ID))
+
+
 @pytest.mark.asyncio
 async def test_predict_no_data(client):
     response = await client.get("/api/v1/predict")
@@ -33,3 +127,190 @@ async def test_predict_no_data(client):
     data = response.json()
     assert data["predicted_start"] is None
     assert data["confidence"] == 0.0
+
+
+@pytest.mark.asyncio
+async def test_prediction_cache_stats(client):
+    response = await client.get("/api/v1/predict/cache")
+    assert response.status_code == 200
+    assert {"hits", "misses", "entries"} <= response.json().keys()
+
+
+@pytest.mark.asyncio
+async def test_sync_pages_through_changes(client):
+    store = app.dependency_overrides[get_cycle_store]()
+    cipher = app.dependency_overrides[get_cipher]()
+    for start in ["2024-01-04", "2024-02-01", "2024-02-29"]:
+        await client.post("/api/v1/cycles", json={"start_date": start})
+    await store.add_logs("local", [(date(2024, 1, 5), cipher.encrypt(b"{}"))])
+
+    first = (await client.get("/api/v1/sync", params={"limit": 2})).json()
+    second = (await client.get("/api/v1/sync", params={"cursor": first["cursor"]})).json()
+
+    assert first["has_more"] is True and second["has_more"] is False
+    changes = first["changes"] + second["changes"]
+    assert [(c["kind"], c["date"]) for c in changes] == [
+        ("cycle", "2024-01-04"), ("cycle", "2024-02-01"), ("cycle", "2024-02-29"),
+        ("log", "2024-01-05"),
+    ]
+    payload = cipher.decrypt(base64.b64decode(changes[0]["payload"]))
+    assert json.loads(payload)["start_date"] == "2024-01-04"
+
+    other_user = await client.get("/api/v1/sync", headers={"X-User-ID": "someone-else"})
+    assert other_user.json() == {"changes": [], "cursor": 0, "has_more": False}
+
+
+@pytest.mark.asyncio
+async def test_sync_deletions_and_conditional_requests(client):
+    store = app.dependency_overrides[get_cycle_store]()
+    cycle_id = (await client.post("/api/v1/cycles", json={"start_date": "2024-01-04"})).json()["id"]
+    synced = await client.get("/api/v1/sync")
+    cursor, etag = synced.json()["cursor"], synced.headers["etag"]
+
+    unchanged = await client.get("/api/v1/sync", headers={"If-None-Match": etag})
+    assert unchanged.status_code == 304
+    assert unchanged.headers["etag"] == etag
+
+    await store.delete_cycles([cycle_id])
+    stale = await client.get("/api/v1/sync", headers={"If-None-Match": etag})
+    delta = await client.get("/api/v1/sync", params={"cursor": cursor})
+
+    assert stale.status_code == 200
+    # The insert is skipped now that its row is gone; only the deletion is left
+    assert [c["deleted"] for c in stale.json()["changes"]] == [True]
+    assert delta.json()["changes"] == [
+        {"seq": cursor + 1, "kind": "cycle", "id": cycle_id, "deleted": True,
+         "date": None, "payload": None},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_sync_requires_the_users_key(client):
+    await client.post("/api/v1/cycles", json={"start_date": "2024-01-04"})
+    etag = (await client.get("/api/v1/sync")).headers["etag"]
+
+    app.dependency_overrides[get_cipher] = lambda: FernetCipher(Fernet.generate_key())
+    for headers in [{}, {"Accept": FRAMES_MEDIA_TYPE}, {"If-None-Match": etag}]:
+        response = await client.get("/api/v1/sync", headers=headers)
+        assert response.status_code == 403
+        assert "etag" not in response.headers
+
+
+@pytest.mark.asyncio
+async def test_a_planted_record_does_not_open_another_users_sync(client):
+    alice = {"X-User-ID": "alice"}
+    key = app.dependency_overrides[get_cipher]()
+    await client.post("/api/v1/cycles", json={"start_date": "2024-01-04"}, headers=alice)
+
+    # A cycle dated 1900 would sort before all of alice's
+    app.dependency_overrides[get_cipher] = lambda: FernetCipher(Fernet.generate_key())
+    planted = await client.post("/api/v1/cycles", json={"start_date": "1900-01-01"}, headers=alice)
+    assert planted.status_code == 403
+    assert (await client.get("/api/v1/sync", headers=alice)).status_code == 403
+
+    app.dependency_overrides[get_cipher] = lambda: key
+    synced = await client.get("/api/v1/sync", headers=alice)
+    listed = await client.get("/api/v1/cycles", headers=alice)
+    assert [c["date"] for c in synced.json()["changes"]] == ["2024-01-04"]
+    assert [c["start_date"] for c in listed.json()["cycles"]] == ["2024-01-04"]
+
+
+@pytest.mark.asyncio
+async def test_sync_frames_match_json(client):
+    store = app.dependency_overrides[get_cycle_store]()
+    cipher = app.dependency_overrides[get_cipher]()
+    cycle_id = (await client.post("/api/v1/cycles", json={"start_date": "2024-01-04"})).json()["id"]
+    await client.post("/api/v1/cycles", json={"start_date": "2024-02-01"})
+    await store.add_logs("local", [(date(2024, 1, 5), cipher.encrypt(b"{}"))])
+    await store.delete_cycles([cycle_id])
+
+    as_json = await client.get("/api/v1/sync")
+    as_frames = await client.get("/api/v1/sync", headers={"Accept": FRAMES_MEDIA_TYPE})
+
+    assert as_frames.headers["content-type"] == FRAMES_MEDIA_TYPE
+    assert as_frames.headers["etag"] != as_json.headers["etag"]
+    frames = list(iter_frames(as_frames.content))
+    assert [frame_type for frame_type, _ in frames] == [FRAME_CHANGE] * 3 + [FRAME_END]
+    changes = [decode_change(body) for _, body in frames[:-1]]
+    expected = as_json.json()["changes"]
+    assert [(c["seq"], c["kind"], c["deleted"]) for c in changes] == [
+        (c["seq"], c["kind"], c["deleted"]) for c in expected
+    ]
+    assert changes[0]["payload"] == base64.b64decode(expected[0]["payload"])
+    assert changes[-1]["date"] is None and changes[-1]["payload"] is None
+    assert json.loads(frames[-1][1]) == {"cursor": as_json.json()["cursor"], "has_more": False}
+
+
+@pytest.mark.asyncio
+async def test_sync_frames_stream_in_pages(client, monkeypatch):
+    monkeypatch.setattr(routes, "SYNC_PAGE_SIZE", 2)
+    for day in range(1, 8):
+        await client.post("/api/v1/cycles", json={"start_date": f"2024-01-0{day}"})
+    headers = {"Accept": f"application/json;q=0.5, {FRAMES_MEDIA_TYPE}"}
+
+    first = list(iter_frames((await client.get(
+        "/api/v1/sync", params={"limit": 5}, headers=headers
+    )).content))
+    end = json.loads(first[-1][1])
+    rest = list(iter_frames((await client.get(
+        "/api/v1/sync", params={"cursor": end["cursor"]}, headers=headers
+    )).content))
+
+    assert end == {"cursor": 5, "has_more": True}
+    assert [decode_change(body)["date"].day for _, body in first[:-1] + rest[:-1]] == [
+        1, 2, 3, 4, 5, 6, 7,
+    ]
+    assert json.loads(rest[-1][1]) == {"cursor": 7, "has_more": False}
+
+
+@pytest.mark.asyncio
+async def test_get_cycles_as_frames(client, monkeypatch):
+    monkeypatch.setattr(routes, "STREAM_BATCH_SIZE", 2)
+    for start in ["2024-02-01", "2024-01-04", "2024-02-29"]:
+        await client.post("/api/v1/cycles", json={"start_date": start, "symptoms": ["cramps"]})
+
+    response = await client.get("/api/v1/cycles", headers={"Accept": FRAMES_MEDIA_TYPE})
+    frames = list(iter_frames(response.content))
+
+    assert [frame_type for frame_type, _ in frames] == [FRAME_RECORD] * 3 + [FRAME_END]
+    assert [json.loads(body)["start_date"] for _, body in frames[:-1]] == [
+        c["start_date"] for c in (await client.get("/api/v1/cycles")).json()["cycles"]
+    ]
+    assert json.loads(frames[-1][1]) == {"count": 3}
+    for accept in ["application/json", FRAMES_MEDIA_TYPE]:
+        response = await client.get("/api/v1/cycles", headers={"Accept": accept})
+        assert "accept" in [v.strip().lower() for v in response.headers["vary"].split(",")]
+
+    app.dependency_overrides[get_cipher] = lambda: FernetCipher(Fernet.generate_key())
+    response = await client.get("/api/v1/cycles", headers={"Accept": FRAMES_MEDIA_TYPE})
+    assert response.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_get_cycles_as_frames_rejects_a_bad_row_before_streaming(client, monkeypatch):
+    monkeypatch.setattr(routes, "STREAM_BATCH_SIZE", 2)
+    for start in ["2024-01-04", "2024-02-01", "2024-02-29"]:
+        await client.post("/api/v1/cycles", json={"start_date": start})
+    store = app.dependency_overrides[get_cycle_store]()
+    await store.add_cycle(DEFAULT_USER_ID, date(2024, 3, 28), b"not a token")
+
+    response = await client.get("/api/v1/cycles", headers={"Accept": FRAMES_MEDIA_TYPE})
+
+    assert response.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_large_responses_are_gzipped(client):
+    cycles = [{"start_date": f"2024-01-{day:02d}"} for day in range(1, 29)]
+    for cycle in cycles:
+        await client.post("/api/v1/cycles", json=cycle)
+
+    for accept in ["application/json", FRAMES_MEDIA_TYPE]:
+        response = await client.get(
+            "/api/v1/sync", headers={"Accept": accept, "Accept-Encoding": "gzip"}
+        )
+        assert response.headers["content-encoding"] == "gzip"
+        assert "Accept-Encoding" in response.headers["vary"]
+
+    small = await client.get("/health", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
@@ -0,0 +1,62 @@
+"""Tests for the binary frame encoding of bulk responses."""
+
+from datetime import date
+
+import pytest
+
+from backend.api.encoding import (
+    FRAME_CHANGE,
+    FRAME_END,
+    FRAME_RECORD,
+    FRAMES_MEDIA_TYPE,
+    decode_change,
+    encode_change,
+    encode_end,
+    encode_records,
+    iter_frames,
+    wants_frames,
+)
+from backend.api.schemas import CycleData
+from backend.services.storage import StoredChange
+
+
+def test_wants_frames():
+    assert wants_frames(FRAMES_MEDIA_TYPE)
+    assert wants_frames(f"application/json, {FRAMES_MEDIA_TYPE}")
+    assert wants_frames(f"{FRAMES_MEDIA_TYPE};q=0.9, application/json;q=0.5")
+    assert not wants_frames(None)
+    assert not wants_frames("*/*")
+    assert not wants_frames(f"{FRAMES_MEDIA_TYPE};q=0.5, application/json")
+    assert not wants_frames(f"{FRAMES_MEDIA_TYPE};q=0")
+
+
+def test_changes_round_trip():
+    changes = [
+        StoredChange(seq=7, kind="log", record_id=3, deleted=False, date=date(2024, 1, 5),
+                     payload=b"\x01" + bytes(range(256))),
+        StoredChange(seq=9, kind="cycle", record_id=12, deleted=True, date=None),
+    ]
+    data = b"".join(encode_change(change) for change in changes) + encode_end(cursor=9)
+
+    frames = list(iter_frames(data))
+
+    assert [frame_type for frame_type, _ in frames] == [FRAME_CHANGE, FRAME_CHANGE, FRAME_END]
+    assert decode_change(frames[0][1]) == {
+        "seq": 7, "kind": "log", "id": 3, "deleted": False, "date": date(2024, 1, 5),
+        "payload": b"\x01" + bytes(range(256)),
+    }
+    assert decode_change(frames[1][1]) == {
+        "seq": 9, "kind": "cycle", "id": 12, "deleted": True, "date": None, "payload": None,
+    }
+    assert frames[2][1] == b'{"cursor":9}'
+
+
+def test_records_and_truncation():
+    data = encode_records([CycleData(start_date=date(2024, 1, 4), symptoms=["cramps"])])
+
+    [(frame_type, body)] = iter_frames(data)
+
+    assert frame_type == FRAME_RECORD
+    assert CycleData.model_validate_json(body).symptoms == ["cramps"]
+    with pytest.raises(ValueError):
+        list(iter_frames(data[:-1]))
@@ -0,0 +1,166 @@
+"""Tests for the streaming Flo import."""
+
+import asyncio
+import json
+from datetime import date, timedelta
+
+import pytest
+from cryptography.fernet import Fernet
+from httpx import AsyncClient, ASGITransport
+
+from backend.api.dependencies import get_cipher, get_cycle_store, get_job_queue
+from backend.main import app
+from backend.services.encryption import FernetCipher
+from backend.services.importer import FloImportPipeline, ImportTooLarge
+from backend.services.jobs import JobQueue
+from backend.services.storage import CycleStore
+
+
+def gdpr_export(n_cycles: int = 3, padding: int = 0) -> bytes:
+    """A Flo GDPR export with point events for two days."""
+    start = date(2020, 1, 1)
+    cycles = [
+        {
+            "period_start_date": f"{start + timedelta(days=28 * i)} 00:00:00.0",
+            "period_end_date": f"{start + timedelta(days=28 * i + 4)} 00:00:00.0",
+        }
+        for i in range(n_cycles)
+    ]
+    export = {
+        "operationalData": {
+            "cycles": cycles,
+            "point_events_manual_v2": [
+                {"date": "2020-01-02 00:00:00.0", "category": "Symptom", "subcategory": "Acne"},
+                {"date": "2020-01-02 00:00:00.0", "category": "Mood", "subcategory": "Happy"},
+                {"date": "2020-01-09 00:00:00.0", "category": "Fluid", "subcategory": "Creamy"},
+            ],
+        },
+        "padding": "x" * padding,
+    }
+    return json.dumps(export).encode()
+
+
+async def chunked(data: bytes, size: int):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+@pytest.fixture
+async def store(tmp_path):
+    store = CycleStore(tmp_path / "flux.db", pool_size=1)
+    yield store
+    await store.close()
+
+
+@pytest.fixture
+def cipher():
+    return FernetCipher(Fernet.generate_key())
+
+
+@pytest.fixture
+async def client(store, cipher):
+    jobs = JobQueue(store)
+    app.dependency_overrides[get_cycle_store] = lambda: store
+    app.dependency_overrides[get_cipher] = lambda: cipher
+    app.dependency_overrides[get_job_queue] = lambda: jobs
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        yield ac
+    app.dependency_overrides.clear()
+    await jobs.close()
+
+
+async def wait_for_job(client: AsyncClient, job_id: str) -> dict:
+    for _ in range(200):
+        job = (await client.get(f"/api/v1/jobs/{job_id}")).json()
+        if job["status"] in ("succeeded", "failed"):
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+
+@pytest.mark.asyncio
+async def test_import_stores_cycles_and_logs(client, store):
+    files = {"file": ("flo.json", gdpr_export(padding=200_000), "application/json")}
+    response = await client.post("/api/v1/import/flo", files=files)
+    assert response.status_code == 202
+
+    job = await wait_for_job(client, response.json()["job_id"])
+
+    assert job["status"] == "succeeded"
+    assert job["result"]["cycles"] == 3
+    assert job["result"]["logs"] == 2
+    assert job["progress"]["stage"] == "done"
+    assert job["progress"]["bytes_read"] == job["progress"]["total_bytes"]
+    assert await store.count_logs("local") == 2
+
+    cycles = (await client.get("/api/v1/cycles")).json()["cycles"]
+    assert [c["start_date"] for c in cycles] == ["2020-01-01", "2020-01-29", "2020-02-26"]
+
+
+@pytest.mark.asyncio
+async def test_invalid_upload_fails_and_rolls_back(client, store):
+    truncated = gdpr_export(n_cycles=50)[:-40]
+    files = {"file": ("flo.json", truncated, "application/json")}
+    response = await client.post("/api/v1/import/flo", files=files)
+
+    job = await wait_for_job(client, response.json()["job_id"])
+
+    assert job["status"] == "failed"
+    assert job["error"]
+    assert await store.count_cycles("local") == 0
+
+    files = {"file": ("flo.csv", b"a,b", "text/csv")}
+    assert (await client.post("/api/v1/import/flo", files=files)).status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_jobs_are_private(client):
+    files = {"file": ("flo.json", gdpr_export(), "application/json")}
+    job_id = (await client.post("/api/v1/import/flo", files=files)).json()["job_id"]
+
+    response = await client.get(f"/api/v1/jobs/{job_id}", headers={"X-User-ID": "someone"})
+    assert response.status_code == 404
+    assert (await wait_for_job(client, job_id))["status"] == "succeeded"
+
+
+@pytest.mark.asyncio
+async def test_memory_cap(store, cipher):
+    pipeline = FloImportPipeline("user", cipher, store, memory_limit=100 * 1024, batch_size=10)
+
+    with pytest.raises(ImportTooLarge):
+        await pipeline.run(chunked(gdpr_export(n_cycles=1000), 4096))
+
+    assert await store.count_cycles("user") == 0
+
+
+@pytest.mark.asyncio
+async def test_backpressure_stops_reading(store, cipher):
+    """A blocked database should stop the pipeline from reading the upload."""
+    release = asyncio.Event()
+    add_cycles = store.add_cycles
+
+    async def slow_add_cycles(user_id, cycles):
+        await release.wait()
+        return await add_cycles(user_id, cycles)
+
+    store.add_cycles = slow_add_cycles
+    chunks_read = 0
+
+    async def upload():
+        nonlocal chunks_read
+        async for chunk in chunked(gdpr_export(n_cycles=200, padding=100_000), 1024):
+            chunks_read += 1
+            yield chunk
+
+    pipeline = FloImportPipeline("user", cipher, store, batch_size=10, max_pending_batches=2)
+    running = asyncio.create_task(pipeline.run(upload()))
+    await asyncio.sleep(0.2)
+
+    # Stuck right after the cycles array, far from the end of the upload
+    assert chunks_read < 30
+    assert pipeline._queue.qsize() <= 2
+
+    release.set()
+    result = await running
+    assert result.cycles == 200
+    assert chunks_read > 100
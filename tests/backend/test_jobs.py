@@ -0,0 +1,232 @@
+"""Tests for the background job queue."""
+
+import asyncio
+from datetime import date, timedelta
+
+import pytest
+from cryptography.fernet import Fernet
+from httpx import AsyncClient, ASGITransport
+
+from backend.api.dependencies import get_cipher, get_cycle_store, get_job_queue
+from backend.main import app
+from backend.services.encryption import FernetCipher
+from backend.services.jobs import JobQueue, UnknownJobType
+from backend.services.retrain import shutdown_fit_executor
+from backend.services.storage import CycleStore
+
+
+@pytest.fixture
+async def store(tmp_path):
+    store = CycleStore(tmp_path / "flux.db", pool_size=1)
+    yield store
+    await store.close()
+
+
+@pytest.fixture
+async def jobs(store):
+    queue = JobQueue(store, limits={"import": 2, "retrain": 1}, progress_interval=0)
+    yield queue
+    await queue.close()
+
+
+async def wait_for(queue: JobQueue, job_id: str) -> str:
+    for _ in range(500):
+        job = await queue.get(job_id)
+        if job.status in ("succeeded", "failed"):
+            return job.status
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+
+class TestJobQueue:
+    @pytest.mark.asyncio
+    async def test_per_type_concurrency_limits(self, jobs):
+        release = asyncio.Event()
+        running = {"import": 0, "retrain": 0}
+        peak = {"import": 0, "retrain": 0}
+
+        def job(job_type: str):
+            async def run(report):
+                running[job_type] += 1
+                peak[job_type] = max(peak[job_type], running[job_type])
+                await release.wait()
+                running[job_type] -= 1
+                return {}
+            return run
+
+        ids = [await jobs.submit("retrain", "user", job("retrain")) for _ in range(4)]
+        ids += [await jobs.submit("import", "user", job("import")) for _ in range(4)]
+        await asyncio.sleep(0.1)
+
+        # Queued retrains do not hold back imports
+        assert running == {"import": 2, "retrain": 1}
+        assert jobs.stats()["retrain"] == {"limit": 1, "running": 1, "queued": 3}
+
+        release.set()
+        assert [await wait_for(jobs, job_id) for job_id in ids] == ["succeeded"] * 8
+        assert peak == {"import": 2, "retrain": 1}
+
+    @pytest.mark.asyncio
+    async def test_result_progress_and_errors_persisted(self, jobs, store):
+        async def ok(report):
+            report({"done": 1})
+            report({"done": 2})
+            return {"answer": 42}
+
+        async def broken(report):
+            raise RuntimeError("boom")
+
+        ok_id = await jobs.submit("import", "user", ok)
+        broken_id = await jobs.submit("import", "user", broken)
+        await wait_for(jobs, ok_id)
+        await wait_for(jobs, broken_id)
+
+        # A fresh queue reads everything back from the table
+        other = JobQueue(store)
+        job = await other.get(ok_id)
+        assert job.result == {"answer": 42}
+        assert job.progress == {"done": 2}
+        assert job.started_at <= job.finished_at
+        failed = await other.get(broken_id)
+        assert failed.status == "failed"
+        assert failed.error == "RuntimeError: boom"
+
+        assert await other.get(ok_id, user_id="someone-else") is None
+
+    @pytest.mark.asyncio
+    async def test_recover_fails_interrupted_jobs(self, store):
+        await store.create_job("old", "user", "import", "running")
+
+        await JobQueue(store).recover()
+
+        job = await JobQueue(store).get("old")
+        assert job.status == "failed"
+        assert "restart" in job.error
+
+    @pytest.mark.asyncio
+    async def test_cleanup_runs_for_finished_cancelled_and_dropped_jobs(self, store):
+        queue = JobQueue(store, limits={"import": 1})
+        cleaned = []
+
+        async def quick(report):
+            return {}
+
+        async def blocked(report):
+            await asyncio.Event().wait()
+
+        first = await queue.submit("import", "user", quick, cleanup=lambda: cleaned.append("quick"))
+        assert await wait_for(queue, first) == "succeeded"
+        await queue.submit("import", "user", blocked, cleanup=lambda: cleaned.append("running"))
+        await queue.submit("import", "user", quick, cleanup=lambda: cleaned.append("queued"))
+        await asyncio.sleep(0.05)
+
+        await queue.close()
+
+        assert cleaned == ["quick", "running", "queued"]
+
+    @pytest.mark.asyncio
+    async def test_unknown_job_type(self, jobs):
+        async def run(report):
+            return {}
+
+        with pytest.raises(UnknownJobType):
+            await jobs.submit("export", "user", run)
+
+
+class TestRetrainApi:
+    @pytest.fixture
+    async def client(self, store, jobs):
+        cipher = FernetCipher(Fernet.generate_key())
+        app.dependency_overrides[get_cycle_store] = lambda: store
+        app.dependency_overrides[get_cipher] = lambda: cipher
+        app.dependency_overrides[get_job_queue] = lambda: jobs
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+            yield ac
+        app.dependency_overrides.clear()
+        shutdown_fit_executor()
+
+    @pytest.mark.asyncio
+    async def test_retrain(self, client, store, jobs):
+        start = date(2024, 1, 1)
+        for length in [28, 29, 27, 28, 30, 28]:
+            start += timedelta(days=length)
+            await client.post("/api/v1/cycles", json={"start_date": start.isoformat()})
+
+        response = await client.post("/api/v1/retrain", params={"model": "weighted_average"})
+        assert response.status_code == 202
+        job_id = response.json()["job_id"]
+
+        assert await wait_for(jobs, job_id) == "succeeded"
+        job = (await client.get(f"/api/v1/jobs/{job_id}")).json()
+        assert job["result"]["model_type"] == "weighted_average"
+        assert job["result"]["cycles_trained"] == 6
+        assert await store.get_model_params("local") is not None
+
+    @pytest.mark.asyncio
+    async def test_retrain_publishes_to_model_store(self, client, jobs, tmp_path):
+        from backend.api.routes import prediction_service
+
+        start = date(2024, 1, 1)
+        for length in [28, 29, 27, 28, 30, 28]:
+            start += timedelta(days=length)
+            await client.post("/api/v1/cycles", json={"start_date": start.isoformat()})
+        baseline = (await client.get("/api/v1/predict")).json()
+        assert baseline["cycle_length_avg"] == 28
+
+        prediction_service.load_model(tmp_path / "models.bin")
+        try:
+            response = await client.post("/api/v1/retrain", params={"model": "bayesian"})
+            job_id = response.json()["job_id"]
+            assert await wait_for(jobs, job_id) == "succeeded"
+            job = (await client.get(f"/api/v1/jobs/{job_id}")).json()
+            assert job["result"]["model_version"] == 1
+
+            params = prediction_service.model.get("local")
+            prediction = (await client.get("/api/v1/predict")).json()
+            assert prediction["predicted_start"] == params.prediction.next_period_date.isoformat()
+            assert prediction["cycle_length_avg"] == params.prediction.expected_cycle_length
+            stats = (await client.get("/api/v1/predict/models")).json()
+            assert stats["enabled"] and stats["users"] == 1
+        finally:
+            prediction_service.model = None
+
+    @pytest.mark.asyncio
+    async def test_model_store_needs_key_and_current_cycles(self, client, jobs, tmp_path):
+        from backend.api.routes import prediction_service
+
+        start = date(2024, 1, 1)
+        for length in [28, 29, 27, 28, 30, 28]:
+            start += timedelta(days=length)
+            await client.post("/api/v1/cycles", json={"start_date": start.isoformat()})
+
+        prediction_service.load_model(tmp_path / "models.bin")
+        try:
+            response = await client.post("/api/v1/retrain", params={"model": "bayesian"})
+            assert await wait_for(jobs, response.json()["job_id"]) == "succeeded"
+            params = prediction_service.model.get("local")
+            served = (await client.get("/api/v1/predict")).json()
+            assert served["predicted_start"] == params.prediction.next_period_date.isoformat()
+
+            # Someone else's key learns nothing from the model store
+            key = app.dependency_overrides[get_cipher]
+            app.dependency_overrides[get_cipher] = lambda: FernetCipher(Fernet.generate_key())
+            assert (await client.get("/api/v1/predict")).status_code == 403
+            app.dependency_overrides[get_cipher] = key
+
+            # A newly logged period retires the model until the next retrain
+            start += timedelta(days=40)
+            await client.post("/api/v1/cycles", json={"start_date": start.isoformat()})
+            prediction = (await client.get("/api/v1/predict")).json()
+            assert prediction["predicted_start"] == (start + timedelta(days=28)).isoformat()
+        finally:
+            prediction_service.model = None
+
+    @pytest.mark.asyncio
+    async def test_retrain_too_few_cycles(self, client, jobs):
+        await client.post("/api/v1/cycles", json={"start_date": "2024-01-01"})
+
+        job_id = (await client.post("/api/v1/retrain")).json()["job_id"]
+
+        assert await wait_for(jobs, job_id) == "failed"
+        job = (await client.get(f"/api/v1/jobs/{job_id}")).json()
+        assert "Need at least 3 cycles" in job["error"]
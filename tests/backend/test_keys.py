@@ -0,0 +1,210 @@
+"""Tests for key derivation and session keys."""
+
+import asyncio
+import base64
+import hashlib
+import threading
+import time
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from backend.api.dependencies import get_cycle_store, get_key_manager
+from backend.main import app
+from backend.services.keys import InvalidCredentials, KeyManager, KeyVault
+from backend.services.storage import CycleStore
+
+
+def fast_derive(password: str, salt: bytes) -> bytes:
+    """Cheap stand-in for the 480k-iteration KDF."""
+    return base64.urlsafe_b64encode(hashlib.pbkdf2_hmac("sha256", password.encode(), salt, 10))
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+async def store(tmp_path):
+    store = CycleStore(tmp_path / "flux.db", pool_size=1)
+    yield store
+    await store.close()
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def keys(clock):
+    manager = KeyManager(max_workers=2, ttl_seconds=60, max_sessions=3, clock=clock,
+                         derive=fast_derive)
+    yield manager
+    manager.close()
+
+
+class TestKeyManager:
+    @pytest.mark.asyncio
+    async def test_login_derives_once_per_session(self, keys, store):
+        session = await keys.login("user", "hunter2", store)
+
+        user_id, key = keys.session_key(session.token)
+        assert user_id == "user"
+        for _ in range(10):
+            assert keys.session_key(session.token) == ("user", key)
+        assert keys.stats()["derivations"] == 1
+
+        # Same password, same salt: the same key on the next login
+        again = await keys.login("user", "hunter2", store)
+        assert keys.session_key(again.token)[1] == key
+
+    @pytest.mark.asyncio
+    async def test_wrong_password_rejected(self, keys, store):
+        await keys.login("user", "hunter2", store)
+
+        with pytest.raises(InvalidCredentials):
+            await keys.login("user", "wrong", store)
+
+    @pytest.mark.asyncio
+    async def test_change_password_keeps_data_key(self, keys, store):
+        session = await keys.login("user", "hunter2", store)
+        _, data_key = keys.session_key(session.token)
+
+        await keys.change_password("user", "hunter2", "correct horse", store)
+
+        again = await keys.login("user", "correct horse", store)
+        assert keys.session_key(again.token)[1] == data_key
+        with pytest.raises(InvalidCredentials):
+            await keys.login("user", "hunter2", store)
+        with pytest.raises(InvalidCredentials):
+            await keys.change_password("user", "hunter2", "other", store)
+
+    @pytest.mark.asyncio
+    async def test_sessions_expire_when_idle(self, keys, store, clock):
+        session = await keys.login("user", "hunter2", store)
+
+        clock.now = 50
+        assert keys.session_key(session.token) is not None
+        clock.now = 100  # Use at 50 extended expiry to 110
+        assert keys.session_key(session.token) is not None
+        clock.now = 200
+        assert keys.session_key(session.token) is None
+
+    @pytest.mark.asyncio
+    async def test_least_recently_used_session_evicted(self, keys, store):
+        tokens = [(await keys.login(f"user{i}", "pw", store)).token for i in range(4)]
+
+        assert keys.session_key(tokens[0]) is None
+        assert all(keys.session_key(token) for token in tokens[1:])
+
+    @pytest.mark.asyncio
+    async def test_logout_wipes_key(self, keys, store):
+        session = await keys.login("user", "hunter2", store)
+
+        assert keys.logout(session.token)
+        assert keys.session_key(session.token) is None
+        assert not keys.logout(session.token)
+
+    @pytest.mark.asyncio
+    async def test_derivation_does_not_block_event_loop(self):
+        """The loop keeps ticking while derivations run on the pool."""
+        def slow_derive(password: str, salt: bytes) -> bytes:
+            time.sleep(0.2)
+            return fast_derive(password, salt)
+
+        manager = KeyManager(max_workers=2, derive=slow_derive)
+        ticks = 0
+        done = threading.Event()
+
+        async def ticker():
+            nonlocal ticks
+            while not done.is_set():
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        async def derive_all():
+            await asyncio.gather(*(manager.derive_key("pw", b"salt") for _ in range(4)))
+            done.set()
+
+        await asyncio.gather(ticker(), derive_all())
+        manager.close()
+
+        assert ticks >= 20
+
+
+class TestKeyVault:
+    def test_release_zeroes_and_reuses_slot(self):
+        vault = KeyVault(capacity=2)
+        slot = vault.store(b"k" * 44)
+        assert vault.load(slot) == b"k" * 44
+
+        vault.release(slot)
+        assert vault.load(slot) == b""
+        assert vault.store(b"other") == slot
+        vault.close()
+
+    def test_full_vault(self):
+        vault = KeyVault(capacity=1)
+        vault.store(b"a")
+        with pytest.raises(MemoryError):
+            vault.store(b"b")
+        vault.close()
+
+
+class TestSessionApi:
+    @pytest.fixture
+    async def client(self, keys, store):
+        app.dependency_overrides[get_cycle_store] = lambda: store
+        app.dependency_overrides[get_key_manager] = lambda: keys
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+            yield ac
+        app.dependency_overrides.clear()
+
+    @pytest.mark.asyncio
+    async def test_session_round_trip(self, client):
+        headers = {"X-User-ID": "alice"}
+        response = await client.post("/api/v1/session", json={"password": "pw"}, headers=headers)
+        assert response.status_code == 200
+        headers["Authorization"] = f"Bearer {response.json()['token']}"
+
+        await client.post("/api/v1/cycles", json={"start_date": "2024-01-04"}, headers=headers)
+        response = await client.get("/api/v1/cycles", headers=headers)
+        assert [c["start_date"] for c in response.json()["cycles"]] == ["2024-01-04"]
+
+        response = await client.put(
+            "/api/v1/session/password",
+            json={"old_password": "pw", "new_password": "pw2"},
+            headers={"X-User-ID": "alice"},
+        )
+        assert response.status_code == 200
+        response = await client.post(
+            "/api/v1/session", json={"password": "pw2"}, headers={"X-User-ID": "alice"}
+        )
+        relogin = {"X-User-ID": "alice", "Authorization": f"Bearer {response.json()['token']}"}
+        response = await client.get("/api/v1/cycles", headers=relogin)
+        assert [c["start_date"] for c in response.json()["cycles"]] == ["2024-01-04"]
+
+        assert (await client.delete("/api/v1/session", headers=headers)).status_code == 200
+        assert (await client.get("/api/v1/cycles", headers=headers)).status_code == 401
+
+    @pytest.mark.asyncio
+    async def test_wrong_password_and_foreign_token(self, client):
+        response = await client.post(
+            "/api/v1/session", json={"password": "pw"}, headers={"X-User-ID": "alice"}
+        )
+        token = response.json()["token"]
+
+        response = await client.post(
+            "/api/v1/session", json={"password": "nope"}, headers={"X-User-ID": "alice"}
+        )
+        assert response.status_code == 401
+
+        response = await client.get(
+            "/api/v1/cycles", headers={"X-User-ID": "bob", "Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 401
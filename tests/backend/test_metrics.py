@@ -0,0 +1,125 @@
+"""Tests for request metrics, stage timings and the sampling profiler."""
+
+import time
+
+import pytest
+from cryptography.fernet import Fernet
+from httpx import ASGITransport, AsyncClient
+
+from backend import main
+from backend.api.dependencies import get_cipher, get_cycle_store
+from backend.main import app
+from backend.services.encryption import FernetCipher
+from backend.services.metrics import MetricsRegistry, SamplingProfiler, metrics
+from backend.services.storage import CycleStore
+
+
+@pytest.fixture
+async def client(tmp_path):
+    store = CycleStore(tmp_path / "flux.db", pool_size=2)
+    key = Fernet.generate_key()
+    app.dependency_overrides[get_cycle_store] = lambda: store
+    app.dependency_overrides[get_cipher] = lambda: FernetCipher(key)
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        yield ac
+
+    app.dependency_overrides.clear()
+    await store.close()
+
+
+def sample_value(text: str, line_start: str) -> float:
+    for line in text.splitlines():
+        if line.startswith(line_start):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+class TestMetricsRegistry:
+    def test_histogram_rendering(self):
+        registry = MetricsRegistry()
+        registry.observe_request("GET", "/api/v1/jobs/{job_id}", 200, 0.003)
+        registry.observe_request("GET", "/api/v1/jobs/{job_id}", 404, 20.0)
+        with registry.stage("encrypt", items=3):
+            pass
+        registry.add_collector("jobs", lambda: {"import": {"running": 1, "limit": 2}})
+
+        text = registry.render()
+
+        labels = 'method="GET",route="/api/v1/jobs/{job_id}",status="2xx"'
+        assert f'flux_http_request_duration_seconds_bucket{{{labels},le="0.0025"}} 0' in text
+        assert f'flux_http_request_duration_seconds_bucket{{{labels},le="0.005"}} 1' in text
+        assert f'flux_http_request_duration_seconds_count{{{labels}}} 1' in text
+        assert 'status="4xx",le="+Inf"} 1' in text
+        assert 'flux_stage_duration_seconds_count{stage="encrypt"} 1' in text
+        assert 'flux_stage_items_total{stage="encrypt"} 3' in text
+        assert "flux_jobs_import_running 1" in text
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_records_routes_and_stages(client):
+    before = metrics.render()
+
+    await client.post("/api/v1/cycles", json={"start_date": "2024-01-05"})
+    await client.get("/api/v1/cycles")
+    await client.get("/api/v1/jobs/does-not-exist")
+    await client.get("/no/such/route")
+    response = await client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    for prefix, increase in [
+        ('flux_http_request_duration_seconds_count{method="POST",route="/api/v1/cycles",status="2xx"', 1),
+        ('flux_http_request_duration_seconds_count{method="GET",route="/api/v1/jobs/{job_id}",status="4xx"', 1),
+        ('flux_http_request_duration_seconds_count{method="GET",route="unmatched",status="4xx"', 1),
+        # The first write also encrypts the user's key check, which the
+        # write then decrypts
+        ('flux_stage_duration_seconds_count{stage="encrypt"}', 2),
+        ('flux_stage_duration_seconds_count{stage="decrypt"}', 2),
+    ]:
+        assert sample_value(text, prefix) - sample_value(before, prefix) == increase, prefix
+    assert "does-not-exist" not in text
+    # The /metrics request itself is still in flight while rendering
+    assert "flux_http_requests_in_flight 1" in text
+    assert "flux_prediction_cache_hits" in text
+
+
+@pytest.mark.asyncio
+async def test_profiler_endpoints_are_off_by_default(client):
+    response = await client.post("/debug/profiler/start")
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_profiler_endpoints(client, monkeypatch):
+    monkeypatch.setattr(main, "PROFILER_ENABLED", True)
+
+    started = await client.post("/debug/profiler/start", params={"interval": 0.001})
+    assert started.json()["running"] is True
+    time.sleep(0.05)
+    stopped = await client.post("/debug/profiler/stop")
+    stacks = await client.get("/debug/profiler", params={"reset": True})
+
+    assert stopped.json()["running"] is False
+    assert stopped.json()["samples"] > 0
+    assert "test_profiler_endpoints" in stacks.text
+    assert (await client.get("/debug/profiler")).text == ""
+
+
+def test_sampling_profiler_counts_busy_stacks():
+    profiler = SamplingProfiler(interval=0.001)
+
+    def busy_loop_for_profiler():
+        deadline = time.perf_counter() + 0.1
+        while time.perf_counter() < deadline:
+            pass
+
+    profiler.start()
+    busy_loop_for_profiler()
+    profiler.stop()
+
+    busy = [line for line in profiler.collapsed().splitlines() if "busy_loop_for_profiler" in line]
+    assert len(busy) == 1  # One stack: frames are keyed by function, not line
+    assert int(busy[0].rsplit(" ", 1)[1]) > 10
+    assert not profiler.running
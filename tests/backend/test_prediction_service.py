@@ -0,0 +1,98 @@
+"""Tests for the prediction service."""
+
+from datetime import date, timedelta
+
+from backend.api.schemas import CycleData
+from backend.services.prediction import PredictionCache, PredictionService
+
+
+def make_cycles(n: int, length: int = 28) -> list[CycleData]:
+    start = date(2024, 1, 1)
+    return [CycleData(start_date=start + timedelta(days=length * i)) for i in range(n)]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestPredictionCache:
+    def test_repeat_prediction_is_cached(self):
+        service = PredictionService()
+        cycles = make_cycles(6)
+
+        first = service.predict(cycles, user_id="alice")
+        second = service.predict(list(reversed(cycles)), user_id="alice")
+
+        assert second is first
+        assert service.cache.stats()["hits"] == 1
+        assert service.cache.stats()["misses"] == 1
+
+    def test_changed_cycles_miss(self):
+        service = PredictionService()
+        service.predict(make_cycles(6), user_id="alice")
+
+        result = service.predict(make_cycles(7), user_id="alice")
+
+        assert result.predicted_start == date(2024, 1, 1) + timedelta(days=28 * 7)
+        assert service.cache.stats()["hits"] == 0
+
+    def test_invalidate(self):
+        service = PredictionService()
+        cycles = make_cycles(6)
+        service.predict(cycles, user_id="alice")
+
+        service.invalidate("alice")
+        service.predict(cycles, user_id="alice")
+
+        stats = service.cache.stats()
+        assert stats["invalidations"] == 1
+        assert stats["misses"] == 2
+
+    def test_ttl_expiry(self):
+        clock = FakeClock()
+        service = PredictionService(cache=PredictionCache(ttl_seconds=60, clock=clock))
+        cycles = make_cycles(6)
+        service.predict(cycles, user_id="alice")
+
+        clock.now = 61
+        service.predict(cycles, user_id="alice")
+
+        assert service.cache.stats()["hits"] == 0
+
+    def test_lru_bound(self):
+        service = PredictionService(cache=PredictionCache(max_entries=2))
+        cycles = make_cycles(6)
+        service.predict(cycles, user_id="alice")
+        service.predict(cycles, user_id="bob")
+        service.predict(cycles, user_id="alice")
+        service.predict(cycles, user_id="carol")
+
+        stats = service.cache.stats()
+        assert stats["entries"] == 2
+        assert stats["evictions"] == 1
+        # bob was least recently used
+        assert service.cache.get("bob", "anything") is None
+
+
+class TestPredictFromStats:
+    def test_matches_full_history_prediction(self):
+        service = PredictionService()
+        starts = [date(2024, 1, 1)]
+        for length in [28, 31, 26, 29, 40, 27, 30]:
+            starts.append(starts[-1] + timedelta(days=length))
+        cycles = [CycleData(start_date=s) for s in starts]
+
+        stats = service.new_stats()
+        for cycle in cycles:
+            stats.update(cycle)
+
+        assert service.predict_from_stats(stats) == service.predict(cycles)
+
+    def test_empty_stats(self):
+        service = PredictionService()
+
+        assert service.predict_from_stats(service.new_stats()) == service.predict([])
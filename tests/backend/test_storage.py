@@ -0,0 +1,162 @@
+"""Tests for the async cycle store."""
+
+import asyncio
+import sqlite3
+from datetime import date, timedelta
+
+import pytest
+
+from backend.services.storage import CycleStore, load_local_key
+
+
+@pytest.fixture
+async def store(tmp_path):
+    store = CycleStore(tmp_path / "flux.db", pool_size=2)
+    yield store
+    await store.close()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_writes_are_batched(store):
+    """Concurrent inserts should all land, with ids matching their payloads."""
+    start = date(2020, 1, 1)
+
+    async def add(i: int) -> tuple[int, int]:
+        cycle_id = await store.add_cycle(f"user{i % 5}", start + timedelta(days=i), b"%d" % i)
+        return i, cycle_id
+
+    results = await asyncio.gather(*(add(i) for i in range(200)))
+
+    assert len({cycle_id for _, cycle_id in results}) == 200
+    for user in range(5):
+        stored = await store.get_cycles(f"user{user}")
+        assert len(stored) == 40
+        assert [c.start_date for c in stored] == sorted(c.start_date for c in stored)
+        assert all(int(c.payload) % 5 == user for c in stored)
+
+
+@pytest.mark.asyncio
+async def test_date_range_lookup(store):
+    starts = [date(2024, month, 1) for month in range(1, 13)]
+    await store.add_cycles("user", [(start, b"x") for start in reversed(starts)])
+
+    stored = await store.get_cycles("user", since=date(2024, 3, 1), until=date(2024, 5, 1))
+
+    assert [c.start_date for c in stored] == starts[2:5]
+    assert await store.count_cycles("user") == 12
+
+
+@pytest.mark.asyncio
+async def test_lookup_uses_index(store):
+    await store.open()
+
+    plan = await store._read(
+        "EXPLAIN QUERY PLAN SELECT payload FROM cycles WHERE user_id = ? AND start_date >= ?",
+        ["user", "2024-01-01"],
+    )
+
+    assert "idx_cycles_user_start" in " ".join(str(row) for row in plan)
+
+
+@pytest.mark.asyncio
+async def test_close_flushes_and_reopens(tmp_path):
+    store = CycleStore(tmp_path / "flux.db")
+    await store.add_cycle("user", date(2024, 1, 1), b"x")
+    await store.close()
+
+    reopened = CycleStore(tmp_path / "flux.db")
+    assert await reopened.count_cycles("user") == 1
+    await reopened.close()
+
+
+def test_local_key_is_created_once(tmp_path):
+    path = tmp_path / "keys" / "flux.key"
+
+    key = load_local_key(path)
+
+    assert load_local_key(path) == key
+    assert path.stat().st_mode & 0o777 == 0o600
+
+
+@pytest.mark.asyncio
+async def test_change_log_backfills_existing_rows(tmp_path):
+    """Rows from before the change log existed are the first changes, by date."""
+    path = tmp_path / "flux.db"
+    conn = sqlite3.connect(path)
+    conn.executescript(
+        "CREATE TABLE cycles (id INTEGER PRIMARY KEY, user_id TEXT NOT NULL, "
+        "start_date TEXT NOT NULL, payload BLOB NOT NULL, created_at REAL NOT NULL);"
+        "INSERT INTO cycles VALUES (1, 'user', '2024-02-01', x'02', 0);"
+        "INSERT INTO cycles VALUES (2, 'user', '2024-01-04', x'01', 0);"
+    )
+    conn.close()
+
+    store = CycleStore(path, pool_size=1)
+    try:
+        await store.open()
+        await store.add_logs("user", [(date(2024, 1, 5), b"log")])
+        await store.delete_cycles([1])
+
+        changes = await store.get_changes("user")
+        after = await store.get_changes("user", after=changes[1].seq, limit=1)
+    finally:
+        await store.close()
+
+    assert [(c.kind, c.record_id, c.deleted) for c in changes] == [
+        ("cycle", 2, False), ("cycle", 1, False), ("log", 1, False), ("cycle", 1, True),
+    ]
+    assert changes[0].payload == b"\x01" and changes[1].payload is None
+    assert [c.seq for c in after] == [changes[2].seq]
+    assert await store.latest_change("user") == changes[-1].seq
+    assert await store.latest_change("nobody") == 0
+
+
+@pytest.mark.asyncio
+async def test_model_state_tracks_cycle_changes(tmp_path):
+    path = tmp_path / "flux.db"
+    conn = sqlite3.connect(path)
+    # Params stored before trained_seq existed
+    conn.executescript(
+        "CREATE TABLE model_params (user_id TEXT PRIMARY KEY, payload BLOB NOT NULL, "
+        "trained_at REAL NOT NULL);"
+        "INSERT INTO model_params VALUES ('old', x'01', 0);"
+    )
+    conn.close()
+
+    store = CycleStore(path, pool_size=1)
+    try:
+        [cycle_id] = await store.add_cycles("user", [(date(2024, 1, 4), b"cycle")])
+        await store.add_cycle("old", date(2024, 1, 4), b"cycle")
+        await store.put_model_params("user", b"params", await store.latest_change("user"))
+        current = await store.get_model_state("user")
+        await store.add_logs("user", [(date(2024, 1, 5), b"log")])
+        after_log = await store.get_model_state("user")
+        await store.delete_cycles([cycle_id])
+        after_delete = await store.get_model_state("user")
+        old = await store.get_model_state("old")
+        missing = await store.get_model_state("nobody")
+    finally:
+        await store.close()
+
+    assert current == (b"params", False)
+    assert after_log == (b"params", False)
+    assert after_delete == (b"params", True)
+    assert old == (b"\x01", True)
+    assert missing is None
+
+
+@pytest.mark.asyncio
+async def test_key_check_and_first_payload(store):
+    assert await store.get_first_payload("user") is None
+    first = await store.add_cycle("user", date(2024, 2, 1), b"first")
+    await store.add_logs("user", [(date(2024, 1, 1), b"log")])
+    await store.add_cycle("user", date(1900, 1, 1), b"planted")
+    assert await store.get_first_payload("user") == b"first"
+
+    await store.delete_cycles([first])
+    assert await store.get_first_payload("user") == b"log"
+
+    assert await store.set_key_check("user", b"check") == b"check"
+    # A second first write keeps the check that won
+    assert await store.set_key_check("user", b"other") == b"check"
+    assert await store.get_key_check("other-user") is None
@@ -1,8 +1,9 @@
 """Tests for the encryption service."""
 
 import pytest
+from cryptography.fernet import Fernet, InvalidToken
 
-from backend.services.encryption import EncryptionService
+from backend.services.encryption import EncryptionService, EnvelopeCipher, FernetCipher
 
 
 class TestEncryptionService:
@@ -46,3 +47,52 @@ class TestEncryptionService:
 
         with pytest.raises(Exception):
             EncryptionService.decrypt(encrypted, key2)
+
+
+class TestBulkEncryption:
+    def test_encrypt_many_round_trip(self):
+        key = Fernet.generate_key()
+        records = [f"log {i}".encode() for i in range(100)]
+
+        encrypted = EncryptionService.encrypt_many(records, key)
+
+        assert EncryptionService.decrypt_many(encrypted, key) == records
+        assert FernetCipher(key).decrypt_many(encrypted) == records
+        assert EncryptionService.decrypt(encrypted[7], key) == records[7]
+
+    def test_envelope_round_trip(self):
+        cipher = EnvelopeCipher(EncryptionService.generate_data_key())
+        records = [f"log {i}".encode() for i in range(100)] + [b""]
+
+        encrypted = cipher.encrypt_many(records)
+
+        assert len(set(encrypted)) == len(records)
+        assert cipher.decrypt_many(encrypted) == records
+        assert cipher.decrypt(cipher.encrypt(b"one")) == b"one"
+
+    def test_envelope_rejects_tampering_and_wrong_key(self):
+        cipher = EnvelopeCipher(EncryptionService.generate_data_key())
+        record = cipher.encrypt(b"secret data")
+
+        with pytest.raises(InvalidToken):
+            cipher.decrypt(record[:-1] + bytes([record[-1] ^ 1]))
+        with pytest.raises(InvalidToken):
+            EnvelopeCipher(EncryptionService.generate_data_key()).decrypt(record)
+        with pytest.raises(InvalidToken):
+            cipher.decrypt(Fernet(Fernet.generate_key()).encrypt(b"fernet"))
+
+    def test_rewrap_keeps_records_readable(self):
+        """Changing the wrapping key must not require re-encrypting records."""
+        data_key = EncryptionService.generate_data_key()
+        old_key, new_key = Fernet.generate_key(), Fernet.generate_key()
+        records = EnvelopeCipher(data_key).encrypt_many([b"a", b"b"])
+
+        wrapped = EncryptionService.wrap_data_key(data_key, old_key)
+        rewrapped = EncryptionService.wrap_data_key(
+            EncryptionService.unwrap_data_key(wrapped, old_key), new_key
+        )
+
+        unwrapped = EncryptionService.unwrap_data_key(rewrapped, new_key)
+        assert EnvelopeCipher(unwrapped).decrypt_many(records) == [b"a", b"b"]
+        with pytest.raises(InvalidToken):
+            EncryptionService.unwrap_data_key(rewrapped, old_key)
@@ -0,0 +1,281 @@
+"""Tests for the Flo export parser."""
+
+import io
+import json
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+from ml.models.schemas import Cycle, DailyLog
+from ml.preprocessing.date_parsing import DateParser, parse_iso_fast
+from ml.preprocessing.flo_parser import (
+    FloParser,
+    PointEventAccumulator,
+    load_any_export,
+    parse_app_export,
+    parse_flo_export,
+    sniff_export_format,
+    to_snake_case,
+    validate_records,
+)
+from ml.preprocessing.json_stream import iter_json_events
+
+SAMPLE_EXPORT = Path(__file__).parent.parent.parent / "data" / "test" / "sample_flo_export.json"
+
+
+def write_gdpr_export(path: Path) -> Path:
+    """Write a small Flo GDPR-style export with point events."""
+    export = {
+        "userProfile": {"name": "test", "tags": ["}", "]", "\\"]},
+        "operationalData": {
+            "point_events_manual_v2": [
+                {"date": "2024-01-04 00:00:00.0", "category": "Symptom", "subcategory": "DrawingPain"},
+                {"date": "2024-01-04 09:30:00.0", "category": "Symptom", "subcategory": "DrawingPain"},
+                {"date": "2024-01-04 00:00:00.0", "category": "Mood", "subcategory": "Panic"},
+                {"date": "2024-01-02 00:00:00.0", "category": "Disturber", "subcategory": "Stress"},
+                {"date": "2024-01-02 00:00:00.0", "category": "Fluid", "subcategory": "Creamy"},
+                {"date": "2024-01-03 00:00:00.0", "category": "Sex", "subcategory": "High Sex Drive"},
+                {"date": "2024-01-03 00:00:00.0", "category": "Unknown", "subcategory": "Thing"},
+                {"date": None, "category": "Symptom", "subcategory": "Acne"},
+            ],
+            "cycles": [
+                {"period_start_date": "2024-02-01 00:00:00.0", "period_end_date": "2024-02-05 00:00:00.0"},
+                {"period_start_date": "2024-01-04 00:00:00.0", "period_end_date": "2024-01-08 00:00:00.0"},
+                {"period_start_date": "2024-02-29 00:00:00.0"},
+            ],
+        },
+    }
+    path.write_text(json.dumps(export), encoding="utf-8")
+    return path
+
+
+class TestStreamingParser:
+    def test_stream_matches_parse_sample(self):
+        """Streaming mode should match the in-memory parser on the sample export."""
+        if not SAMPLE_EXPORT.exists():
+            pytest.skip("Sample test file not found")
+
+        assert parse_flo_export(SAMPLE_EXPORT, stream=True) == parse_flo_export(SAMPLE_EXPORT)
+
+    @pytest.mark.parametrize("chunk_size", [1, 7, 4096])
+    def test_stream_matches_parse_gdpr(self, tmp_path, chunk_size):
+        """Records should not depend on where chunk boundaries fall."""
+        export = write_gdpr_export(tmp_path / "flo.json")
+        cycles, logs = parse_flo_export(export)
+
+        records = list(FloParser(export).iter_parse(chunk_size=chunk_size))
+
+        assert [r for r in records if isinstance(r, Cycle)] == cycles
+        assert [r for r in records if not isinstance(r, Cycle)] == logs
+
+    def test_stream_folds_point_events(self, tmp_path):
+        """Point events should be grouped per day and de-duplicated."""
+        export = write_gdpr_export(tmp_path / "flo.json")
+
+        cycles, logs = parse_flo_export(export, stream=True)
+
+        assert [c.length for c in cycles] == [28, 28, None]
+        assert [str(l.date) for l in logs] == ["2024-01-02", "2024-01-03", "2024-01-04"]
+        assert logs[0].disturbers == ["stress"]
+        assert logs[0].fluid == "creamy"
+        assert logs[1].sex_drive == "high"
+        assert logs[2].symptoms == ["cramps"]
+        assert logs[2].mood == "anxious"
+
+    def test_stream_rejects_truncated_file(self, tmp_path):
+        export = tmp_path / "flo.json"
+        export.write_text('{"periods": [{"start_date": "2024-01-05"}', encoding="utf-8")
+
+        with pytest.raises(ValueError):
+            parse_flo_export(export, stream=True)
+
+    @pytest.mark.parametrize("chunk_size", [1, 4096])
+    def test_stream_accepts_null_sections(self, tmp_path, chunk_size):
+        export = tmp_path / "flo.json"
+        export.write_text(
+            '{"periods": [{"start_date": "2024-01-01"}], "logs": null}', encoding="utf-8"
+        )
+
+        records = list(FloParser(export).iter_parse(chunk_size=chunk_size))
+
+        assert records == parse_flo_export(export)[0]
+        assert load_any_export(export, stream=True)[2] == "flo"
+
+
+def write_app_export(path: Path) -> Path:
+    """Write a small FLux app export with its marker after the arrays."""
+    export = {
+        "cycles": [{"startDate": "2024-01-04", "periodLength": 5}, {"startDate": "2024-02-01"}],
+        "logs": [{"date": "2024-01-05", "flow": "heavy", "sexDrive": "high", "isPeriod": True}],
+        "modelParams": {"version": 1},
+        "exportedAt": "2024-03-01T10:00:00Z",
+    }
+    path.write_text(json.dumps(export), encoding="utf-8")
+    return path
+
+
+class TestLoadAnyExport:
+    @pytest.mark.parametrize("stream", [False, True])
+    def test_detects_flo_export(self, tmp_path, stream):
+        export = write_gdpr_export(tmp_path / "flo.json")
+
+        cycles, logs, input_format = load_any_export(export, stream=stream)
+
+        assert input_format == "flo"
+        assert (cycles, logs) == parse_flo_export(export)
+
+    @pytest.mark.parametrize("stream", [False, True])
+    def test_detects_app_export(self, tmp_path, stream):
+        export = write_app_export(tmp_path / "app.json")
+        expected = parse_app_export(export)
+
+        cycles, logs, input_format = load_any_export(export, stream=stream)
+
+        assert input_format == "app"
+        assert cycles == expected.cycles
+        assert logs == expected.logs
+        assert logs[0].sex_drive == "high"
+
+    @pytest.mark.parametrize("stream", [False, True])
+    def test_explicit_format_skips_detection(self, tmp_path, stream):
+        export = write_app_export(tmp_path / "app.json")
+
+        cycles, logs, input_format = load_any_export(export, "flo", stream=stream)
+
+        assert input_format == "flo"
+        assert [str(c.start_date) for c in cycles] == ["2024-01-04", "2024-02-01"]
+        assert logs[0].flow == "heavy"
+
+    def test_sniff_stops_at_app_marker(self):
+        """Nothing after the marker is read, so a truncated tail goes unnoticed."""
+        assert sniff_export_format(io.StringIO('{"exportedAt": "2024", "logs": [{"da'), 4) == "app"
+        assert sniff_export_format(io.StringIO('{"periods": [{"exportedAt": 1}]}')) == "flo"
+
+    def test_rejects_unknown_format(self, tmp_path):
+        with pytest.raises(ValueError):
+            load_any_export(write_app_export(tmp_path / "app.json"), "csv")
+
+
+class TestAppExport:
+    @pytest.mark.parametrize("chunk_size", [7, 65536])
+    def test_parse_streams_logs(self, tmp_path, chunk_size):
+        export = parse_app_export(write_app_export(tmp_path / "app.json"), chunk_size=chunk_size)
+
+        assert export.exported_at.isoformat() == "2024-03-01T10:00:00+00:00"
+        assert [c.period_length for c in export.cycles] == [5, None]
+        assert export.logs[0].is_period is True
+        assert export.logs[0].sex_drive == "high"
+
+    def test_validate_records_in_batches(self):
+        entries = [
+            {"date": f"2024-01-{day:02d}", "sexDrive": "high", "symptoms": ["cramps"]}
+            for day in range(1, 11)
+        ]
+
+        logs = validate_records(DailyLog, entries, batch_size=3)
+
+        assert [log.date.day for log in logs] == list(range(1, 11))
+        assert all(log.sex_drive == "high" and log.symptoms == ["cramps"] for log in logs)
+
+    def test_invalid_record_raises(self):
+        with pytest.raises(ValueError):
+            validate_records(DailyLog, [{"date": "2024-01-01"}, {"date": "not a date"}])
+
+    def test_snake_case(self):
+        assert to_snake_case("isPeriod") == "is_period"
+        assert to_snake_case("StartDate") == "start_date"
+        assert to_snake_case("date") == "date"
+
+
+class TestColumnarPointEvents:
+    def test_matches_per_event_accumulator(self):
+        """The columnar path should produce the same entries as the event loop."""
+        subcategories = {
+            "Symptom": ["Acne", "DrawingPain", "Headache", "Unknown"],
+            "Mood": ["Happy", "Panic"],
+            "Fluid": ["Dry", "Eggwhite"],
+            "Disturber": ["Stress", "Alcohol"],
+            "Sex": ["High Sex Drive", "None"],
+            "Note": ["Text"],
+        }
+        events = []
+        for i in range(500):
+            category = list(subcategories)[i % len(subcategories)]
+            events.append({
+                "date": f"2024-01-{i % 23 + 1:02d} 00:00:00.0" if i % 41 else None,
+                "category": category,
+                "subcategory": subcategories[category][i * 7 % len(subcategories[category])],
+            })
+
+        parser = FloParser("export.json")
+        accumulator = PointEventAccumulator(parser._parse_event_date)
+        for event in events:
+            accumulator.add(event)
+
+        assert parser._convert_point_events_to_logs(events) == accumulator.entries()
+
+    def test_empty_events(self):
+        assert FloParser("export.json")._convert_point_events_to_logs([]) == []
+
+
+class TestJsonStream:
+    def test_events_for_tracked_paths_only(self):
+        doc = '{"skip": {"a": [1, "]"]}, "data": {"items": [1, {"b": null}], "n": 2}}'
+
+        events = list(iter_json_events(io.StringIO(doc), [("data", "items")], chunk_size=3))
+
+        items = [value for event, path, value in events if event == "item"]
+        assert items == [1, {"b": None}]
+        assert ("end_array", ("data", "items"), None) in events
+
+    def test_null_values_are_not_incomplete_input(self):
+        doc = '{"items": [null, 1, null], "value": null}'
+
+        events = list(iter_json_events(io.StringIO(doc), [("items",), ("value",)], chunk_size=2))
+
+        assert [value for event, _, value in events if event == "item"] == [None, 1, None]
+        assert ("value", ("value",), None) in events
+
+
+class TestDateParser:
+    @pytest.mark.parametrize(
+        "value, expected",
+        [
+            ("2018-10-22 00:00:00.0", date(2018, 10, 22)),
+            ("2018-10-22 13:45:10", date(2018, 10, 22)),
+            ("2018-10-22", date(2018, 10, 22)),
+            ("2018-10-22T13:45:10Z", date(2018, 10, 22)),
+            ("2018-10-22T13:45:10.123456Z", date(2018, 10, 22)),
+            ("2018-10-22T13:45:10.5", date(2018, 10, 22)),
+            ("2024-1-5", date(2024, 1, 5)),
+            ("22.10.2018", date(2018, 10, 22)),
+            ("2018/10/22", date(2018, 10, 22)),
+            ("2024-02-30", None),
+            ("2018-10-22 25:00:00", None),
+            ("2018-10-22 00:00:00.0Z", None),
+            ("not a date", None),
+            (None, None),
+        ],
+    )
+    def test_matches_supported_formats(self, value, expected):
+        assert DateParser().parse(value) == expected
+
+    def test_fast_path_rejects_non_iso(self):
+        assert parse_iso_fast("2018-10-22") == date(2018, 10, 22)
+        assert parse_iso_fast("22-10-2018") is None
+        assert parse_iso_fast("2018-10-22 00:00") is None
+
+    def test_detected_format_keeps_day_first_priority(self):
+        """Remembering a field's format must not flip ambiguous dates."""
+        parser = DateParser()
+
+        assert parser.parse("12/25/2024", "log") == date(2024, 12, 25)
+        assert parser.parse("01/02/2024", "log") == date(2024, 2, 1)
+
+    def test_cache_is_bounded(self):
+        parser = DateParser(cache_size=2)
+        for day in range(1, 10):
+            parser.parse(f"2024-01-{day:02d}")
+
+        assert len(parser._cache) <= 2
@@ -0,0 +1,43 @@
+"""Tests that the ml package loads its heavy dependencies lazily."""
+
+import ast
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).parent.parent.parent
+
+HEAVY = ["numpy", "pandas", "prophet", "ml.models.cycle_predictor"]
+
+
+def loaded_modules(code: str, modules: list[str]) -> list[str]:
+    """Run ``code`` in a fresh interpreter and return which of ``modules`` it loaded."""
+    probe = f"{code}\nimport sys\nprint([m for m in {modules!r} if m in sys.modules])"
+    result = subprocess.run(
+        [sys.executable, "-c", probe], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+    )
+    return ast.literal_eval(result.stdout.strip().splitlines()[-1])
+
+
+class TestLazyImports:
+    def test_import_ml_loads_nothing_heavy(self):
+        assert loaded_modules("import ml", HEAVY) == []
+
+    def test_public_names_resolve_on_access(self):
+        code = "import ml\nassert ml.Cycle.__name__ == 'Cycle'\nassert 'Cycle' in dir(ml)"
+        assert loaded_modules(code, ["ml.models.schemas", "pandas"]) == ["ml.models.schemas"]
+
+    def test_unknown_attribute_raises(self):
+        import ml
+
+        with pytest.raises(AttributeError, match="NotAThing"):
+            ml.NotAThing
+
+    @pytest.mark.parametrize(
+        "module", ["ml.preprocessing.flo_parser", "ml.training.train", "backend.main"]
+    )
+    def test_parser_and_api_skip_pandas_and_predictor(self, module):
+        heavy = ["pandas", "prophet", "ml.models.cycle_predictor"]
+        assert loaded_modules(f"import {module}", heavy) == []
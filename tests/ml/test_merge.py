@@ -0,0 +1,111 @@
+"""Tests for merging overlapping export histories."""
+
+from datetime import date
+from pathlib import Path
+
+from ml.models.schemas import Cycle, DailyLog
+from ml.preprocessing.merge import MergedHistory
+
+
+def flo_source() -> tuple[list[Cycle], list[DailyLog]]:
+    cycles = [
+        Cycle(start_date=date(2024, 1, 1), length=28, period_length=5),
+        Cycle(start_date=date(2024, 1, 29), length=28, period_length=4),
+        Cycle(start_date=date(2024, 2, 26), period_length=5),
+    ]
+    logs = [
+        DailyLog(date=date(2024, 1, 2), flow="heavy", symptoms=["cramps"]),
+        DailyLog(date=date(2024, 1, 3), symptoms=["cramps"], mood="sad"),
+    ]
+    return cycles, logs
+
+
+def app_source() -> tuple[list[Cycle], list[DailyLog]]:
+    cycles = [
+        # The Flo cycle of Feb 26, logged a day later in the app
+        Cycle(start_date=date(2024, 2, 27), length=28),
+        Cycle(start_date=date(2024, 3, 26)),
+    ]
+    logs = [
+        DailyLog(date=date(2024, 1, 3), symptoms=["headache"], mood="happy"),
+        DailyLog(date=date(2024, 3, 27), flow="light"),
+    ]
+    return cycles, logs
+
+
+class TestMergedHistory:
+    def test_merges_overlapping_sources(self):
+        history, stats = MergedHistory.from_sources([flo_source(), app_source()])
+
+        cycles = history.cycles()
+        assert [c.start_date.isoformat() for c in cycles] == [
+            "2024-01-01", "2024-01-29", "2024-02-27", "2024-03-26",
+        ]
+        # The Jan 29 cycle now ends at the app's start; the app keeps its own length
+        assert [c.length for c in cycles] == [28, 29, 28, None]
+        assert cycles[2].period_length == 5  # Filled in from Flo
+
+        log = history.log_on(date(2024, 1, 3))
+        assert log.symptoms == ["headache", "cramps"]
+        assert log.mood == "happy"
+        assert [l.date.day for l in history.logs()] == [2, 3, 27]
+        assert (stats.cycles_added, stats.cycles_updated) == (4, 1)
+        assert (stats.logs_added, stats.logs_updated) == (3, 1)
+
+    def test_incremental_add_matches_sort_merge(self):
+        merged, _ = MergedHistory.from_sources([flo_source(), app_source()])
+        history = MergedHistory()
+        history.add(*flo_source())
+        history.add(*app_source())
+
+        assert history.cycles() == merged.cycles()
+        assert history.logs() == merged.logs()
+
+    def test_repeated_import_only_adds_new_records(self):
+        history = MergedHistory()
+        history.add(*flo_source())
+        history.add(*app_source())
+        before = (history.cycles(), history.logs())
+
+        cycles, logs = app_source()
+        stats = history.add(cycles, logs + [DailyLog(date=date(2024, 4, 1), mood="happy")])
+
+        assert stats.cycles_added == stats.cycles_updated == stats.logs_updated == 0
+        assert stats.logs_added == 1
+        assert stats.cycles_unchanged == 2 and stats.logs_unchanged == 2
+        assert history.cycles() == before[0]
+        assert history.logs()[:-1] == before[1]
+
+    def test_lower_priority_source_only_fills_gaps(self):
+        history = MergedHistory()
+        history.add(*app_source())
+        history.add(*flo_source(), priority=-1)
+
+        assert history.cycle_on(date(2024, 3, 1)).start_date == date(2024, 2, 27)
+        assert history.log_on(date(2024, 1, 3)).mood == "happy"
+        assert history.log_on(date(2024, 1, 2)).flow == "heavy"
+
+    def test_range_queries(self):
+        history, _ = MergedHistory.from_sources([flo_source(), app_source()])
+
+        assert [l.date.day for l in history.logs_between(date(2024, 1, 3), date(2024, 3, 27))] == [
+            3, 27,
+        ]
+        assert history.cycle_on(date(2023, 12, 31)) is None
+        assert history.cycle_on(date(2024, 2, 26)).start_date == date(2024, 1, 29)
+        assert (history.n_cycles, history.n_logs) == (4, 3)
+
+    def test_merges_flo_and_app_exports_of_one_user(self, tmp_path):
+        from ml.training.synthetic import generate
+        from ml.training.train import merge_training_data
+
+        written = {item["format"]: item for item in generate(tmp_path, users=1, years=2)}
+
+        history, stats, formats = merge_training_data(
+            [Path(written["flo"]["path"]), Path(written["app"]["path"])]
+        )
+
+        assert formats == ["flo", "app"]
+        # Both exports describe the same periods and days
+        assert stats.cycles_added == stats.cycles_unchanged == written["flo"]["cycles"]
+        assert history.n_logs == written["app"]["records"]
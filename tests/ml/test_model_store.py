@@ -0,0 +1,164 @@
+"""Tests for the memory-mapped model store."""
+
+from datetime import date, datetime
+
+import numpy as np
+import pytest
+
+from ml.models.schemas import ModelParams, Prediction
+from ml.training.model_store import (
+    HEADER_SIZE,
+    RECORD_DTYPE,
+    InvalidModelStore,
+    ModelStore,
+    user_key,
+)
+
+
+def make_params(length: int = 28, model_type: str = "bayesian") -> ModelParams:
+    return ModelParams(
+        trained_at=datetime(2024, 5, 1, 12, 30),
+        cycles_trained=7,
+        model_type=model_type,
+        prediction=Prediction(
+            next_period_date=date(2024, 6, 1),
+            confidence=0.85,
+            expected_cycle_length=length,
+            fertile_window_start=date(2024, 5, 13),
+            fertile_window_end=date(2024, 5, 18),
+            period_length=5,
+        ),
+        avg_cycle_length=28.3,
+        std_cycle_length=1.2,
+        recent_cycle_lengths=[30, 28, 29, 27, 28, 29, 28],
+        trend=-0.5,
+    )
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestModelStore:
+    def test_roundtrip(self, tmp_path):
+        store = ModelStore(tmp_path / "models.bin")
+        params = make_params()
+
+        store.put("alice", params)
+        loaded = ModelStore(tmp_path / "models.bin").get("alice")
+
+        expected = params.model_copy(update={"recent_cycle_lengths": [28, 29, 27, 28, 29, 28]})
+        assert loaded == expected
+        assert store.get("bob") is None
+        assert "alice" in store and "bob" not in store
+
+    def test_missing_file_is_empty(self, tmp_path):
+        store = ModelStore(tmp_path / "models.bin")
+
+        assert len(store) == 0
+        assert store.get("alice") is None
+        assert store.version("alice") == 0
+
+    def test_versions_and_generation(self, tmp_path):
+        store = ModelStore(tmp_path / "models.bin")
+
+        assert store.put("alice", make_params(28)) == 1
+        assert store.put("alice", make_params(30)) == 2
+        store.put_many([("bob", make_params()), ("carol", make_params())])
+
+        assert store.version("alice") == 2
+        assert store.version("bob") == 1
+        assert store.get("alice").prediction.expected_cycle_length == 30
+        assert store.generation == 3
+        assert len(store) == 3
+
+    def test_grows_past_initial_capacity(self, tmp_path):
+        store = ModelStore(tmp_path / "models.bin")
+        store.put_many((f"user-{i}", make_params(21 + i % 20)) for i in range(500))
+
+        assert len(store) == 500
+        assert store.stats()["capacity"] >= 1000
+        for i in range(0, 500, 37):
+            assert store.get(f"user-{i}").prediction.expected_cycle_length == 21 + i % 20
+
+    def test_reader_sees_swap_after_refresh_interval(self, tmp_path):
+        clock = FakeClock()
+        reader = ModelStore(tmp_path / "models.bin", refresh_interval=5.0, clock=clock)
+        writer = ModelStore(tmp_path / "models.bin")
+
+        writer.put("alice", make_params())
+        assert reader.get("alice") is None  # Not checked yet
+
+        clock.now = 5.0
+        assert reader.get("alice") is not None
+
+    def test_writers_do_not_lose_updates(self, tmp_path):
+        first = ModelStore(tmp_path / "models.bin", refresh_interval=3600)
+        second = ModelStore(tmp_path / "models.bin", refresh_interval=3600)
+
+        first.put("alice", make_params())
+        second.put("bob", make_params())
+
+        assert ModelStore(tmp_path / "models.bin").version("alice") == 1
+        assert len(ModelStore(tmp_path / "models.bin")) == 2
+
+    def test_put_rewrites_the_record_in_place(self, tmp_path):
+        path = tmp_path / "models.bin"
+        store = ModelStore(path)
+        store.put_many([("alice", make_params(28)), ("bob", make_params(29))])
+        reader = ModelStore(path, refresh_interval=3600)
+        inode = path.stat().st_ino
+
+        assert store.put("alice", make_params(31)) == 2
+        assert store.put("carol", make_params(33)) == 1
+
+        assert path.stat().st_ino == inode
+        # The reader's mapping shows the new records before any refresh
+        assert reader.get("alice").prediction.expected_cycle_length == 31
+        assert reader.get("carol").prediction.expected_cycle_length == 33
+        assert ModelStore(path).get("bob").prediction.expected_cycle_length == 29
+        assert store.generation == 3 and len(store) == 3
+
+    def test_record_with_a_bad_checksum_is_absent(self, tmp_path):
+        path = tmp_path / "models.bin"
+        store = ModelStore(path)
+        store.put_many([("alice", make_params()), ("bob", make_params())])
+        index = int(np.flatnonzero(store._snapshot[2]["key"] == user_key("alice"))[0])
+        offset = HEADER_SIZE + index * RECORD_DTYPE.itemsize
+        offset += RECORD_DTYPE.fields["confidence"][1]
+
+        data = bytearray(path.read_bytes())
+        data[offset] ^= 0xFF
+        path.write_bytes(bytes(data))
+
+        store = ModelStore(path)
+        assert store.get("alice") is None
+        assert store.get("bob") is not None
+
+    def test_upgrades_format_1_stores(self, tmp_path):
+        path = tmp_path / "models.bin"
+        ModelStore(path).put_many([("alice", make_params(28)), ("bob", make_params(29))])
+        data = bytearray(path.read_bytes())
+        data[4:6] = (1).to_bytes(2, "little")
+        records = np.frombuffer(data, dtype=RECORD_DTYPE, offset=HEADER_SIZE)
+        records["checksum"] = 0
+        path.write_bytes(bytes(data))
+
+        store = ModelStore(path)
+        assert store.get("alice").prediction.expected_cycle_length == 28
+
+        store.put("alice", make_params(30))
+
+        upgraded = ModelStore(path)
+        assert upgraded.get("alice").prediction.expected_cycle_length == 30
+        assert upgraded.get("bob").prediction.expected_cycle_length == 29
+
+    def test_rejects_other_files(self, tmp_path):
+        (tmp_path / "models.bin").write_bytes(b"{}" * 64)
+
+        with pytest.raises(InvalidModelStore):
+            ModelStore(tmp_path / "models.bin")
@@ -1,6 +1,7 @@
 """Tests for the cycle prediction model."""
 
 import pytest
+import numpy as np
 from datetime import date, timedelta
 
 from ml.models.schemas import Cycle
@@ -112,6 +113,76 @@ class TestCyclePredictor:
         assert 4 <= window_length <= 6
 
 
+class TestBayesianCyclePredictor:
+    def test_regular_cycles(self):
+        """Regular cycles give their length, a fertile window and high confidence."""
+        from ml.training.forecast import BayesianCyclePredictor
+
+        cycles = create_test_cycles(date(2024, 1, 1), [28, 28, 28, 28, 28])
+        result = BayesianCyclePredictor().fit(cycles).predict()
+
+        assert result.expected_cycle_length == 28
+        assert result.next_period_date == cycles[-1].start_date + timedelta(days=28)
+        assert result.fertile_window_end == result.next_period_date - timedelta(days=14)
+        assert (result.fertile_window_end - result.fertile_window_start).days == 5
+        assert result.confidence > 0.7
+
+    def test_irregular_cycles_lower_confidence(self):
+        from ml.training.forecast import BayesianCyclePredictor
+
+        regular = create_test_cycles(date(2024, 1, 1), [28, 29, 28, 27, 28])
+        irregular = create_test_cycles(date(2024, 1, 1), [22, 38, 24, 40, 26])
+
+        assert (
+            BayesianCyclePredictor().fit(irregular).predict().confidence
+            < BayesianCyclePredictor().fit(regular).predict().confidence
+        )
+
+    def test_favors_recent_cycles(self):
+        from ml.training.forecast import BayesianCyclePredictor
+
+        cycles = create_test_cycles(date(2024, 1, 1), [35, 35, 35, 28, 28, 28])
+
+        assert BayesianCyclePredictor().fit(cycles).predict().expected_cycle_length <= 31
+
+    def test_insufficient_data(self):
+        from ml.training.forecast import BayesianCyclePredictor
+
+        with pytest.raises(ValueError, match="at least 2 cycles"):
+            BayesianCyclePredictor().fit([Cycle(start_date=date(2024, 1, 1))])
+
+    def test_fit_batch_matches_single_fits(self):
+        """One vectorized fit should equal fitting each user separately."""
+        from ml.preprocessing.feature_engineering import cycles_to_ragged
+        from ml.training.forecast import BayesianCyclePredictor
+
+        histories = [
+            create_test_cycles(date(2024, 1, 1), [28, 29, 27, 28, 30, 31, 26]),
+            create_test_cycles(date(2022, 2, 2), [28]),
+            create_test_cycles(date(2023, 5, 3), [35, 15, 33, 50, 34]),
+        ]
+        model = BayesianCyclePredictor()
+        predictions = model.predictions(model.fit_batch(*cycles_to_ragged(histories)))
+
+        assert predictions[1] is None
+        for i in (0, 2):
+            assert predictions[i] == BayesianCyclePredictor().fit(histories[i]).predict()
+
+    def test_export_params(self, tmp_path):
+        from ml.models.schemas import ModelParams
+        from ml.training.forecast import BayesianCyclePredictor
+
+        cycles = create_test_cycles(date(2024, 1, 1), [28, 29, 28, 27, 28])
+        predictor = BayesianCyclePredictor().fit(cycles)
+        predictor.save(tmp_path / "model_params.json")
+        params = ModelParams.model_validate_json((tmp_path / "model_params.json").read_text())
+
+        assert params.model_type == "bayesian"
+        assert params.cycles_trained == len(cycles)
+        assert params.prediction == predictor.predict()
+        assert params.recent_cycle_lengths == [28, 29, 28, 27, 28]
+
+
 class TestFloParser:
     def test_parse_sample_export(self):
         """Should parse sample Flo export correctly."""
@@ -143,3 +214,218 @@ class TestFeatureEngineering:
         assert features["n_cycles"] == 5
         assert 27 <= features["mean_length"] <= 29
         assert features["regularity_score"] > 0.5
+
+    def test_compute_features_batch(self):
+        """Batch features should match per-user features."""
+        from ml.preprocessing.feature_engineering import (
+            compute_cycle_features,
+            compute_cycle_features_batch,
+            cycles_to_ragged,
+        )
+
+        histories = [
+            create_test_cycles(date(2024, 1, 1), [28, 29, 27, 28, 30, 31, 26]),
+            create_test_cycles(date(2023, 5, 3), [35, 15, 33, 50]),
+            create_test_cycles(date(2022, 2, 2), [28]),
+            [],
+        ]
+
+        features = compute_cycle_features_batch(*cycles_to_ragged(histories))
+
+        for i in (0, 1):
+            expected = compute_cycle_features(histories[i])
+            assert features["error"][i] is None
+            for key in ["mean_length", "std_length", "rolling_mean_3", "regularity_score"]:
+                if key in expected:
+                    assert features[key][i] == pytest.approx(expected[key])
+                else:
+                    assert np.isnan(features[key][i])
+            for key in ["n_cycles", "min_length", "max_length", "last_length", "last_month"]:
+                assert features[key][i] == expected[key]
+            offsets = features["cycle_length_offsets"]
+            lengths = features["cycle_lengths"][offsets[i]:offsets[i + 1]]
+            assert list(lengths) == expected["cycle_lengths"]
+
+        assert features["rolling_mean_6"][0] == pytest.approx(
+            compute_cycle_features(histories[0])["rolling_mean_6"]
+        )
+        assert features["error"][2] == "Not enough valid cycles (21-45 days)"
+        assert features["error"][3] == "Need at least 2 cycles for features"
+
+
+class TestCompactColumns:
+    def make_logs(self):
+        from ml.models.schemas import DailyLog
+
+        return [
+            DailyLog(date=date(2024, 1, 1), flow="heavy", symptoms=["cramps", "acne"],
+                     mood="happy", is_period=True),
+            DailyLog(date=date(2024, 1, 2), symptoms=["acne", "acne"], temperature=36.55,
+                     notes="slept badly", is_period=False),
+            DailyLog(date=date(2023, 12, 31), mood="not_a_flo_mood",
+                     disturbers=["travel", "something_new"]),
+            DailyLog(date=date(2024, 1, 3)),
+        ]
+
+    def test_logs_roundtrip(self):
+        """Unknown values, list order, duplicates and sparse fields survive."""
+        from ml.preprocessing.compact import DailyLogColumns
+
+        logs = self.make_logs()
+        columns = DailyLogColumns.from_logs(logs)
+
+        assert columns.to_logs() == logs
+        assert len(columns) == 4
+        assert columns.has("symptoms", "acne").tolist() == [True, True, False, False]
+        assert columns.has("mood", "not_a_flo_mood").tolist() == [False, False, True, False]
+        assert not columns.has("symptoms", "never_logged").any()
+
+    def test_cycles_roundtrip(self):
+        from ml.preprocessing.compact import CycleColumns
+
+        cycles = create_test_cycles(date(2024, 1, 1), [28, 29, 27])
+        cycles[0] = cycles[0].model_copy(update={"end_date": date(2024, 1, 5)})
+        columns = CycleColumns.from_cycles(cycles)
+
+        assert columns.to_cycles() == cycles
+        assert columns.start.dtype == np.int32
+
+    def test_too_many_bitset_values(self):
+        from ml.models.schemas import DailyLog
+        from ml.preprocessing.compact import DailyLogColumns
+
+        logs = [DailyLog(date=date(2024, 1, 1), symptoms=[f"s{i}" for i in range(100)])]
+
+        with pytest.raises(ValueError, match="bitset"):
+            DailyLogColumns.from_logs(logs)
+
+    def test_features_match_lists(self):
+        """Feature and training functions give the same results for both forms."""
+        from ml.preprocessing.compact import CycleColumns, DailyLogColumns
+        from ml.preprocessing.feature_engineering import (
+            compute_cycle_features,
+            compute_log_features,
+            cycles_to_ragged,
+        )
+        from ml.training.forecast import BayesianCyclePredictor
+
+        cycles = create_test_cycles(date(2024, 1, 1), [28, 29, 27, 28, 30, 31])
+        cycles.reverse()
+        logs = self.make_logs() + [
+            self.make_logs()[1].model_copy(update={"date": date(2024, 2, d)}) for d in range(1, 12)
+        ]
+        cycle_columns = CycleColumns.from_cycles(cycles)
+
+        assert compute_cycle_features(cycle_columns) == compute_cycle_features(cycles)
+        from_columns = compute_log_features(DailyLogColumns.from_logs(logs), cycle_columns)
+        from_lists = compute_log_features(logs, cycles)
+        for key in ["symptom_frequencies", "mood_frequencies", "avg_temperature", "unassigned"]:
+            assert from_columns[key] == from_lists[key]
+        # The columns' vocabularies include every Flo value, so compare by name
+        for i, symptom in enumerate(from_lists["symptom_vocabulary"]):
+            j = from_columns["symptom_vocabulary"].index(symptom)
+            for key in ["symptom_by_cycle_day", "symptom_by_phase"]:
+                assert from_columns[key][:, j].tolist() == from_lists[key][:, i].tolist()
+        for ours, theirs in zip(cycles_to_ragged([cycle_columns]), cycles_to_ragged([cycles])):
+            assert ours.tolist() == theirs.tolist()
+        assert BayesianCyclePredictor().fit(cycle_columns).predict() == (
+            BayesianCyclePredictor().fit(cycles).predict()
+        )
+
+
+class TestPhaseAggregation:
+    def test_assign_cycle_days(self):
+        from ml.preprocessing.phases import assign_cycle_days
+
+        starts = np.array([100, 128, 157])
+        cycle, day = assign_cycle_days(np.array([99, 100, 127, 128, 170]), starts)
+
+        assert cycle.tolist() == [-1, 0, 0, 1, 2]
+        assert day[1:].tolist() == [0, 27, 0, 13]
+
+    def test_phase_matrices(self):
+        """Logs land in the phase and cycle day they were logged on."""
+        from ml.models.schemas import DailyLog
+        from ml.preprocessing.feature_engineering import compute_log_features
+        from ml.preprocessing.phases import likely_symptoms, symptom_rates
+
+        cycles = create_test_cycles(date(2024, 1, 1), [28, 28, 28])
+        for cycle in cycles:
+            cycle.period_length = 5
+        logs = [DailyLog(date=date(2023, 12, 30), symptoms=["cramps"])]
+        for cycle in cycles:
+            start = cycle.start_date
+            logs += [
+                DailyLog(date=start, symptoms=["cramps", "cramps"], mood="sad"),
+                DailyLog(date=start + timedelta(days=1), symptoms=["cramps"]),
+                DailyLog(date=start + timedelta(days=7), mood="happy"),  # Follicular
+                DailyLog(date=start + timedelta(days=13), symptoms=["acne"]),  # Ovulation
+                DailyLog(date=start + timedelta(days=25), symptoms=["bloating"], mood="sad"),
+            ]
+
+        features = compute_log_features(logs, cycles)
+        symptoms = features["symptom_vocabulary"]
+
+        assert features["unassigned"] == 1
+        assert features["logs_by_phase"].tolist() == [8, 4, 4, 4]  # 4 cycles
+        assert features["symptom_by_cycle_day"][0, symptoms.index("cramps")] == 4
+        assert features["symptom_by_cycle_day"][1, symptoms.index("cramps")] == 4
+        assert features["symptom_by_phase"][:, symptoms.index("acne")].tolist() == [0, 0, 4, 0]
+        moods = features["mood_vocabulary"]
+        assert features["mood_by_phase"][:, moods.index("sad")].tolist() == [4, 0, 0, 4]
+        assert symptom_rates(features)[0, symptoms.index("cramps")] == 1.0
+        assert likely_symptoms(features, "menstrual") == ["cramps"]
+        assert likely_symptoms(features, "luteal") == ["bloating"]
+
+
+class TestIncrementalCycleStats:
+    def test_matches_compute_features(self):
+        """Running statistics should agree with a full recompute."""
+        from ml.preprocessing.cycle_stats import IncrementalCycleStats
+        from ml.preprocessing.feature_engineering import compute_cycle_features
+
+        cycles = create_test_cycles(date(2024, 1, 1), [28, 29, 15, 27, 31, 28, 50, 30])
+
+        expected = compute_cycle_features(cycles)
+        features = IncrementalCycleStats.from_cycles(cycles).features()
+
+        assert features["recent_cycle_lengths"] == expected["cycle_lengths"][-6:]
+        for key in ["mean_length", "std_length", "rolling_mean_3", "rolling_mean_6",
+                    "trend", "regularity_score"]:
+            assert features[key] == pytest.approx(expected[key])
+        for key in ["min_length", "max_length", "last_length", "n_cycles", "last_start_date"]:
+            assert features[key] == expected[key]
+
+    def test_append_and_roundtrip(self, tmp_path):
+        """Appending a cycle to loaded statistics equals building from scratch."""
+        from ml.preprocessing.cycle_stats import IncrementalCycleStats
+
+        cycles = create_test_cycles(date(2024, 1, 1), [28, 29, 27, 30, 28])
+        stats = IncrementalCycleStats.from_cycles(cycles[:-1])
+        stats.save(tmp_path / "model_params.stats.json")
+
+        loaded = IncrementalCycleStats.load(tmp_path / "model_params.stats.json")
+        loaded.update(cycles[-1])
+
+        assert loaded.features() == IncrementalCycleStats.from_cycles(cycles).features()
+
+    def test_rejects_out_of_order_cycle(self):
+        from ml.preprocessing.cycle_stats import IncrementalCycleStats
+
+        stats = IncrementalCycleStats.from_cycles(create_test_cycles(date(2024, 1, 1), [28, 28]))
+
+        with pytest.raises(ValueError, match="not after the last cycle"):
+            stats.update(Cycle(start_date=date(2024, 1, 15)))
+
+    def test_duplicate_starts_are_skipped_like_compute_features(self):
+        from ml.preprocessing.cycle_stats import IncrementalCycleStats
+        from ml.preprocessing.feature_engineering import compute_cycle_features
+
+        cycles = create_test_cycles(date(2024, 1, 1), [28, 29, 27, 30])
+        cycles.insert(2, Cycle(start_date=cycles[2].start_date))
+
+        expected = compute_cycle_features(cycles)
+        features = IncrementalCycleStats.from_cycles(cycles).features()
+
+        assert features["recent_cycle_lengths"] == expected["cycle_lengths"]
+        assert features["mean_length"] == pytest.approx(expected["mean_length"])
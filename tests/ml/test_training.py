@@ -0,0 +1,179 @@
+"""Tests for the training pipeline."""
+
+import json
+import shutil
+from pathlib import Path
+
+import pytest
+
+from ml.training.batch import SUMMARY_FILE, train_batch, train_one
+from ml.training.train import TrainingError, load_training_data, validate_cycles
+
+SAMPLE_EXPORT = Path(__file__).parent.parent.parent / "data" / "test" / "sample_flo_export.json"
+
+
+@pytest.fixture
+def export_dir(tmp_path):
+    if not SAMPLE_EXPORT.exists():
+        pytest.skip("Sample test file not found")
+
+    input_dir = tmp_path / "exports"
+    input_dir.mkdir()
+    for name in ("alice", "bob"):
+        shutil.copy(SAMPLE_EXPORT, input_dir / f"{name}.json")
+    (input_dir / "too_short.json").write_text('{"periods": [{"start_date": "2024-01-05"}]}')
+    (input_dir / "broken.json").write_text("not json")
+    return input_dir
+
+
+class TestBatchTraining:
+    def test_validate_cycles_raises_instead_of_exiting(self):
+        with pytest.raises(TrainingError, match="at least 3 cycles"):
+            validate_cycles([])
+
+    def test_train_one_reports_errors(self, tmp_path):
+        result = train_one(str(tmp_path / "missing.json"), str(tmp_path / "out.json"))
+
+        assert result.status == "error"
+        assert "not found" in result.error
+        assert not (tmp_path / "out.json").exists()
+
+    def test_train_one_with_repeated_start_date(self, tmp_path):
+        export = tmp_path / "app.json"
+        starts = ["2024-01-01", "2024-01-29", "2024-01-29", "2024-02-26", "2024-03-25"]
+        export.write_text(json.dumps({
+            "exportedAt": "2024-04-01T00:00:00Z",
+            "cycles": [{"startDate": start} for start in starts],
+            "logs": [],
+        }))
+
+        result = train_one(str(export), str(tmp_path / "out.json"), model_type="weighted_average")
+
+        assert result.status == "ok", result.error
+        assert (tmp_path / "out.json").exists()
+        assert (tmp_path / "out.stats.json").exists()
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_train_batch(self, export_dir, tmp_path, workers):
+        output_dir = tmp_path / "models"
+
+        results = train_batch(
+            export_dir, output_dir, workers=workers, model_type="weighted_average", verbose=False
+        )
+
+        by_name = {Path(r.input_path).stem: r for r in results}
+        assert by_name["alice"].status == "ok"
+        assert by_name["bob"].status == "ok"
+        assert by_name["too_short"].status == "error"
+        assert by_name["broken"].status == "error"
+        assert (output_dir / "alice_model_params.json").exists()
+        assert (output_dir / "alice_model_params.stats.json").exists()
+
+        summary = json.loads((output_dir / SUMMARY_FILE).read_text())
+        assert summary["succeeded"] == 2
+        assert summary["failed"] == 2
+
+    def test_train_batch_bayesian(self, export_dir, tmp_path):
+        results = train_batch(
+            export_dir, tmp_path / "models", workers=1, model_type="bayesian", verbose=False
+        )
+
+        alice = next(r for r in results if Path(r.input_path).stem == "alice")
+        assert alice.status == "ok"
+        assert alice.model_type == "bayesian"
+        params = json.loads(Path(alice.output_path).read_text())
+        assert params["prediction"]["next_period_date"] == alice.next_period_date
+
+    def test_train_batch_writes_model_store(self, export_dir, tmp_path):
+        from ml.training.model_store import ModelStore
+
+        train_batch(
+            export_dir, tmp_path / "models", workers=1, model_type="bayesian", verbose=False,
+            store_path=tmp_path / "models.bin",
+        )
+
+        store = ModelStore(tmp_path / "models.bin")
+        assert len(store) == 2
+        assert store.get("alice").model_type == "bayesian"
+        assert store.get("broken") is None
+
+
+class TestBacktest:
+    def test_backtest_history(self):
+        from ml.training.backtest import backtest_history, synthetic_histories
+
+        history = synthetic_histories(1, seed=3)[0]
+        rows = backtest_history(history, "bayesian", max_origins=4)
+
+        assert 0 < len(rows) <= 4
+        for error, confidence, fit_s, predict_s in rows:
+            assert 0 <= confidence <= 1
+            assert fit_s >= 0 and predict_s >= 0
+
+    def test_summarize_calibration(self):
+        import numpy as np
+
+        from ml.training.backtest import summarize
+
+        # Half the 0.5-confidence predictions hit: perfectly calibrated bin
+        rows = np.array([[0, 0.5, 0.001, 0.0], [5, 0.5, 0.001, 0.0]] * 10)
+        summary = summarize(rows)
+
+        assert summary["predictions"] == 20
+        assert summary["mae_days"] == 2.5
+        assert summary["calibration"]["ece"] == 0
+        assert summary["calibration"]["bins"][0]["count"] == 20
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_run_backtest(self, workers):
+        from ml.training.backtest import run_backtest, synthetic_histories
+        from ml.training.train import load_training_data
+
+        if not SAMPLE_EXPORT.exists():
+            pytest.skip("Sample test file not found")
+        cycles, _, _ = load_training_data(SAMPLE_EXPORT)
+        sources = {"sample": [cycles], "synthetic": synthetic_histories(6)}
+
+        report = run_backtest(
+            sources, ["weighted_average", "bayesian", "prophet"], workers=workers, max_origins=3
+        )
+
+        json.dumps(report)  # The report is plain JSON
+        for name in sources:
+            for model_type in ("weighted_average", "bayesian"):
+                summary = report["sources"][name][model_type]
+                assert summary["predictions"] > 0
+                assert summary["peak_fit_memory_bytes"] > 0
+        assert report["sources"]["synthetic"]["bayesian"]["predictions"] <= 6 * 3
+
+
+class TestSyntheticExports:
+    def test_deterministic_per_user(self, tmp_path):
+        from ml.training.synthetic import generate
+
+        generate(tmp_path / "a", users=3, years=2, seed=7)
+        generate(tmp_path / "b", users=1, years=2, seed=7, first_user=2)
+        generate(tmp_path / "c", users=1, years=2, seed=8, first_user=2)
+
+        for fmt in ("flo", "app"):
+            name = f"{fmt}/user-000002.json"
+            assert (tmp_path / "a" / name).read_bytes() == (tmp_path / "b" / name).read_bytes()
+            assert (tmp_path / "a" / name).read_bytes() != (tmp_path / "c" / name).read_bytes()
+
+    def test_exports_parse_with_phase_structure(self, tmp_path):
+        from ml.preprocessing.feature_engineering import compute_log_features
+        from ml.preprocessing.phases import likely_symptoms
+        from ml.training.synthetic import generate
+
+        written = generate(tmp_path, users=1, years=4, seed=1)
+
+        for item in written:
+            cycles, logs, input_format = load_training_data(Path(item["path"]))
+            assert input_format == item["format"]
+            assert len(cycles) == item["cycles"]
+            validate_cycles(cycles)
+            features = compute_log_features(logs, cycles)
+            assert "cramps" in likely_symptoms(features, "menstrual", min_rate=0.4)
+            assert "feel_good" in likely_symptoms(features, "follicular", min_rate=0.3)
+        app_logs = load_training_data(tmp_path / "app" / "user-000000.json")[1]
+        assert len(app_logs) == written[1]["records"]